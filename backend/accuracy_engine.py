@@ -0,0 +1,118 @@
+"""
+🎯 TOPLU TAHMİN DOĞRULUĞU MOTORU (Liderlik Tablosu)
+
+analysis_engine.calculate_forecast_accuracy tek bir (mağaza, ürün) serisi içindir;
+ağın tamamı için binlerce istek gerekiyordu. Bu motor tüm serileri tek geçişte
+hesaplar ve forecast_accuracy tablosuna yazar.
+
+[OPTIMIZASYON]
+- Gerçekleşen satışlar günlük satış özetinden (sales_daily) birincil anahtarla tahminlere
+  JOIN edilir. Ham sales tablosuna JOIN, aynı gün birden fazla satış satırı olduğunda
+  tahmini birden fazla kez sayıyordu; özet her gün için tek satırdır.
+- Seri başına sadece toplamlar (Σ|e|, Σe², Σe, Σa, Σa², ...) tek GROUP BY ile döner;
+  MAE / RMSE / R² / MAPE / bias NumPy ile tüm seriler için vektörel hesaplanır.
+- Sonuç tablosu parça parça toplu INSERT (executemany) ile yenilenir.
+"""
+import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import Forecast, ForecastAccuracy, SalesDaily
+
+INSERT_CHUNK_SIZE = 5000
+
+def _series_totals(since: datetime.date, until: datetime.date):
+    """Seri başına hata toplamları (tek GROUP BY)."""
+    pairs = (
+        select(
+            Forecast.store_id,
+            Forecast.product_id,
+            Forecast.predicted_quantity.label("predicted"),
+            func.coalesce(SalesDaily.quantity, 0).label("actual"),
+        )
+        .outerjoin(SalesDaily, and_(
+            SalesDaily.store_id == Forecast.store_id,
+            SalesDaily.product_id == Forecast.product_id,
+            SalesDaily.date == Forecast.date,
+        ))
+        .where(Forecast.date >= since, Forecast.date < until)
+        .subquery()
+    )
+    error = pairs.c.predicted - pairs.c.actual
+    return (
+        select(
+            pairs.c.store_id,
+            pairs.c.product_id,
+            func.count(),
+            func.sum(func.abs(error)),
+            func.sum(error * error),
+            func.sum(error),
+            func.sum(pairs.c.actual),
+            func.sum(pairs.c.actual * pairs.c.actual),
+            func.sum(pairs.c.predicted),
+            func.sum(case((pairs.c.actual > 0, func.abs(error) * 1.0 / pairs.c.actual), else_=0)),
+            func.sum(case((pairs.c.actual > 0, 1), else_=0)),
+        )
+        .group_by(pairs.c.store_id, pairs.c.product_id)
+    )
+
+def compute_metrics(n, abs_error, sq_error, error, actual, actual_sq, ape, ape_count):
+    """
+    Toplamlardan seri başına metrikler (NumPy dizileri). calculate_forecast_accuracy ile aynı tanımlar:
+    R² = 1 - SS_res / SS_tot (tek örnekte veya SS_tot = 0 ise 1.0).
+    """
+    mae = abs_error / n
+    rmse = np.sqrt(sq_error / n)
+    ss_tot = actual_sq - actual ** 2 / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where((n > 1) & (ss_tot > 1e-9), 1 - sq_error / ss_tot, 1.0)
+        mape = np.where(ape_count > 0, ape / ape_count * 100, np.nan)
+    bias = error / n
+    return mae, rmse, r2, mape, bias
+
+def update_forecast_accuracy(db: Session, window_days: Optional[int] = None, as_of: Optional[datetime.date] = None):
+    """
+    🌙 TOPLU DOĞRULUK GÜNCELLEMESİ (Gece görevi)
+    Son ACCURACY_WINDOW_DAYS gündeki (bugün hariç) tüm tahminleri gerçekleşenle
+    karşılaştırır ve forecast_accuracy tablosunu yeniler.
+    """
+    window_days = window_days or settings.ACCURACY_WINDOW_DAYS
+    until = as_of or datetime.date.today()
+    since = until - datetime.timedelta(days=window_days)
+
+    rows = db.execute(_series_totals(since, until)).all()
+    db.execute(delete(ForecastAccuracy))
+    if rows:
+        columns = [np.array(column, dtype=np.float64) for column in zip(*rows)]
+        store_ids, product_ids, n = columns[0], columns[1], columns[2]
+        total_predicted = columns[8]
+        mae, rmse, r2, mape, bias = compute_metrics(n, *columns[3:8], *columns[9:11])
+
+        computed_at = datetime.datetime.utcnow()
+        mappings = [
+            {
+                "store_id": int(store_id), "product_id": int(product_id), "sample_size": int(size),
+                "mae": float(m), "rmse": float(r), "r2": float(q),
+                "mape": None if np.isnan(p) else float(p), "bias": float(b),
+                "total_actual": float(a), "total_predicted": float(tp),
+                "window_start": since, "window_end": until, "computed_at": computed_at,
+            }
+            for store_id, product_id, size, m, r, q, p, b, a, tp in zip(
+                store_ids, product_ids, n, mae, rmse, r2, mape, bias, columns[6], total_predicted
+            )
+        ]
+        # Core executemany: ORM toplu INSERT boş (None) MAPE'li satırlarda grupları bölüp binlerce ifadeye çıkıyordu
+        connection = db.connection()
+        for start in range(0, len(mappings), INSERT_CHUNK_SIZE):
+            connection.execute(insert(ForecastAccuracy.__table__), mappings[start:start + INSERT_CHUNK_SIZE])
+    db.commit()
+
+    return {
+        "window_start": since.isoformat(),
+        "window_end": until.isoformat(),
+        "series": len(rows),
+    }
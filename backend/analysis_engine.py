@@ -1,81 +1,99 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from models import Sale, Product, Store, Inventory, Forecast
+from sqlalchemy import case, func, select, text, update
+from typing import Optional
+import datetime
+from models import SalesDaily, Product, Store, Inventory, Forecast
+from core.config import settings
 from core.logger import logger
 # import pandas as pd # Pandas artık gerekli değil (Optimizasyon)
-# import numpy as np # Numpy da gerekli değil
+import numpy as np # Sadece toplu what-if (vektörize senaryo değerlendirme)
 # from sklearn.metrics import r2_score, mean_absolute_error # Sklearn yerine manuel hesap
 
-def calculate_abc_analysis(db: Session):
+# ABC sınıf sınırları (kümülatif ciro oranı)
+ABC_A_THRESHOLD = 0.80
+ABC_B_THRESHOLD = 0.95
+
+# What-If: transfer edilen stoğun hedefte satışa dönme oranı (varsayım)
+WHAT_IF_SELL_THROUGH = 0.7
+MAX_WHAT_IF_SCENARIOS = 100_000 # Tek istekte değerlendirilecek en fazla senaryo
+
+def calculate_abc_analysis(db: Session, window_days: Optional[int] = None, as_of: Optional[datetime.date] = None):
     """
-    🔠 ABC ANALİZİ (SQL OPTİMİZE)
+    🔠 ABC ANALİZİ (SET-BASED)
+    
+    Son N günün (ABC_WINDOW_DAYS) cirosuna göre tüm ürünleri sınıflandırır ve
+    sonucu set-based UPDATE ... FROM ifadesiyle products tablosuna yazar.
+    Gece görevi (abc_xyz_engine.update_product_classes) aynı sonucu XYZ ile birlikte
+    yazar; bu fonksiyon sadece ciroya bakan hafif yoldur. Endpoint sadece saklanan
+    sonucu okur (get_abc_results).
     
-    RAM dostu versiyon. 
-    Tüm veriyi belleğe çekmek yerine, hesaplamayı veritabanı motoruna (SQL) yıkar.
+    [OPTIMIZASYON]
+    Eski yöntem: Tüm satış geçmişi + her ürün için ayrı SELECT ve ORM güncellemesi (50k ürün = 50k sorgu).
+    Yeni yöntem: Günlük satış özeti (sales_daily) üzerinde tarih indeksli pencere + Window
+    Function + iki set-based UPDATE. Pencerede satışı olmayan ürünler C sınıfına düşer (ciro 0).
     """
-    # 1. SQL Window Functions ile Kümülatif Ciro Hesabı
-    # Modern veritabanları (PostgreSQL, SQLite 3.25+) Window Function destekler.
+    window_days = window_days or settings.ABC_WINDOW_DAYS
+    since = (as_of or datetime.date.today()) - datetime.timedelta(days=window_days)
     
-    sql_query = text("""
-    WITH product_sales AS (
-        SELECT product_id, SUM(total_price) as revenue
-        FROM sales
-        GROUP BY product_id
-    ),
-    total as (
-        SELECT SUM(revenue) as total_revenue FROM product_sales
-    ),
-    cumulative AS (
-        SELECT 
-            p.product_id, 
-            p.revenue,
-            SUM(p.revenue) OVER (ORDER BY p.revenue DESC) as running_total,
-            t.total_revenue
-        FROM product_sales p, total t
+    # 1. Pencere içi ürün cirosu ve kümülatif oran (Window Function)
+    product_sales = (
+        select(SalesDaily.product_id, func.sum(SalesDaily.revenue).label("revenue"))
+        .where(SalesDaily.date >= since)
+        .group_by(SalesDaily.product_id)
+        .subquery()
     )
-    SELECT 
-        product_id, 
-        revenue,
-        (running_total * 1.0 / total_revenue) as ratio
-    FROM cumulative;
-    """)
+    cumulative = select(
+        product_sales.c.product_id,
+        product_sales.c.revenue,
+        (func.sum(product_sales.c.revenue).over(order_by=(product_sales.c.revenue.desc(), product_sales.c.product_id))
+         * 1.0 / func.sum(product_sales.c.revenue).over()).label("ratio"),
+    ).subquery()
     
-    try:
-        results = db.execute(sql_query).fetchall()
-    except Exception as e:
-        logger.error(f"SQL Error: {e}")
-        return []
-
-    abc_results = []
+    abc_case = case(
+        (cumulative.c.ratio <= ABC_A_THRESHOLD, "A"),
+        (cumulative.c.ratio <= ABC_B_THRESHOLD, "B"),
+        else_="C",
+    )
     
-    for row in results:
-        p_id = row[0]
-        revenue = row[1]
-        ratio = row[2]
-        
-        # Sınıflandırma
-        if ratio <= 0.80:
-            abc_class = "A"
-        elif ratio <= 0.95:
-            abc_class = "B"
-        else:
-            abc_class = "C"
-            
-        # Veritabanında güncelle (Bulk Update yerine tek tek yapıyoruz şimdilik, 
-        # çünkü model bağımlılığı var. İlerde bu da bulk SQL olabilir.)
-        product = db.query(Product).filter(Product.id == p_id).first()
-        if product:
-            product.abc_category = abc_class
-            # Sadece ilk 20 veya A grubu ürünleri rapora ekle (Performance UI)
-            if len(abc_results) < 20: 
-                abc_results.append({
-                    "product": product.name,
-                    "revenue": revenue,
-                    "class": abc_class
-                })
-            
+    # 2. Pencerede satışı olan ürünler: tek ifadeyle geri yaz (UPDATE ... FROM)
+    # Not: FROM tarafı doğrudan pencere sorgusu olmalı; products LEFT JOIN alt sorgusu
+    # SQLite'ta indekssiz eşleşir (10k ürün = 100M karşılaştırma).
+    db.execute(
+        update(Product)
+        .where(Product.id == cumulative.c.product_id)
+        .values(abc_category=abc_case, abc_revenue=cumulative.c.revenue)
+        .execution_options(synchronize_session=False)
+    )
+    # 3. Satışı olmayanlar C sınıfına düşer (ciro 0)
+    db.execute(
+        update(Product)
+        .where(Product.id.not_in(select(SalesDaily.product_id).where(SalesDaily.date >= since)))
+        .values(abc_category="C", abc_revenue=0.0)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
-    return abc_results
+    
+    counts = dict(db.query(Product.abc_category, func.count(Product.id)).group_by(Product.abc_category).all())
+    counts = {abc_class: counts.get(abc_class, 0) for abc_class in ("A", "B", "C")}
+    logger.info(f"ABC analizi ({window_days} gün): A={counts['A']}, B={counts['B']}, C={counts['C']}")
+    return {
+        "window_days": window_days,
+        "since": since.isoformat(),
+        "counts": counts,
+    }
+
+def get_abc_results(db: Session, limit: int = 20, abc_class: Optional[str] = None):
+    """
+    Saklanan ABC sonucunu okur (ciroya göre azalan). Hesaplama yapmaz.
+    """
+    query = db.query(Product.name, Product.abc_revenue, Product.abc_category)
+    if abc_class:
+        query = query.filter(Product.abc_category == abc_class)
+    rows = query.order_by(Product.abc_revenue.desc(), Product.id).limit(limit).all()
+    return [
+        {"product": name, "revenue": revenue or 0.0, "class": abc_category}
+        for name, revenue, abc_category in rows
+    ]
 
 def simulate_what_if(db: Session, source_store_id: int, target_store_id: int, product_id: int, amount: int):
     """
@@ -96,7 +114,7 @@ def simulate_what_if(db: Session, source_store_id: int, target_store_id: int, pr
         source_risk = "YÜKSEK"
     
     # Hedef Analizi
-    potential_revenue = amount * product.price * 0.7 
+    potential_revenue = amount * product.price * WHAT_IF_SELL_THROUGH
     
     return {
         "scenario": f"{amount} adet transfer senaryosu",
@@ -113,27 +131,125 @@ def simulate_what_if(db: Session, source_store_id: int, target_store_id: int, pr
         "recommendation": "ONAY" if source_after > source_inv.safety_stock else "RED"
     }
 
+def expand_what_if_grid(source_store_ids, target_store_ids, product_ids, amounts) -> np.ndarray:
+    """
+    Parametre ızgarası -> senaryo matrisi (n x 4: kaynak, hedef, ürün, adet).
+    Kaynak = hedef olan kombinasyonlar atlanır.
+    """
+    grid = np.stack(np.meshgrid(
+        np.asarray(source_store_ids, dtype=np.int64),
+        np.asarray(target_store_ids, dtype=np.int64),
+        np.asarray(product_ids, dtype=np.int64),
+        np.asarray(amounts, dtype=np.int64),
+        indexing="ij",
+    ), axis=-1).reshape(-1, 4)
+    return grid[grid[:, 0] != grid[:, 1]]
+
+def simulate_what_if_batch(db: Session, scenarios: np.ndarray):
+    """
+    🧪 TOPLU WHAT-IF (Vektörize)
+    simulate_what_if ile aynı kurallar; binlerce senaryo tek geçişte değerlendirilir.
+    scenarios: n x 4 tamsayı matrisi (kaynak mağaza, hedef mağaza, ürün, adet).
+
+    [OPTIMIZASYON]
+    Eski yöntem: Senaryo başına 3 ORM sorgusu (10.000 senaryo = 30.000 sorgu).
+    Yeni yöntem: İlgili envanter ve fiyatlar 2 sorguyla bir kez çekilir; (mağaza, ürün)
+    anahtarları sıralı diziye çevrilip np.searchsorted ile eşlenir ve tüm senaryolar
+    NumPy dizileri üzerinde hesaplanır. Sonuç kolon bazlı tablo olarak döner.
+    """
+    scenarios = np.asarray(scenarios, dtype=np.int64).reshape(-1, 4)
+    source, target, product_ids, amount = scenarios.T
+    store_list = np.union1d(source, target).tolist()
+    product_list = np.unique(product_ids).tolist()
+
+    inventory, prices = [], {}
+    if len(scenarios):
+        # 1. Tek sorgu: ilgili mağaza x ürün envanteri
+        inventory = db.execute(
+            select(Inventory.store_id, Inventory.product_id, Inventory.quantity, Inventory.safety_stock)
+            .where(Inventory.store_id.in_(store_list), Inventory.product_id.in_(product_list))
+        ).all()
+        # 2. Tek sorgu: fiyatlar
+        prices = dict(db.execute(select(Product.id, Product.price).where(Product.id.in_(product_list))).all())
+
+    # (mağaza, ürün) -> tek int64 anahtar; sıralı anahtarlar üzerinde ikili arama.
+    # Nöbetçi satır (mağaza -1): envanter boşken de indeksleme geçerli kalır, hiçbir anahtarla eşleşmez
+    width = max(product_list, default=0) + 1
+    inv = np.array([(-1, 0, 0, 0)] + [(s, p, q or 0, ss or 0) for s, p, q, ss in inventory], dtype=np.int64)
+    keys, first = np.unique(inv[:, 0] * width + inv[:, 1], return_index=True)
+    quantity, safety = inv[first, 2], inv[first, 3] # Çift kayıtta ilki (.first() gibi)
+
+    def lookup(store_ids):
+        wanted = store_ids * width + product_ids
+        pos = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        return pos, keys[pos] == wanted
+
+    src_pos, src_found = lookup(source)
+    tgt_pos, tgt_found = lookup(target)
+    found = src_found & tgt_found
+
+    src_qty, src_safety, tgt_qty = quantity[src_pos], safety[src_pos], quantity[tgt_pos]
+    price = np.array([prices.get(p) or 0.0 for p in product_list], dtype=np.float64)
+    unit_price = price[np.searchsorted(product_list, product_ids)] if product_list else np.empty(0)
+
+    source_after = src_qty - amount
+    high_risk = source_after < src_safety
+    approved = found & (source_after > src_safety)
+    potential_revenue = amount * unit_price * WHAT_IF_SELL_THROUGH
+
+    def column(values):
+        values = values.tolist()
+        for i in np.flatnonzero(~found):
+            values[i] = None
+        return values
+
+    return {
+        "scenarios": len(scenarios),
+        "summary": {
+            "approved": int(approved.sum()),
+            "rejected": int((found & ~approved).sum()),
+            "not_found": int((~found).sum()),
+            "approved_potential_revenue": float(potential_revenue[approved].sum()),
+        },
+        "results": {
+            "source_store_id": source.tolist(),
+            "target_store_id": target.tolist(),
+            "product_id": product_ids.tolist(),
+            "amount": amount.tolist(),
+            "source_current_stock": column(src_qty),
+            "source_stock_after": column(source_after),
+            "source_risk": column(np.where(high_risk, "YÜKSEK", "DÜŞÜK")),
+            "target_current_stock": column(tgt_qty),
+            "target_stock_after": column(tgt_qty + amount),
+            "potential_revenue_increase": column(potential_revenue),
+            "recommendation": np.where(found, np.where(approved, "ONAY", "RED"), "ENVANTER_YOK").tolist(),
+        },
+    }
+
 def calculate_forecast_accuracy(db: Session, store_id: int, product_id: int):
     """
     🎯 TAHMİN DOĞRULUĞU (SQL JOIN OPTİMİZE)
     
     N+1 problemini çözer. Forecast ve Sales tablolarını veritabanında birleştirir.
+    Gerçekleşen, günlük satış özetinden (sales_daily) birincil anahtarla okunur (aynı gün
+    birden fazla satış satırı tahmini tekrar saymaz); sadece gerçekleşeni bilinen (bugünden önceki) günler karşılaştırılır.
+    Tüm seriler için toplu hesap: accuracy_engine.update_forecast_accuracy
     """
     # Tek Sorguda (JOIN) Çek
     sql_query = text("""
         SELECT 
             f.date, 
             f.predicted_quantity as predicted, 
-            COALESCE(s.quantity, 0) as actual
+            COALESCE(sd.quantity, 0) as actual
         FROM forecasts f
-        LEFT JOIN sales s 
-            ON f.store_id = s.store_id 
-            AND f.product_id = s.product_id 
-            AND f.date = s.date
-        WHERE f.store_id = :store_id AND f.product_id = :product_id
+        LEFT JOIN sales_daily sd
+            ON sd.store_id = f.store_id AND sd.product_id = f.product_id AND sd.date = f.date
+        WHERE f.store_id = :store_id AND f.product_id = :product_id AND f.date < :today
+        ORDER BY f.date
     """)
     
-    results = db.execute(sql_query, {"store_id": store_id, "product_id": product_id}).fetchall()
+    results = db.execute(sql_query, {"store_id": store_id, "product_id": product_id,
+                                     "today": datetime.date.today()}).fetchall()
     
     if not results:
         return {"error": "Yeterli tahmin verisi yok"}
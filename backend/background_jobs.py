@@ -0,0 +1,103 @@
+"""
+🧵 ARKA PLAN İŞ TİPLERİ
+
+core/jobs.py worker havuzunda çalışabilecek işlerin tek kayıt noktası. Endpoint'ler
+işi burada kayıtlı adla kuyruğa yazar ve iş id'sini hemen döner:
+
+    POST /api/jobs {"name": "sales_boom", "params": {"seed": 42}}
+
+Her iş eski senkron endpoint'in döndüğü sonucu döner (iş kaydının result alanı).
+Gece görevleri (scheduled_jobs) de aynı adla elle tetiklenebilir.
+"""
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from core.jobs import JobContext, register_job
+from core.scheduler import registered_jobs
+from models import BackgroundJob, BackgroundJobLog
+import scheduled_jobs  # noqa: F401 - Gece görevi kayıtları (aşağıda iş tipi olarak da eklenir)
+import simulation_engine
+import snapshot_engine
+import analysis_engine
+import generate_forecast_standalone
+import monte_carlo_engine
+
+RESET_JOB = "reset"
+GOLDEN_SNAPSHOT_JOB = "golden_snapshot"
+SALES_BOOM_JOB = "sales_boom"
+RECESSION_JOB = "recession"
+SUPPLY_SHOCK_JOB = "supply_shock"
+CUSTOM_SCENARIO_JOB = "custom_scenario"
+ABC_ANALYSIS_JOB = "abc_analysis"
+GENERATE_FORECASTS_JOB = "generate_forecasts"
+MONTE_CARLO_JOB = "monte_carlo"
+
+_job_tables = (BackgroundJob.__table__, BackgroundJobLog.__table__)
+
+def _reset(db: Session, ctx: JobContext):
+    """
+    Reset altın snapshot'ı tüm veritabanına geri yükler; iş tabloları da eski haline
+    dönerdi (çalışan reset işinin kendi kaydı dahil). İş kayıtları önce okunur,
+    geri yüklemeden sonra aynen yazılır.
+    """
+    ctx.progress(0.1, "Altın snapshot geri yükleniyor")
+    connection = db.connection()
+    saved = [(table, [dict(row) for row in connection.execute(select(table)).mappings()]) for table in _job_tables]
+    db.commit()
+    message = simulation_engine.reset_database(db)
+
+    connection = db.connection()
+    for table, _ in reversed(saved):
+        connection.execute(delete(table))
+    for table, rows in saved:
+        if rows:
+            connection.execute(insert(table), rows)
+    db.commit()
+    ctx.log(message)
+    return {"message": message, "status": "RESET"}
+
+def _golden_snapshot(db: Session, ctx: JobContext):
+    ctx.progress(0.1, "Altın snapshot kaydediliyor")
+    result = snapshot_engine.save_golden_snapshot()
+    ctx.log(f"Altın snapshot: {result['snapshot']} ({result['seconds']} sn)")
+    return {"message": "Altın snapshot güncellendi", **result}
+
+def _sales_boom(db: Session, ctx: JobContext, seed=None):
+    return {"message": simulation_engine.simulate_sales_boom(db, seed), "status": "BOOM"}
+
+def _recession(db: Session, ctx: JobContext, seed=None):
+    return {"message": simulation_engine.simulate_recession(db, seed), "status": "RECESSION"}
+
+def _supply_shock(db: Session, ctx: JobContext):
+    return {"message": simulation_engine.simulate_supply_shock(db), "status": "SHOCK"}
+
+def _custom_scenario(db: Session, ctx: JobContext, price_change: int = 0, delay_days: int = 0):
+    return simulation_engine.simulate_custom_scenario(db, price_change, delay_days)
+
+def _abc_analysis(db: Session, ctx: JobContext):
+    return analysis_engine.calculate_abc_analysis(db)
+
+def _generate_forecasts(db: Session, ctx: JobContext):
+    def on_progress(fraction: float, message: str):
+        ctx.log(message)
+        ctx.progress(fraction, message)
+    return generate_forecast_standalone.generate_forecasts(db, on_progress=on_progress)
+
+def _monte_carlo(db: Session, ctx: JobContext, **params):
+    def on_chunk(done: int, total: int):
+        ctx.progress(done / total, f"{done}/{total} parça simüle edildi")
+    return monte_carlo_engine.run_monte_carlo(db, on_chunk=on_chunk, **params)
+
+register_job(RESET_JOB, _reset, "Veritabanını altın snapshot'a döndürür")
+register_job(GOLDEN_SNAPSHOT_JOB, _golden_snapshot, "Mevcut durumu altın snapshot olarak kaydeder")
+register_job(SALES_BOOM_JOB, _sales_boom, "Satış patlaması simülasyonu")
+register_job(RECESSION_JOB, _recession, "Ekonomik durgunluk simülasyonu")
+register_job(SUPPLY_SHOCK_JOB, _supply_shock, "Tedarik krizi simülasyonu")
+register_job(CUSTOM_SCENARIO_JOB, _custom_scenario, "Fiyat / gecikme senaryosu")
+register_job(ABC_ANALYSIS_JOB, _abc_analysis, "ABC sınıflarını yeniden hesaplar")
+register_job(GENERATE_FORECASTS_JOB, _generate_forecasts, "Tüm mağaza-ürün tahminlerini yeniden üretir")
+register_job(MONTE_CARLO_JOB, _monte_carlo, "Monte Carlo stoksuz kalma riski")
+
+# Gece görevleri (risk_snapshot, abc_xyz_analysis, forecast_accuracy) elle de tetiklenebilsin
+for _daily in registered_jobs().values():
+    register_job(_daily.name, lambda db, ctx, func=_daily.func: func(db), "Gece görevi (elle)")
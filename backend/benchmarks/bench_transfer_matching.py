@@ -0,0 +1,170 @@
+"""
+🏎️ BENCHMARK: Robin Hood Eşleştirme (Ürün İndeksli Havuzlar vs Eski Döngü)
+
+Sentetik bir mağaza ağı (varsayılan 500 mağaza x 5.000 SKU) üretir ve
+eşleştirme aşamasını iki yöntemle ölçer:
+
+- legacy : Her alıcı için tüm vericileri tarayan eski liste döngüsü (O(alıcı x verici))
+- indexed: (store_type, product_id) havuzları + vektörize skor (transfer_engine)
+
+Eski yöntem bu ölçekte saatler sürdüğü için `--legacy-sample` kadar alıcıyla
+ölçülür ve alıcı başına süre üzerinden toplam süre tahmin edilir.
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_transfer_matching.py --stores 500 --skus 5000
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import StoreType  # noqa: E402
+from geo_engine import get_distance_matrix  # noqa: E402
+from transfer_engine import compute_transfer_recommendations  # noqa: E402
+
+
+def build_network(n_stores: int, n_skus: int, density: float, seed: int = 42):
+    """ORM'siz sentetik ağ: mağaza, ürün, envanter ve 7 günlük talep haritası."""
+    rng = np.random.default_rng(seed)
+    n_hubs = max(1, n_stores // 50)
+    n_centers = max(1, n_stores // 100)
+
+    products = [
+        SimpleNamespace(id=i + 1, name=f"SKU-{i + 1}", abc_category=c)
+        for i, c in enumerate(rng.choice(["A", "B", "C"], size=n_skus, p=[0.2, 0.3, 0.5]))
+    ]
+
+    stores = []
+    demand_map = {}
+    for s in range(n_stores):
+        if s < n_centers:
+            store_type, stock_range = StoreType.CENTER, (200, 2000)
+        elif s < n_centers + n_hubs:
+            store_type, stock_range = StoreType.HUB, (50, 600)
+        else:
+            store_type, stock_range = StoreType.STORE, (0, 80)
+
+        store = SimpleNamespace(
+            id=s + 1, name=f"Store {s + 1}", store_type=store_type,
+            lat=40.8 + rng.random() * 0.5, lon=28.6 + rng.random() * 0.9, inventory=[]
+        )
+        # Depolar tüm çeşidi, mağazalar `density` oranında çeşidi stoklar
+        if store_type == StoreType.STORE:
+            product_idx = np.flatnonzero(rng.random(n_skus) < density)
+        else:
+            product_idx = np.arange(n_skus)
+        quantities = rng.integers(stock_range[0], stock_range[1], size=len(product_idx))
+        demands = rng.integers(0, 30, size=len(product_idx)).astype(float)
+
+        for p_idx, qty, demand in zip(product_idx, quantities, demands):
+            product = products[p_idx]
+            store.inventory.append(SimpleNamespace(
+                product_id=product.id, product=product, quantity=int(qty), safety_stock=10
+            ))
+            demand_map[(store.id, product.id)] = demand
+        stores.append(store)
+
+    # Birkaç reddedilmiş rota (ceza puanı)
+    penalty_map = {}
+    for _ in range(n_stores):
+        a, b = rng.integers(1, n_stores + 1, size=2)
+        penalty_map[(int(a), int(b))] = float(rng.integers(1, 5))
+
+    return stores, demand_map, penalty_map
+
+
+def legacy_build(stores, demand_map):
+    """Eski havuz kurulumunun referans kopyası - sadece ölçüm içindir."""
+    receivers = []
+    givers = {StoreType.HUB: [], StoreType.CENTER: [], StoreType.STORE: []}
+
+    for store in stores:
+        for item in store.inventory:
+            total_predicted_demand = demand_map.get((store.id, item.product_id), 0)
+            if item.quantity < (total_predicted_demand + item.safety_stock):
+                urgency_score = 1.0 if item.quantity == 0 else (total_predicted_demand / item.quantity if item.quantity > 0 else 1.0)
+                receivers.append({
+                    "store": store, "product": item.product,
+                    "shortage": (total_predicted_demand + item.safety_stock) - item.quantity,
+                    "priority": min(urgency_score, 1.0),
+                    "abc_category": item.product.abc_category
+                })
+            elif item.quantity > (total_predicted_demand + item.safety_stock):
+                excess = item.quantity - (total_predicted_demand + item.safety_stock)
+                if store.store_type == StoreType.STORE:
+                    excess = int(excess * 0.5)
+                if excess > 0:
+                    givers[store.store_type].append({"store": store, "product_id": item.product_id, "excess": excess})
+
+    receivers.sort(key=lambda x: (x["abc_category"] == 'A', x["priority"]), reverse=True)
+    return receivers, givers
+
+
+def legacy_match(stores, receivers, givers, penalty_map, max_truck_capacity=50):
+    """Eski eşleştirme döngüsünün (her alıcı için tüm vericileri tarar) referans kopyası."""
+    distance_matrix = get_distance_matrix(stores)
+    matches = []
+    for req in receivers:
+        best_source = None
+        best_score = -float('inf')
+        for source_type in [StoreType.HUB, StoreType.CENTER, StoreType.STORE]:
+            potential_givers = [g for g in givers[source_type] if g["product_id"] == req["product"].id and g["excess"] > 0]
+            if not potential_givers:
+                continue
+            for giver in potential_givers:
+                dist = distance_matrix.distance(req["store"].id, giver["store"].id)
+                dist_penalty = dist if source_type == StoreType.STORE else dist * 0.7
+                penalty_score = penalty_map.get((giver["store"].id, req["store"].id), 0.0)
+                score = (req["priority"] * 100) - (dist_penalty * 0.5) - (penalty_score * 5.0)
+                if score > best_score:
+                    best_score = score
+                    best_source = giver
+            if best_source:
+                break
+        if best_source:
+            amount = min(req["shortage"], best_source["excess"], max_truck_capacity)
+            best_source["excess"] -= amount
+            matches.append((best_source["store"].id, req["store"].id, req["product"].id, amount))
+
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=500)
+    parser.add_argument("--skus", type=int, default=5000)
+    parser.add_argument("--density", type=float, default=0.2, help="Mağaza başına stoklanan çeşit oranı")
+    parser.add_argument("--legacy-sample", type=int, default=200, help="Eski yöntemle ölçülecek alıcı sayısı")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stores, demand_map, penalty_map = build_network(args.stores, args.skus, args.density)
+    n_items = sum(len(s.inventory) for s in stores)
+    print(f"Ağ: {args.stores} mağaza x {args.skus} SKU ({n_items:,} envanter kaydı) - {time.perf_counter() - t0:.1f} sn")
+
+    t0 = time.perf_counter()
+    recs = compute_transfer_recommendations(stores, demand_map, penalty_map)
+    indexed_time = time.perf_counter() - t0
+    print(f"indexed : {indexed_time:8.2f} sn  ({len(recs):,} öneri)")
+
+    t0 = time.perf_counter()
+    receivers, givers = legacy_build(stores, demand_map)
+    build_time = time.perf_counter() - t0
+    n_receivers = len(receivers)
+    sample = receivers[:args.legacy_sample]
+
+    t0 = time.perf_counter()
+    legacy_match(stores, sample, givers, penalty_map)
+    per_receiver = (time.perf_counter() - t0) / max(len(sample), 1)
+    legacy_estimate = build_time + per_receiver * n_receivers
+    print(f"legacy  : {legacy_estimate:8.2f} sn  (tahmini; {args.legacy_sample} alıcıda {per_receiver * 1000:.2f} ms/alıcı, toplam {n_receivers:,} alıcı)")
+    print(f"Hızlanma: ~{legacy_estimate / indexed_time:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
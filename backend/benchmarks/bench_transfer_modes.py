@@ -0,0 +1,84 @@
+"""
+⚖️ BENCHMARK: Transfer Modları (greedy vs optimal)
+
+Aynı sentetik ağ üzerinde iki modu çalıştırır ve karşılaştırır:
+- Süre (sn)
+- Taşınan toplam birim ve karşılanan ihtiyaç oranı
+- Amaç fonksiyonu: Σ miktar x birim skor (aciliyet, dist_penalty, RoutePenalty)
+- Öneri (tır) sayısı
+
+`--workers N` ile eşleştirme ürün bazında N süreçte paralel çalışır.
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_transfer_modes.py --stores 200 --skus 1000
+    python benchmarks/bench_transfer_modes.py --stores 500 --skus 5000 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_transfer_matching import build_network  # noqa: E402
+from models import StoreType  # noqa: E402
+from geo_engine import get_distance_matrix  # noqa: E402
+from transfer_engine import build_pools, compute_transfer_recommendations  # noqa: E402
+
+
+def evaluate(recs, stores, demand_map, penalty_map):
+    """Öneri listesini aynı skor terimleriyle puanlar (modlardan bağımsız ölçüt)."""
+    distance_matrix = get_distance_matrix(stores)
+    receivers, _, _ = build_pools(stores, demand_map, distance_matrix)
+    need = {(r["store_id"], r["product_id"]): r for r in receivers}
+    types = {s.id: s.store_type for s in stores}
+
+    objective = 0.0
+    moved = 0.0
+    received = defaultdict(float)
+    for rec in recs:
+        source_id, target_id = rec["source"]["id"], rec["target"]["id"]
+        req = need[(target_id, rec["product_id"])]
+        dist = distance_matrix.distance(source_id, target_id)
+        dist_penalty = dist if types[source_id] == StoreType.STORE else dist * 0.7
+        score = (req["priority"] * 100) - (dist_penalty * 0.5) - (penalty_map.get((source_id, target_id), 0.0) * 5.0)
+        objective += rec["amount"] * score
+        moved += rec["amount"]
+        received[(target_id, rec["product_id"])] += rec["amount"]
+
+    total_shortage = sum(r["shortage"] for r in receivers)
+    covered = sum(min(received[key], r["shortage"]) for key, r in need.items())
+    return {
+        "objective": objective,
+        "units": moved,
+        "coverage": covered / total_shortage if total_shortage else 1.0,
+        "transfers": len(recs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--skus", type=int, default=1000)
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--time-budget", type=float, default=120.0, help="optimal mod süre bütçesi (sn)")
+    parser.add_argument("--workers", type=int, default=1, help="Paralel eşleştirme süreç sayısı")
+    args = parser.parse_args()
+
+    stores, demand_map, penalty_map = build_network(args.stores, args.skus, args.density)
+    print(f"Ağ: {args.stores} mağaza x {args.skus} SKU ({sum(len(s.inventory) for s in stores):,} envanter kaydı), {args.workers} worker")
+    print(f"{'mod':<8} {'süre (sn)':>10} {'amaç':>16} {'birim':>12} {'karşılama':>10} {'transfer':>10}")
+
+    for mode in ("greedy", "optimal"):
+        t0 = time.perf_counter()
+        recs = compute_transfer_recommendations(stores, demand_map, penalty_map, mode=mode,
+                                                time_budget=args.time_budget, workers=args.workers)
+        elapsed = time.perf_counter() - t0
+        m = evaluate(recs, stores, demand_map, penalty_map)
+        print(f"{mode:<8} {elapsed:>10.2f} {m['objective']:>16,.0f} {m['units']:>12,.0f} {m['coverage']:>9.1%} {m['transfers']:>10,}")
+
+
+if __name__ == "__main__":
+    main()
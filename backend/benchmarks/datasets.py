@@ -0,0 +1,202 @@
+"""
+🧪 BENCHMARK VERİ SETLERİ (Sentetik, Tekrar Üretilebilir)
+
+Belirli bir ölçekte (mağaza x SKU x gün) yerel bir SQLite dosyası üretir.
+Aynı ölçek + seed her zaman aynı veriyi üretir; dosya `benchmarks/data/`
+altında önbelleklenir ve sonraki çalıştırmalarda tekrar kullanılır.
+
+Üretilen tablolar: stores, products, inventories, sales (N gün geçmiş),
+sales_daily (günlük özet), forecasts (son 14 gün + gelecek 7 gün), route_penalties,
+pos_sales (PENDING).
+"""
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, insert, inspect, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base  # noqa: E402
+from models import (  # noqa: E402
+    Store, StoreType, Product, Inventory, Sale, SalesDaily, Forecast, RoutePenalty, PosSale, PosSaleItem
+)
+from sales_rollup import rebuild_sales_daily  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# assortment     : Mağaza başına stoklanan SKU oranı
+# sale_rate      : Bir (mağaza, ürün) çiftinin herhangi bir günde satış yapma olasılığı
+# forecast_share : Tahmini olan (mağaza, ürün) çiftlerinin oranı
+SCALES = {
+    "small":  {"stores": 10,   "skus": 100,    "days": 730, "assortment": 1.0, "sale_rate": 0.30,   "forecast_share": 1.0},
+    "medium": {"stores": 100,  "skus": 1000,   "days": 730, "assortment": 0.5, "sale_rate": 0.03,   "forecast_share": 1.0},
+    "large":  {"stores": 1000, "skus": 10000,  "days": 730, "assortment": 0.1, "sale_rate": 0.003,  "forecast_share": 0.1},
+}
+
+FORECAST_PAST_DAYS = 14
+FORECAST_FUTURE_DAYS = 7
+PENDING_POS_SALES = 200
+CHUNK_SIZE = 50_000
+CATEGORIES = ["Elektronik", "Giyim", "Ev Yaşam", "Gıda"]
+
+def dataset_path(scale: dict, seed: int) -> str:
+    """Ölçek parametreleri + seed + bugünün tarihi -> dosya adı (tarih göreli veriler için)."""
+    key = json.dumps({**scale, "seed": seed, "today": datetime.date.today().isoformat()}, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+    return os.path.join(DATA_DIR, f"bench_{scale['stores']}x{scale['skus']}_{digest}.db")
+
+def _insert_chunks(conn, table, rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(insert(table), rows[i:i + CHUNK_SIZE])
+
+def build_dataset(path: str, scale: dict, seed: int = 42) -> dict:
+    """Veri setini `path` dosyasına yazar ve tablo satır sayılarını döner."""
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    n_stores, n_skus, days = scale["stores"], scale["skus"], scale["days"]
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    counts = {}
+
+    with engine.begin() as conn:
+        # --- Mağazalar: ~%1 CENTER, ~%2 HUB, gerisi STORE (İstanbul çevresi) ---
+        n_centers = max(1, n_stores // 100)
+        n_hubs = max(1, n_stores // 50)
+        types = [StoreType.CENTER] * n_centers + [StoreType.HUB] * n_hubs + [StoreType.STORE] * (n_stores - n_centers - n_hubs)
+        lats = 40.8 + rng.random(n_stores) * 0.5
+        lons = 28.6 + rng.random(n_stores) * 0.9
+        _insert_chunks(conn, Store.__table__, [
+            {"id": i + 1, "name": f"Bench Store {i + 1}", "store_type": types[i].name, "lat": float(lats[i]), "lon": float(lons[i])}
+            for i in range(n_stores)
+        ])
+
+        # --- Ürünler: log-normal fiyat, ~%20 A / %30 B / %50 C ---
+        prices = np.round(rng.lognormal(5, 1, n_skus), 2)
+        abc = rng.choice(["A", "B", "C"], size=n_skus, p=[0.2, 0.3, 0.5])
+        _insert_chunks(conn, Product.__table__, [
+            {"id": i + 1, "sku": f"BENCH-{i + 1:06d}", "name": f"Bench SKU {i + 1}", "category": CATEGORIES[i % len(CATEGORIES)],
+             "cost": float(prices[i] * 0.6), "price": float(prices[i]), "abc_category": str(abc[i])}
+            for i in range(n_skus)
+        ])
+
+        # --- Envanter: depolar tüm çeşidi, mağazalar `assortment` oranında ---
+        store_idx, product_idx = [], []
+        for s in range(n_stores):
+            if types[s] == StoreType.STORE and scale["assortment"] < 1.0:
+                chosen = np.flatnonzero(rng.random(n_skus) < scale["assortment"])
+            else:
+                chosen = np.arange(n_skus)
+            store_idx.append(np.full(len(chosen), s))
+            product_idx.append(chosen)
+        store_idx = np.concatenate(store_idx)
+        product_idx = np.concatenate(product_idx)
+        is_depot = np.array([t != StoreType.STORE for t in types])[store_idx]
+        quantities = np.where(is_depot, rng.integers(200, 2000, len(store_idx)), rng.integers(0, 80, len(store_idx)))
+        _insert_chunks(conn, Inventory.__table__, [
+            {"store_id": int(s) + 1, "product_id": int(p) + 1, "quantity": int(q), "safety_stock": 10}
+            for s, p, q in zip(store_idx, product_idx, quantities)
+        ])
+        counts["inventories"] = len(store_idx)
+
+        # --- Satışlar: her çift için gün başına Bernoulli(sale_rate), Poisson adet ---
+        n_pairs = len(store_idx)
+        sales_per_pair = rng.binomial(days, scale["sale_rate"], n_pairs)
+        pair_of_sale = np.repeat(np.arange(n_pairs), sales_per_pair)
+        day_offsets = rng.integers(1, days + 1, len(pair_of_sale))
+        sale_qty = rng.poisson(3, len(pair_of_sale)) + 1
+        first_day = today - datetime.timedelta(days=days)
+        counts["sales"] = len(pair_of_sale)
+        for i in range(0, len(pair_of_sale), CHUNK_SIZE):
+            sl = slice(i, i + CHUNK_SIZE)
+            pairs = pair_of_sale[sl]
+            conn.execute(insert(Sale.__table__), [
+                {"store_id": int(store_idx[p]) + 1, "product_id": int(product_idx[p]) + 1,
+                 "date": first_day + datetime.timedelta(days=int(d)), "quantity": int(q),
+                 "total_price": float(q * prices[product_idx[p]])}
+                for p, d, q in zip(pairs, day_offsets[sl], sale_qty[sl])
+            ])
+        counts["sales_daily"] = rebuild_sales_daily(conn)
+
+        # --- Tahminler: son 14 gün (doğruluk) + gelecek 7 gün (transfer motoru) ---
+        forecast_pairs = np.flatnonzero(rng.random(n_pairs) < scale["forecast_share"])
+        offsets = np.arange(-FORECAST_PAST_DAYS, FORECAST_FUTURE_DAYS + 1)
+        counts["forecasts"] = len(forecast_pairs) * len(offsets)
+        for i in range(0, len(forecast_pairs), max(1, CHUNK_SIZE // len(offsets))):
+            chunk = forecast_pairs[i:i + max(1, CHUNK_SIZE // len(offsets))]
+            predicted = rng.poisson(2, (len(chunk), len(offsets)))
+            conn.execute(insert(Forecast.__table__), [
+                {"store_id": int(store_idx[p]) + 1, "product_id": int(product_idx[p]) + 1,
+                 "date": today + datetime.timedelta(days=int(offset)), "predicted_quantity": float(predicted[row, col])}
+                for row, p in enumerate(chunk) for col, offset in enumerate(offsets)
+            ])
+
+        # --- Rota cezaları ---
+        a, b = rng.integers(1, n_stores + 1, (2, n_stores))
+        conn.execute(insert(RoutePenalty.__table__), [
+            {"source_store_id": int(x), "target_store_id": int(y), "penalty_score": float(rng.integers(1, 5))}
+            for x, y in zip(a, b) if x != y
+        ])
+
+        # --- Bekleyen POS satışları (sync_engine.process_pending_sales için; mağaza 1) ---
+        store1_products = product_idx[store_idx == 0]
+        now = datetime.datetime.utcnow()
+        conn.execute(insert(PosSale.__table__), [
+            {"id": i + 1, "pos_device_id": "POS-BENCH", "receipt_no": f"R{i + 1:06d}", "transaction_type": "SALE",
+             "total_amount": 0.0, "status": "PENDING", "created_at": now}
+            for i in range(PENDING_POS_SALES)
+        ])
+        item_products = rng.choice(store1_products, (PENDING_POS_SALES, 3))
+        conn.execute(insert(PosSaleItem.__table__), [
+            {"pos_sale_id": i + 1, "product_sku": f"BENCH-{int(p) + 1:06d}", "quantity": 1, "unit_price": float(prices[p])}
+            for i in range(PENDING_POS_SALES) for p in item_products[i]
+        ])
+
+    engine.dispose()
+    counts.update(stores=n_stores, products=n_skus)
+    return counts
+
+def _missing_columns(path: str) -> bool:
+    """Önbellekteki dosyada modelde olup tabloda olmayan kolon var mı? (ALTER yerine yeniden üretilir)"""
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        inspector = inspect(engine)
+        existing = set(inspector.get_table_names())
+        return any(
+            {column.name for column in table.columns} - {column["name"] for column in inspector.get_columns(table.name)}
+            for table in Base.metadata.sorted_tables
+            if table.name in existing
+        )
+    finally:
+        engine.dispose()
+
+def get_dataset(scale_name: str, seed: int = 42, rebuild: bool = False) -> str:
+    """Ölçeğin veri seti dosyasını döner; yoksa (veya rebuild / kolon eksikse) üretir."""
+    scale = SCALES[scale_name]
+    path = dataset_path(scale, seed)
+    if rebuild or not os.path.exists(path) or _missing_columns(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        started = time.perf_counter()
+        tmp_path = path + ".tmp"
+        counts = build_dataset(tmp_path, scale, seed)
+        os.replace(tmp_path, path)
+        print(f"Veri seti üretildi ({scale_name}): {counts} - {time.perf_counter() - started:.1f} sn")
+    else:
+        # Önbellekteki dosya eski şemayla üretilmiş olabilir: sonradan eklenen tablo ve indeksleri oluştur
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+        with engine.begin() as conn:
+            if conn.execute(select(SalesDaily.store_id).limit(1)).first() is None:
+                rebuild_sales_daily(conn) # Özet tablosundan önce üretilmiş dosya
+        engine.dispose()
+    return path
@@ -0,0 +1,321 @@
+"""
+🏁 BENCHMARK SÜİTİ: Karar Motorları (Sentetik Ölçek)
+
+`datasets.py` ile üretilen tekrar üretilebilir veri setleri üzerinde motorları
+çalıştırır ve her biri için şunları ölçer:
+- Süre (sn, wall time)
+- Sorgu sayısı (before_cursor_execute ile sayılır; makineden bağımsız, deterministik)
+- Tepe bellek (MB, tracemalloc; ayrı bir çalıştırmada ölçülür, süreyi bozmasın diye)
+
+Veriyi değiştiren motorlar (simülasyonlar, tahmin üretimi, POS senkronu) her
+çalıştırmada veri setinin taze bir kopyası üzerinde koşar.
+
+Sonuçlar JSON olarak kaydedilip sonraki çalıştırmalarla karşılaştırılabilir.
+Süre ve bellek makineye bağlıdır; sorgu sayıları ise her yerde aynı olmalıdır.
+
+Kullanım (backend klasöründen):
+    python benchmarks/run_benchmarks.py --scale small
+    python benchmarks/run_benchmarks.py --scale medium --only transfer_recommendations risk_report
+    python benchmarks/run_benchmarks.py --scale small --save-baseline benchmarks/baselines/small.json
+    python benchmarks/run_benchmarks.py --scale small --compare benchmarks/baselines/small.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import register_orm_listeners  # noqa: E402
+from datasets import SCALES, get_dataset  # noqa: E402
+from models import Inventory, Store  # noqa: E402
+import abc_xyz_engine  # noqa: E402
+import accuracy_engine  # noqa: E402
+import analysis_engine  # noqa: E402
+import monte_carlo_engine  # noqa: E402
+import generate_forecast_standalone  # noqa: E402
+import risk_engine  # noqa: E402
+import sandbox_engine  # noqa: E402
+import simulation_engine  # noqa: E402
+import sync_engine  # noqa: E402
+import transfer_engine  # noqa: E402
+from services import inventory_service  # noqa: E402
+
+ACCURACY_SAMPLE = 20 # calculate_forecast_accuracy çift başına çağrılır; örneklem üzerinden ölçülür
+WHAT_IF_SAMPLE = 200 # simulate_what_if senaryo başına çağrılır; örneklem üzerinden ölçülür
+DEFAULT_THRESHOLD = 0.25 # Süre/bellek için %25 üzeri artış gerileme sayılır
+
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn") # Çift başına tekrarlanan uyarı
+
+# --- Hedefler ---
+# Her hedef: setup(db) -> argümanlar (sayılmaz), run(db, args) -> sonuç (ölçülür)
+
+def _stores(db):
+    return transfer_engine.load_stores_with_inventory(db)
+
+def _warm_risk_summary(db):
+    risk_engine.refresh_risk_summary(db)
+    return db.query(Store).all()
+
+def _accuracy_pairs(db):
+    rows = db.query(Inventory.store_id, Inventory.product_id).order_by(Inventory.id).limit(ACCURACY_SAMPLE).all()
+    return [tuple(row) for row in rows]
+
+def _run_accuracy(db, pairs):
+    return [analysis_engine.calculate_forecast_accuracy(db, store_id, product_id) for store_id, product_id in pairs]
+
+def _run_sandbox(db, _):
+    sandbox = sandbox_engine.SandboxRegistry().create(db)
+    sandbox.apply("sales-boom", seed=0)
+    return sandbox.state()
+
+def _what_if_grid(db):
+    """10 kaynak x 11 hedef (kaynak = hedef hariç 100 çift) x 20 ürün x 5 adet = 10.000 senaryo."""
+    store_ids = [row[0] for row in db.query(Store.id).order_by(Store.id).limit(11)]
+    product_ids = [row[0] for row in db.query(Inventory.product_id).filter(Inventory.store_id == store_ids[0])
+                   .order_by(Inventory.product_id).limit(20)]
+    return analysis_engine.expand_what_if_grid(store_ids[:10], store_ids, product_ids, [5, 10, 25, 50, 100])
+
+def _run_what_if_single(db, scenarios):
+    return [analysis_engine.simulate_what_if(db, *row) for row in scenarios[:WHAT_IF_SAMPLE].tolist()]
+
+TARGETS = {
+    "transfer_recommendations": {
+        "setup": _stores,
+        "run": lambda db, stores: transfer_engine.generate_transfer_recommendations(db, stores),
+    },
+    "risk_report": { # Soğuk: özet tablosu boş, tüm mağazalar sayılır
+        "setup": lambda db: db.query(Store).all(),
+        "run": lambda db, stores: risk_engine.get_risk_report(db, stores),
+        "mutates": True,
+    },
+    "risk_report_warm": { # Sıcak: özet güncel, sadece okunur
+        "setup": _warm_risk_summary,
+        "run": lambda db, stores: risk_engine.get_risk_report(db, stores),
+        "mutates": True,
+    },
+    "abc_analysis": {
+        "run": lambda db, _: analysis_engine.calculate_abc_analysis(db),
+        "mutates": True,
+    },
+    "abc_xyz_classification": { # Veri setinin tüm günleri (730) x tüm ürünler
+        "run": lambda db, _: abc_xyz_engine.update_product_classes(db, window_days=730),
+        "mutates": True,
+    },
+    "forecast_accuracy": {
+        "setup": _accuracy_pairs,
+        "run": _run_accuracy,
+    },
+    "forecast_accuracy_batch": { # Tüm seriler tek geçişte (liderlik tablosu)
+        "run": lambda db, _: accuracy_engine.update_forecast_accuracy(db),
+        "mutates": True,
+    },
+    "what_if": { # Tekli yol, WHAT_IF_SAMPLE senaryo
+        "setup": _what_if_grid,
+        "run": _run_what_if_single,
+    },
+    "what_if_batch": { # 10.000 senaryo tek geçişte
+        "setup": _what_if_grid,
+        "run": lambda db, scenarios: analysis_engine.simulate_what_if_batch(db, scenarios),
+    },
+    "generate_forecasts": {
+        "run": lambda db, _: generate_forecast_standalone.generate_forecasts(db),
+        "mutates": True,
+    },
+    "store_inventory_page": { # En geniş çeşitli mağaza (1), ilk sayfa
+        "run": lambda db, _: inventory_service.list_store_inventory(db, 1, limit=200),
+        "async": True,
+    },
+    "store_inventory_status_page": {
+        "run": lambda db, _: inventory_service.list_store_inventory(db, 1, status="OUT_OF_STOCK_RISK", limit=200),
+        "async": True,
+    },
+    "process_pending_sales": {
+        "run": lambda db, _: sync_engine.process_pending_sales(db),
+        "mutates": True,
+        "async": True,
+    },
+    "sim_sales_boom": {
+        "run": lambda db, _: simulation_engine.simulate_sales_boom(db, seed=0),
+        "mutates": True,
+    },
+    "sim_recession": {
+        "run": lambda db, _: simulation_engine.simulate_recession(db, seed=0),
+        "mutates": True,
+    },
+    "sim_supply_shock": {
+        "run": lambda db, _: simulation_engine.simulate_supply_shock(db),
+        "mutates": True,
+    },
+    "sim_custom_scenario": {
+        "run": lambda db, _: simulation_engine.simulate_custom_scenario(db, price_change=10, delay_days=3),
+        "mutates": True,
+    },
+    "monte_carlo": { # Tüm ağ, 1000 yol x 14 gün, tek süreç
+        "run": lambda db, _: monte_carlo_engine.run_monte_carlo(db, n_paths=1000, horizon_days=14, seed=0, workers=1),
+    },
+    "monte_carlo_parallel": { # Aynı iş, parçalar süreç havuzunda (çekirdek sayısı kadar worker)
+        "run": lambda db, _: monte_carlo_engine.run_monte_carlo(db, n_paths=1000, horizon_days=14, seed=0,
+                                                                  workers=os.cpu_count() or 1),
+    },
+    "sim_sandbox": { # Snapshot yükleme + satış patlaması + KPI / risk haritası (DB'ye yazmaz)
+        "run": _run_sandbox,
+    },
+}
+
+# --- Ölçüm ---
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+def _run_sync(target, path, seed):
+    engine = create_engine(f"sqlite:///{path}")
+    db = sessionmaker(bind=engine, autoflush=False)()
+    counter = QueryCounter()
+    try:
+        args = target["setup"](db) if "setup" in target else None
+        random.seed(seed)
+        event.listen(engine, "before_cursor_execute", counter)
+        started = time.perf_counter()
+        target["run"](db, args)
+        return time.perf_counter() - started, counter.count
+    finally:
+        db.close()
+        engine.dispose()
+
+def _run_async(target, path, seed):
+    async def runner():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        counter = QueryCounter()
+        event.listen(engine.sync_engine, "before_cursor_execute", counter)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as db:
+                random.seed(seed)
+                started = time.perf_counter()
+                await target["run"](db, None)
+                return time.perf_counter() - started, counter.count
+        finally:
+            await engine.dispose()
+    return asyncio.run(runner())
+
+def _measure_once(target, dataset, seed, workdir):
+    path = dataset
+    if target.get("mutates"):
+        path = os.path.join(workdir, "work.db")
+        shutil.copyfile(dataset, path)
+    runner = _run_async if target.get("async") else _run_sync
+    return runner(target, path, seed)
+
+def measure(name, dataset, seed, workdir, memory=True):
+    target = TARGETS[name]
+    try:
+        seconds, queries = _measure_once(target, dataset, seed, workdir)
+    except Exception as e:
+        # Motor hatası süiti durdurmaz; raporda hata olarak görünür
+        return {"error": f"{type(e).__name__}: {e}".splitlines()[0]}
+    result = {"seconds": round(seconds, 4), "queries": queries}
+    if memory:
+        tracemalloc.start()
+        try:
+            _measure_once(target, dataset, seed, workdir)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = round(peak / 1024 / 1024, 2)
+    return result
+
+# --- Karşılaştırma ---
+
+def compare(results, baseline, threshold):
+    """Baseline'a göre gerilemeleri listeler. Sorgu sayısındaki her artış gerilemedir."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or "error" in previous:
+            continue
+        if "error" in current:
+            regressions.append(f"{name}: hata - {current['error']}")
+            continue
+        if current["queries"] > previous["queries"]:
+            regressions.append(f"{name}: sorgu {previous['queries']} -> {current['queries']}")
+        for metric in ("seconds", "peak_mb"):
+            if metric in current and metric in previous and previous[metric] > 0:
+                ratio = current[metric] / previous[metric]
+                if ratio > 1 + threshold:
+                    regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]} (x{ratio:.2f})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=list(TARGETS), help="Sadece bu hedefleri çalıştır")
+    parser.add_argument("--rebuild", action="store_true", help="Önbellekteki veri setini yeniden üret")
+    parser.add_argument("--no-memory", action="store_true", help="Tepe bellek ölçümünü atla (2x daha hızlı)")
+    parser.add_argument("--save-baseline", metavar="JSON", help="Sonuçları bu dosyaya yaz")
+    parser.add_argument("--compare", metavar="JSON", help="Sonuçları bu baseline ile karşılaştır")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Süre/bellek gerileme eşiği (oran)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Gerileme varsa çıkış kodu 1")
+    args = parser.parse_args()
+    register_orm_listeners() # Uygulamadaki gibi: envanter yazan hedefler risk özetini de günceller
+
+    dataset = get_dataset(args.scale, args.seed, rebuild=args.rebuild)
+    names = args.only or list(TARGETS)
+    print(f"Ölçek: {args.scale} {SCALES[args.scale]}")
+    print(f"{'hedef':<26} {'süre (sn)':>10} {'sorgu':>8} {'tepe MB':>9}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            results[name] = measure(name, dataset, args.seed, workdir, memory=not args.no_memory)
+            res = results[name]
+            if "error" in res:
+                print(f"{name:<26} HATA: {res['error']}")
+                continue
+            print(f"{name:<26} {res['seconds']:>10.3f} {res['queries']:>8} {res.get('peak_mb', '-'):>9}")
+
+    report = {
+        "scale": args.scale,
+        "params": SCALES[args.scale],
+        "seed": args.seed,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Baseline yazıldı: {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("⚠️ Gerilemeler:")
+            for line in regressions:
+                print(f"  - {line}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print("✅ Baseline'a göre gerileme yok.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+🔔 DEĞİŞİKLİK TAKİBİ (Change Tracker)
+
+Envanter, tahmin, rota cezası ve mağaza/ürün tablolarındaki değişiklikleri
+süreç içinde yakalar. Artımlı (incremental) motorlar ve önbellekler
+"son baktığımdan beri ne değişti?" sorusunu DB'yi taramadan cevaplayabilir.
+
+Nasıl çalışır?
+- ORM Unit of Work (db.add / attribute değişimi) -> `after_flush` ile etkilenen
+  (store_id, product_id) anahtarları oturumda biriktirilir.
+- `after_commit` -> biriken değişiklikler yayınlanır (sürüm sayacı artar, günlüğe yazılır).
+- `after_rollback` -> biriken değişiklikler atılır.
+- ORM toplu UPDATE/DELETE/INSERT (`query.update`, `session.execute(insert(...))`)
+  anahtar bilgisi taşımadığı için ilgili tür "tamamen değişti" (keys=None) işaretlenir.
+  Etkilenen anahtarları bilen çağıran `.execution_options(changed_keys=[...])` verebilir.
+- ORM dışı yollar (raw SQL, bulk_*_mappings, tablo drop/create) `record_change`
+  veya `record_reset` ile bildirilmelidir.
+
+NOT: Takip süreç içidir. Birden fazla worker varsa diğer worker'ların yaptığı
+değişiklikler görünmez; tüketiciler bu yüzden bir yaş (TTL) sınırı da uygular.
+"""
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Inventory, Forecast, RoutePenalty, Store, Product
+
+# Takip edilen değişiklik türleri
+INVENTORY = "inventory"
+FORECAST = "forecast"
+ROUTE_PENALTY = "route_penalty"
+STORE = "store"
+PRODUCT = "product"
+KINDS = (INVENTORY, FORECAST, ROUTE_PENALTY, STORE, PRODUCT)
+
+# Model -> tür eşlemesi. Anahtarlı türler (store_id, product_id) taşır.
+_MODEL_KINDS = {
+    Inventory: INVENTORY,
+    Forecast: FORECAST,
+    RoutePenalty: ROUTE_PENALTY,
+    Store: STORE,
+    Product: PRODUCT,
+}
+_KEYED_KINDS = (INVENTORY, FORECAST)
+
+# Günlükte tutulacak en fazla commit sayısı. Daha eskisini soran tüketici tam yeniden hesaplar.
+JOURNAL_SIZE = 10000
+
+_SESSION_KEY = "change_tracker_pending"
+
+_lock = threading.Lock()
+_sequence = 0
+_versions: Dict[str, int] = {kind: 0 for kind in KINDS}
+_journal = deque(maxlen=JOURNAL_SIZE) # (sequence, {kind: set(keys) | None})
+
+Changes = Dict[str, Optional[Set[Tuple[int, int]]]]
+
+def _merge(target: Changes, kind: str, keys: Optional[Iterable[Tuple[int, int]]]):
+    """Değişikliği biriktirir. keys=None 'bu türün tamamı değişti' anlamına gelir."""
+    if keys is None or kind not in _KEYED_KINDS:
+        target[kind] = None
+    elif kind not in target:
+        target[kind] = set(keys)
+    elif target[kind] is not None:
+        target[kind].update(keys)
+
+def _publish(changes: Changes):
+    global _sequence
+    if not changes:
+        return
+    with _lock:
+        _sequence += 1
+        for kind in changes:
+            _versions[kind] += 1
+        _journal.append((_sequence, changes))
+
+def record_change(kind: str, keys: Optional[Iterable[Tuple[int, int]]] = None, session: Optional[Session] = None):
+    """
+    ORM event'lerinin yakalayamadığı değişiklikleri bildirir.
+
+    session verilirse değişiklik o oturumun commit'i ile yayınlanır
+    (rollback olursa atılır); verilmezse hemen yayınlanır.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Bilinmeyen değişiklik türü: {kind}")
+    if session is not None:
+        _merge(session.info.setdefault(_SESSION_KEY, {}), kind, keys)
+    else:
+        changes = {}
+        _merge(changes, kind, keys)
+        _publish(changes)
+
+def record_reset():
+    """Tüm türlerin tamamen değiştiğini bildirir (örn. veritabanı sıfırlama)."""
+    _publish({kind: None for kind in KINDS})
+
+def current_sequence() -> int:
+    with _lock:
+        return _sequence
+
+def versions() -> Dict[str, int]:
+    """Tür bazında değişiklik sayaçları (önbellek anahtarı olarak kullanılabilir)."""
+    with _lock:
+        return dict(_versions)
+
+def changes_since(sequence: int) -> Tuple[int, Optional[Changes]]:
+    """
+    Verilen sıra numarasından sonra yayınlanan değişiklikleri birleştirip döner.
+
+    Dönüş: (güncel sıra numarası, değişiklikler). Günlük o kadar geriye
+    gitmiyorsa değişiklikler None döner (tüketici tam yeniden hesaplamalı).
+    """
+    with _lock:
+        latest = _sequence
+        if sequence == latest:
+            return latest, {}
+        if sequence > latest or not _journal or _journal[0][0] > sequence + 1:
+            return latest, None
+        merged: Changes = {}
+        for seq, changes in _journal:
+            if seq <= sequence:
+                continue
+            for kind, keys in changes.items():
+                _merge(merged, kind, keys)
+        return latest, merged
+
+# --- ORM Event'leri ---
+# Session sınıfına bağlanır; AsyncSession da içeride bir Session kullandığı için kapsanır.
+
+def _collect_flush(session, flush_context):
+    pending = session.info.setdefault(_SESSION_KEY, {})
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        kind = _MODEL_KINDS.get(type(obj))
+        if kind is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if kind in _KEYED_KINDS:
+            _merge(pending, kind, [(obj.store_id, obj.product_id)])
+        else:
+            _merge(pending, kind, None)
+
+def _collect_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    kind = _MODEL_KINDS.get(mapper.class_) if mapper is not None else None
+    if kind is not None:
+        # Çağıran etkilenen anahtarları biliyorsa .execution_options(changed_keys=[...]) ile bildirir
+        keys = orm_execute_state.execution_options.get("changed_keys")
+        _merge(orm_execute_state.session.info.setdefault(_SESSION_KEY, {}), kind, keys)
+
+def _publish_commit(session):
+    _publish(session.info.pop(_SESSION_KEY, None))
+
+def _discard(session):
+    session.info.pop(_SESSION_KEY, None)
+
+event.listen(Session, "after_flush", _collect_flush)
+event.listen(Session, "do_orm_execute", _collect_bulk)
+event.listen(Session, "after_commit", _publish_commit)
+event.listen(Session, "after_rollback", _discard)
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+# Önbellek sonucunun durumu (X-Cache başlığı)
+HIT = "HIT"             # Önbellekten döndü
+MISS = "MISS"           # Bu istek hesapladı
+COALESCED = "COALESCED" # Aynı anahtarı hesaplayan başka isteğin sonucunu bekledi
+
+class _Flight:
+    """Devam eden tek hesaplama; aynı anahtarı isteyenler bunun bitmesini bekler."""
+    __slots__ = ("done", "value", "error", "created_at")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.created_at = 0.0
+
+class VersionedCache:
+    """
+    Sürüm Anahtarlı Sonuç Önbelleği (Single-Flight)
+
+    Anahtar, sonucu etkileyen verilerin değişiklik sayaçlarını içerir
+    (bkz. change_tracker.versions). Veri değişince anahtar da değişir, yani
+    açık bir silme gerekmez; eski kayıtlar LRU ile düşer.
+
+    Aynı anahtar için eşzamanlı istekler tek hesaplamayı bekler (request
+    coalescing). TTL, takibin göremediği değişikliklere (diğer worker'lar,
+    ORM dışı yazımlar) karşı güvenlik ağıdır.
+    """
+    def __init__(self, ttl: float, max_entries: int = 16):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._flights = {}
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, str, float]:
+        """
+        Dönüş: (değer, durum, yaş sn). Durum HIT / MISS / COALESCED olabilir.
+        compute hata verirse hata bekleyen tüm isteklere iletilir ve önbelleğe yazılmaz.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1], HIT, now - entry[0]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, COALESCED, time.monotonic() - flight.created_at
+
+        try:
+            flight.value = compute()
+            flight.created_at = time.monotonic()
+            with self._lock:
+                self._entries[key] = (flight.created_at, flight.value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return flight.value, MISS, 0.0
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
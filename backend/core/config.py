@@ -28,6 +28,48 @@ class Settings(BaseSettings):
     MAIL_USERNAME: str = ""
     MAIL_PASSWORD: str = ""
     
+    # Transfer Motoru (Robin Hood)
+    TRANSFER_OPTIMAL_TIME_BUDGET: float = 10.0 # mode=optimal için toplam çözüm süresi (sn)
+    TRANSFER_INCREMENTAL_MAX_AGE: float = 300.0 # Artımlı mod durumunun tam yenilenmeden önceki en uzun ömrü (sn)
+    TRANSFER_MATCH_WORKERS: int = 1 # >1 ise eşleştirme ürün bazında süreç havuzunda paralel çalışır
+    TRANSFER_CACHE_TTL: float = 60.0 # Öneri önbelleğinin en uzun ömrü (diğer worker'ların yazımları için)
+    
+    # Risk Motoru
+    RISK_SUMMARY_MAX_AGE: float = 3600.0 # Risk özeti satırının yeniden sayılmadan önceki en uzun ömrü (ORM dışı yazımlar için)
+    RISK_SNAPSHOT_HOUR: int = 2 # Günlük risk geçmişi fotoğrafının alınacağı saat (yerel)
+    
+    # ABC Analizi
+    ABC_WINDOW_DAYS: int = 365 # Sınıflandırmada kullanılan satış penceresi (gün)
+    ABC_ANALYSIS_HOUR: int = 3 # Gece ABC güncellemesinin saati (yerel)
+    
+    # Tahmin Doğruluğu
+    ACCURACY_WINDOW_DAYS: int = 90 # Doğruluk hesabına giren geçmiş tahmin günleri
+    ACCURACY_JOB_HOUR: int = 4 # Gece doğruluk hesabının saati (yerel)
+    
+    # Simülasyon Sandbox'ları
+    SANDBOX_DEMAND_DAYS: int = 30 # Snapshot'taki ortalama günlük talebin hesaplandığı geçmiş (gün)
+    SANDBOX_MAX_COUNT: int = 8 # Aynı anda açık tutulabilecek sandbox sayısı (süreç başına)
+    SANDBOX_TTL: float = 3600.0 # Kullanılmayan sandbox'ın silinmeden önceki ömrü (sn)
+    SANDBOX_SNAPSHOT_MAX_AGE: float = 300.0 # Yeni sandbox'ların paylaştığı taban snapshot'ın en uzun ömrü (sn)
+    GOLDEN_SNAPSHOT_PATH: str = "" # Reset'in geri yüklediği altın SQLite kopyası (boşsa <veritabanı>.golden)
+    
+    # Monte Carlo Talep Simülasyonu
+    MONTE_CARLO_HISTORY_DAYS: int = 90 # Talep dağılımının tahmin edildiği geçmiş (gün)
+    MONTE_CARLO_HORIZON_DAYS: int = 14 # Varsayılan simülasyon ufku (gün)
+    MONTE_CARLO_PATHS: int = 1000 # Kalem başına çekilen talep yolu sayısı
+    MONTE_CARLO_WORKERS: int = 1 # >1 ise kalem parçaları süreç havuzunda paralel çalışır
+    
+    # Zamanlanmış Görevler
+    SCHEDULER_ENABLED: bool = True # False ise uygulama içi zamanlayıcı başlamaz (cron ile scheduled_jobs.py çalıştırılabilir)
+    SCHEDULER_POLL_SECONDS: float = 60.0
+    SCHEDULER_RETRY_DELAY: float = 900.0 # Başarısız görevin aynı gün tekrar denenmeden önceki bekleme süresi (sn)
+    
+    # Arka Plan İşleri
+    JOB_WORKERS: int = 2 # Ağır işlerin çalıştığı worker thread sayısı (istek thread'lerinden ayrı)
+    JOB_HEARTBEAT_SECONDS: float = 30.0 # Süreç kendi Queued / Running işlerinin nabzını bu aralıkla yazar ve takılı işleri tarar
+    JOB_STALE_SECONDS: float = 300.0 # Bu süre nabız gelmeyen Queued / Running iş Failed sayılır (sahibi süreç ölmüş)
+    JOB_LOG_POLL_SECONDS: float = 0.5 # Log akışının (SSE) yeni satırları kontrol aralığı
+    
     # Test Modu
     TESTING: bool = False
     
@@ -0,0 +1,338 @@
+"""
+🧵 ARKA PLAN İŞ ÇALIŞTIRICI (Job Runner)
+
+Reset, simülasyonlar, ABC / doğruluk hesapları ve tahmin üretimi eskiden HTTP
+isteğinin içinde, FastAPI'nin paylaşılan threadpool'unda senkron çalışıyordu; tek
+ağır çağrı dashboard'un diğer isteklerini bekletiyordu.
+
+Yeni akış:
+- İstek sadece background_jobs tablosuna Queued kaydı açar ve iş id'sini döner.
+- İş, istek thread'lerinden ayrı, JOB_WORKERS boyutlu bir ThreadPoolExecutor'da
+  kendi DB oturumuyla çalışır. Kayıt koşullu UPDATE (Queued -> Running) ile
+  sahiplenilir; iptal edilmiş iş hiç başlamaz.
+- İş fonksiyonu JobContext alır: log() background_job_logs'a satır yazar,
+  progress() ilerlemeyi günceller ve iptal isteğini okur. Her ikisi ayrı kısa
+  oturumla commit edilir (işin kendi transaction'ından bağımsız görünür).
+- İptal işbirlikçidir: Queued iş hemen Cancelled olur; Running iş sıradaki
+  progress() / check_cancelled() çağrısında JobCancelled ile durur ve işin
+  oturumu geri alınır. Ara kontrol yapmayan işler sonuna kadar çalışır.
+- Her iş kuyruğa alan sürecin worker_id'sini taşır. Süreç, kendi Queued / Running
+  işlerinin nabzını JOB_HEARTBEAT_SECONDS aralıkla yazar (ilerleme bildirmeyen
+  uzun işler de canlı görünür) ve aynı turda JOB_STALE_SECONDS boyunca nabzı
+  gelmeyen işleri (sahibi çökmüş / yeniden başlamış süreç) Failed işaretler.
+  Kapanışta kuyruktan düşürülen işler Cancelled olur.
+
+Threadler yeterli: ağır işlerin süresi SQLite / NumPy içinde (GIL dışında) geçer;
+süreç paralelliği gereken motorlar kendi havuzlarını kullanır (MONTE_CARLO_WORKERS).
+"""
+import asyncio
+import datetime
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.exceptions import BusinessRuleException, ResourceNotFoundException
+from core.logger import logger
+from database import SyncSessionLocal
+from models import BackgroundJob, BackgroundJobLog
+
+# İş durumları
+QUEUED = "Queued"
+RUNNING = "Running"
+SUCCESS = "Success"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+FINISHED = (SUCCESS, FAILED, CANCELLED)
+
+class JobCancelled(Exception):
+    """İş, iptal isteği üzerine durduruldu."""
+
+@dataclass
+class JobType:
+    name: str
+    func: Callable[..., object] # func(db, ctx, **params); kendi commit'ini yapar
+    description: str = ""
+
+_job_types: Dict[str, JobType] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_futures: Dict[int, Future] = {}
+_cancel_events: Dict[int, threading.Event] = {}
+_PROCESS_TOKEN = uuid.uuid4().hex[:8] # Aynı pid'le yeniden başlayan süreç (örn. konteyner) ayırt edilsin
+
+def worker_id() -> str:
+    """Bu sürecin kimliği (fork sonrası pid değiştiği için her çağrıda hesaplanır)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_PROCESS_TOKEN}"
+
+def register_job(name: str, func: Callable[..., object], description: str = ""):
+    _job_types[name] = JobType(name=name, func=func, description=description)
+
+def registered_job_types() -> Dict[str, JobType]:
+    return dict(_job_types)
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="job")
+        return _executor
+
+class JobContext:
+    """İş fonksiyonuna verilen kanal: log, ilerleme ve iptal kontrolü."""
+    def __init__(self, job_id: int, session_factory=SyncSessionLocal):
+        self.job_id = job_id
+        self._session_factory = session_factory
+        self._cancel = _cancel_events.setdefault(job_id, threading.Event())
+
+    def log(self, message: str, level: str = "INFO"):
+        db = self._session_factory()
+        try:
+            db.add(BackgroundJobLog(job_id=self.job_id, level=level, message=message))
+            db.execute(update(BackgroundJob).where(BackgroundJob.id == self.job_id)
+                       .values(heartbeat_at=datetime.datetime.utcnow()))
+            db.commit()
+        finally:
+            db.close()
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        """İlerlemeyi (0-1) yazar; başka süreçten gelen iptal isteğini de okur."""
+        values = {"progress": max(0.0, min(1.0, fraction)), "heartbeat_at": datetime.datetime.utcnow()}
+        if message is not None:
+            values["message"] = message
+        db = self._session_factory()
+        try:
+            db.execute(update(BackgroundJob).where(BackgroundJob.id == self.job_id).values(**values))
+            cancel_requested = db.execute(
+                select(BackgroundJob.cancel_requested).where(BackgroundJob.id == self.job_id)
+            ).scalar()
+            db.commit()
+        finally:
+            db.close()
+        if cancel_requested:
+            self._cancel.set()
+        self.check_cancelled()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+def submit_job(db: Session, name: str, params: Optional[dict] = None,
+               session_factory=SyncSessionLocal) -> BackgroundJob:
+    """İşi kuyruğa yazar ve worker havuzuna verir; kaydı hemen döner."""
+    if name not in _job_types:
+        raise BusinessRuleException(f"Bilinmeyen iş tipi: {name}. Seçenekler: {', '.join(sorted(_job_types))}")
+    job = BackgroundJob(name=name, params=params or {}, status=QUEUED,
+                        worker_id=worker_id(), heartbeat_at=datetime.datetime.utcnow())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _cancel_events[job.id] = threading.Event()
+    _futures[job.id] = _get_executor().submit(_execute, job.id, session_factory)
+    return job
+
+def _to_json(result):
+    try:
+        return jsonable_encoder(result)
+    except (TypeError, ValueError):
+        return {"detail": str(result)}
+
+def _finish(session_factory, job_id: int, status: str, result=None, error: Optional[str] = None):
+    db = session_factory()
+    try:
+        now = datetime.datetime.utcnow()
+        values = {"status": status, "result": result, "error": error, "finished_at": now, "heartbeat_at": now}
+        if status == SUCCESS:
+            values["progress"] = 1.0
+        db.execute(update(BackgroundJob).where(BackgroundJob.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+def _execute(job_id: int, session_factory):
+    db = session_factory()
+    try:
+        now = datetime.datetime.utcnow()
+        claimed = db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id, BackgroundJob.status == QUEUED)
+            .values(status=RUNNING, started_at=now, heartbeat_at=now)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return # Başlamadan iptal edildi
+        job = db.get(BackgroundJob, job_id)
+        name, params = job.name, dict(job.params or {})
+        ctx = JobContext(job_id, session_factory)
+        ctx.log(f"Başladı: {name}")
+
+        # Son log satırı durumdan önce yazılır: SSE akışı iş bitince kapanır (bkz. routers/jobs.py)
+        try:
+            result = _job_types[name].func(db, ctx, **params)
+        except JobCancelled:
+            db.rollback()
+            ctx.log("İptal edildi", level="WARNING")
+            _finish(session_factory, job_id, CANCELLED)
+            return
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"Arka plan işi hatası ({name} #{job_id}): {e}")
+            ctx.log(f"Hata: {e}", level="ERROR")
+            _finish(session_factory, job_id, FAILED, error=str(e)[:500])
+            return
+        ctx.log("Tamamlandı")
+        _finish(session_factory, job_id, SUCCESS, result=_to_json(result))
+    finally:
+        db.close()
+        _cancel_events.pop(job_id, None)
+        _futures.pop(job_id, None)
+
+def get_job(db: Session, job_id: int) -> BackgroundJob:
+    job = db.get(BackgroundJob, job_id)
+    if job is None:
+        raise ResourceNotFoundException("Job", str(job_id))
+    return job
+
+def list_jobs(db: Session, status: Optional[str] = None, name: Optional[str] = None, limit: int = 50) -> List[BackgroundJob]:
+    query = select(BackgroundJob)
+    if status is not None:
+        query = query.where(BackgroundJob.status == status)
+    if name is not None:
+        query = query.where(BackgroundJob.name == name)
+    return db.execute(query.order_by(BackgroundJob.id.desc()).limit(limit)).scalars().all()
+
+def read_logs(db: Session, job_id: int, after_id: int = 0, limit: int = 500) -> List[BackgroundJobLog]:
+    return db.execute(
+        select(BackgroundJobLog)
+        .where(BackgroundJobLog.job_id == job_id, BackgroundJobLog.id > after_id)
+        .order_by(BackgroundJobLog.id)
+        .limit(limit)
+    ).scalars().all()
+
+def cancel_job(db: Session, job_id: int) -> BackgroundJob:
+    """Queued işi hemen iptal eder; Running işe iptal isteği bırakır. Bitmiş iş değişmez."""
+    job = get_job(db, job_id)
+    if job.status in FINISHED:
+        return job
+    now = datetime.datetime.utcnow()
+    cancelled = db.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.id == job_id, BackgroundJob.status == QUEUED)
+        .values(status=CANCELLED, cancel_requested=True, finished_at=now)
+    ).rowcount
+    if not cancelled:
+        db.execute(update(BackgroundJob).where(BackgroundJob.id == job_id).values(cancel_requested=True))
+    db.add(BackgroundJobLog(job_id=job_id, level="WARNING", message="İptal istendi"))
+    db.commit()
+    event = _cancel_events.get(job_id)
+    if event is not None:
+        event.set()
+    db.refresh(job)
+    return job
+
+def wait_for_job(job_id: int, timeout: Optional[float] = None) -> bool:
+    """Bu süreçte çalışan işin bitmesini bekler (CLI / testler). Süre dolarsa False."""
+    future = _futures.get(job_id)
+    if future is None:
+        return True
+    done, _ = wait_futures([future], timeout=timeout)
+    return bool(done)
+
+def heartbeat_jobs(db: Session) -> int:
+    """Bu sürecin Queued / Running işlerinin nabzını yazar (iş ilerleme bildirmese de canlı görünür)."""
+    touched = db.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.worker_id == worker_id(), BackgroundJob.status.in_((QUEUED, RUNNING)))
+        .values(heartbeat_at=datetime.datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return touched
+
+def recover_stale_jobs(db: Session) -> int:
+    """
+    JOB_STALE_SECONDS boyunca nabız (heartbeat) gelmeyen Queued / Running işleri
+    Failed işaretler: sahibi süreç çökmüş veya yeniden başlamıştır (canlı süreçler
+    kendi işlerinin nabzını JOB_HEARTBEAT_SECONDS aralıkla yazar).
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=settings.JOB_STALE_SECONDS)
+    recovered = db.execute(
+        update(BackgroundJob)
+        .where(
+            BackgroundJob.status.in_((QUEUED, RUNNING)),
+            or_(BackgroundJob.heartbeat_at < cutoff,
+                BackgroundJob.heartbeat_at.is_(None) & (BackgroundJob.created_at < cutoff)),
+        )
+        .values(status=FAILED, error="Worker yanıt vermiyor (süreç yeniden başlamış olabilir)",
+                finished_at=func.coalesce(BackgroundJob.finished_at, datetime.datetime.utcnow()))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if recovered:
+        logger.warning(f"Takılı kalan {recovered} arka plan işi Failed işaretlendi")
+    return recovered
+
+def monitor_jobs(session_factory=SyncSessionLocal) -> int:
+    """Tek izleme turu: önce kendi işlerinin nabzı, sonra takılı iş taraması."""
+    db = session_factory()
+    try:
+        heartbeat_jobs(db)
+        return recover_stale_jobs(db)
+    finally:
+        db.close()
+
+async def _monitor_loop():
+    while True:
+        try:
+            await asyncio.to_thread(monitor_jobs)
+        except Exception as e:
+            logger.error(f"Arka plan iş izleme hatası: {e}")
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+
+def start_job_monitor() -> asyncio.Task:
+    """Uygulama içinde (lifespan) çalışan nabız / takılı iş döngüsü; açılıştaki ilk tur hemen çalışır."""
+    return asyncio.create_task(_monitor_loop())
+
+def shutdown_jobs(session_factory=SyncSessionLocal):
+    """
+    Bekleyen (başlamamış) işleri bırakır ve Cancelled işaretler; çalışanların
+    bitmesini beklemez (süreç ölürse onları diğer süreçlerin izleme turu Failed yapar).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+    dropped = [job_id for job_id, future in list(_futures.items()) if future.cancelled()]
+    if not dropped:
+        return
+    db = session_factory()
+    try:
+        db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id.in_(dropped), BackgroundJob.status == QUEUED)
+            .values(status=CANCELLED, error="Sunucu kapanırken kuyruktan düşürüldü",
+                    finished_at=datetime.datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        logger.error(f"Kuyruktaki işler iptal işaretlenemedi: {e}")
+    finally:
+        db.close()
+    for job_id in dropped:
+        _futures.pop(job_id, None)
+        _cancel_events.pop(job_id, None)
@@ -0,0 +1,22 @@
+import base64
+import json
+from typing import Callable, Optional, Tuple
+
+# Keyset sayfalama cursor'ı: son satırın sıralama anahtarı, base64(JSON liste) olarak
+
+def encode_cursor(*values) -> str:
+    """Sıralama anahtarını (sıralama_değeri, ..., kimlik) opak cursor'a çevirir."""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+def decode_cursor(cursor: str, *converters: Optional[Callable]) -> Tuple:
+    """
+    Cursor'ı anahtar demetine çözer. Her bileşen sıradaki dönüştürücüden geçer
+    (None: olduğu gibi); bileşen sayısı dönüştürücü sayısıyla aynı olmalı.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(converters):
+            raise ValueError
+        return tuple(value if convert is None else convert(value) for value, convert in zip(values, converters))
+    except (ValueError, TypeError):
+        raise ValueError("Geçersiz cursor")
@@ -0,0 +1,128 @@
+import asyncio
+import datetime
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.logger import logger
+from database import SyncSessionLocal
+from models import ScheduledJobRun
+
+# Çalıştırma durumları
+RUNNING = "Running"
+SUCCESS = "Success"
+FAILED = "Failed"
+SKIPPED = "Skipped" # Başka worker/süreç bugünün çalıştırmasını almış veya bitirmiş
+RETRY_PENDING = "RetryPending" # Bugünkü çalıştırma başarısız; retry süresi henüz dolmadı
+
+DONE_FOR_TODAY = (SUCCESS, SKIPPED) # Bu durumlardan sonra görev o gün tekrar denenmez
+
+STALE_RUN_HOURS = 6 # Bu süreden uzun "Running" kalan kayıt çökmüş sayılır ve devralınabilir
+
+@dataclass
+class DailyJob:
+    name: str
+    hour: int # Yerel saat; bu saatten sonra gün içinde bir kez çalışır
+    func: Callable[[Session], object] # Senkron; kendi commit'ini yapar
+
+_jobs: Dict[str, DailyJob] = {}
+_last_run: Dict[str, datetime.date] = {} # Bu süreçte görevin en son ele alındığı gün
+
+def register_daily_job(name: str, hour: int, func: Callable[[Session], object]):
+    _jobs[name] = DailyJob(name=name, hour=hour, func=func)
+
+def registered_jobs() -> Dict[str, DailyJob]:
+    return dict(_jobs)
+
+def _claim(db: Session, name: str, run_date: datetime.date) -> Optional[ScheduledJobRun]:
+    """
+    Bugünün çalıştırmasını sahiplenir. (job_name, run_date) tekil olduğu için
+    aynı anda çalışan worker'lardan yalnızca biri kazanır. Başarısız (retry
+    süresi dolmuş) veya takılı kalmış kayıtlar koşullu UPDATE ile devralınır.
+    """
+    run = ScheduledJobRun(job_name=name, run_date=run_date, status=RUNNING)
+    db.add(run)
+    try:
+        db.commit()
+        return run
+    except IntegrityError:
+        db.rollback()
+
+    now = datetime.datetime.utcnow()
+    taken = db.execute(
+        update(ScheduledJobRun)
+        .where(
+            ScheduledJobRun.job_name == name,
+            ScheduledJobRun.run_date == run_date,
+            or_(
+                (ScheduledJobRun.status == FAILED)
+                & (ScheduledJobRun.finished_at < now - datetime.timedelta(seconds=settings.SCHEDULER_RETRY_DELAY)),
+                (ScheduledJobRun.status == RUNNING)
+                & (ScheduledJobRun.started_at < now - datetime.timedelta(hours=STALE_RUN_HOURS)),
+            ),
+        )
+        .values(status=RUNNING, started_at=now, finished_at=None, detail=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not taken:
+        return None
+    return db.query(ScheduledJobRun).filter(
+        ScheduledJobRun.job_name == name, ScheduledJobRun.run_date == run_date
+    ).first()
+
+def run_job(name: str, run_date: Optional[datetime.date] = None, session_factory=SyncSessionLocal) -> str:
+    """Görevi (sahiplenebilirse) çalıştırır ve sonucu scheduled_job_runs'a yazar. Durum döner."""
+    job = _jobs[name]
+    run_date = run_date or datetime.date.today()
+    db = session_factory()
+    try:
+        run = _claim(db, name, run_date)
+        if run is None:
+            status = db.query(ScheduledJobRun.status).filter(
+                ScheduledJobRun.job_name == name, ScheduledJobRun.run_date == run_date
+            ).scalar()
+            return RETRY_PENDING if status == FAILED else SKIPPED
+
+        try:
+            result = job.func(db)
+            run.status, run.detail = SUCCESS, str(result)[:500]
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"Zamanlanmış görev hatası ({name}): {e}")
+            run.status, run.detail = FAILED, str(e)[:500]
+        run.finished_at = datetime.datetime.utcnow()
+        db.commit()
+        return run.status
+    finally:
+        db.close()
+
+async def _scheduler_loop():
+    while True:
+        now = datetime.datetime.now()
+        today = now.date()
+        for job in list(_jobs.values()):
+            if now.hour < job.hour or _last_run.get(job.name) == today:
+                continue
+            try:
+                status = await asyncio.to_thread(run_job, job.name, today)
+            except Exception as e:
+                logger.error(f"Zamanlayıcı hatası ({job.name}): {e}")
+                continue
+            if status in DONE_FOR_TODAY: # FAILED / RETRY_PENDING: retry süresi dolunca tekrar denenir
+                _last_run[job.name] = today
+        await asyncio.sleep(settings.SCHEDULER_POLL_SECONDS)
+
+def start_scheduler() -> asyncio.Task:
+    """
+    ⏰ GÜNLÜK GÖREV ZAMANLAYICI
+    Uygulama içinde (lifespan) çalışan hafif döngü: her görev, belirlenen saatten
+    sonra günde bir kez çalışır. Çoklu worker güvenliği DB'deki tekil kayıtla sağlanır;
+    sunucu geç açılırsa görev aynı gün telafi edilir.
+    """
+    logger.info(f"Zamanlayıcı başladı: {', '.join(_jobs) or '-'}")
+    return asyncio.create_task(_scheduler_loop())
@@ -56,6 +56,19 @@ Base = declarative_base()
 # --- BACKWARD COMPATIBILITY ---
 engine = sync_engine
 
+# --- ORM EVENT'LERİ ---
+
+def register_orm_listeners():
+    """
+    Özet tablolarını yazım anında güncel tutan ORM event'lerini kaydeder.
+    Modelleri import etmek motorları yüklemez; uygulama ve veri yazan betikler
+    bunu başlangıçta bir kez çağırır (tekrar çağrılması zararsızdır).
+    """
+    import risk_engine # Döngüsel import olmasın diye geç yüklenir (motor -> models -> database)
+    import sales_rollup
+    risk_engine.register_listeners()
+    sales_rollup.register_listeners()
+
 # --- DEPENDENCIES ---
 
 async def get_db():
@@ -1,119 +1,201 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import SessionLocal
-from models import Store, Product, Sale, Forecast
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+"""
+🔮 TOPLU TAHMİN ÜRETİMİ (Doğrusal Trend Regresyonu)
+
+Her (mağaza, ürün) serisi için günlük satış adedine doğrusal trend uydurur ve
+son satış gününden sonraki HORIZON_DAYS gün için tahmin yazar. Yeterli geçmişi
+olmayan seriler (soğuk başlangıç) aynı tipteki en yakın mağazanın trendini kullanır.
+
+[OPTIMIZASYON]
+- Eski yöntem mağaza x ürün (ilk 50 ürün) başına ayrı Sale sorgusu + sklearn
+  LinearRegression + ORM nesnesi kullanıyordu; proxy ararken her aday mağaza için
+  ek sorgu atıyordu. Tüm katalog için saatler sürüyordu.
+- Yeni yöntem tüm serilerin günlük adetlerini sales_daily'den TEK sorguyla okur.
+  Seriler (seri x gün) matrisi gibi ele alınır; her satır için EKK (en küçük kareler)
+  eğim / kesişimi kapalı formdan hep birlikte hesaplanır:
+      eğim = (n Σty - Σt Σy) / (n Σt² - (Σt)²),  kesişim = (Σy - eğim Σt) / n
+  Σy ve Σty np.bincount ile toplanır; satışsız günler 0 olduğundan toplamlara
+  katkı vermez, Σt ve Σt² ise pencere sınırlarından aritmetik seri formülüyle
+  bulunur. Sonuç sıfır dolu yoğun matrise uydurmayla birebir aynıdır, fakat
+  matris bellekte kurulmaz.
+- Tahminler parça parça toplu INSERT (executemany) ile yazılır; ürün sınırı yoktur.
+"""
 import datetime
-from datetime import timedelta
-import math
-
-# --- Helper Functions ---
-
-def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat / 2) * math.sin(dlat / 2) + \
-        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
-        math.sin(dlon / 2) * math.sin(dlon / 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-def get_proxy_sales_data(db: Session, target_store: Store, product_id: int):
-    other_stores = db.query(Store).filter(
-        Store.id != target_store.id,
-        Store.store_type == target_store.store_type
-    ).all()
-    
-    best_proxy = None
-    min_dist = float('inf')
-    
-    for s in other_stores:
-        has_data = db.query(Sale).filter(Sale.store_id == s.id, Sale.product_id == product_id).first()
-        if not has_data:
-            continue
-            
-        dist = calculate_distance(target_store.lat, target_store.lon, s.lat, s.lon)
-        if dist < min_dist:
-            min_dist = dist
-            best_proxy = s
-            
-    if best_proxy:
-        print(f"    Using proxy store {best_proxy.name} for Store {target_store.id}")
-        return db.query(Sale.date, Sale.quantity)\
-            .filter(Sale.store_id == best_proxy.id, Sale.product_id == product_id)\
-            .order_by(Sale.date)\
-            .all()
-    return []
-
-def generate_forecasts(db: Session):
-    print("Starting standalone forecast generation...")
-    
-    # 1. Clear existing forecasts
-    print("Clearing existing forecasts...")
-    db.query(Forecast).delete()
-    db.commit()
-    
-    stores = db.query(Store).all()
-    # Use ALL products or a larger limit
-    products = db.query(Product).limit(50).all() 
-    
-    generated_count = 0
-    
-    for store in stores:
-        for product in products:
-            # print(f"Processing Store {store.id} - Product {product.id} ({product.name})...")
-            
-            sales_data = db.query(Sale.date, Sale.quantity)\
-                .filter(Sale.store_id == store.id, Sale.product_id == product.id)\
-                .order_by(Sale.date)\
-                .all()
-            
-            # Cold Start Handle
-            if len(sales_data) < 10:
-                # print(f"  Insufficient data ({len(sales_data)}), trying proxy...")
-                sales_data = get_proxy_sales_data(db, store, product.id)
-                
-            if len(sales_data) < 10:
-                # print(f"  Still insufficient data ({len(sales_data)}). Skipping.")
-                continue
-                
-            try:
-                df = pd.DataFrame(sales_data, columns=['date', 'quantity'])
-                df['date_ordinal'] = pd.to_datetime(df['date']).map(datetime.datetime.toordinal)
-                
-                X = df[['date_ordinal']]
-                y = df['quantity']
-                
-                model = LinearRegression()
-                model.fit(X, y)
-                
-                # Gelecek 30 gün
-                last_date = pd.to_datetime(df['date'].max())
-                future_dates = [last_date + timedelta(days=x) for x in range(1, 31)]
-                future_ordinals = np.array([d.toordinal() for d in future_dates]).reshape(-1, 1)
-                predictions = model.predict(future_ordinals)
-                
-                for i, pred in enumerate(predictions):
-                    pred_qty = max(0, round(pred))
-                    forecast = Forecast(
-                        store_id=store.id,
-                        product_id=product.id,
-                        date=future_dates[i],
-                        predicted_quantity=pred_qty
-                    )
-                    db.add(forecast)
-                    generated_count += 1
-                
-                # print(f"  Generated forecasts for S{store.id} P{product.id}")
-            except Exception as e:
-                print(f"  Error generating forecast for S{store.id} P{product.id}: {e}")
-                
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import change_tracker
+from core.logger import logger
+from database import SyncSessionLocal as SessionLocal
+from geo_engine import get_distance_matrix
+from models import Forecast, Inventory, SalesDaily, Store
+
+HORIZON_DAYS = 30 # Son satış gününden sonraki tahmin ufku
+MIN_SALES_DAYS = 10 # Bundan az satış günü olan seri kendi verisiyle tahmin edilmez (proxy aranır)
+INSERT_CHUNK_SIZE = 5000
+
+def fit_trends(series: np.ndarray, day: np.ndarray, quantity: np.ndarray, n_series: int, last_day: int):
+    """
+    Kapalı form EKK: seri başına y = kesişim + eğim * t (t = gün indeksi).
+
+    series/day/quantity satış olan (seri, gün) hücreleridir. Her serinin penceresi
+    ilk satış gününden last_day'e kadardır; aradaki satışsız günler 0 sayılır.
+    Dönüş: (kesişim, eğim, satış günü sayısı) dizileri.
+    """
+    sales_days = np.bincount(series, minlength=n_series)
+    sum_y = np.bincount(series, weights=quantity, minlength=n_series)
+    sum_ty = np.bincount(series, weights=day * quantity, minlength=n_series)
+    first = np.full(n_series, last_day, dtype=np.int64)
+    np.minimum.at(first, series, day)
+
+    # Pencere [first, last_day] için Σt ve Σt² (aritmetik seri)
+    a, b = first.astype(np.float64), float(last_day)
+    n = b - a + 1
+    sum_t = (a + b) * n / 2
+    sum_tt = (b * (b + 1) * (2 * b + 1) - (a - 1) * a * (2 * a - 1)) / 6
+
+    denominator = n * sum_tt - sum_t ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, (n * sum_ty - sum_t * sum_y) / denominator, 0.0) # Tek günlük pencere: düz çizgi
+    intercept = (sum_y - slope * sum_t) / n
+    return intercept, slope, sales_days
+
+def _column(rows, index: int, dtype, convert=None) -> np.ndarray:
+    values = (row[index] for row in rows)
+    return np.fromiter(map(convert, values) if convert else values, dtype=dtype, count=len(rows))
+
+def _load_series(connection):
+    """
+    Tahmin edilecek seriler ve günlük satışları.
+    Seriler: stokta tutulan veya satışı olan (mağaza, ürün) çiftleri, anahtar = store_id * width + product_id.
+    stores tablosunda olmayan mağaza kimlikleri (yetim satırlar) atlanır: mesafe matrisinde yer almazlar.
+    """
+    known_stores = np.array(connection.execute(select(Store.id)).scalars().all(), dtype=np.int64)
+    inventory = connection.execute(select(Inventory.store_id, Inventory.product_id)).all()
+    rows = connection.execute(select(SalesDaily.store_id, SalesDaily.product_id, SalesDaily.date, SalesDaily.quantity)).all()
+    sales = {
+        "store_id": _column(rows, 0, np.int64),
+        "product_id": _column(rows, 1, np.int64),
+        "day": _column(rows, 2, np.int64, datetime.date.toordinal), # Gün = proleptik Gregoryen sıra numarası
+        "quantity": _column(rows, 3, np.float64),
+    }
+    known = np.isin(sales["store_id"], known_stores)
+    sales = {name: values[known] for name, values in sales.items()}
+    inventory_stores, inventory_products = _column(inventory, 0, np.int64), _column(inventory, 1, np.int64)
+    known = np.isin(inventory_stores, known_stores)
+    inventory_stores, inventory_products = inventory_stores[known], inventory_products[known]
+
+    width = int(max(inventory_products.max(initial=0), sales["product_id"].max(initial=0))) + 1
+    keys = np.unique(np.concatenate([inventory_stores * width + inventory_products,
+                                     sales["store_id"] * width + sales["product_id"]]))
+    return keys, width, sales
+
+def _assign_proxies(db: Session, store_ids: np.ndarray, product_ids: np.ndarray, fittable: np.ndarray) -> np.ndarray:
+    """
+    Soğuk başlangıç: uydurulamayan her seri için aynı tipteki en yakın mağazanın
+    aynı ürün serisinin indeksini döner (-1: uygun proxy yok).
+
+    Komşular mesafeye göre bir kez sıralanır; çözülmemiş seriler sıradaki komşuya
+    hep birlikte bakar (seri başına sorgu yok).
+    """
+    proxy = np.full(len(store_ids), -1, dtype=np.int64)
+    targets = np.flatnonzero(~fittable)
+    if len(targets) == 0 or not fittable.any():
+        return proxy
+
+    stores = db.query(Store).order_by(Store.id).all() # Matris satır sırası = store_id sırası
+    distances = get_distance_matrix(stores)
+    position = distances.index
+    types = np.array([s.store_type for s in stores], dtype=object)
+    candidate = np.array(distances.matrix, dtype=np.float64)
+    candidate[types[:, None] != types[None, :]] = np.inf # Sadece aynı tip
+    np.fill_diagonal(candidate, np.inf)
+    candidate[np.isnan(candidate)] = np.inf # Koordinatsız mağaza proxy olamaz
+    neighbours = np.argsort(candidate, axis=1, kind="stable")
+
+    # (mağaza pozisyonu, ürün) -> uydurulabilir seri indeksi
+    n_products = int(product_ids.max()) + 1
+    store_pos = np.array([position[int(s)] for s in store_ids], dtype=np.int64)
+    fitted_at = np.full((len(stores), n_products), -1, dtype=np.int64)
+    fit_idx = np.flatnonzero(fittable)
+    fitted_at[store_pos[fit_idx], product_ids[fit_idx]] = fit_idx
+
+    pending = targets
+    for rank in range(len(stores) - 1):
+        if len(pending) == 0:
+            break
+        source = store_pos[pending]
+        neighbour = neighbours[source, rank]
+        reachable = np.isfinite(candidate[source, neighbour])
+        found = fitted_at[neighbour, product_ids[pending]]
+        hit = reachable & (found >= 0)
+        proxy[pending[hit]] = found[hit]
+        pending = pending[~hit & reachable] # Bu sırada aday kalmadıysa (inf) aramayı bırak
+    return proxy
+
+def _report(on_progress, fraction: float, message: str):
+    logger.info(f"Tahmin üretimi: {message}")
+    if on_progress is not None:
+        on_progress(fraction, message)
+
+def generate_forecasts(db: Session, on_progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, object]:
+    """
+    Tüm serilerin tahminlerini yeniden üretir (eski tahminler silinir).
+    on_progress(oran, mesaj): aşama bildirimi (arka plan işinde ilerleme / log satırı).
+    Dönüş: seri / tahmin sayıları ve süre.
+    """
+    started = time.perf_counter()
+    connection = db.connection()
+    keys, width, sales = _load_series(connection)
+    store_ids, product_ids = keys // width, keys % width
+    _report(on_progress, 0.3, f"{len(sales['day'])} günlük satış satırı, {len(keys)} seri okundu")
+
+    # t = 0: ilk satış günü (büyük sıra numaralarında sayısal hata olmasın)
+    origin = int(sales["day"].min(initial=datetime.date.today().toordinal()))
+    day = sales["day"] - origin
+    last_day = int(day.max(initial=0))
+    series = np.searchsorted(keys, sales["store_id"] * width + sales["product_id"])
+    intercept, slope, sales_days = fit_trends(series, day, sales["quantity"], len(keys), last_day)
+
+    fittable = sales_days >= MIN_SALES_DAYS
+    proxy = _assign_proxies(db, store_ids, product_ids, fittable)
+    source = np.where(fittable, np.arange(len(keys)), proxy)
+    selected = np.flatnonzero(source >= 0)
+    coefficients = source[selected]
+    _report(on_progress, 0.5, f"{int(fittable.sum())} seriye trend uyduruldu")
+
+    # (seri x ufuk) tahmin matrisi tek seferde
+    future = last_day + np.arange(1, HORIZON_DAYS + 1)
+    predicted = intercept[coefficients, None] + slope[coefficients, None] * future[None, :]
+    predicted = np.maximum(np.round(predicted), 0.0)
+
+    dates = [datetime.date.fromordinal(origin + int(t)) for t in future]
+    mappings = [
+        {"store_id": store_id, "product_id": product_id, "date": date, "predicted_quantity": quantity}
+        for store_id, product_id, row in zip(store_ids[selected].tolist(), product_ids[selected].tolist(), predicted.tolist())
+        for date, quantity in zip(dates, row)
+    ]
+    # Silme + yazım tek kısa transaction'da (bildirimler ayrı oturumla yazıldığı için yazım kilidi arada tutulmaz)
+    connection.execute(delete(Forecast))
+    for start in range(0, len(mappings), INSERT_CHUNK_SIZE):
+        connection.execute(insert(Forecast.__table__), mappings[start:start + INSERT_CHUNK_SIZE])
+    # Core INSERT / DELETE ORM event'lerini tetiklemez: önbellekler commit ile haberdar edilir
+    change_tracker.record_change(change_tracker.FORECAST, session=db)
     db.commit()
-    print(f"DONE. Generated {generated_count} total forecasts.")
+
+    summary = {
+        "series": int(len(selected)),
+        "proxy_series": int((~fittable & (proxy >= 0)).sum()),
+        "skipped_series": int(len(keys) - len(selected)),
+        "forecasts": len(mappings),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    _report(on_progress, 1.0, f"{summary['forecasts']} tahmin yazıldı: {summary['series']} seri "
+                              f"({summary['proxy_series']} proxy ile), {summary['seconds']} sn")
+    return summary
 
 if __name__ == "__main__":
     db = SessionLocal()
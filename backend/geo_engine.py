@@ -0,0 +1,93 @@
+from models import Store
+from typing import List, Dict, Optional
+import numpy as np
+import threading
+import math
+
+EARTH_RADIUS_KM = 6371 # Dünya yarıçapı (km)
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """
+    Haversine Formülü: Küresel yüzey üzerindeki iki nokta arasındaki en kısa mesafeyi hesaplar.
+
+    Matematiksel Formül:
+    a = sin²(Δlat/2) + cos(lat1) * cos(lat2) * sin²(Δlon/2)
+    c = 2 * atan2(√a, √(1-a))
+    d = R * c
+
+    R: Dünya Yarıçapı (Ortalama 6371 km)
+
+    Tekil (skaler) hesaplar içindir. Çok sayıda nokta için `haversine` veya
+    `get_distance_matrix` kullanın.
+    """
+    dLat = math.radians(lat2 - lat1)
+    dLon = math.radians(lon2 - lon1)
+    a = math.sin(dLat/2) * math.sin(dLat/2) + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
+        math.sin(dLon/2) * math.sin(dLon/2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return EARTH_RADIUS_KM * c
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Vektörize Haversine (NumPy):
+    Argümanlar skaler veya dizi olabilir; NumPy broadcast kurallarıyla
+    tüm noktalar için mesafeyi (km) tek seferde hesaplar.
+    Koordinatı olmayan (None/NaN) noktalar için sonuç NaN olur.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + \
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def store_coordinates(stores: List[Store]):
+    """Mağaza listesinden (lat, lon) dizilerini çıkarır (None -> NaN)."""
+    lats = np.array([s.lat for s in stores], dtype=float)
+    lons = np.array([s.lon for s in stores], dtype=float)
+    return lats, lons
+
+class DistanceMatrix:
+    """
+    Mağazalar Arası Mesafe Matrisi (N x N, km).
+
+    Satır/sütun sırası `store_ids` ile aynıdır. `index` sözlüğü ile
+    store_id -> matris indeksi dönüşümü O(1) yapılır.
+    """
+    def __init__(self, store_ids: List[int], lats: np.ndarray, lons: np.ndarray):
+        self.store_ids = tuple(store_ids)
+        self.index: Dict[int, int] = {store_id: i for i, store_id in enumerate(self.store_ids)}
+        # Broadcast: (N, 1) x (1, N) -> (N, N)
+        self.matrix = haversine(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+        self.matrix.setflags(write=False) # Paylaşılan (read-only) önbellek
+
+    def distance(self, source_store_id: int, target_store_id: int) -> float:
+        return float(self.matrix[self.index[source_store_id], self.index[target_store_id]])
+
+    def row(self, store_id: int) -> np.ndarray:
+        return self.matrix[self.index[store_id]]
+
+# --- Süreç İçi Önbellek (Process Cache) ---
+# Mesafe matrisi bir kez hesaplanır, mağaza kümesi veya koordinatı değişene kadar tekrar kullanılır.
+# Anahtar (id, lat, lon) üçlüleridir: Core UPDATE, snapshot geri yükleme veya başka bir süreçteki
+# koordinat değişimi de (ORM event'i tetiklenmese bile) yeni matris üretir.
+_cache_lock = threading.Lock()
+_cached_key: Optional[tuple] = None
+_cached_matrix: Optional[DistanceMatrix] = None
+
+def get_distance_matrix(stores: List[Store]) -> DistanceMatrix:
+    """
+    Verilen mağaza kümesi için önbellekteki mesafe matrisini döner.
+    Mağaza kümesi (yeni/silinen mağaza) veya bir koordinat değiştiyse matris yeniden oluşturulur.
+    """
+    global _cached_key, _cached_matrix
+    ordered = sorted(stores, key=lambda s: s.id)
+    key = tuple((s.id, s.lat, s.lon) for s in ordered)
+
+    with _cache_lock:
+        if _cached_matrix is not None and _cached_key == key:
+            return _cached_matrix
+
+        lats, lons = store_coordinates(ordered)
+        _cached_matrix = DistanceMatrix([s.id for s in ordered], lats, lons)
+        _cached_key = key
+        return _cached_matrix
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import async_engine, Base, get_db, get_sync_db
+from database import async_engine, Base, get_db, get_sync_db, register_orm_listeners
 from models import User
 from core.logger import logger
 from core.config import settings
@@ -11,6 +11,9 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import contextlib
+import scheduled_jobs  # noqa: F401 - Görev kayıtları
+from core.scheduler import start_scheduler
+from core.jobs import shutdown_jobs, start_job_monitor
 
 # Import Routers
 from routers import (
@@ -25,9 +28,15 @@ from routers import (
     pos,
     customers, # Phase 8
     marketing, # Phase 2 (New)
-    utils # Proxy & Helpers
+    utils, # Proxy & Helpers
+    risk,
+    sandbox,
+    jobs
 )
 
+# Özet tablolarını yazım anında güncel tutan ORM event'leri (risk özeti, günlük satış özeti)
+register_orm_listeners()
+
 
 
 
@@ -42,9 +51,19 @@ async def lifespan(app: FastAPI):
     # Seed Data (Sync olarak çalıştırılabilir veya Async'e çevrilebilir)
     # Basitlik için Sync Session kullanıyoruz
     seed_default_user()
+
+    # Gece görevleri (risk geçmişi vb.) - bkz. scheduled_jobs.py
+    scheduler_task = start_scheduler() if settings.SCHEDULER_ENABLED and not settings.TESTING else None
+    # Arka plan işlerinin nabzı; önceki / çökmüş süreçlerde yarım kalan işler Failed olur (bkz. core/jobs.py)
+    job_monitor_task = start_job_monitor() if not settings.TESTING else None
     
     yield
     # Shutdown
+    if scheduler_task:
+        scheduler_task.cancel()
+    if job_monitor_task:
+        job_monitor_task.cancel()
+    shutdown_jobs()
 
 # --- Seeding ---
 def seed_default_user():
@@ -94,6 +113,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Cache", "Age"], # Tarayıcıdaki istemci okuyabilsin
 )
 
 # --- Include Routers ---
@@ -102,13 +122,16 @@ app.include_router(sales.router)
 app.include_router(stores.router)
 app.include_router(products.router)
 app.include_router(analytics.router)
-# app.include_router(simulation.router)
+app.include_router(simulation.router) # Senaryo işleri, reset/snapshot, what-if (tekli ve toplu)
 app.include_router(integrations.router)
 app.include_router(transfers.router)
 app.include_router(pos.router)
 app.include_router(customers.router) # Phase 8
 app.include_router(marketing.router) # Phase 2 (New)
 app.include_router(utils.router) # Proxy & Helpers
+app.include_router(risk.router)
+app.include_router(sandbox.router) # Veritabanına yazmayan simülasyonlar
+app.include_router(jobs.router) # Arka plan işleri (simülasyon, reset, analiz)
 
 @app.get("/")
 async def read_root(): 
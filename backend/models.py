@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Enum, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -37,6 +37,67 @@ class Inventory(Base):
     store = relationship("Store", back_populates="inventory")
     product = relationship("Product")
 
+    __table_args__ = (
+        Index("ix_inventories_store_product", "store_id", "product_id"), # Mağaza stok listesi (keyset sayfalama)
+    )
+
+class StoreRiskSummary(Base):
+    """
+    Mağaza bazlı risk özeti (risk_engine tarafından artımlı güncellenir).
+    Envanter değişiklikleri satırı delta ile günceller; delta bilinmiyorsa
+    satır dirty işaretlenir ve bir sonraki raporda sadece o mağaza yeniden sayılır.
+    """
+    __tablename__ = "store_risk_summary"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    total_items = Column(Integer, default=0) # Envanter kalemi sayısı
+    total_stock = Column(Integer, default=0) # Σ quantity
+    total_safety = Column(Integer, default=0) # Σ safety_stock
+    high_risk_count = Column(Integer, default=0) # quantity < safety_stock
+    overstock_count = Column(Integer, default=0) # quantity > safety_stock * 3
+    low_stock_count = Column(Integer, default=0) # quantity < 10 (dashboard uyarısı)
+    dirty = Column(Boolean, default=False, index=True) # Yeniden sayım gerekli mi?
+    updated_at = Column(DateTime, nullable=True)
+
+class StoreRiskSnapshot(Base):
+    """
+    Günlük mağaza risk geçmişi (gece görevi store_risk_summary'den yazar).
+    Zaman serisi sorguları sadece bu tablodan okunur; envanter taranmaz.
+    """
+    __tablename__ = "store_risk_history"
+
+    snapshot_date = Column(Date, primary_key=True) # Tarih aralığı sorguları PK üzerinden
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    status = Column(String(16)) # HIGH_RISK / OVERSTOCK / LOW_RISK / UNKNOWN
+    total_items = Column(Integer, default=0)
+    total_stock = Column(Integer, default=0)
+    total_safety = Column(Integer, default=0)
+    high_risk_count = Column(Integer, default=0)
+    overstock_count = Column(Integer, default=0)
+    low_stock_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_store_risk_history_store_date", "store_id", "snapshot_date"), # Mağaza seti + tarih aralığı
+    )
+
+class ProductRiskSnapshot(Base):
+    """Günlük ürün risk geçmişi: ürünün tüm mağazalardaki durumu tek satırda."""
+    __tablename__ = "product_risk_history"
+
+    snapshot_date = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    status = Column(String(16))
+    store_count = Column(Integer, default=0) # Ürünü stoklayan mağaza sayısı
+    total_stock = Column(Integer, default=0)
+    total_safety = Column(Integer, default=0)
+    high_risk_stores = Column(Integer, default=0) # quantity < safety_stock olan mağaza sayısı
+    overstock_stores = Column(Integer, default=0)
+    out_of_stock_stores = Column(Integer, default=0) # quantity <= 0
+
+    __table_args__ = (
+        Index("ix_product_risk_history_product_date", "product_id", "snapshot_date"),
+    )
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -47,6 +108,10 @@ class Product(Base):
     cost = Column(Float)
     price = Column(Float)
     abc_category = Column(String, default="C") # A, B, or C
+    abc_revenue = Column(Float, default=0.0) # ABC penceresindeki ciro (son ABC_WINDOW_DAYS gün)
+    xyz_category = Column(String, default="Z") # X, Y, or Z (günlük talebin değişim katsayısı)
+    demand_cv = Column(Float, nullable=True) # Günlük talep CV (std / ortalama); talep yoksa boş
+    abc_xyz_class = Column(String, default="CZ") # Birleşik sınıf (AX ... CZ)
     
     sales = relationship("Sale", back_populates="product")
     forecasts = relationship("Forecast", back_populates="product")
@@ -108,6 +173,35 @@ class Forecast(Base):
     # İlişkiler
     store = relationship("Store", back_populates="forecasts")
     product = relationship("Product", back_populates="forecasts")
+
+    __table_args__ = (
+        Index("ix_forecasts_store_product_date", "store_id", "product_id", "date"), # Mağaza bazlı tahmin toplamları
+    )
+
+class ForecastAccuracy(Base):
+    """
+    Seri (mağaza, ürün) bazlı tahmin doğruluğu. Gece görevi (accuracy_engine)
+    tüm serileri tek geçişte hesaplayıp tabloyu yeniler; liderlik tablosu buradan okunur.
+    """
+    __tablename__ = "forecast_accuracy"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    sample_size = Column(Integer) # Karşılaştırılan gün sayısı
+    mae = Column(Float)
+    rmse = Column(Float)
+    r2 = Column(Float)
+    mape = Column(Float, nullable=True) # %; gerçekleşenin 0 olduğu günler hariç (hiç yoksa boş)
+    bias = Column(Float) # Ortalama (tahmin - gerçekleşen); pozitif = fazla tahmin
+    total_actual = Column(Float)
+    total_predicted = Column(Float)
+    window_start = Column(Date)
+    window_end = Column(Date) # Dahil değil (hesaplama günü)
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_forecast_accuracy_mae", "mae"), # Varsayılan sıralama (en kötü önce)
+    )
     
 
 
@@ -135,9 +229,62 @@ class Sale(Base):
     holiday = Column(String) 
     promotion = Column(String)
 
+    __table_args__ = (
+        # ABC / XYZ penceresi (date >= ?) tabloya gitmeden indeksten toplanır (covering index)
+        Index("ix_sales_date_product_qty_revenue", "date", "product_id", "quantity", "total_price"),
+    )
+
+class SalesDaily(Base):
+    """
+    Günlük satış özeti (mağaza, ürün, gün). Analitik sorgular milyonlarca satış satırı
+    yerine buradan okur. sales_rollup yazım anında (ORM flush) artımlı günceller;
+    toplu / ham SQL yazımlar sales_rollup.add_sales veya rebuild_sales_daily ile bildirilir.
+    """
+    __tablename__ = "sales_daily"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    quantity = Column(Integer, default=0)
+    revenue = Column(Float, default=0.0)
+    transaction_count = Column(Integer, default=0) # Satış satırı sayısı
+
+    __table_args__ = (
+        # Ağ geneli pencere sorguları (ABC / XYZ) tabloya gitmeden indeksten okunur
+        Index("ix_sales_daily_date_product", "date", "product_id", "quantity", "revenue"),
+    )
+
 # ==========================================
 # 🔄 Transfers (Transferler) Modeli
 # ==========================================
+class TransferStatus:
+    """Transfer yaşam döngüsü: Pending -> Approved -> Completed, veya Rejected."""
+    PENDING = "Pending"     # Motor önerdi, karar bekliyor
+    APPROVED = "Approved"   # Onaylandı, stok henüz taşınmadı
+    COMPLETED = "Completed" # Stok taşındı
+    REJECTED = "Rejected"   # Reddedildi (rota cezası uygulandı)
+
+    OPEN = (PENDING, APPROVED) # Karar verilebilir durumlar
+
+class TransferBatch(Base):
+    """
+    Öneri Çalıştırması (Recommendation Run)
+    Robin Hood motorunun her kalıcı çalıştırması bir batch olarak saklanır;
+    önerileri `transfers` tablosunda Pending olarak durur.
+    """
+    __tablename__ = "transfer_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    mode = Column(String, default="greedy") # greedy / optimal
+    algorithm = Column(String, nullable=True)
+    status = Column(String, default="Active", index=True) # Active, Superseded (yeni run gelince)
+    total_transfers = Column(Integer, default=0)
+    total_units = Column(Integer, default=0)
+    duration_ms = Column(Integer, nullable=True) # Motor süresi
+
+    transfers = relationship("Transfer", back_populates="batch")
+
 class Transfer(Base):
     __tablename__ = "transfers"
 
@@ -146,12 +293,30 @@ class Transfer(Base):
     target_store_id = Column(Integer, ForeignKey("stores.id")) # Nereye?
     product_id = Column(Integer, ForeignKey("products.id")) # Ne?
     amount = Column(Integer) # Kaç tane?
-    status = Column(String, default="Pending") # "Pending", "Approved", "Completed"
+    status = Column(String, default=TransferStatus.PENDING, index=True) # Bkz. TransferStatus
     request_date = Column(DateTime, default=datetime.datetime.utcnow) # Talep tarihi
     
     # Transferin neden yapıldığı (Örn: "Stok Dengeleme", "Acil İhtiyaç")
     reason = Column(String, nullable=True)
 
+    # --- Öneri Çalıştırması (Robin Hood) ---
+    batch_id = Column(Integer, ForeignKey("transfer_batches.id"), nullable=True, index=True)
+    rank = Column(Integer, nullable=True) # Çalıştırma içindeki öncelik sırası
+    score = Column(Float, nullable=True)
+    algorithm = Column(String, nullable=True)
+    explanation = Column(JSON, nullable=True) # XAI açıklaması (summary, reasons, score, type)
+    decided_at = Column(DateTime, nullable=True) # Onay/Red zamanı
+    completed_at = Column(DateTime, nullable=True) # Stok taşıma zamanı
+
+    batch = relationship("TransferBatch", back_populates="transfers")
+    source_store = relationship("Store", foreign_keys=[source_store_id])
+    target_store = relationship("Store", foreign_keys=[target_store_id])
+    product = relationship("Product")
+
+    __table_args__ = (
+        Index("ix_transfers_batch_status_rank", "batch_id", "status", "rank"),
+    )
+
 # ==========================================
 # 🌟 StoreFeatures (Mağaza Özellikleri)
 # ==========================================
@@ -298,3 +463,59 @@ class PosZReport(Base):
     
     created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+# ==========================================
+# ⏰ Zamanlanmış Görevler (Gece Görevleri)
+# ==========================================
+class ScheduledJobRun(Base):
+    """
+    Günlük görev çalıştırma kaydı. (job_name, run_date) tekil olduğu için birden
+    fazla worker aynı görevi aynı gün için yalnızca bir kez çalıştırır.
+    """
+    __tablename__ = "scheduled_job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, index=True)
+    run_date = Column(Date)
+    status = Column(String, default="Running") # Running, Success, Failed
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    detail = Column(String, nullable=True) # Sonuç özeti veya hata mesajı
+
+    __table_args__ = (
+        UniqueConstraint("job_name", "run_date", name="uix_job_run_date"),
+    )
+
+# ==========================================
+# 🧵 Arka Plan İşleri (Job Runner)
+# ==========================================
+class BackgroundJob(Base):
+    """
+    Uzun süren işlem (simülasyon, reset, analiz) kaydı. İstek sadece kaydı açar;
+    iş, istek thread'lerinden ayrı bir worker havuzunda çalışır (bkz. core/jobs.py).
+    """
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True) # Kayıtlı iş tipi (örn. sales_boom)
+    params = Column(JSON, nullable=True)
+    status = Column(String, default="Queued", index=True) # Queued, Running, Success, Failed, Cancelled
+    progress = Column(Float, default=0.0) # 0-1
+    message = Column(String, nullable=True) # Son ilerleme mesajı
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True) # Son nabız: ilerleme/log veya sahibi sürecin periyodik yazımı (takılı iş tespiti)
+    worker_id = Column(String, nullable=True, index=True) # İşi kuyruğa alan ve çalıştıran süreç (host:pid:token)
+
+class BackgroundJobLog(Base):
+    __tablename__ = "background_job_logs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("background_jobs.id"), index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    level = Column(String, default="INFO")
+    message = Column(String)
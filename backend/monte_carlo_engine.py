@@ -0,0 +1,226 @@
+"""
+🎲 MONTE CARLO TALEP SİMÜLASYONU
+
+simulate_custom_scenario sabit varsayımlarla (günde 2 adet, baz satış 5) tek bir
+deterministik sonuç üretir. Bu motor her (mağaza, ürün) için günlük talep
+dağılımını geçmiş satışlardan (sales_daily) tahmin eder ve ufuk boyunca binlerce
+talep yolu çekerek kalem başına şunları raporlar:
+- Stoksuz kalma olasılığı
+- Beklenen kayıp satış (karşılanamayan talep)
+- Ufuk sonu stok yüzdelikleri (P5 / P50 / P95)
+
+Talep modeli (günlük):
+- Varyans > ortalama (aşırı yayılım): Gamma-Poisson karışımı (negatif binom).
+  λ ~ Gamma(k, μ/k), k = μ² / (σ² - μ); talep ~ Poisson(λ)
+- Aksi halde: Poisson(μ)
+Satışsız günler 0 sayılır; μ ve σ² için Σq ve Σq² yeterlidir (load_demand_moments).
+Günler bağımsız olduğundan h günlük toplam da aynı aileden kapalı formda çekilir:
+Gamma(h·k, μ/k) karışımlı Poisson (Poisson için Poisson(h·μ)). Yol başına tek çekim,
+günlük çekimlerin toplamıyla aynı dağılımı verir.
+
+Senaryo düğmeleri:
+- price_change: Talep çarpanı = 1 - ΔFiyat% * PRICE_ELASTICITY (simulation_engine ile aynı)
+- delay_days: İkmal gecikmesi; stoğun karşılaması gereken süre ufuk + gecikme olur.
+
+[OPTIMIZASYON]
+Süreye rastgele sayı üretimi hakimdir: (kalem x yol x gün) günlük çekim + cumsum orta
+ölçekte ~2 dk sürüyordu; yol başına kapalı formda tek toplam çekimi gün sayısı kat az çekim yapar.
+Kalemler, (kalem x yol) hücre sayısı CHUNK_CELLS'i aşmayacak parçalara bölünür;
+her parça tamamen vektörel çekilir. workers > 1 ise parçalar süreç havuzunda çalışır.
+Her parçanın tohumu SeedSequence.spawn ile türetildiğinden sonuç worker sayısından bağımsızdır.
+"""
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from abc_xyz_engine import load_demand_moments
+from core.config import settings
+from core.logger import logger
+from models import Inventory
+from simulation_engine import PRICE_ELASTICITY
+
+QUANTILES = (0.05, 0.5, 0.95)
+CHUNK_CELLS = 2_000_000 # Parça başına en fazla (kalem x yol) hücre (~16 MB float64)
+MAX_PATHS = 10_000
+MAX_HORIZON_DAYS = 180
+
+_inventory = Inventory.__table__
+
+@dataclass
+class DemandFit:
+    store_ids: np.ndarray
+    product_ids: np.ndarray
+    stock: np.ndarray # Güncel stok
+    mean: np.ndarray # Günlük ortalama talep (μ)
+    var: np.ndarray # Günlük talep varyansı (σ²)
+    history_days: int
+
+    def __len__(self):
+        return len(self.store_ids)
+
+def fit_demand(db: Session, store_id: Optional[int] = None, product_ids: Optional[Iterable[int]] = None,
+               history_days: Optional[int] = None) -> DemandFit:
+    """
+    Envanter kalemlerini (stoğuyla) ve son history_days günün talep momentlerini
+    iki sorguda yükler; (mağaza, ürün) sırasıyla hizalar. Satışı olmayan kalemlerin talebi 0'dır.
+    """
+    history_days = history_days or settings.MONTE_CARLO_HISTORY_DAYS
+    query = select(_inventory.c.store_id, _inventory.c.product_id, _inventory.c.quantity)
+    if store_id is not None:
+        query = query.where(_inventory.c.store_id == store_id)
+    if product_ids is not None:
+        query = query.where(_inventory.c.product_id.in_(list(product_ids)))
+    rows = db.connection().execute(query.order_by(_inventory.c.store_id, _inventory.c.product_id)).all()
+    items = np.array([(s, p, q or 0) for s, p, q in rows], dtype=np.int64).reshape(-1, 3)
+
+    until = datetime.date.today() - datetime.timedelta(days=1)
+    since = until - datetime.timedelta(days=history_days - 1)
+    moments = load_demand_moments(db, since, until, by_store=True,
+                                  store_ids=[store_id] if store_id is not None else None)
+
+    daily_sum = np.zeros(len(items))
+    daily_sum_sq = np.zeros(len(items))
+    if len(items) and len(moments.product_ids):
+        width = int(max(items[:, 1].max(), moments.product_ids.max())) + 1
+        item_keys = items[:, 0] * width + items[:, 1] # (mağaza, ürün) sırasıyla zaten sıralı
+        moment_keys = moments.store_ids * width + moments.product_ids
+        pos = np.minimum(np.searchsorted(item_keys, moment_keys), len(item_keys) - 1)
+        matched = item_keys[pos] == moment_keys
+        daily_sum[pos[matched]] = moments.daily_sum[matched]
+        daily_sum_sq[pos[matched]] = moments.daily_sum_sq[matched]
+
+    mean = daily_sum / moments.n_days
+    return DemandFit(
+        store_ids=items[:, 0],
+        product_ids=items[:, 1],
+        stock=items[:, 2],
+        mean=mean,
+        var=np.maximum(daily_sum_sq / moments.n_days - mean ** 2, 0.0),
+        history_days=history_days,
+    )
+
+def draw_demand(mean: np.ndarray, var: np.ndarray, n_paths: int, days: int,
+                rng: np.random.Generator) -> np.ndarray:
+    """(kalem, yol) boyutlu ufuk toplam talebi: days günlük bağımsız talebin toplamı."""
+    shape = (len(mean), n_paths)
+    overdispersed = var > mean
+    rate = np.broadcast_to((mean * days)[:, None], shape)
+    if overdispersed.any():
+        k = np.where(overdispersed, mean ** 2 / np.where(overdispersed, var - mean, 1.0), 1.0)
+        k = np.maximum(k, 1e-6) # μ -> 0 iken Gamma şekli 0 olamaz
+        gamma = rng.gamma((k * days)[:, None], (mean / k)[:, None], shape)
+        rate = np.where(overdispersed[:, None], gamma, rate)
+    return rng.poisson(rate)
+
+def simulate_chunk(stock: np.ndarray, mean: np.ndarray, var: np.ndarray, n_paths: int, days: int,
+                   seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """Bir parça kalem için yolları çeker ve kalem başına özet istatistikleri döner."""
+    total = draw_demand(mean, var, n_paths, days, np.random.default_rng(seed))
+    stock = stock[:, None]
+    return {
+        "stockout_probability": (total > stock).mean(axis=1),
+        "expected_lost_sales": np.maximum(total - stock, 0).mean(axis=1),
+        "ending_quantiles": np.quantile(np.maximum(stock - total, 0), QUANTILES, axis=1).T,
+    }
+
+def _chunks(n_items: int, n_paths: int) -> List[slice]:
+    size = max(1, CHUNK_CELLS // n_paths)
+    return [slice(start, min(start + size, n_items)) for start in range(0, n_items, size)]
+
+def run_simulation(stock: np.ndarray, mean: np.ndarray, var: np.ndarray, n_paths: int, days: int,
+                   seed: Optional[int] = None, workers: Optional[int] = None,
+                   on_chunk: Optional[Callable[[int, int], None]] = None) -> Dict[str, np.ndarray]:
+    """
+    Tüm kalemleri parça parça simüle eder (DB bağımsız çekirdek; testler ve benchmark doğrudan çağırır).
+    workers > 1 ise parçalar ProcessPoolExecutor'da çalışır; açılamazsa sıralı çalışılır.
+    on_chunk(biten, toplam) her parça bittiğinde çağrılır (arka plan işinde ilerleme / iptal).
+    """
+    chunks = _chunks(len(stock), n_paths)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = [(stock[c], mean[c], var[c], n_paths, days, s) for c, s in zip(chunks, seeds)]
+    workers = settings.MONTE_CARLO_WORKERS if workers is None else workers
+
+    parts = None
+    if workers > 1 and len(chunks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                parts = []
+                for part in executor.map(simulate_chunk, *zip(*args)):
+                    parts.append(part)
+                    if on_chunk is not None:
+                        on_chunk(len(parts), len(args))
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Monte Carlo süreç havuzu başlatılamadı, sıralı çalışılıyor: {e}")
+    if parts is None:
+        parts = []
+        for a in args:
+            parts.append(simulate_chunk(*a))
+            if on_chunk is not None:
+                on_chunk(len(parts), len(args))
+
+    if not parts:
+        return {"stockout_probability": np.empty(0), "expected_lost_sales": np.empty(0),
+                "ending_quantiles": np.empty((0, len(QUANTILES)))}
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+def validate_parameters(horizon_days: Optional[int], n_paths: Optional[int], delay_days: int = 0):
+    """Varsayılanları uygular ve sınırları kontrol eder (ValueError). (ufuk, yol sayısı) döner."""
+    horizon_days = horizon_days or settings.MONTE_CARLO_HORIZON_DAYS
+    n_paths = n_paths or settings.MONTE_CARLO_PATHS
+    if not 1 <= horizon_days + delay_days <= MAX_HORIZON_DAYS or delay_days < 0:
+        raise ValueError(f"Ufuk + gecikme 1-{MAX_HORIZON_DAYS} gün olmalı")
+    if not 1 <= n_paths <= MAX_PATHS:
+        raise ValueError(f"Yol sayısı 1-{MAX_PATHS} olmalı")
+    return horizon_days, n_paths
+
+def run_monte_carlo(db: Session, store_id: Optional[int] = None, product_ids: Optional[Iterable[int]] = None,
+                    horizon_days: Optional[int] = None, n_paths: Optional[int] = None, price_change: float = 0,
+                    delay_days: int = 0, seed: Optional[int] = None, limit: Optional[int] = None,
+                    workers: Optional[int] = None, on_chunk: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    🎲 Kalem bazlı stoksuz kalma riski (Monte Carlo).
+    Sonuçlar stoksuz kalma olasılığına (eşitlikte kayıp satışa) göre azalan sıralı,
+    kolon bazlı tablodur; limit verilirse ilk limit kalem döner (özet tüm kalemler üzerindendir).
+    """
+    horizon_days, n_paths = validate_parameters(horizon_days, n_paths, delay_days)
+    fit = fit_demand(db, store_id, product_ids)
+    demand_multiplier = max(0.0, 1 - (price_change / 100.0) * PRICE_ELASTICITY)
+    # Talep oranı c ile ölçeklenirse: μ -> cμ, σ² - μ -> c²(σ² - μ) (Gamma ölçeği c ile çarpılır)
+    mean = fit.mean * demand_multiplier
+    var = mean + np.maximum(fit.var - fit.mean, 0.0) * demand_multiplier ** 2
+    days = horizon_days + delay_days
+    stats = run_simulation(fit.stock, mean, var, n_paths, days, seed, workers, on_chunk)
+
+    order = np.lexsort((-stats["expected_lost_sales"], -stats["stockout_probability"]))[:limit]
+    probability = stats["stockout_probability"]
+    quantiles = stats["ending_quantiles"][order]
+    return {
+        "items": len(fit),
+        "paths": n_paths,
+        "horizon_days": horizon_days,
+        "delay_days": delay_days,
+        "simulated_days": days,
+        "history_days": fit.history_days,
+        "demand_multiplier": round(demand_multiplier, 4),
+        "summary": {
+            "expected_lost_sales": float(stats["expected_lost_sales"].sum()),
+            "items_likely_stockout": int((probability >= 0.5).sum()),
+            "mean_stockout_probability": float(probability.mean()) if len(probability) else 0.0,
+        },
+        "results": {
+            "store_id": fit.store_ids[order].tolist(),
+            "product_id": fit.product_ids[order].tolist(),
+            "stock": fit.stock[order].tolist(),
+            "mean_daily_demand": np.round(mean[order], 3).tolist(),
+            "expected_demand": np.round(mean[order] * days, 2).tolist(),
+            "stockout_probability": np.round(probability[order], 4).tolist(),
+            "expected_lost_sales": np.round(stats["expected_lost_sales"][order], 2).tolist(),
+            **{f"inventory_p{int(q * 100):02d}": quantiles[:, i].tolist() for i, q in enumerate(QUANTILES)},
+        },
+    }
@@ -1,125 +1,400 @@
-from models import Store, Inventory
-from typing import Dict, List
+from models import Store, Inventory, StoreRiskSummary, StoreRiskSnapshot, ProductRiskSnapshot
+from typing import Dict, Iterable, List, Optional
+from collections import defaultdict
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import bindparam, case, delete, event, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from core.config import settings
 from core.logger import logger
+import datetime
+
+# Karar eşikleri
+HIGH_RISK_RATIO = 0.2 # Kalemlerin %20'sinden fazlası güvenlik stoğunun altındaysa
+OVERSTOCK_RATIO = 0.4 # Kalemlerin %40'ından fazlası aşırı stoktaysa
+OVERSTOCK_MULTIPLIER = 3 # quantity > safety_stock * 3 -> aşırı stok
+LOW_STOCK_THRESHOLD = 10 # Dashboard uyarısı: stoğu bu adedin altındaki çeşit sayısı
+LOW_STOCK_CRITICAL = 20 # Bu sayıdan fazla düşük stoklu çeşit -> CRITICAL
+LOW_STOCK_WARNING = 5 # Bu sayıdan fazla düşük stoklu çeşit -> WARNING
+
+REFRESH_CHUNK_SIZE = 500 # IN listesi başına mağaza sayısı
+
+FRONTEND_COLORS = {
+    "HIGH_RISK": "red",
+    "MEDIUM_RISK": "orange",
+    "OVERSTOCK": "yellow",
+    "LOW_RISK": "green",
+    "UNKNOWN": "gray"
+}
+
+_summary = StoreRiskSummary.__table__
+_inventory = Inventory.__table__
+_stores = Store.__table__
+
+# Özet kolonları (delta sırası _contribution ile aynı)
+_SUMMARY_COLUMNS = ("total_items", "total_stock", "total_safety", "high_risk_count", "overstock_count", "low_stock_count")
+
+def classify_risk(total_items: int, high_risk: int, overstock: int, empty_status: str = "UNKNOWN") -> str:
+    """Karar Mantığı: Kalem sayıları -> risk durumu."""
+    if total_items == 0:
+        return empty_status
+    if (high_risk / total_items) > HIGH_RISK_RATIO:
+        return "HIGH_RISK"
+    if (overstock / total_items) > OVERSTOCK_RATIO:
+        return "OVERSTOCK"
+    return "LOW_RISK"
+
+def classify_low_stock(low_stock_count: int) -> str:
+    """Dashboard mağaza uyarısı: düşük stoklu çeşit sayısı -> CRITICAL / WARNING / SAFE."""
+    if low_stock_count > LOW_STOCK_CRITICAL:
+        return "CRITICAL"
+    if low_stock_count > LOW_STOCK_WARNING:
+        return "WARNING"
+    return "SAFE"
+
+# --- Özet Tablosu Bakımı (store_risk_summary) ---
+#
+# Eski yöntem: Her raporda tüm envanter tablosu taranıyordu (O(envanter)).
+# Yeni yöntem:
+# - ORM ile yapılan envanter değişiklikleri (db.add, item.quantity -= x, db.delete)
+#   flush sırasında mağaza bazlı delta olarak özet satırına yazılır (aynı transaction).
+# - Deltası bilinemeyen değişiklikler (toplu UPDATE/INSERT, SQL ifadesi atamaları)
+#   sadece ilgili mağazaları (bilinmiyorsa tümünü) dirty işaretler.
+# - Rapor, sadece dirty / eksik / RISK_SUMMARY_MAX_AGE'den eski satırları yeniden sayar
+#   ve gerisini özet tablosundan okur (O(mağaza)).
+# ORM dışı yazımlar (raw SQL) mark_stores_dirty ile bildirilmelidir; bildirilmeyenler
+# en geç RISK_SUMMARY_MAX_AGE sonra düzelir.
+
+def _contribution(quantity, safety_stock):
+    """Tek envanter kaleminin özete katkısı; değerler bilinmiyorsa None."""
+    if not isinstance(quantity, (int, float)) or not isinstance(safety_stock, (int, float)):
+        return None
+    return (1, quantity, safety_stock, int(quantity < safety_stock),
+            int(quantity > safety_stock * OVERSTOCK_MULTIPLIER), int(quantity < LOW_STOCK_THRESHOLD))
+
+def _attr_value(state, key: str, before: bool):
+    """Flush öncesi (before=True) veya sonrası değer. Yüklenmemişse None."""
+    history = state.attrs[key].history
+    values = (history.deleted or history.unchanged) if before else (history.added or history.unchanged)
+    return values[0] if values else None
+
+def mark_stores_dirty(connection, store_ids: Optional[Iterable[int]] = None):
+    """
+    Mağazaların özetini yeniden sayım için işaretler (store_ids=None -> tümü).
+    connection: Session.connection() veya Connection (çağıranın transaction'ı).
+    Özet satırı olmayan mağazalar zaten dirty sayılır.
+    """
+    stmt = update(_summary).values(dirty=True)
+    if store_ids is not None:
+        store_ids = list(store_ids)
+        if not store_ids:
+            return
+        stmt = stmt.where(_summary.c.store_id.in_(store_ids))
+    connection.execute(stmt)
+
+def _apply_flush_deltas(session, flush_context):
+    deltas = defaultdict(lambda: [0] * len(_SUMMARY_COLUMNS))
+    dirty_stores = set()
+    all_dirty = False
+
+    def add(store_id, contribution, sign):
+        nonlocal all_dirty
+        if store_id is None:
+            all_dirty = True
+        elif contribution is None:
+            dirty_stores.add(store_id)
+        else:
+            row = deltas[store_id]
+            for i, value in enumerate(contribution):
+                row[i] += sign * value
+
+    for obj in session.new:
+        if isinstance(obj, Inventory):
+            state = obj._sa_instance_state
+            add(_attr_value(state, "store_id", False),
+                _contribution(_attr_value(state, "quantity", False), _attr_value(state, "safety_stock", False)), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Inventory):
+            state = obj._sa_instance_state
+            add(_attr_value(state, "store_id", True),
+                _contribution(_attr_value(state, "quantity", True), _attr_value(state, "safety_stock", True)), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Inventory) and session.is_modified(obj):
+            state = obj._sa_instance_state
+            add(_attr_value(state, "store_id", True),
+                _contribution(_attr_value(state, "quantity", True), _attr_value(state, "safety_stock", True)), -1)
+            add(_attr_value(state, "store_id", False),
+                _contribution(_attr_value(state, "quantity", False), _attr_value(state, "safety_stock", False)), 1)
+
+    updates = [
+        {"b_store_id": store_id, **{f"b_{col}": value for col, value in zip(_SUMMARY_COLUMNS, row)}}
+        for store_id, row in deltas.items() if any(row) and store_id not in dirty_stores
+    ]
+    if not (updates or dirty_stores or all_dirty):
+        return
+
+    connection = session.connection()
+    if updates:
+        # Tek executemany: satırı olmayan mağazalar etkilenmez (zaten dirty sayılır)
+        connection.execute(
+            update(_summary)
+            .where(_summary.c.store_id == bindparam("b_store_id"))
+            .values({col: _summary.c[col] + bindparam(f"b_{col}") for col in _SUMMARY_COLUMNS}),
+            updates
+        )
+    if all_dirty:
+        mark_stores_dirty(connection)
+    elif dirty_stores:
+        mark_stores_dirty(connection, dirty_stores)
+
+def _mark_bulk_dirty(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Inventory:
+        return
+    # Toplu ifadelerde delta bilinmez; etkilenen anahtarlar verilmişse sadece o mağazalar
+    keys = orm_execute_state.execution_options.get("changed_keys")
+    store_ids = None if keys is None else {store_id for store_id, _ in keys}
+    mark_stores_dirty(orm_execute_state.session.connection(), store_ids)
+
+def register_listeners():
+    """
+    Envanter yazan her oturumun özeti güncellemesi için ORM event'lerini kaydeder.
+    Uygulama ve betik giriş noktalarından (database.register_orm_listeners) çağrılır;
+    tekrar çağrılması zararsızdır.
+    """
+    for name, listener in (("after_flush", _apply_flush_deltas), ("do_orm_execute", _mark_bulk_dirty)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+def _upsert_summary(connection):
+    """Dialekte göre INSERT ... ON CONFLICT (store_id) DO UPDATE (sayım sonucu satırın yerine geçer)."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(_summary)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(_summary)
+    else:
+        raise NotImplementedError(f"store_risk_summary UPSERT desteklenmiyor: {dialect}")
+    return stmt.on_conflict_do_update(
+        index_elements=[_summary.c.store_id],
+        set_={col: stmt.excluded[col] for col in (*_SUMMARY_COLUMNS, "dirty", "updated_at")},
+    )
+
+def _recount_stale(connection, store_ids: Optional[Iterable[int]]) -> List[int]:
+    now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(seconds=settings.RISK_SUMMARY_MAX_AGE)
+
+    stale_query = (
+        select(_stores.c.id)
+        .select_from(_stores.outerjoin(_summary, _summary.c.store_id == _stores.c.id))
+        .where(or_(
+            _summary.c.store_id.is_(None),
+            _summary.c.dirty.is_(True),
+            _summary.c.updated_at.is_(None),
+            _summary.c.updated_at < cutoff,
+        ))
+    )
+    if store_ids is not None:
+        stale_query = stale_query.where(_stores.c.id.in_(list(store_ids)))
+    stale = connection.execute(stale_query).scalars().all()
+
+    for i in range(0, len(stale), REFRESH_CHUNK_SIZE):
+        chunk = stale[i:i + REFRESH_CHUNK_SIZE]
+        # Eşzamanlı delta yazımlarını beklet: sayım, kilidi tutanların commit'inden sonrasını görür
+        connection.execute(select(_summary.c.store_id).where(_summary.c.store_id.in_(chunk)).with_for_update())
+        stats = {
+            row[0]: row[1:]
+            for row in connection.execute(
+                select(
+                    _inventory.c.store_id,
+                    func.count(_inventory.c.id),
+                    func.coalesce(func.sum(_inventory.c.quantity), 0),
+                    func.coalesce(func.sum(_inventory.c.safety_stock), 0),
+                    func.sum(case((_inventory.c.quantity < _inventory.c.safety_stock, 1), else_=0)),
+                    func.sum(case((_inventory.c.quantity > _inventory.c.safety_stock * OVERSTOCK_MULTIPLIER, 1), else_=0)),
+                    func.sum(case((_inventory.c.quantity < LOW_STOCK_THRESHOLD, 1), else_=0)),
+                )
+                .where(_inventory.c.store_id.in_(chunk))
+                .group_by(_inventory.c.store_id)
+            )
+        }
+        # UPSERT: satırı henüz olmayan mağazayı aynı anda yenileyen iki okuyucu PK çakışmasına düşmez
+        connection.execute(_upsert_summary(connection), [
+            {
+                "store_id": store_id,
+                **dict(zip(_SUMMARY_COLUMNS, (int(value or 0) for value in stats.get(store_id, (0,) * len(_SUMMARY_COLUMNS))))),
+                "dirty": False,
+                "updated_at": now,
+            }
+            for store_id in chunk
+        ])
+        connection.execute(update(_stores).where(_stores.c.id.in_(chunk)).values(last_risk_analysis=now))
+    return stale
+
+def refresh_risk_summary(db: Session, store_ids: Optional[Iterable[int]] = None) -> List[int]:
+    """
+    🔄 ÖZET YENİLEME
+    Sadece dirty, özet satırı olmayan veya RISK_SUMMARY_MAX_AGE'den eski mağazaları
+    GROUP BY ile yeniden sayar ve Store.last_risk_analysis'i günceller.
+    Yeniden sayılan mağaza id'lerini döner.
+
+    Okuma yollarından (rapor, GET /api/stores) çağrılır: yazım çağıranın oturumunda
+    değil, aynı veritabanına açılan kendi kısa transaction'ında yapılır; çağıranın
+    bekleyen değişiklikleri flush / commit edilmez, transaction'ı sonlanmaz.
+    """
+    with Session(bind=db.get_bind()) as refresh_db:
+        with refresh_db.begin():
+            stale = _recount_stale(refresh_db.connection(), store_ids)
+    if stale:
+        logger.info(f"Risk özeti yenilendi: {len(stale)} mağaza")
+    return stale
+
+def refresh_for_read(db: Session, store_ids: Optional[Iterable[int]] = None) -> List[int]:
+    """Okuma yolları için: yenileme başarısız olursa (örn. kilit) özet olduğu gibi okunur, istek düşmez."""
+    try:
+        return refresh_risk_summary(db, store_ids)
+    except Exception as e:
+        logger.error(f"Risk özeti yenilenemedi: {e}")
+        return []
 
 def analyze_store_risk(store: Store, db: Session) -> str:
     """
-    MAĞAZA RİSK ANALİZİ (SQL OPTİMİZE)
-    
+    MAĞAZA RİSK ANALİZİ (ÖZET TABLOSU)
+
     Eski yöntem: Tüm envanteri çek, döngüyle say (Python Loop).
-    Yeni yöntem: Veritabanında (SQL) saydır ve sadece 3 tane sayı çek.
+    Sonraki yöntem: Veritabanında (SQL) saydır ve sadece 3 tane sayı çek.
+    Yeni yöntem: Artımlı tutulan store_risk_summary satırını oku (gerekirse sadece bu mağazayı yeniden say).
     """
     if not db:
         # DB oturumu yoksa (eski kod uyumluluğu) manuel hesapla veya hata dön
         return "UNKNOWN"
 
-    sql_query = text("""
-        SELECT 
-            COUNT(*) as total_items,
-            SUM(CASE WHEN quantity < safety_stock THEN 1 ELSE 0 END) as high_risk_count,
-            SUM(CASE WHEN quantity > safety_stock * 3 THEN 1 ELSE 0 END) as overstock_count
-        FROM inventory
-        WHERE store_id = :store_id
-    """)
-    
+    store_id = store.id
+    refresh_for_read(db, [store_id])
     try:
-        result = db.execute(sql_query, {"store_id": store.id}).fetchone()
-        if not result:
-            return "UNKNOWN"
-            
-        total_items = result[0]
-        high_risk_count = result[1] or 0
-        overstock_count = result[2] or 0
-        
+        result = db.connection().execute(
+            select(_summary.c.total_items, _summary.c.high_risk_count, _summary.c.overstock_count)
+            .where(_summary.c.store_id == store_id)
+        ).fetchone()
     except Exception as e:
         logger.error(f"Risk Engine SQL Error: {e}")
         return "UNKNOWN"
 
-    if total_items == 0:
-        return "LOW_RISK"
-
-    # Karar Mantığı (Aynı kalıyor)
-    if (high_risk_count / total_items) > 0.2:
-        return "HIGH_RISK"
-    
-    if (overstock_count / total_items) > 0.4:
-        return "OVERSTOCK"
-        
-    return "LOW_RISK"
+    if not result:
+        return "UNKNOWN"
+    return classify_risk(result[0], result[1] or 0, result[2] or 0, empty_status="LOW_RISK")
 
 def get_risk_report(db: Session, stores: List[Store]) -> List[Dict]:
     """
-    TOPLU RİSK RAPORU (SQL OPTİMİZE)
-    
-    Tüm mağazaların risk durumunu tek sorguda çeker.
+    TOPLU RİSK RAPORU (ÖZET TABLOSU)
+
+    Sadece değişen mağazalar yeniden sayılır; rapor mağaza + özet tablolarından
+    REFRESH_CHUNK_SIZE'lık IN listeleriyle okunur (O(mağaza), envanter taranmaz;
+    SQLite'ın bind parametresi sınırı aşılmaz).
     """
-    # Tek sorguda tüm mağazaların stok istatistiklerini al
-    sql_query = text("""
-        SELECT 
-            i.store_id,
-            SUM(i.quantity) as total_stock_qty,
-            SUM(i.safety_stock) as total_safety_qty,
-            COUNT(i.id) as total_items,
-            SUM(CASE WHEN i.quantity < i.safety_stock THEN 1 ELSE 0 END) as high_risk,
-            SUM(CASE WHEN i.quantity > i.safety_stock * 3 THEN 1 ELSE 0 END) as overstock
-        FROM inventory i
-        GROUP BY i.store_id
-    """)
-    
+    store_ids = [store.id for store in stores]
+
+    refresh_for_read(db)
+    query = (
+        select(
+            _stores.c.id, _stores.c.name, _stores.c.store_type,
+            _summary.c.total_stock, _summary.c.total_safety, _summary.c.total_items,
+            _summary.c.high_risk_count, _summary.c.overstock_count, _stores.c.last_risk_analysis,
+        )
+        .select_from(_stores.outerjoin(_summary, _summary.c.store_id == _stores.c.id))
+    )
     try:
-        stats_results = db.execute(sql_query).fetchall()
+        connection = db.connection()
+        rows = []
+        for i in range(0, len(store_ids), REFRESH_CHUNK_SIZE):
+            chunk = store_ids[i:i + REFRESH_CHUNK_SIZE]
+            rows.extend(connection.execute(query.where(_stores.c.id.in_(chunk))).all())
     except Exception as e:
         logger.error(f"Bulk Risk Report Error: {e}")
-        stats_results = []
-        
-    # Sonuçları Store ID'ye göre sözlüğe al (O(1) erişim için)
-    stats_map = {}
-    for row in stats_results:
-        stats_map[row[0]] = {
-            "total_stock": row[1] or 0,
-            "total_safety": row[2] or 0,
-            "total_items": row[3] or 0,
-            "high_risk": row[4] or 0,
-            "overstock": row[5] or 0
-        }
+        rows = []
+
+    rows_by_id = {row[0]: row for row in rows}
 
     report = []
-    
-    frontend_colors = {
-        "HIGH_RISK": "red",
-        "MEDIUM_RISK": "orange",
-        "OVERSTOCK": "yellow",
-        "LOW_RISK": "green",
-        "UNKNOWN": "gray"
-    }
-        
-    for store in stores:
-        stat = stats_map.get(store.id, {})
-        
-        # Risk Durumu Hesapla
-        total_items = stat.get("total_items", 0)
-        high_risk = stat.get("high_risk", 0)
-        overstock = stat.get("overstock", 0)
-        
-        status = "LOW_RISK"
-        if total_items > 0:
-            if (high_risk / total_items) > 0.2:
-                status = "HIGH_RISK"
-            elif (overstock / total_items) > 0.4:
-                status = "OVERSTOCK"
-        else:
-            status = "UNKNOWN" if total_items == 0 else "LOW_RISK"
-            
+    for store_id in store_ids:
+        row = rows_by_id.get(store_id)
+        if row is None:
+            continue
+        _, name, store_type, total_stock, total_safety, total_items, high_risk, overstock, analyzed_at = row
+        status = classify_risk(total_items or 0, high_risk or 0, overstock or 0)
+
         report.append({
-            "store_id": store.id,
-            "name": store.name,
-            "type": store.store_type.value,
-            "stock": stat.get("total_stock", 0),
-            "safety_stock": stat.get("total_safety", 0),
+            "store_id": store_id,
+            "name": name,
+            "type": store_type.value,
+            "stock": total_stock or 0,
+            "safety_stock": total_safety or 0,
             "status": status,
-            "color": frontend_colors.get(status, "gray")
+            "color": FRONTEND_COLORS.get(status, "gray"),
+            "last_risk_analysis": analyzed_at,
         })
-        
+
     return report
+
+# --- Günlük Risk Geçmişi (Gece Görevi) ---
+
+SNAPSHOT_CHUNK_SIZE = 5000 # Bulk INSERT paket boyutu
+
+def snapshot_risk_history(db: Session, snapshot_date: Optional[datetime.date] = None) -> Dict:
+    """
+    📸 GÜNLÜK RİSK FOTOĞRAFI
+    Mağaza satırları güncel store_risk_summary'den (sadece dirty mağazalar yeniden sayılır),
+    ürün satırları envanterin ürün bazlı tek GROUP BY'ından yazılır.
+    Aynı gün tekrar çalışırsa o günün satırları yenilenir (idempotent).
+    """
+    snapshot_date = snapshot_date or datetime.date.today()
+    refresh_risk_summary(db)
+    connection = db.connection()
+    store_history = StoreRiskSnapshot.__table__
+    product_history = ProductRiskSnapshot.__table__
+
+    store_rows = [
+        {
+            "snapshot_date": snapshot_date,
+            "store_id": row.store_id,
+            "status": classify_risk(row.total_items or 0, row.high_risk_count or 0, row.overstock_count or 0),
+            **{col: row._mapping[col] or 0 for col in _SUMMARY_COLUMNS},
+        }
+        for row in connection.execute(select(_summary.c.store_id, *(_summary.c[col] for col in _SUMMARY_COLUMNS)))
+    ]
+
+    product_rows = [
+        {
+            "snapshot_date": snapshot_date,
+            "product_id": product_id,
+            "status": classify_risk(store_count, high_risk or 0, overstock or 0),
+            "store_count": store_count,
+            "total_stock": int(total_stock or 0),
+            "total_safety": int(total_safety or 0),
+            "high_risk_stores": int(high_risk or 0),
+            "overstock_stores": int(overstock or 0),
+            "out_of_stock_stores": int(out_of_stock or 0),
+        }
+        for product_id, store_count, total_stock, total_safety, high_risk, overstock, out_of_stock in connection.execute(
+            select(
+                _inventory.c.product_id,
+                func.count(_inventory.c.id),
+                func.sum(_inventory.c.quantity),
+                func.sum(_inventory.c.safety_stock),
+                func.sum(case((_inventory.c.quantity < _inventory.c.safety_stock, 1), else_=0)),
+                func.sum(case((_inventory.c.quantity > _inventory.c.safety_stock * OVERSTOCK_MULTIPLIER, 1), else_=0)),
+                func.sum(case((_inventory.c.quantity <= 0, 1), else_=0)),
+            ).group_by(_inventory.c.product_id)
+        )
+    ]
+
+    connection.execute(delete(store_history).where(store_history.c.snapshot_date == snapshot_date))
+    connection.execute(delete(product_history).where(product_history.c.snapshot_date == snapshot_date))
+    for table, rows in ((store_history, store_rows), (product_history, product_rows)):
+        for i in range(0, len(rows), SNAPSHOT_CHUNK_SIZE):
+            connection.execute(insert(table), rows[i:i + SNAPSHOT_CHUNK_SIZE])
+    db.commit()
+
+    logger.info(f"Risk geçmişi {snapshot_date}: {len(store_rows)} mağaza, {len(product_rows)} ürün")
+    return {"snapshot_date": snapshot_date.isoformat(), "stores": len(store_rows), "products": len(product_rows)}
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, Response, HTTPException, Request
+from fastapi import APIRouter, Depends, Response, HTTPException, Request, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, desc
-from typing import List
+from typing import List, Optional
 import datetime
 import io
 import csv
 
-from database import get_sync_db
+from database import get_db, get_sync_db
 from models import Sale, Product, Forecast
-from schemas import AnalyticsResponse, InventorySchema
+from schemas import (
+    AnalyticsResponse, BackgroundJobSchema, ForecastAccuracySchema, InventorySchema, MonteCarloRequest,
+)
+from services.accuracy_service import list_accuracy_leaderboard
 # Helper functions from original main.py imports (moved or assumed accessible)
-from analysis_engine import calculate_abc_analysis, simulate_what_if, calculate_forecast_accuracy
+from analysis_engine import (
+    get_abc_results, simulate_what_if, calculate_forecast_accuracy,
+)
 from cold_start_engine import analyze_cold_start
+import abc_xyz_engine
+import monte_carlo_engine
+import background_jobs
+import scheduled_jobs
+from core import jobs
 from export_engine import export_training_data
 
+MAX_LEADERBOARD_PAGE = 500
+
 router = APIRouter(
     tags=["analytics"]
 )
@@ -77,13 +90,103 @@ def get_forecasts(store_id: int = None, product_id: int = None, db: Session = De
 def get_forecast_accuracy(store_id: int, product_id: int, db: Session = Depends(get_sync_db)):
     return calculate_forecast_accuracy(db, store_id, product_id)
 
+@router.get("/api/analysis/accuracy/leaderboard", response_model=List[ForecastAccuracySchema])
+async def get_accuracy_leaderboard(
+    response: Response,
+    sort: str = Query("mae", description="mae / rmse / mape / bias / r2"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$", description="Boşsa en kötü seri önce"),
+    limit: int = Query(50, ge=1, le=MAX_LEADERBOARD_PAGE),
+    cursor: Optional[str] = Query(None, description="Önceki yanıtın X-Next-Cursor başlığı"),
+    store_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    min_samples: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    🏆 TAHMİN DOĞRULUĞU LİDERLİK TABLOSU
+    Tüm seriler gece görevinde (forecast_accuracy) tek geçişte hesaplanır; burada
+    sadece okunur. Sonraki sayfa varsa cursor'ı `X-Next-Cursor` başlığında döner.
+    """
+    try:
+        rows, next_cursor = await list_accuracy_leaderboard(
+            db, sort=sort, descending=None if order is None else order == "desc", limit=limit, cursor=cursor,
+            store_id=store_id, product_id=product_id, min_samples=min_samples,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.post("/api/analysis/accuracy/run", response_model=BackgroundJobSchema, status_code=202)
+def run_forecast_accuracy(db: Session = Depends(get_sync_db)):
+    """Gece görevinin yaptığı toplu doğruluk hesabını hemen başlatır (arka plan işi)."""
+    return jobs.submit_job(db, scheduled_jobs.FORECAST_ACCURACY_JOB)
+
 @router.get("/api/analysis/cold-start")
 def get_cold_start_analysis(product_id: int, db: Session = Depends(get_sync_db)):
     return analyze_cold_start(db, product_id)
 
 @router.get("/api/analysis/abc")
-def get_abc_analysis(db: Session = Depends(get_sync_db)):
-    return calculate_abc_analysis(db)
+def get_abc_analysis(
+    limit: int = Query(20, ge=1, le=1000),
+    abc_class: Optional[str] = Query(None, pattern="^[ABC]$"),
+    db: Session = Depends(get_sync_db),
+):
+    """
+    🔠 ABC ANALİZİ (Saklanan Sonuç)
+    Sınıflandırma gece görevinde (abc_xyz_analysis) hesaplanır; burada sadece okunur.
+    """
+    return get_abc_results(db, limit, abc_class)
+
+@router.post("/api/analysis/abc/run", response_model=BackgroundJobSchema, status_code=202)
+def run_abc_analysis(db: Session = Depends(get_sync_db)):
+    """ABC sınıflarını yeniden hesaplar (sadece ciro, set-based SQL UPDATE; arka plan işi)."""
+    return jobs.submit_job(db, background_jobs.ABC_ANALYSIS_JOB)
+
+@router.get("/api/analysis/abc-xyz")
+def get_abc_xyz_analysis(store_id: Optional[int] = None, db: Session = Depends(get_sync_db)):
+    """
+    🔠 ABC-XYZ MATRİSİ
+    store_id yoksa: saklanan ürün sınıflarının 3x3 dağılımı (gece görevi yazar).
+    store_id varsa: o mağazanın ürünleri kendi satışlarıyla anlık sınıflanır.
+    """
+    if store_id is None:
+        return {"matrix": abc_xyz_engine.get_abc_xyz_matrix(db)}
+    items = abc_xyz_engine.classify_store_products(db, store_id)
+    matrix = {a + x: 0 for a in "ABC" for x in "XYZ"}
+    for item in items:
+        matrix[item["class"]] += 1
+    return {"store_id": store_id, "matrix": matrix, "items": items}
+
+@router.post("/api/analysis/abc-xyz/run", response_model=BackgroundJobSchema, status_code=202)
+def run_abc_xyz_analysis(db: Session = Depends(get_sync_db)):
+    """Gece görevinin yaptığı ABC-XYZ güncellemesini hemen başlatır (arka plan işi)."""
+    return jobs.submit_job(db, scheduled_jobs.ABC_XYZ_JOB)
+
+@router.post("/api/analysis/monte-carlo", response_model=BackgroundJobSchema, status_code=202)
+def run_monte_carlo(request: MonteCarloRequest, db: Session = Depends(get_sync_db)):
+    """
+    🎲 MONTE CARLO STOK RİSKİ
+    Geçmiş günlük satışlardan kalem bazında talep dağılımı tahmin edilir; ufuk boyunca
+    çekilen yollarla stoksuz kalma olasılığı, beklenen kayıp satış ve stok yüzdelikleri hesaplanır.
+    Arka plan işi olarak çalışır; parametre hataları kuyruğa yazmadan 400 döner.
+    """
+    try:
+        monte_carlo_engine.validate_parameters(request.horizon_days, request.paths, request.delay_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return jobs.submit_job(db, background_jobs.MONTE_CARLO_JOB, {
+        "store_id": request.store_id, "product_ids": request.product_ids,
+        "horizon_days": request.horizon_days, "n_paths": request.paths, "price_change": request.price_change,
+        "delay_days": request.delay_days, "seed": request.seed, "limit": request.limit,
+    })
+
+@router.post("/api/forecast/generate", response_model=BackgroundJobSchema, status_code=202)
+def generate_forecasts(db: Session = Depends(get_sync_db)):
+    """🔮 Tüm mağaza-ürün tahminlerini yeniden üretir (arka plan işi)."""
+    return jobs.submit_job(db, background_jobs.GENERATE_FORECASTS_JOB)
 
 @router.get("/api/analysis/model-metrics")
 def get_model_metrics(store_id: int = 1, product_id: int = 1, db: Session = Depends(get_sync_db)):
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import asyncio
+import json
+
+from core import jobs
+from core.config import settings
+from database import AsyncSessionLocal, get_sync_db
+from models import BackgroundJob, BackgroundJobLog
+from schemas import BackgroundJobLogSchema, BackgroundJobSchema, JobSubmitRequest
+import background_jobs  # noqa: F401 - İş tipi kayıtları
+
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"]
+)
+
+@router.get("/types")
+def list_job_types():
+    return [{"name": t.name, "description": t.description} for t in jobs.registered_job_types().values()]
+
+@router.post("", response_model=BackgroundJobSchema, status_code=202)
+def submit_job(req: JobSubmitRequest, db: Session = Depends(get_sync_db)):
+    """
+    🧵 ARKA PLAN İŞİ BAŞLAT
+    İş kuyruğa yazılır ve id'si hemen döner; ilerleme GET /api/jobs/{id} ile izlenir.
+    """
+    return jobs.submit_job(db, req.name, req.params)
+
+@router.get("", response_model=List[BackgroundJobSchema])
+def list_jobs(status: Optional[str] = None, name: Optional[str] = None,
+              limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_sync_db)):
+    return jobs.list_jobs(db, status=status, name=name, limit=limit)
+
+@router.get("/{job_id}", response_model=BackgroundJobSchema)
+def get_job(job_id: int, db: Session = Depends(get_sync_db)):
+    return jobs.get_job(db, job_id)
+
+@router.get("/{job_id}/logs", response_model=List[BackgroundJobLogSchema])
+def get_job_logs(job_id: int, after_id: int = 0, limit: int = Query(500, ge=1, le=5000),
+                 db: Session = Depends(get_sync_db)):
+    """after_id: son okunan log id'si (sadece daha yeni satırlar döner)."""
+    jobs.get_job(db, job_id)
+    return jobs.read_logs(db, job_id, after_id=after_id, limit=limit)
+
+@router.post("/{job_id}/cancel", response_model=BackgroundJobSchema)
+def cancel_job(job_id: int, db: Session = Depends(get_sync_db)):
+    """Kuyruktaki iş hemen iptal olur; çalışan iş bir sonraki ilerleme kontrolünde durur."""
+    return jobs.cancel_job(db, job_id)
+
+async def _log_events(job_id: int, after_id: int):
+    """Yeni log satırlarını SSE olarak iletir; iş bitip kalan satırlar gönderilince 'end' olayı yollar."""
+    while True:
+        async with AsyncSessionLocal() as db: # Her turda kısa oturum (uzun transaction tutulmaz)
+            status = (await db.execute(select(BackgroundJob.status).where(BackgroundJob.id == job_id))).scalar()
+            logs = (await db.execute(
+                select(BackgroundJobLog)
+                .where(BackgroundJobLog.job_id == job_id, BackgroundJobLog.id > after_id)
+                .order_by(BackgroundJobLog.id)
+            )).scalars().all()
+        for log in logs:
+            after_id = log.id
+            payload = BackgroundJobLogSchema.model_validate(log).model_dump(mode="json")
+            yield f"id: {log.id}\nevent: log\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        if status is None or status in jobs.FINISHED:
+            yield f"event: end\ndata: {json.dumps({'status': status})}\n\n"
+            return
+        await asyncio.sleep(settings.JOB_LOG_POLL_SECONDS)
+
+@router.get("/{job_id}/logs/stream")
+def stream_job_logs(job_id: int, after_id: int = 0, db: Session = Depends(get_sync_db)):
+    """📜 Canlı log akışı (text/event-stream). Tarayıcıda: new EventSource(url)."""
+    jobs.get_job(db, job_id)
+    return StreamingResponse(
+        _log_events(job_id, after_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
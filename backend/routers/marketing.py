@@ -6,8 +6,9 @@ from database import get_db
 from models import Customer, Store, Coupon
 from services.marketing_service import analyze_customer_context, generate_smart_message, create_coupon
 from services.email_service import send_marketing_email
+from geo_engine import haversine, store_coordinates
 import logging
-from math import radians, sin, cos, sqrt, atan2
+import numpy as np
 
 router = APIRouter(tags=["marketing"])
 logger = logging.getLogger(__name__)
@@ -17,16 +18,7 @@ class LocationCheck(BaseModel):
     lon: float
     customer_id: int  # In a real app, this comes from Auth token
 
-# Haversine Formula for distance
-def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371000 # Earth radius in meters
-    phi1, phi2 = radians(lat1), radians(lat2)
-    dphi = radians(lat2 - lat1)
-    dlambda = radians(lon2 - lon1)
-    
-    a = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return R * c
+GEOFENCE_RADIUS_M = 500 # 500 meters geofence
 
 @router.post("/api/marketing/check-proximity")
 async def check_proximity(data: LocationCheck, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
@@ -40,13 +32,15 @@ async def check_proximity(data: LocationCheck, background_tasks: BackgroundTasks
     nearest_store = None
     min_dist = float('inf')
     
-    for store in stores:
-        if store.lat and store.lon:
-            dist = calculate_distance(data.lat, data.lon, store.lat, store.lon)
-            if dist < 500: # 500 meters geofence
-                nearest_store = store
-                min_dist = dist
-                break
+    if stores:
+        # Distance to every store in one vectorized pass (km -> meters)
+        lats, lons = store_coordinates(stores)
+        distances = haversine(data.lat, data.lon, lats, lons) * 1000
+        inside = np.flatnonzero(distances < GEOFENCE_RADIUS_M)
+        if inside.size:
+            # Keep the original "first store inside the geofence" behaviour
+            nearest_store = stores[inside[0]]
+            min_dist = float(distances[inside[0]])
     
     if not nearest_store:
         return {"notification": False, "reason": "No store nearby"}
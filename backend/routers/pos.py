@@ -205,7 +205,7 @@ async def create_pos_sale_direct(
     3. Sadakat Puanı Hesapla & Güncelle.
     4. PDF Fiş üret ve mail at.
     """
-    from models import Inventory, Product # Local import
+    from models import Inventory, Product, Sale # Local import
     
     try:
         new_sale = PosSale(
@@ -247,6 +247,17 @@ async def create_pos_sale_direct(
                 if inventory:
                     inventory.quantity -= item.quantity
                     db.add(inventory) # Update
+
+                    # Raporlama: sync_engine ile aynı şekilde Sale kaydı (flush'ta sales_daily'ye işlenir).
+                    # Yalnızca stok satırı varken: saha mağazası (9999) kurulmamışsa sales/sales_daily
+                    # yabancı anahtarları flush'ı düşürür ya da (SQLite) yetim mağaza kimliği bırakır.
+                    db.add(Sale(
+                        store_id=field_store_id,
+                        product_id=product.id,
+                        date=new_sale.created_at.date(),
+                        quantity=item.quantity,
+                        total_price=item.quantity * item.unit_price
+                    ))
                 else:
                     # Create negative stock or handle error? 
                     # For field ops, maybe allow negative or create 0
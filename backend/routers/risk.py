@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import datetime
+
+from database import get_db, get_sync_db
+from models import Store
+import risk_engine
+import background_jobs  # noqa: F401 - Gece görevleri iş tipi olarak da kayıtlı
+import scheduled_jobs
+from core import jobs
+from schemas import BackgroundJobSchema, ProductRiskPointSchema, RiskStatusCountSchema, StoreRiskPointSchema
+from services import risk_service
+
+MAX_PRODUCTS_PER_QUERY = 200
+
+router = APIRouter(
+    prefix="/api/risk",
+    tags=["risk"]
+)
+
+def _range(start: Optional[datetime.date], end: Optional[datetime.date]):
+    try:
+        return risk_service.resolve_range(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/report")
+def get_current_risk_report(db: Session = Depends(get_sync_db)):
+    """
+    🚦 GÜNCEL RİSK RAPORU
+    Artımlı tutulan özet tablosundan (sadece değişen mağazalar yeniden sayılır).
+    """
+    return risk_engine.get_risk_report(db, db.query(Store).all())
+
+@router.post("/snapshot", response_model=BackgroundJobSchema, status_code=202)
+def take_risk_snapshot(db: Session = Depends(get_sync_db)):
+    """
+    📸 RİSK FOTOĞRAFI (Manuel)
+    Gece görevinin yaptığını hemen başlatır (arka plan işi); bugünün satırları yenilenir.
+    """
+    return jobs.submit_job(db, scheduled_jobs.RISK_SNAPSHOT_JOB)
+
+@router.get("/history/stores", response_model=List[StoreRiskPointSchema])
+async def get_store_risk_history(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    store_ids: Optional[List[int]] = Query(None, description="Boşsa tüm mağazalar (?store_ids=1&store_ids=2)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    📈 MAĞAZA RİSK ZAMAN SERİSİ
+    Sadece günlük risk geçmişi tablosundan okunur (varsayılan: son 90 gün).
+    """
+    start, end = _range(start, end)
+    return await risk_service.store_risk_series(db, start, end, store_ids)
+
+@router.get("/history/status-counts", response_model=List[RiskStatusCountSchema])
+async def get_risk_status_counts(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    store_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Gün bazında durumlara göre mağaza sayıları (trend grafiği)."""
+    start, end = _range(start, end)
+    return await risk_service.store_status_counts(db, start, end, store_ids)
+
+@router.get("/history/products", response_model=List[ProductRiskPointSchema])
+async def get_product_risk_history(
+    product_ids: List[int] = Query(..., description=f"En fazla {MAX_PRODUCTS_PER_QUERY} ürün"),
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """📈 ÜRÜN RİSK ZAMAN SERİSİ (tüm mağazalar toplamında)."""
+    if len(product_ids) > MAX_PRODUCTS_PER_QUERY:
+        raise HTTPException(status_code=400, detail=f"En fazla {MAX_PRODUCTS_PER_QUERY} ürün sorgulanabilir")
+    start, end = _range(start, end)
+    return await risk_service.product_risk_series(db, product_ids, start, end)
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import desc
-from typing import List
+from typing import List, Optional
+import datetime
 
 from database import get_db
 from models import Sale, Store, Product, Customer
-from schemas import SaleSchema
+from schemas import SaleSchema, SalesRollupSchema
+from sales_rollup import GRANULARITIES, period_start, rollup_query
 
 router = APIRouter(
     prefix="/api/sales",
@@ -49,3 +51,31 @@ async def read_sales(request: Request, skip: int = 0, limit: int = 100, db: Asyn
             "total_price": s.total_price
         })
     return results
+
+@router.get("/rollup", response_model=List[SalesRollupSchema])
+async def read_sales_rollup(
+    granularity: str = Query("day", description=f"Periyot: {', '.join(GRANULARITIES)}"),
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    store_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    📊 GÜNLÜK / HAFTALIK / AYLIK SATIŞ ÖZETİ
+    Ham satış satırları yerine sales_daily özetinden okur. Varsayılan aralık son 90 gün.
+    start, periyot başlangıcına hizalanır (ilk hafta / ay eksik sayılmaz).
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz periyot. Seçenekler: {', '.join(GRANULARITIES)}")
+    end = end or datetime.date.today()
+    start = period_start(start or end - datetime.timedelta(days=90), granularity)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start, end'den sonra olamaz")
+
+    stmt = rollup_query(db.get_bind().dialect.name, granularity, start, end, store_id, product_id)
+    rows = (await db.execute(stmt)).mappings().all()
+    return [
+        {"store_id": store_id, "product_id": product_id, **row}
+        for row in rows
+    ]
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from database import get_sync_db
+from schemas import SandboxScenarioRequest
+from sandbox_engine import registry
+
+router = APIRouter(
+    prefix="/api/simulate/sandboxes",
+    tags=["simulation"]
+)
+
+@router.post("")
+def create_sandbox(refresh: bool = False, db: Session = Depends(get_sync_db)):
+    """
+    🧪 YENİ SANDBOX
+    Envanterin bellek içi kopyası; senaryolar canlı tablolara dokunmaz.
+    `refresh=true` taban snapshot'ı yaşına bakmadan yeniden yükler.
+    """
+    sandbox = registry.create(db, refresh=refresh)
+    return sandbox.state(include_risk_map=False)
+
+@router.get("")
+def list_sandboxes():
+    return registry.list()
+
+@router.get("/{sandbox_id}")
+def get_sandbox(sandbox_id: str, include_risk_map: bool = True):
+    """Sandbox durumu: uygulanan senaryolar, taban / projeksiyon KPI'ları ve risk haritası."""
+    return registry.get(sandbox_id).state(include_risk_map=include_risk_map)
+
+@router.post("/{sandbox_id}/scenarios")
+def apply_scenario(sandbox_id: str, req: SandboxScenarioRequest):
+    sandbox = registry.get(sandbox_id)
+    sandbox.apply(req.scenario, req.price_change, req.delay_days, req.seed)
+    return sandbox.state()
+
+@router.post("/{sandbox_id}/reset")
+def reset_sandbox(sandbox_id: str):
+    sandbox = registry.get(sandbox_id)
+    sandbox.reset()
+    return sandbox.state(include_risk_map=False)
+
+@router.delete("/{sandbox_id}")
+def delete_sandbox(sandbox_id: str):
+    registry.delete(sandbox_id)
+    return {"message": "Sandbox silindi", "sandbox_id": sandbox_id}
@@ -1,48 +1,54 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from schemas import SimulationStats, CustomScenarioRequest, WhatIfRequest, NearbyStoreRequest
+from typing import Optional
+from schemas import SimulationStats, CustomScenarioRequest, WhatIfRequest, WhatIfBatchRequest, NearbyStoreRequest, BackgroundJobSchema
 from database import get_sync_db
 from models import Sale, Inventory, Store
 from sqlalchemy import func
 
-# Simulation Engines
-from simulation_engine import (
-    simulate_sales_boom, 
-    simulate_recession, 
-    simulate_supply_shock, 
-    reset_database,
-    simulate_custom_scenario
-)
-from analysis_engine import simulate_what_if
+# Simulation Engines (arka plan işi olarak çalışır - bkz. background_jobs.py)
+import background_jobs
+from core import jobs
+from analysis_engine import simulate_what_if, expand_what_if_grid, simulate_what_if_batch, MAX_WHAT_IF_SCENARIOS
+import snapshot_engine
+from core.exceptions import BusinessRuleException
+from geo_engine import haversine, store_coordinates
+import numpy as np
 
 router = APIRouter(
     prefix="/api/simulate",
     tags=["simulation"]
 )
 
-@router.post("/sales-boom")
-def trigger_sales_boom(request: Request, db: Session = Depends(get_sync_db)):
+# Senaryolar ve reset iş olarak kuyruğa yazılır; yanıt iş kaydıdır (202).
+# Sonuç (eski yanıt: {"message", "status"}) GET /api/jobs/{id} -> result alanında.
+
+@router.post("/sales-boom", response_model=BackgroundJobSchema, status_code=202)
+def trigger_sales_boom(request: Request, seed: Optional[int] = None, db: Session = Depends(get_sync_db)):
     """🚨 SİMÜLASYON: SATIŞ PATLAMASI (BOOM)"""
-    msg = simulate_sales_boom(db)
-    return {"message": msg, "status": "BOOM"}
+    return jobs.submit_job(db, background_jobs.SALES_BOOM_JOB, {"seed": seed})
 
-@router.post("/recession")
-def trigger_recession(request: Request, db: Session = Depends(get_sync_db)):
+@router.post("/recession", response_model=BackgroundJobSchema, status_code=202)
+def trigger_recession(request: Request, seed: Optional[int] = None, db: Session = Depends(get_sync_db)):
     """📉 SİMÜLASYON: EKONOMİK DURGUNLUK (RECESSION)"""
-    msg = simulate_recession(db)
-    return {"message": msg, "status": "RECESSION"}
+    return jobs.submit_job(db, background_jobs.RECESSION_JOB, {"seed": seed})
 
-@router.post("/supply-shock")
+@router.post("/supply-shock", response_model=BackgroundJobSchema, status_code=202)
 def trigger_supply_shock(request: Request, db: Session = Depends(get_sync_db)):
     """⚠️ SİMÜLASYON: TEDARİK ZİNCİRİ KRİZİ (SUPPLY SHOCK)"""
-    msg = simulate_supply_shock(db)
-    return {"message": msg, "status": "SHOCK"}
+    return jobs.submit_job(db, background_jobs.SUPPLY_SHOCK_JOB)
 
-@router.post("/reset")
+@router.post("/reset", response_model=BackgroundJobSchema, status_code=202)
 def trigger_reset(request: Request, db: Session = Depends(get_sync_db)):
     """🔄 FABRİKA AYARLARINA DÖN (RESET)"""
-    msg = reset_database(db)
-    return {"message": msg, "status": "RESET"}
+    return jobs.submit_job(db, background_jobs.RESET_JOB)
+
+@router.post("/snapshot", response_model=BackgroundJobSchema, status_code=202)
+def refresh_golden_snapshot(db: Session = Depends(get_sync_db)):
+    """📸 Mevcut durumu altın snapshot olarak kaydet (sonraki reset'ler buraya döner)"""
+    if not snapshot_engine.supports_snapshots():
+        raise BusinessRuleException("Bu veritabanı için snapshot desteklenmiyor")
+    return jobs.submit_job(db, background_jobs.GOLDEN_SNAPSHOT_JOB)
 
 @router.get("/stats", response_model=SimulationStats)
 def get_simulation_stats(db: Session = Depends(get_sync_db)):
@@ -61,58 +67,62 @@ def get_simulation_stats(db: Session = Depends(get_sync_db)):
         "critical_stores": critical_stores
     }
 
-@router.post("/custom")
+@router.post("/custom", response_model=BackgroundJobSchema, status_code=202)
 def run_custom_simulation(scenario_req: CustomScenarioRequest, request: Request, db: Session = Depends(get_sync_db)):
     """
     🧪 ÖZEL SENARYO SİMÜLASYONU (What-If)
     """
-    result = simulate_custom_scenario(db, scenario_req.price_change, scenario_req.delay_days)
-    return result
+    return jobs.submit_job(db, background_jobs.CUSTOM_SCENARIO_JOB, {
+        "price_change": scenario_req.price_change, "delay_days": scenario_req.delay_days,
+    })
 
 @router.post("/what-if")
 def trigger_what_if(request: WhatIfRequest, db: Session = Depends(get_sync_db)):
     return simulate_what_if(db, request.source_store_id, request.target_store_id, request.product_id, request.amount)
 
+@router.post("/what-if/batch")
+def run_what_if_batch(request: WhatIfBatchRequest, db: Session = Depends(get_sync_db)):
+    """
+    🧪 TOPLU WHAT-IF (Transfer Senaryoları)
+    Senaryo listesi ve/veya parametre ızgarası (kaynak x hedef x ürün x adet) tek istekte
+    değerlendirilir; veritabanına yazmaz. Sonuç kolon bazlı tablodur (senaryo sırasıyla).
+    """
+    grid = request.grid
+    grid_size = len(grid.source_store_ids) * len(grid.target_store_ids) * len(grid.product_ids) * len(grid.amounts) \
+        if grid else 0
+    if grid_size + len(request.scenarios) > MAX_WHAT_IF_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"En fazla {MAX_WHAT_IF_SCENARIOS} senaryo değerlendirilebilir")
+    if not grid_size and not request.scenarios:
+        raise HTTPException(status_code=400, detail="Senaryo veya ızgara gerekli")
+
+    parts = [np.array([(s.source_store_id, s.target_store_id, s.product_id, s.amount) for s in request.scenarios],
+                      dtype=np.int64).reshape(-1, 4)]
+    if grid_size:
+        parts.append(expand_what_if_grid(grid.source_store_ids, grid.target_store_ids, grid.product_ids, grid.amounts))
+    return simulate_what_if_batch(db, np.concatenate(parts))
+
 @router.post("/find-nearby-store")
 def find_nearby_store(req: "NearbyStoreRequest", db: Session = Depends(get_sync_db)):
     """
-    📍 En yakın mağazayı bul (Haversine Formülü)
+    📍 En yakın mağazayı bul (Haversine Formülü - Vektörize)
     """
-    import math
-
     stores = db.query(Store).all()
     if not stores:
         return {"error": "Mağaza bulunamadı"}
 
-    closest_store = None
-    min_dist = float("inf")
+    # Tüm mağazalara olan mesafe tek NumPy işlemiyle hesaplanır
+    lats, lons = store_coordinates(stores)
+    distances = haversine(req.lat, req.lon, lats, lons)
 
-    # Haversine
-    R = 6371  # km
-    
-    for store in stores:
-        try:
-            dlat = math.radians(store.lat - req.lat)
-            dlon = math.radians(store.lon - req.lon)
-            a = math.sin(dlat/2) * math.sin(dlat/2) + \
-                math.cos(math.radians(req.lat)) * math.cos(math.radians(store.lat)) * \
-                math.sin(dlon/2) * math.sin(dlon/2)
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-            dist = R * c
-            
-            if dist < min_dist:
-                min_dist = dist
-                closest_store = store
-        except:
-            continue
-            
-    if closest_store:
-        return {
-            "store_id": closest_store.id,
-            "name": closest_store.name,
-            "distance_km": round(min_dist, 2),
-            "lat": closest_store.lat,
-            "lon": closest_store.lon
-        }
-    
-    return {"error": "Hesaplama hatası"}
+    if np.isnan(distances).all():
+        return {"error": "Hesaplama hatası"}
+
+    closest_idx = int(np.nanargmin(distances))
+    closest_store = stores[closest_idx]
+    return {
+        "store_id": closest_store.id,
+        "name": closest_store.name,
+        "distance_km": round(float(distances[closest_idx]), 2),
+        "lat": closest_store.lat,
+        "lon": closest_store.lon
+    }
@@ -1,97 +1,104 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
-from sqlalchemy.orm import selectinload
-from typing import List
-import datetime
+from typing import List, Optional
+import hashlib
+import json
 
 from database import get_db
-from models import Store, Inventory, Forecast, Product
+from models import Store, StoreRiskSummary
+import risk_engine
 from schemas import StoreSchema, InventorySchema
+from services.inventory_service import list_store_inventory
+
+MAX_INVENTORY_PAGE = 1000
 
 router = APIRouter(
     prefix="/api/stores",
     tags=["stores"]
 )
 
+def _etag(payload) -> str:
+    """Yanıt gövdesinin özeti (strong ETag)."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
 @router.get("", response_model=List[StoreSchema])
-async def read_stores(db: AsyncSession = Depends(get_db)):
+async def read_stores(request: Request, db: AsyncSession = Depends(get_db)):
     """
     🏪 MAĞAZALARI LİSTELE
+
+    Eski yöntem: Her mağazanın tüm Inventory satırları ORM nesnesi olarak yüklenip
+    Python'da toplanıyor, risk için mağaza başına ayrı COUNT sorgusu atılıyordu.
+    Yeni yöntem: store_risk_summary (risk_engine) üzerinden tek JOIN sorgusu;
+    envanter satırı yüklenmez (sadece değişen mağazalar yeniden sayılır).
+
+    Conditional GET: Yanıt ETag taşır; If-None-Match eşleşirse gövdesiz 304 döner.
     """
-    # Features ve Inventory ilişkisini eager load yapıyoruz
-    stmt = select(Store).options(
-        selectinload(Store.features),
-        selectinload(Store.inventory)
-    )
-    result = await db.execute(stmt)
-    stores = result.scalars().all()
-    
-    # Risk Analizi ve Stok Hesaplama
-    for store in stores:
-        # Toplam Stok ve Güvenlik Stoğu
-        total_stock = sum(i.quantity for i in store.inventory)
-        total_safety = sum(i.safety_stock for i in store.inventory)
-        
-        # Pydantic model bunları bekliyor, dinamik olarak ekliyoruz
-        store.stock = total_stock
-        store.safety_stock = total_safety
-        
-        # Risk Analizi
-        # Stoğu 10'un altında olan kaç çeşit ürün var?
-        result_risk = await db.execute(
-            select(func.count(Inventory.id)).filter(
-                Inventory.store_id == store.id,
-                Inventory.quantity < 10
-            )
+    # Yenileme kendi kısa transaction'ında yazar; GET isteğinin oturumu sadece okur
+    await db.run_sync(risk_engine.refresh_for_read)
+
+    summary = StoreRiskSummary.__table__
+    result = await db.execute(
+        select(
+            Store.id, Store.name, Store.store_type, Store.lat, Store.lon,
+            summary.c.total_stock, summary.c.total_safety, summary.c.low_stock_count,
         )
-        risk_count = result_risk.scalar() or 0
-        
-        if risk_count > 20:
-            store.risk_status = "CRITICAL"
-        elif risk_count > 5:
-            store.risk_status = "WARNING"
-        else:
-            store.risk_status = "SAFE"
-            
-    return stores
+        .outerjoin(summary, summary.c.store_id == Store.id)
+        .order_by(Store.id)
+    )
+    stores = [
+        {
+            "id": store_id,
+            "name": name,
+            "store_type": store_type.value,
+            "lat": lat,
+            "lon": lon,
+            "stock": total_stock or 0,
+            "safety_stock": total_safety or 0,
+            "risk_status": risk_engine.classify_low_stock(low_stock_count or 0),
+        }
+        for store_id, name, store_type, lat, lon, total_stock, total_safety, low_stock_count in result.all()
+    ]
+
+    etag = _etag(stores)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} # Her seferinde doğrula, değişmediyse 304
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=stores, headers=headers)
 
 @router.get("/{store_id}/inventory", response_model=List[InventorySchema])
-async def get_store_inventory(store_id: int, db: AsyncSession = Depends(get_db)):
+async def get_store_inventory(
+    store_id: int,
+    response: Response,
+    status: Optional[str] = Query(None, description="OUT_OF_STOCK_RISK / OVERSTOCK / OPTIMAL"),
+    sort: str = Query("product_id", description="product_id / product_name / quantity / predicted_sales"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(200, ge=1, le=MAX_INVENTORY_PAGE),
+    cursor: Optional[str] = Query(None, description="Önceki yanıtın X-Next-Cursor başlığı"),
+    db: AsyncSession = Depends(get_db),
+):
     """
-    📦 MAĞAZA STOK DURUMU
+    📦 MAĞAZA STOK DURUMU (Sayfalı)
+
+    Tahmin toplamları (30 gün) tek GROUP BY JOIN ile gelir; sıralama, status filtresi
+    ve keyset sayfalama sunucuda yapılır. Sonraki sayfa varsa cursor'ı
+    `X-Next-Cursor` başlığında döner (gövde eskisi gibi liste).
     """
-    # Ürün detaylarını ve Gelecek Tahminlerini (Forecast) dahil et
-    stmt = select(Inventory).filter(Inventory.store_id == store_id).options(
-        selectinload(Inventory.product)
-    )
-    result = await db.execute(stmt)
-    inventory_items = result.scalars().all()
-    
-    # Tahminleri al (Sonraki ay için)
-    next_month = datetime.date.today() + datetime.timedelta(days=30)
-    
-    for item in inventory_items:
-        # Bu ürün için bu mağazadaki toplam tahmin
-        result_forecast = await db.execute(
-            select(func.sum(Forecast.predicted_quantity)).filter(
-                Forecast.store_id == store_id,
-                Forecast.product_id == item.product_id,
-                Forecast.date <= next_month
-            )
+    try:
+        rows, next_cursor = await list_store_inventory(
+            db, store_id, status=status, sort=sort, descending=(order == "desc"), limit=limit, cursor=cursor
         )
-        total_forecast = result_forecast.scalar() or 0
-        
-        # Dinamik özellik ekleme (Schema'da varsa)
-        item.predicted_sales = total_forecast
-        
-        # Stok yetersiz mi?
-        if item.quantity < total_forecast:
-            item.status = "OUT_OF_STOCK_RISK"
-        elif item.quantity > total_forecast * 2:
-            item.status = "OVERSTOCK"
-        else:
-            item.status = "OPTIMAL"
-            
-    return inventory_items
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
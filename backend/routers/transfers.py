@@ -1,28 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
+from datetime import date
 
 from database import get_db, get_sync_db
-from models import Store, Inventory, Sale, RoutePenalty, TransferRejection, Product
-from schemas import TransferRecommendationSchema, TransferRequest, RejectionRequest
+from models import Store, Inventory, Sale, Product, Transfer, TransferStatus
+from schemas import (
+    TransferRecommendationSchema, TransferRequest, RejectionRequest, BatchTransferRequest, BatchTransferResponse,
+    StoredTransferSchema, TransferBatchSchema, TransferApprovalRequest, TransferDecisionRequest
+)
+from services.inventory_service import execute_transfer_batch
+from services import transfer_service
+from core.cache import VersionedCache
+from core.config import settings
+import change_tracker
 
 # Imports from engines (Synchronous)
-from transfer_engine import generate_transfer_recommendations
+from transfer_engine import generate_transfer_recommendations, load_stores_with_inventory, get_incremental_engine, TRANSFER_MODES
 
 router = APIRouter(
     tags=["transfers"]
 )
 
+# Öneri listesi önbelleği: Anahtar, sonucu etkileyen tabloların sürüm sayaçlarıdır.
+# transfer_stock (envanter) ve reject_transfer (RoutePenalty) commit edilince
+# ilgili sayaç artar ve eski sonuç bir daha kullanılmaz.
+RECOMMENDATION_DEPENDENCIES = (
+    change_tracker.INVENTORY,
+    change_tracker.FORECAST,
+    change_tracker.ROUTE_PENALTY,
+    change_tracker.STORE,
+    change_tracker.PRODUCT,
+)
+recommendation_cache = VersionedCache(ttl=settings.TRANSFER_CACHE_TTL)
+
 @router.get("/api/transfers/recommendations", response_model=List[TransferRecommendationSchema])
-def get_transfer_recommendations(db: Session = Depends(get_sync_db)):
+def get_transfer_recommendations(response: Response, mode: str = "greedy", incremental: bool = False,
+                                 db: Session = Depends(get_sync_db)):
     """
     🚚 TRANSFER ÖNERİLERİ (ROBIN HOOD)
     NOT: Hesaplama motoru senkron olduğu için 'get_sync_db' kullanıyoruz.
+    
+    mode=greedy (varsayılan) veya mode=optimal (ürün bazında min-cost flow).
+    incremental=true: Durum RAM'de tutulur, sadece son çağrıdan beri değişen
+    envanter/tahmin kayıtlarının ürünleri yeniden eşleştirilir.
+
+    [OPTIMIZASYON] Sonuç, veri sürümlerine göre önbelleklenir. Eşzamanlı aynı
+    istekler tek hesaplamayı bekler. Yanıt başlıkları:
+    - X-Cache: HIT / MISS / COALESCED
+    - Age: Sonucun yaşı (sn)
     """
-    stores = db.query(Store).all()
-    recommendations = generate_transfer_recommendations(db, stores) 
+    if mode not in TRANSFER_MODES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz mod. Seçenekler: {', '.join(TRANSFER_MODES)}")
+
+    # Sürümler hesaplamadan ÖNCE okunur: hesaplama sırasında gelen commit yeni anahtar üretir
+    versions = change_tracker.versions()
+    key = (mode, incremental, date.today(), *(versions[kind] for kind in RECOMMENDATION_DEPENDENCIES))
+
+    def compute():
+        if incremental:
+            return get_incremental_engine(mode).recommendations(db)
+        # Envanter ve ürünler tek geçişte yüklenir (N+1 yok)
+        stores = load_stores_with_inventory(db)
+        return generate_transfer_recommendations(db, stores, mode=mode)
+
+    recommendations, cache_status, age = recommendation_cache.get_or_compute(key, compute)
+    response.headers["X-Cache"] = cache_status
+    response.headers["Age"] = str(int(age))
     return recommendations
 
 @router.post("/api/transfer")
@@ -68,42 +114,124 @@ async def transfer_stock(transfer_req: TransferRequest, request: Request, db: As
     else:
         raise HTTPException(status_code=400, detail="Transfer için product_id zorunludur.")
     
-    await db.commit()
+    await db.commit() # Envanter sürümü artar -> öneri önbelleği geçersizleşir
     return {"message": msg}
 
+@router.post("/api/transfers/execute-batch", response_model=BatchTransferResponse)
+async def execute_transfers_batch(batch: BatchTransferRequest, db: AsyncSession = Depends(get_db)):
+    """
+    📦 TOPLU TRANSFER (ONAYLANAN ÖNERİLER) - ASYNC
+    Tüm kalemler tek transaction'da, sabit sayıda sorguyla uygulanır.
+    Her kalem için başarı/hata bilgisi döner.
+    """
+    results = await execute_transfer_batch(db, batch.transfers, batch.all_or_nothing, batch.reason)
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
 @router.post("/api/transfer/reject")
 async def reject_transfer(request: RejectionRequest, db: AsyncSession = Depends(get_db)):
     """
     ❌ TRANSFER ÖNERİSİNİ REDDET - ASYNC
+    transfer_id kayıtlı bir öneriye (RUN-<kayıt id>) aitse satır Rejected olarak işaretlenir;
+    canlı önizleme kimlikleri (TRF-<n>) kayıtlı satırlara hiç eşlenmez.
     """
-    # 1. Red Kaydını Oluştur
-    rejection = TransferRejection(
-        source_store_id=request.source_store_id,
-        target_store_id=request.target_store_id,
-        product_id=request.product_id,
-        reason=request.reason
+    # 1. Kayıtlı öneri mi? (RUN-<kayıt id>, aynı rota ve ürün, karar bekliyor)
+    record_id = request.transfer_id.removeprefix(transfer_service.STORED_ID_PREFIX)
+    if request.transfer_id.startswith(transfer_service.STORED_ID_PREFIX) and record_id.isdigit():
+        stored = (await db.execute(select(Transfer).filter(
+            Transfer.id == int(record_id),
+            Transfer.source_store_id == request.source_store_id,
+            Transfer.target_store_id == request.target_store_id,
+            Transfer.product_id == request.product_id,
+            Transfer.status.in_(TransferStatus.OPEN)
+        ))).scalars().first()
+        if stored:
+            penalty = await transfer_service.reject_transfer_record(db, stored, request.reason)
+            return {
+                "message": "Transfer reddedildi ve rota cezalandırıldı.",
+                "new_penalty_score": penalty.penalty_score
+            }
+
+    # 2. Red Kaydı + Ceza Puanını Artır (Penalty)
+    penalty = await transfer_service.apply_route_rejection(
+        db, request.source_store_id, request.target_store_id, request.product_id, request.reason
     )
-    db.add(rejection)
-    
-    # 2. Ceza Puanını Artır (Penalty)
-    res_penalty = await db.execute(select(RoutePenalty).filter(
-        RoutePenalty.source_store_id == request.source_store_id,
-        RoutePenalty.target_store_id == request.target_store_id
-    ))
-    penalty = res_penalty.scalars().first()
-    
-    if not penalty:
-        penalty = RoutePenalty(
-            source_store_id=request.source_store_id,
-            target_store_id=request.target_store_id,
-            penalty_score=1
-        )
-        db.add(penalty)
-    else:
-        penalty.penalty_score += 1
         
-    await db.commit()
+    await db.commit() # RoutePenalty sürümü artar -> öneri önbelleği geçersizleşir
     return {
         "message": "Transfer reddedildi ve rota cezalandırıldı.", 
         "new_penalty_score": penalty.penalty_score
     }
+
+# ==========================================
+# 🧾 KALICI ÖNERİ ÇALIŞTIRMALARI (Runs & Lifecycle)
+# ==========================================
+
+@router.post("/api/transfers/runs", response_model=TransferBatchSchema)
+def create_transfer_run(mode: str = "greedy", db: Session = Depends(get_sync_db)):
+    """
+    Motoru çalıştırır ve önerileri Pending olarak saklar (önceki aktif run Superseded olur).
+    Listeleme/onay/red işlemleri bundan sonra saklanan satırlar üzerinden yapılır.
+    """
+    if mode not in TRANSFER_MODES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz mod. Seçenekler: {', '.join(TRANSFER_MODES)}")
+    return transfer_service.create_recommendation_run(db, mode=mode)
+
+@router.get("/api/transfers/runs", response_model=List[TransferBatchSchema])
+async def list_transfer_runs(limit: int = 20, offset: int = 0, db: AsyncSession = Depends(get_db)):
+    """Geçmiş öneri çalıştırmaları (en yeni önce)."""
+    return await transfer_service.list_batches(db, limit=min(limit, 100), offset=offset)
+
+@router.get("/api/transfers/runs/latest/transfers", response_model=List[StoredTransferSchema])
+async def list_latest_run_transfers(status: Optional[str] = TransferStatus.PENDING, limit: int = 200, offset: int = 0,
+                                    db: AsyncSession = Depends(get_db)):
+    """Aktif çalıştırmanın önerileri (varsayılan: karar bekleyenler)."""
+    batch = await transfer_service.get_batch(db)
+    if not batch:
+        return []
+    return await transfer_service.list_batch_transfers(db, batch.id, status, min(limit, 1000), offset)
+
+@router.get("/api/transfers/runs/{batch_id}/transfers", response_model=List[StoredTransferSchema])
+async def list_run_transfers(batch_id: int, status: Optional[str] = None, limit: int = 200, offset: int = 0,
+                             db: AsyncSession = Depends(get_db)):
+    """Belirli bir (geçmiş) çalıştırmanın satırları - motor tekrar çalışmaz."""
+    batch = await transfer_service.get_batch(db, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Öneri çalıştırması bulunamadı")
+    return await transfer_service.list_batch_transfers(db, batch_id, status, min(limit, 1000), offset)
+
+@router.post("/api/transfers/approve", response_model=BatchTransferResponse)
+async def approve_transfers(approval: TransferApprovalRequest, db: AsyncSession = Depends(get_db)):
+    """
+    ✅ KAYITLI ÖNERİLERİ ONAYLA
+    execute=true: Stok tek transaction'da taşınır (Completed). Taşınamayanlar Approved kalır.
+    """
+    results = await transfer_service.approve_transfers(db, approval.transfer_ids, approval.execute)
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+@router.post("/api/transfers/{record_id}/reject")
+async def reject_stored_transfer(record_id: int, decision: TransferDecisionRequest, db: AsyncSession = Depends(get_db)):
+    """❌ KAYITLI ÖNERİYİ REDDET: Satır Rejected olur, rota cezası artar."""
+    transfer = (await db.execute(select(Transfer).filter(Transfer.id == record_id))).scalars().first()
+    if not transfer:
+        raise HTTPException(status_code=404, detail="Transfer bulunamadı")
+    if transfer.status not in TransferStatus.OPEN:
+        raise HTTPException(status_code=409, detail=f"Transfer durumu uygun değil ({transfer.status})")
+
+    penalty = await transfer_service.reject_transfer_record(db, transfer, decision.reason)
+    return {
+        "message": "Transfer reddedildi ve rota cezalandırıldı.",
+        "status": transfer.status,
+        "new_penalty_score": penalty.penalty_score
+    }
@@ -0,0 +1,319 @@
+"""
+📦 GÜNLÜK SATIŞ ÖZETİ (sales_daily)
+
+Analitik sorgular (ABC, XYZ, doğruluk, KPI) her seferinde milyonlarca satış
+satırını tarıyordu. sales_daily, (mağaza, ürün, gün) başına adet, ciro ve
+işlem sayısını tutar; haftalık / aylık görünümler bu satırlardan türetilir.
+
+[OPTIMIZASYON]
+Eski yöntem: Her rapor sales tablosunu GROUP BY ile baştan topluyordu (O(satış satırı)).
+Yeni yöntem:
+- ORM ile yazılan satışlar (db.add(Sale), db.delete, alan güncellemesi) flush sırasında
+  anahtar bazlı delta olarak özete eklenir (aynı transaction, tek executemany UPSERT).
+- Deltası bilinemeyen değişiklikler (SQL ifadesi atamaları, yüklenmemiş alanlar) o
+  anahtarlar için sales tablosundan yeniden sayılır.
+- Toplu / ham SQL yazımlar add_sales (bilinen satırlar) veya rebuild_sales_daily
+  (tarih aralığı) ile bildirilmelidir. ORM toplu UPDATE / DELETE uyarı loglar.
+
+Backfill: python sales_rollup.py [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+"""
+import argparse
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from core.logger import logger
+from models import Sale, SalesDaily
+
+GRANULARITIES = ("day", "week", "month")
+
+REBUILD_CHUNK_DAYS = 31 # Backfill transaction başına gün sayısı
+RECOUNT_CHUNK_SIZE = 500 # Yeniden sayımda IN listesi başına anahtar
+
+_daily = SalesDaily.__table__
+_sales = Sale.__table__
+
+_VALUE_COLUMNS = ("quantity", "revenue", "transaction_count")
+_RECOUNT_KEY = "sales_rollup_recount" # session.info: flush sonrası yeniden sayılacak anahtarlar
+
+Key = Tuple[int, int, datetime.date]
+
+# --- Periyot İfadeleri ---
+
+def period_expression(date_column, granularity: str, dialect_name: str):
+    """
+    Gün kolonunu periyot başlangıcına çevirir: day -> gün, week -> pazartesi, month -> ayın 1'i.
+    SQLite'ta metin ('YYYY-MM-DD'), PostgreSQL'de tarih döner.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Geçersiz periyot. Seçenekler: {', '.join(GRANULARITIES)}")
+    if granularity == "day":
+        return date_column
+    if dialect_name == "sqlite":
+        if granularity == "week":
+            return func.date(date_column, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", date_column)
+    return func.date(func.date_trunc(granularity, date_column))
+
+def period_start(day: datetime.date, granularity: str) -> datetime.date:
+    """period_expression'ın Python karşılığı (aralık sınırlarını hizalamak için)."""
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def rollup_query(dialect_name: str, granularity: str = "day",
+                 since: Optional[datetime.date] = None, until: Optional[datetime.date] = None,
+                 store_id: Optional[int] = None, product_id: Optional[int] = None):
+    """
+    sales_daily üzerinden (mağaza, ürün, periyot) toplamları. since / until dahil.
+    Mağaza veya ürün verilmezse o boyut toplanır (ör. sadece ürün -> tüm mağazalar).
+    """
+    period = period_expression(_daily.c.date, granularity, dialect_name).label("period")
+    keys = []
+    if store_id is not None:
+        keys.append(_daily.c.store_id)
+    if product_id is not None:
+        keys.append(_daily.c.product_id)
+    stmt = select(
+        *keys,
+        period,
+        func.sum(_daily.c.quantity).label("quantity"),
+        func.sum(_daily.c.revenue).label("revenue"),
+        func.sum(_daily.c.transaction_count).label("transaction_count"),
+    )
+    if store_id is not None:
+        stmt = stmt.where(_daily.c.store_id == store_id)
+    if product_id is not None:
+        stmt = stmt.where(_daily.c.product_id == product_id)
+    if since is not None:
+        stmt = stmt.where(_daily.c.date >= since)
+    if until is not None:
+        stmt = stmt.where(_daily.c.date <= until)
+    return stmt.group_by(*keys, period).order_by(period)
+
+# --- Artımlı Bakım ---
+
+def _upsert(connection):
+    """Dialekte göre INSERT ... ON CONFLICT DO UPDATE (değerler mevcut satıra eklenir)."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(_daily)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(_daily)
+    else:
+        raise NotImplementedError(f"sales_daily UPSERT desteklenmiyor: {dialect}")
+    return stmt.on_conflict_do_update(
+        index_elements=[_daily.c.store_id, _daily.c.product_id, _daily.c.date],
+        set_={col: _daily.c[col] + stmt.excluded[col] for col in _VALUE_COLUMNS},
+    )
+
+def apply_deltas(connection, deltas: Mapping[Key, Iterable[float]]):
+    """Anahtar -> (adet, ciro, işlem sayısı) deltalarını tek executemany UPSERT ile yazar."""
+    rows = [
+        {"store_id": key[0], "product_id": key[1], "date": key[2],
+         **{col: value for col, value in zip(_VALUE_COLUMNS, values)}}
+        for key, values in deltas.items() if any(values)
+    ]
+    if rows:
+        connection.execute(_upsert(connection), rows)
+
+def add_sales(connection, rows: Iterable[Mapping]):
+    """
+    Ham / toplu SQL ile eklenen satış satırlarını özete işler.
+    rows: store_id, product_id, date, quantity, total_price alanlı sözlükler
+    (Core insert(Sale.__table__) ile aynı liste verilebilir).
+    connection: Session.connection() veya Connection (çağıranın transaction'ı).
+    """
+    deltas = defaultdict(lambda: [0, 0.0, 0])
+    for row in rows:
+        if row.get("store_id") is None or row.get("product_id") is None or row.get("date") is None:
+            continue
+        values = deltas[(row["store_id"], row["product_id"], row["date"])]
+        values[0] += row.get("quantity") or 0
+        values[1] += row.get("total_price") or 0.0
+        values[2] += 1
+    apply_deltas(connection, deltas)
+
+def recount_keys(connection, keys: Iterable[Key]):
+    """Verilen (mağaza, ürün, gün) anahtarlarını sales tablosundan yeniden sayar."""
+    keys = list(set(keys))
+    for start in range(0, len(keys), RECOUNT_CHUNK_SIZE):
+        chunk = keys[start:start + RECOUNT_CHUNK_SIZE]
+        connection.execute(delete(_daily).where(
+            tuple_(_daily.c.store_id, _daily.c.product_id, _daily.c.date).in_(chunk)
+        ))
+        connection.execute(insert(_daily).from_select(
+            ["store_id", "product_id", "date", *_VALUE_COLUMNS],
+            _aggregate_sales().where(
+                tuple_(_sales.c.store_id, _sales.c.product_id, _sales.c.date).in_(chunk)
+            ),
+        ))
+
+def _aggregate_sales():
+    return (
+        select(
+            _sales.c.store_id,
+            _sales.c.product_id,
+            _sales.c.date,
+            func.coalesce(func.sum(_sales.c.quantity), 0),
+            func.coalesce(func.sum(_sales.c.total_price), 0.0),
+            func.count(),
+        )
+        .where(_sales.c.store_id.is_not(None), _sales.c.product_id.is_not(None), _sales.c.date.is_not(None))
+        .group_by(_sales.c.store_id, _sales.c.product_id, _sales.c.date)
+    )
+
+def _attr_value(state, key: str, before: bool):
+    """Flush öncesi (before=True) veya sonrası değer. Yüklenmemişse None."""
+    history = state.attrs[key].history
+    values = (history.deleted or history.unchanged) if before else (history.added or history.unchanged)
+    return values[0] if values else None
+
+def _sale_key(state, before: bool) -> Optional[Key]:
+    key = tuple(_attr_value(state, name, before) for name in ("store_id", "product_id", "date"))
+    return None if None in key else key
+
+def _sale_values(state, before: bool):
+    """Tek satış satırının özete katkısı; SQL ifadesi atanmışsa None."""
+    quantity = _attr_value(state, "quantity", before)
+    price = _attr_value(state, "total_price", before)
+    if not all(v is None or isinstance(v, (int, float)) for v in (quantity, price)):
+        return None
+    return (quantity or 0, price or 0.0, 1)
+
+def _collect_expression_keys(session, flush_context, instances):
+    """SQL ifadesi atanmış satışlar flush sırasında expire olur (after_flush'ta geçmiş boş): anahtarı önceden al."""
+    keys = set()
+    for obj in session.dirty:
+        if isinstance(obj, Sale):
+            state = obj._sa_instance_state
+            if _sale_values(state, False) is None:
+                keys.update(key for key in (_sale_key(state, True), _sale_key(state, False)) if key is not None)
+    if keys:
+        session.info.setdefault(_RECOUNT_KEY, set()).update(keys)
+
+def _apply_flush_deltas(session, flush_context):
+    deltas: Dict[Key, list] = defaultdict(lambda: [0, 0.0, 0])
+    recount = session.info.pop(_RECOUNT_KEY, set())
+
+    def add(key, values, sign):
+        if key is None:
+            return # Anahtarı eksik satış günlük özete girmez
+        if values is None:
+            recount.add(key)
+        else:
+            row = deltas[key]
+            for i, value in enumerate(values):
+                row[i] += sign * value
+
+    for obj in session.new:
+        if isinstance(obj, Sale):
+            state = obj._sa_instance_state
+            add(_sale_key(state, False), _sale_values(state, False), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Sale):
+            state = obj._sa_instance_state
+            add(_sale_key(state, True), _sale_values(state, True), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Sale) and session.is_modified(obj):
+            state = obj._sa_instance_state
+            old_key, new_key = _sale_key(state, True), _sale_key(state, False)
+            old_values, new_values = _sale_values(state, True), _sale_values(state, False)
+            if old_key is None or old_values is None or new_values is None:
+                # Eski değer bilinmiyor: yeni anahtar (ve biliniyorsa eskisi) yeniden sayılır
+                recount.update(key for key in (old_key, new_key) if key is not None)
+                if new_key is None:
+                    logger.warning("sales_daily: anahtarı yüklenmemiş satış güncellendi; rebuild_sales_daily gerekebilir")
+            else:
+                add(old_key, old_values, -1)
+                add(new_key, new_values, 1)
+
+    if not (deltas or recount):
+        return
+    connection = session.connection()
+    apply_deltas(connection, {key: values for key, values in deltas.items() if key not in recount})
+    if recount:
+        recount_keys(connection, recount)
+
+def _apply_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Sale:
+        return
+    params = orm_execute_state.parameters
+    if orm_execute_state.is_insert and params:
+        # db.execute(insert(Sale), [ {...}, ... ]) -> satırlar biliniyor
+        add_sales(orm_execute_state.session.connection(), params if isinstance(params, list) else [params])
+    else:
+        logger.warning("sales_daily: Sale için toplu ifade; etkilenen günler için rebuild_sales_daily çağrılmalı")
+
+def register_listeners():
+    """
+    Sale yazan her oturumun özeti güncellemesi için ORM event'lerini kaydeder.
+    database.register_orm_listeners üzerinden çağrılır; tekrar çağrılması zararsızdır.
+    """
+    for name, listener in (("before_flush", _collect_expression_keys), ("after_flush", _apply_flush_deltas),
+                           ("do_orm_execute", _apply_bulk)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+# --- Backfill ---
+
+def rebuild_sales_daily(connection, since: Optional[datetime.date] = None, until: Optional[datetime.date] = None):
+    """
+    🔁 YENİDEN OLUŞTURMA (Backfill)
+    [since, until] aralığındaki (dahil; verilmezse tüm satışlar) özet satırlarını
+    silip sales tablosundan GROUP BY ile yeniden yazar. Aralık REBUILD_CHUNK_DAYS'lik
+    parçalarla işlenir; her parça tek INSERT ... SELECT'tir.
+    connection: Session.connection() veya Connection. Commit çağırana aittir.
+    Dönüş: yazılan özet satırı sayısı.
+    """
+    if since is None or until is None:
+        first, last = connection.execute(select(func.min(_sales.c.date), func.max(_sales.c.date))).one()
+        if first is None:
+            if since is None and until is None:
+                connection.execute(delete(_daily))
+            return 0
+        since = since or _as_date(first)
+        until = until or _as_date(last)
+
+    written = 0
+    start = since
+    while start <= until:
+        end = min(start + datetime.timedelta(days=REBUILD_CHUNK_DAYS - 1), until)
+        connection.execute(delete(_daily).where(_daily.c.date >= start, _daily.c.date <= end))
+        result = connection.execute(insert(_daily).from_select(
+            ["store_id", "product_id", "date", *_VALUE_COLUMNS],
+            _aggregate_sales().where(_sales.c.date >= start, _sales.c.date <= end),
+        ))
+        written += max(result.rowcount or 0, 0)
+        start = end + datetime.timedelta(days=1)
+    return written
+
+def _as_date(value) -> datetime.date:
+    """SQLite min/max tarih kolonunu metin döner."""
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description="sales_daily özet tablosunu yeniden oluşturur (backfill).")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, default=None, help="Başlangıç günü (dahil)")
+    parser.add_argument("--until", type=datetime.date.fromisoformat, default=None, help="Bitiş günü (dahil)")
+    args = parser.parse_args()
+
+    from database import Base, sync_engine
+    Base.metadata.create_all(bind=sync_engine, tables=[_daily])
+    with sync_engine.begin() as connection:
+        written = rebuild_sales_daily(connection, args.since, args.until)
+    print(f"✅ sales_daily: {written} satır yazıldı")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+🧪 SİMÜLASYON SANDBOX'LARI (Copy-on-Write)
+
+/api/simulate/* senaryoları canlı inventories ve sales tablolarını kalıcı olarak
+değiştirir; geri dönüşün tek yolu reset_database'di. Sandbox, envanterin ve son
+talebin bellek içi dizi kopyası (simulation_engine.InventorySnapshot) üzerinde
+aynı senaryo fonksiyonlarını çalıştırır, projeksiyon KPI'larını ve risk haritasını
+döner. Veritabanına hiçbir şey yazılmaz.
+
+[OPTIMIZASYON]
+- Snapshot DB'den bir kez (2 sorgu) yüklenir; SANDBOX_SNAPSHOT_MAX_AGE içinde açılan
+  sandbox'lar aynı taban dizileri paylaşır.
+- Copy-on-write: sandbox sadece değişen stok dizisinin kendi kopyasını tutar;
+  mağaza / ürün / fiyat dizileri ortaktır (N sandbox != N kat bellek).
+- KPI ve risk haritası mağaza bazında np.bincount ile tek geçişte hesaplanır.
+
+NOT: Sandbox'lar süreç içidir (worker başına). Kullanılmayanlar SANDBOX_TTL sonra,
+SANDBOX_MAX_COUNT aşılınca en eski olan silinir.
+"""
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import simulation_engine
+from core.config import settings
+from core.exceptions import BusinessRuleException, ResourceNotFoundException
+from models import Store
+from risk_engine import FRONTEND_COLORS, OVERSTOCK_MULTIPLIER, classify_risk
+from simulation_engine import InventorySnapshot
+
+SCENARIOS = ("sales-boom", "recession", "supply-shock", "custom")
+CRITICAL_STORE_STOCK = 100 # /api/simulate/stats ile aynı: toplam stoğu bunun altındaki mağaza kritik
+
+class _Base:
+    """Sandbox'ların paylaştığı taban: snapshot + mağaza bilgileri (salt okunur)."""
+    def __init__(self, snapshot: InventorySnapshot, stores: Dict[int, tuple]):
+        self.snapshot = snapshot
+        self.store_ids, self.store_index = np.unique(snapshot.store_ids, return_inverse=True)
+        self.stores = stores # store_id -> (ad, tip)
+
+class Sandbox:
+    """Tek sandbox: taban snapshot + kendi stok dizisi (ilk senaryoda kopyalanır)."""
+    def __init__(self, base: _Base):
+        self.id = uuid.uuid4().hex[:12]
+        self.base = base
+        self.quantity = base.snapshot.quantity # İlk yazıma kadar tabanla paylaşılır
+        self.sold = None # Kalem başına üretilen satış (ilk satışta ayrılır)
+        self.revenue = 0.0
+        self.history: List[dict] = []
+        self.created_at = self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def apply(self, scenario: str, price_change: int = 0, delay_days: int = 0, seed: Optional[int] = None) -> dict:
+        """Senaryoyu sandbox'ın güncel durumuna uygular (DB'ye yazmaz)."""
+        if scenario not in SCENARIOS:
+            raise BusinessRuleException(f"Geçersiz senaryo. Seçenekler: {', '.join(SCENARIOS)}")
+        with self.lock:
+            current = self.base.snapshot.with_quantity(self.quantity)
+            rng = np.random.default_rng(seed)
+            if scenario == "sales-boom":
+                outcome = simulation_engine.sales_boom(current, rng)
+            elif scenario == "recession":
+                outcome = simulation_engine.recession(current, rng)
+            elif scenario == "supply-shock":
+                outcome = simulation_engine.supply_shock(current)
+            else:
+                outcome = simulation_engine.custom_scenario(current, price_change, delay_days)
+
+            self.quantity = outcome.quantity # Senaryolar yeni dizi döner: taban hiç değişmez
+            if outcome.sold.any():
+                self.sold = outcome.sold if self.sold is None else self.sold + outcome.sold
+                self.revenue += float(outcome.sold @ current.price)
+            entry = {"scenario": scenario, "message": outcome.message}
+            if outcome.impact is not None:
+                entry["impact"] = outcome.impact
+            self.history.append(entry)
+            self.last_used = time.monotonic()
+            return entry
+
+    def reset(self):
+        """Sandbox'ı taban snapshot'a döndürür."""
+        with self.lock:
+            self.quantity = self.base.snapshot.quantity
+            self.sold = None
+            self.revenue = 0.0
+            self.history = []
+            self.last_used = time.monotonic()
+
+    def state(self, include_risk_map: bool = True) -> dict:
+        with self.lock:
+            quantity, sold, revenue, history = self.quantity, self.sold, self.revenue, list(self.history)
+        result = {
+            "sandbox_id": self.id,
+            "snapshot_age_seconds": round(time.monotonic() - self.base.snapshot.loaded_at, 1),
+            "items": len(self.base.snapshot),
+            "scenarios": history,
+            "baseline": _kpis(self.base, self.base.snapshot.quantity, None, 0.0),
+            "projected": _kpis(self.base, quantity, sold, revenue),
+        }
+        if include_risk_map:
+            result["risk_map"] = _risk_map(self.base, quantity)
+        return result
+
+def _store_counts(base: _Base, quantity: np.ndarray):
+    """Mağaza bazında (kalem, stok, yüksek risk, aşırı stok) sayıları."""
+    snapshot, n = base.snapshot, len(base.store_ids)
+    idx = base.store_index
+    return (
+        np.bincount(idx, minlength=n),
+        np.bincount(idx, weights=quantity, minlength=n),
+        np.bincount(idx, weights=quantity < snapshot.safety_stock, minlength=n),
+        np.bincount(idx, weights=quantity > snapshot.safety_stock * OVERSTOCK_MULTIPLIER, minlength=n),
+    )
+
+def _statuses(base: _Base, quantity: np.ndarray) -> List[str]:
+    items, _, high_risk, overstock = _store_counts(base, quantity)
+    return [classify_risk(int(i), int(h), int(o)) for i, h, o in zip(items, high_risk, overstock)]
+
+def _kpis(base: _Base, quantity: np.ndarray, sold: Optional[np.ndarray], revenue: float) -> dict:
+    snapshot = base.snapshot
+    _, store_stock, _, _ = _store_counts(base, quantity)
+    statuses = _statuses(base, quantity)
+    daily_demand = float(snapshot.daily_demand.sum())
+    total_stock = int(quantity.sum())
+    return {
+        "total_stock": total_stock,
+        "stock_value": float(quantity @ snapshot.price),
+        "units_sold": int(sold.sum()) if sold is not None else 0,
+        "revenue": revenue,
+        "stockout_items": int((quantity <= 0).sum()),
+        "below_safety_items": int((quantity < snapshot.safety_stock).sum()),
+        "critical_stores": int((store_stock < CRITICAL_STORE_STOCK).sum()),
+        "days_of_cover": round(total_stock / daily_demand, 1) if daily_demand > 0 else None,
+        "risk_counts": {status: statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+def _risk_map(base: _Base, quantity: np.ndarray) -> List[dict]:
+    _, store_stock, _, _ = _store_counts(base, quantity)
+    baseline = _statuses(base, base.snapshot.quantity)
+    projected = _statuses(base, quantity)
+    result = []
+    for i, store_id in enumerate(base.store_ids.tolist()):
+        name, store_type = base.stores.get(store_id, (None, None))
+        result.append({
+            "store_id": store_id,
+            "name": name,
+            "type": store_type,
+            "stock": int(store_stock[i]),
+            "status": projected[i],
+            "baseline_status": baseline[i],
+            "color": FRONTEND_COLORS.get(projected[i], "gray"),
+        })
+    return result
+
+class SandboxRegistry:
+    """Süreç içi sandbox kaydı (thread-safe)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sandboxes: Dict[str, Sandbox] = {}
+        self._base: Optional[_Base] = None
+
+    def _evict(self, now: float):
+        for sandbox_id in [k for k, s in self._sandboxes.items() if now - s.last_used > settings.SANDBOX_TTL]:
+            del self._sandboxes[sandbox_id]
+        while len(self._sandboxes) >= settings.SANDBOX_MAX_COUNT:
+            oldest = min(self._sandboxes.values(), key=lambda s: s.last_used)
+            del self._sandboxes[oldest.id]
+
+    def _current_base(self, db: Session, refresh: bool) -> _Base:
+        base = self._base
+        if refresh or base is None or time.monotonic() - base.snapshot.loaded_at > settings.SANDBOX_SNAPSHOT_MAX_AGE:
+            snapshot = simulation_engine.load_inventory_snapshot(db)
+            stores = {
+                store_id: (name, store_type.value if store_type is not None else None)
+                for store_id, name, store_type in db.execute(select(Store.id, Store.name, Store.store_type))
+            }
+            base = _Base(snapshot, stores)
+            with self._lock:
+                self._base = base
+        return base
+
+    def create(self, db: Session, refresh: bool = False) -> Sandbox:
+        """Yeni sandbox açar; taban snapshot güncelse paylaşılır (DB'ye gidilmez)."""
+        base = self._current_base(db, refresh)
+        sandbox = Sandbox(base)
+        with self._lock:
+            self._evict(time.monotonic())
+            self._sandboxes[sandbox.id] = sandbox
+        return sandbox
+
+    def get(self, sandbox_id: str) -> Sandbox:
+        with self._lock:
+            sandbox = self._sandboxes.get(sandbox_id)
+        if sandbox is None:
+            raise ResourceNotFoundException("Sandbox", sandbox_id)
+        sandbox.last_used = time.monotonic()
+        return sandbox
+
+    def delete(self, sandbox_id: str):
+        with self._lock:
+            if self._sandboxes.pop(sandbox_id, None) is None:
+                raise ResourceNotFoundException("Sandbox", sandbox_id)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            sandboxes = list(self._sandboxes.values())
+        now = time.monotonic()
+        return [
+            {"sandbox_id": s.id, "scenarios": len(s.history), "idle_seconds": round(now - s.last_used, 1),
+             "snapshot_age_seconds": round(now - s.base.snapshot.loaded_at, 1)}
+            for s in sandboxes
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._sandboxes.clear()
+            self._base = None
+
+registry = SandboxRegistry()
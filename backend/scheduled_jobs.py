@@ -0,0 +1,33 @@
+"""
+⏰ ZAMANLANMIŞ GÖREVLER
+
+Gece görevlerinin tek kayıt noktası. Uygulama açılışında (main.lifespan)
+zamanlayıcıya kaydedilir; harici cron ile de tek seferlik çalıştırılabilir:
+
+    python scheduled_jobs.py risk_snapshot
+    python scheduled_jobs.py abc_xyz_analysis
+    python scheduled_jobs.py forecast_accuracy
+
+Aynı gün için zaten çalışmışsa (başka worker veya cron) tekrar çalışmaz (Skipped).
+"""
+import argparse
+
+from core.config import settings
+from core.scheduler import register_daily_job, registered_jobs, run_job
+import abc_xyz_engine
+import accuracy_engine
+import risk_engine
+
+RISK_SNAPSHOT_JOB = "risk_snapshot"
+ABC_XYZ_JOB = "abc_xyz_analysis" # ABC'yi de yazar (analysis_engine ile aynı sonuç)
+FORECAST_ACCURACY_JOB = "forecast_accuracy"
+
+register_daily_job(RISK_SNAPSHOT_JOB, settings.RISK_SNAPSHOT_HOUR, risk_engine.snapshot_risk_history)
+register_daily_job(ABC_XYZ_JOB, settings.ABC_ANALYSIS_HOUR, abc_xyz_engine.update_product_classes)
+register_daily_job(FORECAST_ACCURACY_JOB, settings.ACCURACY_JOB_HOUR, accuracy_engine.update_forecast_accuracy)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zamanlanmış görevi hemen çalıştır")
+    parser.add_argument("job", choices=list(registered_jobs()))
+    args = parser.parse_args()
+    print(f"{args.job}: {run_job(args.job)}")
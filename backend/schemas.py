@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Union
 import datetime
 
@@ -33,6 +33,27 @@ class TransferRequest(BaseModel):
     product_id: int
     amount: int
 
+class BatchTransferRequest(BaseModel):
+    transfers: List[TransferRequest] = Field(..., min_length=1, max_length=1000)
+    all_or_nothing: bool = False # True: Tek kalem hatalıysa hiçbir transfer uygulanmaz
+    reason: Optional[str] = "Robin Hood Stok Dengeleme"
+
+class BatchTransferItemResult(BaseModel):
+    index: int # İstekteki sırası
+    source_store_id: int
+    target_store_id: int
+    product_id: int
+    amount: int
+    success: bool
+    transfer_record_id: Optional[int] = None # Oluşan Transfer kaydı
+    detail: Optional[str] = None # Hata nedeni
+
+class BatchTransferResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchTransferItemResult]
+
 class AnalyticsResponse(BaseModel):
     total_revenue: float
     top_selling_product: str
@@ -50,6 +71,17 @@ class SaleSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class SalesRollupSchema(BaseModel):
+    period: datetime.date # Periyot başlangıcı (gün / haftanın pazartesisi / ayın 1'i)
+    store_id: Optional[int] = None # Filtre verilmediyse tüm mağazaların toplamı
+    product_id: Optional[int] = None
+    quantity: int
+    revenue: float
+    transaction_count: int
+
+    class Config:
+        from_attributes = True
+
 # --- Transfer Engine Schemas ---
 class XaiExplanationSchema(BaseModel):
     summary: str
@@ -72,6 +104,36 @@ class TransferRecommendationSchema(BaseModel):
     xai_explanation: XaiExplanationSchema
     algorithm: str
 
+class StoredTransferSchema(TransferRecommendationSchema):
+    """Kalıcı öneri satırı (transfer_id = RUN-<kayıt id>, çağrılar arasında sabit)."""
+    record_id: int
+    batch_id: Optional[int] = None
+    rank: Optional[int] = None
+    status: str
+    request_date: Optional[datetime.datetime] = None
+    decided_at: Optional[datetime.datetime] = None
+    completed_at: Optional[datetime.datetime] = None
+
+class TransferBatchSchema(BaseModel):
+    id: int
+    created_at: datetime.datetime
+    mode: str
+    algorithm: Optional[str] = None
+    status: str
+    total_transfers: int
+    total_units: int
+    duration_ms: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class TransferApprovalRequest(BaseModel):
+    transfer_ids: List[int] = Field(..., min_length=1, max_length=1000) # Kayıt id'leri
+    execute: bool = True # True: Stok hemen taşınır (Completed), False: Sadece Approved
+
+class TransferDecisionRequest(BaseModel):
+    reason: str # COST, OPS, STRATEGY
+
 # --- User Schemas ---
 class UserSchema(BaseModel):
     username: str
@@ -109,6 +171,60 @@ class InventorySchema(BaseModel):
     safety_stock: int
     abc_category: str
     forecast_next_7_days: float
+    predicted_sales: float = 0 # Önümüzdeki 30 günün tahmin toplamı
+    status: str = "OPTIMAL" # OUT_OF_STOCK_RISK / OVERSTOCK / OPTIMAL
+
+# --- Risk History Schemas ---
+class StoreRiskPointSchema(BaseModel):
+    snapshot_date: datetime.date
+    store_id: int
+    status: str
+    total_items: int
+    total_stock: int
+    total_safety: int
+    high_risk_count: int
+    overstock_count: int
+    low_stock_count: int
+
+    class Config:
+        from_attributes = True
+
+class ProductRiskPointSchema(BaseModel):
+    snapshot_date: datetime.date
+    product_id: int
+    status: str
+    store_count: int
+    total_stock: int
+    total_safety: int
+    high_risk_stores: int
+    overstock_stores: int
+    out_of_stock_stores: int
+
+    class Config:
+        from_attributes = True
+
+class RiskStatusCountSchema(BaseModel):
+    snapshot_date: datetime.date
+    counts: Dict[str, int] # Durum -> mağaza sayısı (örn. {"HIGH_RISK": 3, "LOW_RISK": 40})
+
+# --- Forecast Accuracy Schemas ---
+class ForecastAccuracySchema(BaseModel):
+    store_id: int
+    product_id: int
+    sample_size: int
+    mae: float
+    rmse: float
+    r2: float
+    mape: Optional[float] = None # %; gerçekleşenin hep 0 olduğu serilerde boş
+    bias: float # Ortalama (tahmin - gerçekleşen)
+    total_actual: float
+    total_predicted: float
+    window_start: datetime.date
+    window_end: datetime.date
+    computed_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
 
 # --- Simulation Schemas ---
 class SimulationStats(BaseModel):
@@ -120,6 +236,55 @@ class CustomScenarioRequest(BaseModel):
     price_change: int
     delay_days: int
 
+class SandboxScenarioRequest(BaseModel):
+    scenario: str # sales-boom / recession / supply-shock / custom
+    price_change: int = 0 # Sadece custom
+    delay_days: int = 0 # Sadece custom
+    seed: Optional[int] = None # Tekrarlanabilir rastgele senaryolar için
+
+class MonteCarloRequest(BaseModel):
+    store_id: Optional[int] = None # Boşsa tüm ağ
+    product_ids: Optional[List[int]] = None
+    horizon_days: Optional[int] = None # Varsayılan: settings.MONTE_CARLO_HORIZON_DAYS
+    paths: Optional[int] = None # Varsayılan: settings.MONTE_CARLO_PATHS
+    price_change: float = 0 # Fiyat değişimi (%), talebi elastisite ile ölçekler
+    delay_days: int = 0 # İkmal gecikmesi (gün)
+    seed: Optional[int] = None
+    limit: Optional[int] = 200 # En riskli N kalem (None: hepsi)
+
+# --- Background Job Schemas ---
+class JobSubmitRequest(BaseModel):
+    name: str # Kayıtlı iş tipi (bkz. background_jobs.py)
+    params: Dict[str, Any] = {}
+
+class BackgroundJobSchema(BaseModel):
+    id: int
+    name: str
+    params: Optional[Dict[str, Any]] = None
+    status: str
+    progress: Optional[float] = None
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: Optional[bool] = None
+    created_at: Optional[datetime.datetime] = None
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    heartbeat_at: Optional[datetime.datetime] = None
+    worker_id: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class BackgroundJobLogSchema(BaseModel):
+    id: int
+    created_at: Optional[datetime.datetime] = None
+    level: str
+    message: str
+
+    class Config:
+        from_attributes = True
+
 class NearbyStoreRequest(BaseModel):
     lat: float
     lon: float
@@ -130,6 +295,17 @@ class WhatIfRequest(BaseModel):
     product_id: int
     amount: int
 
+class WhatIfGrid(BaseModel):
+    """Parametre ızgarası: tüm kombinasyonlar değerlendirilir (kaynak = hedef olanlar hariç)."""
+    source_store_ids: List[int]
+    target_store_ids: List[int]
+    product_ids: List[int]
+    amounts: List[int]
+
+class WhatIfBatchRequest(BaseModel):
+    scenarios: List[WhatIfRequest] = [] # Tek tek senaryolar
+    grid: Optional[WhatIfGrid] = None # ve/veya parametre ızgarası
+
 class RejectionRequest(BaseModel):
     transfer_id: str 
     source_store_id: int
@@ -0,0 +1,34 @@
+"""
+DB Migration: products.abc_revenue kolonu, ABC penceresi için sales covering indeksi
+ve ilk ABC sınıflandırması.
+/api/analysis/abc artık saklanan sonucu okur; gece görevi çalışana kadar boş
+kalmaması için sınıflandırma burada bir kez hesaplanır.
+Çalıştır: python add_abc_revenue.py
+"""
+import asyncio
+from sqlalchemy import text
+from database import async_engine, AsyncSessionLocal
+from analysis_engine import calculate_abc_analysis
+
+async def migrate():
+    try:
+        async with async_engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE products ADD COLUMN abc_revenue FLOAT DEFAULT 0"))
+        print("✅ products.abc_revenue column added")
+    except Exception as e:
+        print(f"⚠️ products.abc_revenue: {e}")
+
+    async with async_engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_sales_date_product_revenue ON sales (date, product_id, total_price)"
+        ))
+    print("✅ ix_sales_date_product_revenue index ready")
+
+    async with AsyncSessionLocal() as db:
+        result = await db.run_sync(calculate_abc_analysis)
+    print(f"✅ ABC classification stored: {result['counts']}")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,42 @@
+"""
+DB Migration: products tablosuna XYZ / birleşik ABC-XYZ kolonları, adet kolonunu da
+kapsayan sales pencere indeksi ve ilk sınıflandırma.
+Çalıştır: python add_abc_xyz_columns.py
+"""
+import asyncio
+from sqlalchemy import text
+from database import async_engine, AsyncSessionLocal
+from abc_xyz_engine import update_product_classes
+
+PRODUCT_COLUMNS = [
+    ("xyz_category", "VARCHAR DEFAULT 'Z'"),
+    ("demand_cv", "FLOAT"),
+    ("abc_xyz_class", "VARCHAR DEFAULT 'CZ'"),
+]
+
+async def migrate():
+    for name, ddl in PRODUCT_COLUMNS:
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(text(f"ALTER TABLE products ADD COLUMN {name} {ddl}"))
+            print(f"✅ products.{name} column added")
+        except Exception as e:
+            print(f"⚠️ products.{name}: {e}")
+
+    # ABC indeksi quantity'yi de kapsayan sürümle değişir (XYZ günlük adetleri indeksten okur)
+    async with async_engine.begin() as conn:
+        await conn.execute(text("DROP INDEX IF EXISTS ix_sales_date_product_revenue"))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_sales_date_product_qty_revenue "
+            "ON sales (date, product_id, quantity, total_price)"
+        ))
+    print("✅ ix_sales_date_product_qty_revenue index ready")
+
+    async with AsyncSessionLocal() as db:
+        result = await db.run_sync(update_product_classes)
+    print(f"✅ ABC-XYZ classes stored: {result['matrix']}")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
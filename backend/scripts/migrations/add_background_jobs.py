@@ -0,0 +1,27 @@
+"""
+DB Migration: Arka plan iş tabloları (background_jobs, background_job_logs).
+Çalıştır: python add_background_jobs.py
+"""
+import asyncio
+from sqlalchemy import text
+from database import async_engine, Base
+from models import BackgroundJob, BackgroundJobLog
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[BackgroundJob.__table__, BackgroundJobLog.__table__])
+    print("✅ background_jobs / background_job_logs tables ready")
+
+    # Tablo bu kolondan önce oluşturulduysa (sahip süreç ve periyodik nabız için)
+    try:
+        async with async_engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE background_jobs ADD COLUMN worker_id VARCHAR"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_background_jobs_worker_id ON background_jobs (worker_id)"))
+        print("✅ background_jobs.worker_id column added")
+    except Exception as e:
+        print(f"⚠️ background_jobs.worker_id: {e}")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,22 @@
+"""
+DB Migration: Seri bazlı tahmin doğruluğu tablosu (forecast_accuracy) + ilk hesaplama.
+Çalıştır: python add_forecast_accuracy.py
+"""
+import asyncio
+from database import async_engine, AsyncSessionLocal, Base
+from models import ForecastAccuracy
+from accuracy_engine import update_forecast_accuracy
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[ForecastAccuracy.__table__])
+    print("✅ forecast_accuracy table ready")
+
+    async with AsyncSessionLocal() as db:
+        result = await db.run_sync(update_forecast_accuracy)
+    print(f"✅ Forecast accuracy computed: {result['series']} series")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,23 @@
+"""
+DB Migration: Mağaza stok listesi (keyset sayfalama + toplu tahmin JOIN) için bileşik indeksler.
+Çalıştır: python add_inventory_forecast_indexes.py
+"""
+import asyncio
+from sqlalchemy import text
+from database import async_engine
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_inventories_store_product ON inventories (store_id, product_id)",
+    "CREATE INDEX IF NOT EXISTS ix_forecasts_store_product_date ON forecasts (store_id, product_id, date)",
+]
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        for ddl in INDEXES:
+            await conn.execute(text(ddl))
+    print("✅ inventory/forecast indexes ready")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,20 @@
+"""
+DB Migration: Günlük risk geçmişi (store_risk_history, product_risk_history)
+ve zamanlanmış görev kayıtları (scheduled_job_runs).
+Çalıştır: python add_risk_history.py
+"""
+import asyncio
+from database import async_engine, Base
+from models import StoreRiskSnapshot, ProductRiskSnapshot, ScheduledJobRun
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            StoreRiskSnapshot.__table__, ProductRiskSnapshot.__table__, ScheduledJobRun.__table__
+        ])
+    print("✅ store_risk_history, product_risk_history, scheduled_job_runs tables ready")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
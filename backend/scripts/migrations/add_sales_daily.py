@@ -0,0 +1,23 @@
+"""
+DB Migration: Günlük satış özeti tablosu (sales_daily) + mevcut satışlardan backfill.
+Çalıştır: python add_sales_daily.py
+Sonradan belirli bir aralığı yeniden kurmak için: python sales_rollup.py --since 2025-01-01
+"""
+import asyncio
+from database import async_engine, Base
+from models import SalesDaily
+from sales_rollup import rebuild_sales_daily
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[SalesDaily.__table__])
+    print("✅ sales_daily table ready")
+
+    async with async_engine.begin() as conn:
+        written = await conn.run_sync(rebuild_sales_daily)
+    print(f"✅ sales_daily backfilled: {written} rows")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
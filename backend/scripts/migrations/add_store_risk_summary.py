@@ -0,0 +1,37 @@
+"""
+DB Migration: Mağaza risk özeti tablosu (store_risk_summary).
+Satırlar ilk risk raporunda (eksik satır = dirty) otomatik hesaplanır.
+Çalıştır: python add_store_risk_summary.py
+"""
+import asyncio
+from sqlalchemy import text
+from database import async_engine, Base
+from models import StoreRiskSummary
+
+# Tablo ilk sürümden sonra eklenen kolonlar
+SUMMARY_COLUMNS = [
+    ("low_stock_count", "INTEGER DEFAULT 0"),
+]
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[StoreRiskSummary.__table__])
+    print("✅ store_risk_summary table ready")
+
+    for name, ddl in SUMMARY_COLUMNS:
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(text(f"ALTER TABLE store_risk_summary ADD COLUMN {name} {ddl}"))
+            print(f"✅ store_risk_summary.{name} column added")
+        except Exception as e:
+            print(f"⚠️ store_risk_summary.{name}: {e}")
+
+    # Yeni kolonlar mevcut satırlarda boş: tümü bir sonraki okumada yeniden sayılsın
+    async with async_engine.begin() as conn:
+        await conn.execute(text("UPDATE store_risk_summary SET dirty = TRUE"))
+    print("✅ store_risk_summary rows marked dirty")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
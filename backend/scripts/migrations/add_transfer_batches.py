@@ -0,0 +1,50 @@
+"""
+DB Migration: Kalıcı öneri çalıştırmaları (transfer_batches) ve Transfer yaşam döngüsü kolonları.
+Çalıştır: python add_transfer_batches.py
+"""
+import asyncio
+from sqlalchemy import text
+from database import async_engine, Base
+from models import TransferBatch
+
+TRANSFER_COLUMNS = [
+    ("batch_id", "INTEGER REFERENCES transfer_batches(id)"),
+    ("rank", "INTEGER"),
+    ("score", "FLOAT"),
+    ("algorithm", "VARCHAR"),
+    ("explanation", "JSON"),
+    ("decided_at", "TIMESTAMP"),
+    ("completed_at", "TIMESTAMP"),
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_transfers_batch_id ON transfers (batch_id)",
+    "CREATE INDEX IF NOT EXISTS ix_transfers_status ON transfers (status)",
+    "CREATE INDEX IF NOT EXISTS ix_transfers_batch_status_rank ON transfers (batch_id, status, rank)",
+]
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        # 1. Yeni tablo
+        await conn.run_sync(Base.metadata.create_all, tables=[TransferBatch.__table__])
+        print("✅ transfer_batches table ready")
+
+    # 2. Kolonlar (her biri ayrı transaction: mevcutsa hata verir, devam edilir)
+    for name, ddl in TRANSFER_COLUMNS:
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(text(f"ALTER TABLE transfers ADD COLUMN {name} {ddl}"))
+            print(f"✅ transfers.{name} column added")
+        except Exception as e:
+            print(f"⚠️ transfers.{name}: {e}")
+
+    # 3. İndeksler
+    async with async_engine.begin() as conn:
+        for ddl in INDEXES:
+            await conn.execute(text(ddl))
+    print("✅ transfer indexes ready")
+
+    print("\n🎉 Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
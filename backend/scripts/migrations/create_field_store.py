@@ -1,4 +1,4 @@
-from database import get_sync_db
+from database import get_sync_db, register_orm_listeners
 from models import Store, Inventory, Product
 
 def create_field_store():
@@ -51,4 +51,5 @@ def create_field_store():
         db.close()
 
 if __name__ == "__main__":
+    register_orm_listeners() # Açılan envanter kayıtları risk özetine yansısın
     create_field_store()
@@ -4,6 +4,8 @@ try:
     cursor = conn.cursor()
     cursor.execute("DROP TABLE IF EXISTS sales")
     print("Table 'sales' dropped successfully.")
+    cursor.execute("DROP TABLE IF EXISTS sales_daily") # Özet sales'ten türetilir (bkz. sales_rollup.py)
+    print("Table 'sales_daily' dropped successfully.")
     conn.commit()
     conn.close()
 except Exception as e:
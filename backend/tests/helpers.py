@@ -0,0 +1,53 @@
+"""Test modüllerinin ortak yardımcıları: küçük bir SQLite mağaza ağı kurar ve sorgu sayar."""
+import datetime
+import random
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, register_orm_listeners
+from models import Store, StoreType, Product, Inventory, Forecast
+
+
+def build_db(n_stores: int, n_products: int, seed: int = 42, url: str = "sqlite://"):
+    """Bellek içi (veya verilen URL'deki) SQLite üzerinde küçük bir mağaza ağı kurar."""
+    register_orm_listeners()
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    types = [StoreType.CENTER, StoreType.HUB] + [StoreType.STORE] * max(0, n_stores - 2)
+    for i, store_type in enumerate(types[:n_stores]):
+        db.add(Store(name=f"Store {i}", store_type=store_type,
+                     lat=40.8 + rng.random() * 0.4, lon=28.6 + rng.random() * 0.8))
+    for i in range(n_products):
+        db.add(Product(name=f"Product {i}", category="Test", cost=10, price=20,
+                       abc_category=rng.choice(["A", "B", "C"])))
+    db.commit()
+
+    today = datetime.date.today()
+    for store in db.query(Store).all():
+        for product in db.query(Product).all():
+            qty = rng.randint(500, 2000) if store.store_type != StoreType.STORE else rng.randint(0, 60)
+            db.add(Inventory(store_id=store.id, product_id=product.id, quantity=qty, safety_stock=10))
+            for d in range(7):
+                db.add(Forecast(store_id=store.id, product_id=product.id,
+                                date=today + datetime.timedelta(days=d),
+                                predicted_quantity=float(rng.randint(0, 10))))
+    db.commit()
+    return engine, db
+
+
+def count_queries(engine, fn):
+    counter = {"n": 0}
+
+    def _before(*args):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return result, counter["n"]
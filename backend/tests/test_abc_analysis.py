@@ -0,0 +1,42 @@
+import datetime
+
+from analysis_engine import calculate_abc_analysis, get_abc_results
+from models import Product, Sale
+from tests.helpers import build_db, count_queries
+
+
+def test_abc_classification_is_set_based():
+    """Sınıflar son N günün cirosuyla, ürün sayısından bağımsız sabit sayıda sorguyla yazılmalı."""
+    engine, db = build_db(2, 6)
+    today = datetime.date.today()
+    # Ürün 1: ciro payı %80, Ürün 2: %15, Ürün 3: %5. Ürün 4'ün satışı pencere dışında.
+    for product_id, revenue in [(1, 800.0), (2, 150.0), (3, 50.0)]:
+        db.add(Sale(store_id=1, product_id=product_id, date=today - datetime.timedelta(days=3),
+                    quantity=1, total_price=revenue))
+    db.add(Sale(store_id=1, product_id=4, date=today - datetime.timedelta(days=400),
+                quantity=1, total_price=100000.0))
+    db.commit()
+
+    result, queries = count_queries(engine, lambda: calculate_abc_analysis(db, window_days=30))
+    assert queries <= 4
+    assert result["counts"] == {"A": 1, "B": 1, "C": 4}
+
+    db.expire_all()
+    classes = {p.id: (p.abc_category, p.abc_revenue) for p in db.query(Product)}
+    assert classes[1] == ("A", 800.0)
+    assert classes[2] == ("B", 150.0)
+    assert classes[3] == ("C", 50.0)
+    assert classes[4] == ("C", 0.0) # Eski satış pencereye girmez
+
+    # Okuma tarafı hesaplama yapmaz: tek sorgu, ciroya göre azalan
+    top, queries = count_queries(engine, lambda: get_abc_results(db, limit=2))
+    assert queries == 1
+    assert top == [{"product": "Product 0", "revenue": 800.0, "class": "A"},
+                   {"product": "Product 1", "revenue": 150.0, "class": "B"}]
+    assert [row["class"] for row in get_abc_results(db, abc_class="C")] == ["C"] * 4
+    db.close()
+
+
+if __name__ == "__main__":
+    test_abc_classification_is_set_based()
+    print("✅ ABC analizi testleri geçti")
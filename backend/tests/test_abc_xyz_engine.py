@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+
+import abc_xyz_engine
+from analysis_engine import calculate_abc_analysis
+from models import Product, Sale
+from tests.helpers import build_db, count_queries
+
+
+def test_classify_vectorized():
+    revenue = np.array([50.0, 800.0, 150.0, 0.0])
+    assert abc_xyz_engine.classify_abc(revenue, np.arange(4)).tolist() == ["C", "A", "B", "C"]
+
+    demand = np.array([
+        [10, 10, 10, 10], # Sabit -> CV 0 (X)
+        [0, 20, 0, 20],   # CV 1.0 (Y)
+        [0, 0, 0, 40],    # CV ~1.73 (Z)
+        [0, 0, 0, 0],     # Talep yok (Z)
+    ], dtype=np.float32)
+    cv, xyz = abc_xyz_engine.classify_xyz(demand.sum(axis=1), (demand ** 2).sum(axis=1), demand.shape[1])
+    assert xyz.tolist() == ["X", "Y", "Z", "Z"]
+    assert np.allclose(cv[:3], demand[:3].std(axis=1) / demand[:3].mean(axis=1)) # Σq, Σq² ile aynı CV
+    assert np.isinf(cv[3])
+
+
+def test_update_product_classes_matches_sql_abc():
+    """Ürün sınıfları tek sorgu + toplu UPDATE ile yazılmalı; ABC SQL sürümüyle aynı olmalı."""
+    engine, db = build_db(2, 5)
+    today = datetime.date.today()
+    for day in range(10):
+        date = today - datetime.timedelta(days=day)
+        db.add(Sale(store_id=1, product_id=1, date=date, quantity=5, total_price=80.0)) # Düzenli
+        if day % 5 == 0:
+            db.add(Sale(store_id=2, product_id=2, date=date, quantity=30, total_price=75.0)) # Seyrek
+    db.add(Sale(store_id=1, product_id=3, date=today, quantity=1, total_price=50.0))
+    db.add(Sale(store_id=2, product_id=5, date=today, quantity=1, total_price=100.0))
+    db.commit()
+
+    result, queries = count_queries(engine, lambda: abc_xyz_engine.update_product_classes(db, window_days=9))
+    assert queries <= 5
+    db.expire_all()
+    stored = {p.id: (p.abc_category, p.xyz_category, p.abc_xyz_class) for p in db.query(Product)}
+    assert stored[1] == ("A", "X", "AX")
+    assert stored[2] == ("B", "Z", "BZ")
+    assert stored[4] == ("C", "Z", "CZ") and db.get(Product, 4).demand_cv is None
+    assert stored[5][0] == "C"
+    assert sum(result["matrix"].values()) == 5
+
+    calculate_abc_analysis(db, window_days=9)
+    db.expire_all()
+    assert {p.id: p.abc_category for p in db.query(Product)} == {k: v[0] for k, v in stored.items()}
+
+    # Mağaza bazında: sadece o mağazanın satışları
+    items = abc_xyz_engine.classify_store_products(db, 2, window_days=9)
+    assert [(i["product_id"], i["class"]) for i in items] == [(2, "AZ"), (5, "CZ")]
+    db.close()
+
+
+if __name__ == "__main__":
+    test_classify_vectorized()
+    test_update_product_classes_matches_sql_abc()
+    print("✅ ABC-XYZ testleri geçti")
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from fastapi import Response
+
+from core.cache import VersionedCache, HIT, MISS, COALESCED
+from models import Inventory
+from routers.transfers import get_transfer_recommendations, recommendation_cache
+from tests.helpers import build_db
+
+
+def test_single_flight():
+    """Aynı anahtar için eşzamanlı istekler tek hesaplama yapmalı."""
+    cache = VersionedCache(ttl=60)
+    calls = []
+    statuses = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["sonuç"]
+
+    def worker():
+        value, status, _ = cache.get_or_compute(("greedy", 1), compute)
+        assert value == ["sonuç"]
+        statuses.append(status)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"hesaplama: {len(calls)}, durumlar: {sorted(statuses)}")
+    assert len(calls) == 1
+    assert statuses.count(MISS) == 1 and statuses.count(COALESCED) == 7
+    assert cache.get_or_compute(("greedy", 1), compute)[1] == HIT
+    assert cache.get_or_compute(("greedy", 2), compute)[1] == MISS # Yeni sürüm -> yeni anahtar
+
+
+def test_error_is_not_cached():
+    cache = VersionedCache(ttl=60)
+
+    def fail():
+        raise RuntimeError("DB hatası")
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute("k", fail)
+            assert False, "Hata iletilmeli"
+        except RuntimeError:
+            pass
+    assert cache.get_or_compute("k", lambda: 1) == (1, MISS, 0.0)
+
+
+def test_endpoint_invalidated_by_inventory_commit():
+    """Envanter commit'i öneri önbelleğini geçersiz kılmalı."""
+    recommendation_cache.clear()
+    engine, db = build_db(6, 5)
+
+    first = Response()
+    recs = get_transfer_recommendations(first, db=db)
+    second = Response()
+    assert get_transfer_recommendations(second, db=db) == recs
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == (MISS, HIT)
+
+    item = db.query(Inventory).filter_by(store_id=3, product_id=1).one()
+    item.quantity = 0
+    db.commit()
+
+    third = Response()
+    get_transfer_recommendations(third, db=db)
+    assert third.headers["X-Cache"] == MISS
+    db.close()
+
+
+if __name__ == "__main__":
+    test_single_flight()
+    test_error_is_not_cached()
+    test_endpoint_invalidated_by_inventory_commit()
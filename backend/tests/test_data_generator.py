@@ -0,0 +1,97 @@
+import datetime
+import os
+import tempfile
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import data_generator
+from data_generator import GeneratorConfig, generate_data
+from database import Base
+from models import Customer, Inventory, Product, Sale, SalesDaily, Store, StoreType
+from sales_rollup import rebuild_sales_daily
+
+
+def _generate(path, **kwargs):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    counts = generate_data(engine, GeneratorConfig(**kwargs))
+    return engine, counts
+
+
+def _daily_rows(db):
+    return db.execute(
+        select(SalesDaily.store_id, SalesDaily.product_id, SalesDaily.date, SalesDaily.quantity,
+               func.round(SalesDaily.revenue, 4), SalesDaily.transaction_count)
+        .order_by(SalesDaily.store_id, SalesDaily.product_id, SalesDaily.date)
+    ).all()
+
+
+def test_generates_demo_catalog_and_consistent_rollup():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, counts = _generate(os.path.join(tmp, "demo.db"), days=60, batch_rows=1000)
+        db = sessionmaker(bind=engine)()
+
+        stores = db.query(Store).order_by(Store.id).all()
+        assert [s.name for s in stores] == [loc[0] for loc in data_generator.LOCATIONS]
+        assert stores[0].store_type == StoreType.CENTER
+        assert db.query(Product).count() == counts["products"] == 15
+        assert db.query(Customer).filter(Customer.points_balance == 0.0).count() == 100 # ORM varsayılanları yazıldı
+        assert db.query(Inventory).count() == counts["inventories"] == 7 * 15
+
+        # Her mağaza her gün 10-75 işlem (hafta sonu x1.5), adet 1-5, tutar = fiyat x adet
+        per_day = db.query(func.count()).select_from(Sale).group_by(Sale.store_id, Sale.date).all()
+        assert len(per_day) == 7 * 61 and all(10 <= n <= 75 for (n,) in per_day)
+        assert db.query(Sale).count() == counts["sales"]
+        sale = db.query(Sale).join(Product).filter(Sale.quantity == 3).first()
+        assert sale.total_price == sale.product.price * 3
+        assert db.query(func.min(Sale.date)).scalar() == datetime.date.today() - datetime.timedelta(days=60)
+
+        # Bloklardan NumPy ile toplanan özet, sales tablosundan yeniden kurulanla aynı
+        generated = _daily_rows(db)
+        assert len(generated) == counts["sales_daily"]
+        rebuild_sales_daily(db.connection())
+        assert _daily_rows(db) == generated
+        db.close()
+        engine.dispose()
+
+
+def test_same_seed_same_data_and_scales_beyond_catalog():
+    with tempfile.TemporaryDirectory() as tmp:
+        kwargs = dict(seed=7, stores=60, products=40, customers=500, days=20, batch_rows=5000)
+        first, counts = _generate(os.path.join(tmp, "a.db"), **kwargs)
+        second, _ = _generate(os.path.join(tmp, "b.db"), **kwargs)
+        query = select(Sale.store_id, Sale.product_id, Sale.customer_id, Sale.date, Sale.quantity).order_by(Sale.id)
+        with first.connect() as a, second.connect() as b:
+            assert a.execute(query).all() == b.execute(query).all()
+            assert a.execute(select(func.count()).select_from(Store).where(Store.store_type == StoreType.HUB)).scalar() == 2
+            assert a.execute(select(func.count(func.distinct(Product.sku)))).scalar() == 40
+            assert a.execute(select(func.max(Sale.product_id))).scalar() == 40
+
+        assert counts["stores"] == 60 and counts["customers"] == 500
+        first.dispose()
+        second.dispose()
+
+
+def test_summer_products_sell_more_in_summer():
+    rng = np.random.default_rng(1)
+    products = data_generator.generate_products(rng, 15)
+    summer_ids = np.flatnonzero(np.isin(products["template"], data_generator.SUMMER_PRODUCTS))
+    assert len(summer_ids) == 3
+
+    def share(month):
+        dates = [datetime.date(2025, month, day) for day in range(1, 29)]
+        sales = data_generator.generate_sales_block(rng, dates, 50, products["price"], summer_ids, 10, (10, 50))
+        return np.isin(sales["product_id"] - 1, summer_ids).mean()
+
+    # Yazın: %40 yaz ürünü + %60 x 3/15 düzgün = %52; kışın 3/15 = %20
+    assert abs(share(7) - 0.52) < 0.02
+    assert abs(share(1) - 0.20) < 0.02
+
+
+if __name__ == "__main__":
+    test_generates_demo_catalog_and_consistent_rollup()
+    test_same_seed_same_data_and_scales_beyond_catalog()
+    test_summer_products_sell_more_in_summer()
+    print("✅ Veri üretici testleri geçti")
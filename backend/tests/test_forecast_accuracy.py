@@ -0,0 +1,97 @@
+import asyncio
+import datetime
+import os
+import tempfile
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from accuracy_engine import update_forecast_accuracy
+from analysis_engine import calculate_forecast_accuracy
+from models import Forecast, ForecastAccuracy, Sale
+from services.accuracy_service import list_accuracy_leaderboard
+from tests.helpers import build_db, count_queries
+
+
+def _add_history(db, today):
+    """Her seri için geçmiş 4 günlük tahmin ve satış. (1, 1) aynı gün iki satış satırı içerir."""
+    for store_id in (1, 2):
+        for product_id in (1, 2, 3):
+            for day in range(1, 5):
+                date = today - datetime.timedelta(days=day)
+                db.add(Forecast(store_id=store_id, product_id=product_id, date=date,
+                                predicted_quantity=10.0))
+                actual = 10 + (store_id * product_id) * (day % 2) # Seri numarası büyüdükçe hata artar
+                db.add(Sale(store_id=store_id, product_id=product_id, date=date,
+                            quantity=actual - 4, total_price=0.0))
+                db.add(Sale(store_id=store_id, product_id=product_id, date=date,
+                            quantity=4, total_price=0.0))
+    db.commit()
+
+
+def test_batch_accuracy_matches_single_series():
+    today = datetime.date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "accuracy.db")
+        engine, db = build_db(2, 3, url=f"sqlite:///{path}")
+        _add_history(db, today)
+
+        # Aynı gün iki satış satırı: tahmin iki kez sayılmamalı, gelecek günler karşılaştırılmamalı
+        single = calculate_forecast_accuracy(db, 1, 1)
+        assert single["metrics"]["Sample_Size"] == 4
+        assert single["metrics"]["MAE"] == 0.5
+
+        result, queries = count_queries(engine, lambda: update_forecast_accuracy(db, window_days=10))
+        assert result["series"] == 6
+        assert queries <= 4 # Seri sayısından bağımsız
+
+        for row in db.query(ForecastAccuracy):
+            metrics = calculate_forecast_accuracy(db, row.store_id, row.product_id)["metrics"]
+            assert row.sample_size == metrics["Sample_Size"]
+            assert round(row.mae, 2) == metrics["MAE"]
+            assert round(row.rmse, 2) == metrics["RMSE"]
+            assert round(row.r2, 4) == metrics["r2"]
+        worst = db.get(ForecastAccuracy, (2, 3))
+        assert worst.bias < 0 and worst.mape > 0 # Gerçekleşen tahminin üstünde
+        db.get(ForecastAccuracy, (1, 1)).mape = None # MAPE hesaplanamayan seri
+        db.commit()
+        db.close()
+        engine.dispose()
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            async with AsyncSession(async_engine) as adb:
+                page, cursor = await list_accuracy_leaderboard(adb, sort="mae", limit=4)
+                assert [(r.store_id, r.product_id) for r in page][0] == (2, 3) # En kötü önce
+                rest, last_cursor = await list_accuracy_leaderboard(adb, sort="mae", limit=4, cursor=cursor)
+                assert last_cursor is None and len(page) + len(rest) == 6
+                maes = [r.mae for r in page + rest]
+                assert maes == sorted(maes, reverse=True)
+
+                # Boş MAPE iki yönde de en sonda; cursor sayfaları arasında da
+                for descending in (True, False):
+                    series, cursor = [], None
+                    while True:
+                        page_rows, cursor = await list_accuracy_leaderboard(adb, sort="mape", descending=descending,
+                                                                            limit=2, cursor=cursor)
+                        series += page_rows
+                        if cursor is None:
+                            break
+                    assert len(series) == 6 and (series[-1].store_id, series[-1].product_id) == (1, 1)
+                    mapes = [r.mape for r in series[:-1]]
+                    assert mapes == sorted(mapes, reverse=descending)
+
+                best, _ = await list_accuracy_leaderboard(adb, sort="r2", descending=True, limit=1)
+                assert best[0].r2 == max(r.r2 for r in page + rest)
+                try:
+                    await list_accuracy_leaderboard(adb, sort="unknown")
+                    assert False, "Geçersiz sıralama kabul edilmemeli"
+                except ValueError:
+                    pass
+            await async_engine.dispose()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_batch_accuracy_matches_single_series()
+    print("✅ Tahmin doğruluğu testleri geçti")
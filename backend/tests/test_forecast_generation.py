@@ -0,0 +1,119 @@
+import datetime
+import os
+import tempfile
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+import background_jobs
+import change_tracker
+from core import jobs
+import generate_forecast_standalone as forecaster
+from models import Forecast, SalesDaily
+from tests.helpers import build_db, count_queries
+
+
+def test_closed_form_matches_dense_polyfit():
+    """Toplamlardan kapalı form EKK, sıfır dolu yoğun (seri x gün) matrise polyfit ile aynı."""
+    rng = np.random.default_rng(3)
+    n_series, last_day = 6, 59
+    dense = np.zeros((n_series, last_day + 1))
+    for i in range(n_series - 1):
+        days = rng.choice(np.arange(i * 5, last_day + 1), size=20, replace=False)
+        dense[i, days] = rng.integers(1, 9, size=20)
+    dense[-1, last_day] = 7 # Tek günlük pencere
+
+    series, day = np.nonzero(dense)
+    intercept, slope, sales_days = forecaster.fit_trends(series, day, dense[series, day], n_series, last_day)
+
+    for i in range(n_series - 1):
+        first = day[series == i].min()
+        t = np.arange(first, last_day + 1)
+        expected_slope, expected_intercept = np.polyfit(t, dense[i, first:], 1)
+        assert np.isclose(slope[i], expected_slope) and np.isclose(intercept[i], expected_intercept)
+    assert slope[-1] == 0 and intercept[-1] == 7
+    assert sales_days.tolist() == [20] * 5 + [1]
+
+
+def _add_daily(db, store_id, product_id, days, quantities, end):
+    db.execute(insert(SalesDaily), [
+        {"store_id": store_id, "product_id": product_id, "date": end - datetime.timedelta(days=int(39 - t)),
+         "quantity": int(q), "revenue": float(q) * 20, "transaction_count": 1}
+        for t, q in zip(days, quantities)
+    ])
+
+
+def test_forecasts_full_catalog_with_proxy_and_bulk_insert():
+    engine, db = build_db(4, 60) # CENTER, HUB, STORE, STORE; 50 ürün sınırının üzerinde
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    t = np.arange(40)
+    for product_id in range(1, 61):
+        for store_id in (1, 3):
+            _add_daily(db, store_id, product_id, t, 5 + t, end) # y = 5 + t (tam doğrusal)
+    _add_daily(db, 4, 1, [37, 38, 39], [100, 100, 100], end) # Yetersiz geçmiş -> proxy
+    db.commit()
+    version = change_tracker.versions()[change_tracker.FORECAST]
+
+    summary, n_queries = count_queries(engine, lambda: forecaster.generate_forecasts(db))
+    assert summary["series"] == 180 and summary["proxy_series"] == 60 # Mağaza 4 -> en yakın STORE (3)
+    assert summary["skipped_series"] == 60 # Tek HUB: aynı tipte proxy yok
+    assert summary["forecasts"] == 180 * forecaster.HORIZON_DAYS == db.query(Forecast).count()
+    assert n_queries < 20 # Seri başına sorgu yok; yazım toplu
+    assert change_tracker.versions()[change_tracker.FORECAST] > version
+
+    expected = [5 + 39 + k for k in range(1, forecaster.HORIZON_DAYS + 1)]
+    for store_id in (1, 3, 4):
+        rows = db.query(Forecast).filter(Forecast.store_id == store_id, Forecast.product_id == 1) \
+            .order_by(Forecast.date).all()
+        assert [r.date for r in rows] == [end + datetime.timedelta(days=k) for k in range(1, 31)]
+        assert [r.predicted_quantity for r in rows] == [float(v) for v in expected]
+        assert rows[0].model_name == "SimpleRegression"
+    assert db.query(Forecast).filter(Forecast.store_id == 2).count() == 0 # Eski tahminler silindi
+    db.close()
+
+
+def test_orphan_store_series_are_skipped():
+    """stores tablosunda olmayan mağaza (ör. kurulmamış saha mağazası 9999) işi düşürmez, tahmin almaz."""
+    engine, db = build_db(3, 2)
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    _add_daily(db, 1, 1, np.arange(40), np.full(40, 3), end)
+    _add_daily(db, 9999, 1, [38, 39], [4, 4], end) # Yetersiz geçmiş: proxy aranırdı
+    _add_daily(db, 9999, 2, np.arange(40), np.full(40, 2), end)
+    db.commit()
+
+    summary = forecaster.generate_forecasts(db)
+    assert summary["series"] + summary["skipped_series"] == 6 # Sadece 3 mağaza x 2 ürün
+    assert db.query(Forecast).filter(Forecast.store_id == 9999).count() == 0
+    assert db.query(Forecast).filter(Forecast.store_id == 1, Forecast.product_id == 1).count() == forecaster.HORIZON_DAYS
+    db.close()
+
+
+def test_job_reports_stages_to_job_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Worker thread'i aynı veritabanını görsün diye dosya
+        engine, db = build_db(3, 4, url=f"sqlite:///{os.path.join(tmp, 'forecast.db')}")
+        end = datetime.date.today() - datetime.timedelta(days=1)
+        _add_daily(db, 1, 1, np.arange(40), np.full(40, 3), end)
+        db.commit()
+
+        job = jobs.submit_job(db, background_jobs.GENERATE_FORECASTS_JOB, session_factory=sessionmaker(bind=engine))
+        assert jobs.wait_for_job(job.id, timeout=30)
+        db.expire_all()
+        job = jobs.get_job(db, job.id)
+        assert job.status == jobs.SUCCESS, job.error
+        assert job.result["forecasts"] == 30 and job.progress == 1.0
+
+        messages = [log.message for log in jobs.read_logs(db, job.id)]
+        assert "1 seriye trend uyduruldu" in messages
+        assert messages[-2].startswith("30 tahmin yazıldı") and messages[-1] == "Tamamlandı"
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_closed_form_matches_dense_polyfit()
+    test_forecasts_full_catalog_with_proxy_and_bulk_insert()
+    test_orphan_store_series_are_skipped()
+    test_job_reports_stages_to_job_log()
+    print("✅ Toplu tahmin testleri geçti")
@@ -0,0 +1,49 @@
+from models import Store, StoreType
+from geo_engine import calculate_distance, haversine, get_distance_matrix
+
+
+def _stores():
+    return [
+        Store(id=1, name="Kadıköy", store_type=StoreType.STORE, lat=40.9819, lon=29.0254),
+        Store(id=2, name="Beşiktaş", store_type=StoreType.STORE, lat=41.0422, lon=29.0077),
+        Store(id=3, name="Gebze", store_type=StoreType.CENTER, lat=40.8028, lon=29.4307),
+    ]
+
+
+def test_matrix_matches_scalar_haversine():
+    stores = _stores()
+    matrix = get_distance_matrix(stores)
+
+    for a in stores:
+        for b in stores:
+            expected = calculate_distance(a.lat, a.lon, b.lat, b.lon)
+            assert abs(matrix.distance(a.id, b.id) - expected) < 1e-6
+
+    # Vektörize nokta -> çoklu mağaza hesabı da aynı sonucu vermeli
+    vector = haversine(41.0, 29.0, [s.lat for s in stores], [s.lon for s in stores])
+    assert abs(vector[0] - calculate_distance(41.0, 29.0, stores[0].lat, stores[0].lon)) < 1e-6
+
+
+def test_cache_invalidated_on_coordinate_change():
+    stores = _stores()
+    first = get_distance_matrix(stores)
+    assert get_distance_matrix(stores) is first
+
+    # Koordinat değişimi önbelleği geçersiz kılmalı
+    stores[0].lat = 41.5
+    second = get_distance_matrix(stores)
+    assert second is not first
+    assert abs(second.distance(1, 2) - calculate_distance(41.5, 29.0254, 41.0422, 29.0077)) < 1e-6
+
+    # ORM dışı değişim (Core UPDATE / snapshot geri yükleme): yeniden yüklenen nesneler yeni koordinatla gelir
+    reloaded = _stores()
+    reloaded[1].lon = 29.5
+    third = get_distance_matrix(reloaded)
+    assert third is not second
+    assert abs(third.distance(1, 2) - calculate_distance(40.9819, 29.0254, 41.0422, 29.5)) < 1e-6
+
+
+if __name__ == "__main__":
+    test_matrix_matches_scalar_haversine()
+    test_cache_invalidated_on_coordinate_change()
+    print("✅ Geo engine testleri geçti.")
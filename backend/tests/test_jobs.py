@@ -0,0 +1,221 @@
+import os
+import tempfile
+import threading
+import datetime
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+import background_jobs
+import scheduled_jobs
+from core import jobs
+from core.config import settings
+from core.exceptions import BusinessRuleException
+from models import BackgroundJob
+from tests.helpers import build_db
+
+_release = threading.Event()
+
+
+def _blocking_job(db, ctx, steps=3):
+    """Testte işin kuyruktan alınıp istekten bağımsız çalıştığını görmek için bekler."""
+    ctx.log("bekliyor")
+    _release.wait(10)
+    for i in range(steps):
+        ctx.progress((i + 1) / steps, f"adım {i + 1}")
+    return {"steps": steps}
+
+
+def _failing_job(db, ctx):
+    ctx.log("başladı")
+    raise RuntimeError("bozuk veri")
+
+
+def _endless_job(db, ctx):
+    while True:
+        ctx.progress(0.5, "çalışıyor")
+        time.sleep(0.01)
+
+
+jobs.register_job("test_blocking", _blocking_job)
+jobs.register_job("test_failing", _failing_job)
+jobs.register_job("test_endless", _endless_job)
+
+
+def _session_factory(tmp):
+    # Worker thread'leri aynı veritabanını görsün diye dosya (bellek içi SQLite thread başına ayrıdır)
+    engine, db = build_db(3, 4, url=f"sqlite:///{os.path.join(tmp, 'jobs.db')}")
+    return engine, db, sessionmaker(bind=engine)
+
+
+def _wait_status(db, job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        job = jobs.get_job(db, job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"İş {job_id} {statuses} durumuna geçmedi: {job.status}")
+
+
+def test_submit_returns_immediately_and_job_reports_progress():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        _release.clear()
+        started = time.perf_counter()
+        job = jobs.submit_job(db, "test_blocking", {"steps": 4}, session_factory=factory)
+        assert time.perf_counter() - started < 1.0 # İstek işin bitmesini beklemez
+        assert job.status == jobs.QUEUED
+
+        _wait_status(db, job.id, (jobs.RUNNING,))
+        _release.set()
+        assert jobs.wait_for_job(job.id, timeout=10)
+
+        job = _wait_status(db, job.id, jobs.FINISHED)
+        assert job.status == jobs.SUCCESS
+        assert job.progress == 1.0 and job.message == "adım 4"
+        assert job.result == {"steps": 4}
+        assert job.started_at is not None and job.finished_at >= job.started_at
+
+        logs = jobs.read_logs(db, job.id)
+        assert [log.message for log in logs] == ["Başladı: test_blocking", "bekliyor", "Tamamlandı"]
+        assert [log.message for log in jobs.read_logs(db, job.id, after_id=logs[0].id)] == ["bekliyor", "Tamamlandı"]
+        db.close()
+        engine.dispose()
+
+
+def test_failed_job_records_error():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        job = jobs.submit_job(db, "test_failing", session_factory=factory)
+        jobs.wait_for_job(job.id, timeout=10)
+
+        job = _wait_status(db, job.id, jobs.FINISHED)
+        assert job.status == jobs.FAILED
+        assert job.error == "bozuk veri"
+        assert jobs.read_logs(db, job.id)[-1].level == "ERROR"
+
+        try:
+            jobs.submit_job(db, "yok_boyle_is", session_factory=factory)
+            assert False, "Bilinmeyen iş tipi kabul edilmemeli"
+        except BusinessRuleException:
+            pass
+        db.close()
+        engine.dispose()
+
+
+def test_cancel_running_and_queued_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        _release.clear()
+        # Tüm worker'lar meşgulken gelen iş kuyrukta bekler
+        running = [jobs.submit_job(db, "test_endless", session_factory=factory) for _ in range(settings.JOB_WORKERS)]
+        for job in running:
+            _wait_status(db, job.id, (jobs.RUNNING,))
+        queued = jobs.submit_job(db, "test_blocking", session_factory=factory)
+
+        cancelled = jobs.cancel_job(db, queued.id)
+        assert cancelled.status == jobs.CANCELLED # Kuyruktaki iş hemen iptal olur
+
+        for job in running:
+            assert jobs.cancel_job(db, job.id).cancel_requested
+        for job in running:
+            jobs.wait_for_job(job.id, timeout=10)
+            assert _wait_status(db, job.id, jobs.FINISHED).status == jobs.CANCELLED
+
+        jobs.wait_for_job(queued.id, timeout=10)
+        db.expire_all()
+        queued = jobs.get_job(db, queued.id)
+        assert queued.status == jobs.CANCELLED and queued.started_at is None # Hiç başlamadı
+        assert jobs.cancel_job(db, queued.id).status == jobs.CANCELLED # Bitmiş işte etkisiz
+        db.close()
+        engine.dispose()
+
+
+def test_monte_carlo_job_and_stale_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        job = jobs.submit_job(db, background_jobs.MONTE_CARLO_JOB, {"n_paths": 50, "seed": 1},
+                              session_factory=factory)
+        jobs.wait_for_job(job.id, timeout=30)
+        job = _wait_status(db, job.id, jobs.FINISHED)
+        assert job.status == jobs.SUCCESS, job.error
+        assert job.result["items"] == 12 and job.message == "1/1 parça simüle edildi"
+
+        # Süreç çökmüş gibi: nabzı eski Running iş açılışta Failed olur
+        stale = BackgroundJob(name="test_blocking", status=jobs.RUNNING,
+                              heartbeat_at=job.finished_at.replace(year=2000))
+        db.add(stale)
+        db.commit()
+        assert jobs.recover_stale_jobs(db) == 1
+        db.refresh(stale)
+        assert stale.status == jobs.FAILED
+        db.close()
+        engine.dispose()
+
+
+def test_monitor_keeps_own_jobs_alive_and_fails_orphans():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        old = datetime.datetime.utcnow() - datetime.timedelta(seconds=settings.JOB_STALE_SECONDS + 60)
+        # Bu süreçte ilerleme bildirmeden uzun süren iş / yeniden başlamış sürecin yarım bıraktığı işler
+        own = BackgroundJob(name="test_blocking", status=jobs.RUNNING, worker_id=jobs.worker_id(), heartbeat_at=old)
+        orphans = [BackgroundJob(name="test_blocking", status=status, worker_id="eski-host:1:deadbeef", heartbeat_at=old)
+                   for status in (jobs.RUNNING, jobs.QUEUED)]
+        db.add_all([own, *orphans])
+        db.commit()
+
+        assert jobs.monitor_jobs(factory) == 2
+        db.expire_all()
+        assert own.status == jobs.RUNNING and own.heartbeat_at > old
+        assert [job.status for job in orphans] == [jobs.FAILED, jobs.FAILED]
+        assert jobs.monitor_jobs(factory) == 0
+        db.close()
+        engine.dispose()
+
+
+def test_shutdown_cancels_queued_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        running = [jobs.submit_job(db, "test_endless", session_factory=factory) for _ in range(settings.JOB_WORKERS)]
+        for job in running:
+            _wait_status(db, job.id, (jobs.RUNNING,))
+        queued = jobs.submit_job(db, "test_blocking", session_factory=factory)
+        assert queued.worker_id == jobs.worker_id()
+
+        jobs.shutdown_jobs(factory)
+        db.expire_all()
+        assert jobs.get_job(db, queued.id).status == jobs.CANCELLED # Kuyrukta kalmaz
+
+        for job in running: # Çalışanlar kapanışta beklenmez; testte temizlenir
+            jobs.cancel_job(db, job.id)
+            jobs.wait_for_job(job.id, timeout=10)
+            assert _wait_status(db, job.id, jobs.FINISHED).status == jobs.CANCELLED
+        db.close()
+        engine.dispose()
+
+
+def test_manual_snapshots_run_as_jobs():
+    assert background_jobs.GOLDEN_SNAPSHOT_JOB in jobs.registered_job_types()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db, factory = _session_factory(tmp)
+        # POST /api/risk/snapshot: gece göreviyle aynı iş, istekte değil worker'da çalışır
+        job = jobs.submit_job(db, scheduled_jobs.RISK_SNAPSHOT_JOB, session_factory=factory)
+        jobs.wait_for_job(job.id, timeout=30)
+        job = _wait_status(db, job.id, jobs.FINISHED)
+        assert job.status == jobs.SUCCESS, job.error
+        assert job.result["stores"] == 3
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_submit_returns_immediately_and_job_reports_progress()
+    test_failed_job_records_error()
+    test_cancel_running_and_queued_jobs()
+    test_monte_carlo_job_and_stale_recovery()
+    test_monitor_keeps_own_jobs_alive_and_fails_orphans()
+    test_shutdown_cancels_queued_jobs()
+    test_manual_snapshots_run_as_jobs()
+    print("✅ Arka plan iş testleri geçti")
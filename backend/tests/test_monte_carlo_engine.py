@@ -0,0 +1,94 @@
+import datetime
+import math
+
+import numpy as np
+
+import monte_carlo_engine
+from models import Inventory, Sale
+from monte_carlo_engine import draw_demand, fit_demand, run_monte_carlo, run_simulation
+from tests.helpers import build_db, count_queries
+
+
+def _poisson_tail(lam, stock):
+    """P(D > stock) ve E[max(D - stock, 0)] (D ~ Poisson(lam)), kapalı formda."""
+    pmf = [math.exp(-lam) * lam ** k / math.factorial(k) for k in range(stock + 1)]
+    below = sum(pmf)
+    lost = lam - stock + sum((stock - k) * p for k, p in enumerate(pmf))
+    return 1 - below, lost
+
+
+def test_simulation_matches_analytic_poisson():
+    stock = np.array([0, 20, 10_000])
+    mean = np.array([2.0, 2.0, 2.0])
+    stats = run_simulation(stock, mean, mean.copy(), n_paths=20_000, days=10, seed=1, workers=1)
+    probability, lost = _poisson_tail(20.0, 20)
+    assert stats["stockout_probability"][0] == 1.0
+    assert abs(stats["stockout_probability"][1] - probability) < 0.02
+    assert abs(stats["expected_lost_sales"][1] - lost) < 0.1
+    assert stats["stockout_probability"][2] == 0.0
+    assert stats["ending_quantiles"][2, 1] == 10_000 - 20 # Medyan kalan stok ~ stok - μ·gün
+
+    # Aşırı yayılımlı talep: ufuk toplamı, bağımsız günlük çekimlerin toplamıyla aynı dağılım
+    rng = np.random.default_rng(2)
+    daily = draw_demand(np.array([3.0]), np.array([12.0]), 200_000, 1, rng)
+    assert abs(daily.mean() - 3.0) < 0.05 and abs(daily.var() / 12.0 - 1) < 0.03
+    summed = draw_demand(np.array([3.0]), np.array([12.0]), 20_000, 20, rng)[0]
+    by_day = draw_demand(np.array([3.0]), np.array([12.0]), 20_000 * 20, 1, rng)[0].reshape(-1, 20).sum(axis=1)
+    assert abs(summed.mean() - 60) < 1 and abs(summed.var() / 240 - 1) < 0.05 # Var = gün x σ²
+    assert abs(np.quantile(summed, 0.9) - np.quantile(by_day, 0.9)) <= 1
+
+
+def test_chunks_are_deterministic_across_workers():
+    rng = np.random.default_rng(0)
+    n = 5_000 # CHUNK_CELLS / 1000 yol = 2000 kalem/parça -> 3 parça
+    stock, mean = rng.integers(0, 40, n), rng.uniform(0, 4, n)
+    var = mean * rng.uniform(1, 3, n)
+    assert len(monte_carlo_engine._chunks(n, 1000)) == 3
+    serial = run_simulation(stock, mean, var, 1000, 10, seed=7, workers=1)
+    parallel = run_simulation(stock, mean, var, 1000, 10, seed=7, workers=2)
+    for key in serial:
+        np.testing.assert_array_equal(serial[key], parallel[key])
+
+
+def test_fit_from_sales_history_and_scenario_knobs():
+    engine, db = build_db(3, 2)
+    db.query(Inventory).update({Inventory.quantity: 30})
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    for day in range(0, 90, 2): # Gün aşırı 4 adet: μ = 2, σ² = 4
+        db.add(Sale(store_id=3, product_id=1, date=yesterday - datetime.timedelta(days=day),
+                    quantity=4, total_price=80.0))
+    db.add(Sale(store_id=3, product_id=2, date=yesterday - datetime.timedelta(days=200), # Pencere dışı
+                quantity=50, total_price=1000.0))
+    db.commit()
+
+    fit, queries = count_queries(engine, lambda: fit_demand(db, store_id=3))
+    assert queries == 2
+    assert fit.product_ids.tolist() == [1, 2]
+    assert np.allclose(fit.mean, [2.0, 0.0]) and np.allclose(fit.var, [4.0, 0.0])
+
+    base = run_monte_carlo(db, store_id=3, horizon_days=14, n_paths=2000, seed=3)
+    assert base["items"] == 2 and base["results"]["product_id"][0] == 1 # En riskli kalem önce
+    assert base["results"]["stockout_probability"][1] == 0.0
+    p_base = base["results"]["stockout_probability"][0]
+    assert 0 < p_base < 1
+
+    cheaper = run_monte_carlo(db, store_id=3, horizon_days=14, n_paths=2000, price_change=-20, seed=3)
+    delayed = run_monte_carlo(db, store_id=3, horizon_days=14, n_paths=2000, delay_days=7, seed=3)
+    assert cheaper["demand_multiplier"] == 1.3 and cheaper["results"]["stockout_probability"][0] > p_base
+    assert delayed["simulated_days"] == 21 and delayed["results"]["stockout_probability"][0] > p_base
+
+    whole = run_monte_carlo(db, n_paths=100, seed=3, limit=2)
+    assert whole["items"] == 6 and len(whole["results"]["store_id"]) == 2
+    try:
+        run_monte_carlo(db, n_paths=monte_carlo_engine.MAX_PATHS + 1)
+        assert False, "Yol sınırı aşılmamalı"
+    except ValueError:
+        pass
+    db.close()
+
+
+if __name__ == "__main__":
+    test_simulation_matches_analytic_poisson()
+    test_chunks_are_deterministic_across_workers()
+    test_fit_from_sales_history_and_scenario_knobs()
+    print("✅ Monte Carlo testleri geçti")
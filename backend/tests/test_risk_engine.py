@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+import risk_engine
+from models import Inventory, Store, StoreRiskSummary
+from risk_engine import get_risk_report, refresh_risk_summary, classify_risk, OVERSTOCK_MULTIPLIER
+from models import StoreType
+from tests.helpers import build_db, count_queries
+
+
+def _brute_force(db):
+    """Envanteri baştan tarayarak mağaza bazlı beklenen özet."""
+    expected = {}
+    for store in db.query(Store).all():
+        items = db.query(Inventory).filter(Inventory.store_id == store.id).all()
+        high = sum(1 for i in items if i.quantity < i.safety_stock)
+        over = sum(1 for i in items if i.quantity > i.safety_stock * OVERSTOCK_MULTIPLIER)
+        expected[store.id] = {
+            "stock": sum(i.quantity for i in items),
+            "safety_stock": sum(i.safety_stock for i in items),
+            "status": classify_risk(len(items), high, over),
+        }
+    return expected
+
+
+def _report(db):
+    return {
+        row["store_id"]: {"stock": row["stock"], "safety_stock": row["safety_stock"], "status": row["status"]}
+        for row in get_risk_report(db, db.query(Store).all())
+    }
+
+
+def test_summary_matches_full_scan():
+    """İlk rapor tüm mağazaları sayar, last_risk_analysis dolar; sonrası sadece okur."""
+    engine, db = build_db(6, 8)
+    assert _report(db) == _brute_force(db)
+    assert all(store.last_risk_analysis is not None for store in db.query(Store).all())
+
+    _, n_queries = count_queries(engine, lambda: get_risk_report(db, db.query(Store).all()))
+    print(f"Güncel özetle rapor: {n_queries} sorgu")
+    assert n_queries <= 3 # mağazalar + stale kontrolü + özet okuma
+    db.close()
+
+
+
+def test_report_reads_stores_in_chunks():
+    """Mağaza listesi IN parçalarına bölünse de rapor aynı ve istek sırasında kalmalı."""
+    engine, db = build_db(7, 4, seed=11)
+    expected = _report(db)
+    stores = db.query(Store).order_by(Store.id.desc()).all()
+    chunk_size = risk_engine.REFRESH_CHUNK_SIZE
+    risk_engine.REFRESH_CHUNK_SIZE = 3
+    try:
+        report, n_queries = count_queries(engine, lambda: get_risk_report(db, stores))
+    finally:
+        risk_engine.REFRESH_CHUNK_SIZE = chunk_size
+    assert [row["store_id"] for row in report] == [store.id for store in stores]
+    assert {row["store_id"]: {k: row[k] for k in ("stock", "safety_stock", "status")} for row in report} == expected
+    assert n_queries == 4 # stale kontrolü + 3 parça
+    db.close()
+
+def test_orm_changes_update_summary_by_delta():
+    """ORM ile ekleme/güncelleme/silme özeti delta ile günceller (yeniden sayım yok)."""
+    engine, db = build_db(5, 6, seed=3)
+    _report(db)
+
+    items = db.query(Inventory).order_by(Inventory.id).all()
+    items[0].quantity = 0 # Riskli hale getir
+    items[1].safety_stock = 500
+    db.delete(items[2])
+    db.add(Inventory(store_id=items[3].store_id, product_id=items[3].product_id, quantity=999, safety_stock=5))
+    db.commit()
+
+    assert db.query(StoreRiskSummary).filter(StoreRiskSummary.dirty.is_(True)).count() == 0
+    assert refresh_risk_summary(db) == [] # Yeniden sayılacak mağaza yok
+    assert _report(db) == _brute_force(db)
+
+    # Rollback: özet de geri alınır
+    before = _report(db)
+    items[0].quantity = 10_000
+    db.flush()
+    db.rollback()
+    assert _report(db) == before
+    db.close()
+
+
+def test_bulk_update_marks_stores_dirty():
+    """Deltası bilinmeyen toplu UPDATE sadece bildirilen mağazaları (yoksa tümünü) dirty yapar."""
+    engine, db = build_db(5, 6, seed=5)
+    _report(db)
+    store_id = db.query(Store.id).order_by(Store.id).first()[0]
+
+    db.execute(
+        update(Inventory).where(Inventory.store_id == store_id).values(quantity=Inventory.quantity * 10)
+        .execution_options(synchronize_session=False, changed_keys=[(store_id, None)])
+    )
+    db.commit()
+    dirty = [row.store_id for row in db.query(StoreRiskSummary).filter(StoreRiskSummary.dirty.is_(True))]
+    assert dirty == [store_id]
+
+    db.execute(update(Inventory).values(quantity=0).execution_options(synchronize_session=False))
+    db.commit()
+    assert db.query(StoreRiskSummary).filter(StoreRiskSummary.dirty.is_(False)).count() == 0
+    assert _report(db) == _brute_force(db)
+    db.close()
+
+
+def test_refresh_does_not_touch_caller_session():
+    """Okuma yolundaki yenileme kendi transaction'ında yazar; çağıranın bekleyen değişikliği flush / commit edilmez."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db = build_db(4, 5, url=f"sqlite:///{os.path.join(tmp, 'risk.db')}") # Ayrı bağlantılar (bellek içi değil)
+        _report(db)
+        db.execute(update(StoreRiskSummary).values(dirty=True)) # Mevcut satırlar UPSERT ile yenilenir
+        db.commit()
+
+        stores = db.query(Store).all()
+        expected = _brute_force(db)
+        pending = Store(name="Taslak", store_type=StoreType.STORE, lat=41.0, lon=29.0)
+        db.add(pending)
+        report = get_risk_report(db, stores)
+        assert pending in db.new # Flush edilmedi
+        assert {row["store_id"]: row["status"] for row in report} == {k: v["status"] for k, v in expected.items()}
+        db.rollback()
+        assert db.query(StoreRiskSummary).count() == 4 # Yinelenen satır yok
+        assert db.query(StoreRiskSummary).filter(StoreRiskSummary.dirty.is_(True)).count() == 0
+        assert db.query(Store).filter(Store.name == "Taslak").count() == 0
+        db.close()
+        engine.dispose()
+
+
+def test_listeners_are_registered_explicitly():
+    """Modelleri import etmek motorları yüklemez; kayıt açık ve tekrar çağrılabilir."""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    check = "import sys, models; assert not {'risk_engine', 'sales_rollup'} & set(sys.modules)"
+    subprocess.run([sys.executable, "-c", check], cwd=backend, check=True)
+
+    risk_engine.register_listeners()
+    risk_engine.register_listeners()
+    assert event.contains(Session, "after_flush", risk_engine._apply_flush_deltas)
+
+
+if __name__ == "__main__":
+    test_summary_matches_full_scan()
+    test_report_reads_stores_in_chunks()
+    test_orm_changes_update_summary_by_delta()
+    test_bulk_update_marks_stores_dirty()
+    test_refresh_does_not_touch_caller_session()
+    test_listeners_are_registered_explicitly()
+    print("✅ Risk özeti testleri geçti")
@@ -0,0 +1,138 @@
+import asyncio
+import datetime
+import os
+import tempfile
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from core import scheduler
+from core.config import settings
+from models import Inventory, ProductRiskSnapshot, ScheduledJobRun, Store, StoreRiskSnapshot
+from risk_engine import get_risk_report, snapshot_risk_history
+from services import risk_service
+from tests.helpers import build_db
+
+
+def test_snapshots_and_time_series():
+    """Günlük fotoğraf güncel raporla aynı olmalı; seri sorguları envantere dokunmamalı."""
+    today = datetime.date.today()
+    yesterday = today - datetime.timedelta(days=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        engine, db = build_db(5, 6, url=f"sqlite:///{path}")
+
+        snapshot_risk_history(db, yesterday)
+        for item in db.query(Inventory).filter(Inventory.store_id == 3):
+            item.quantity = 0 # Mağaza 3 bugün riskli
+        db.commit()
+        result = snapshot_risk_history(db, today)
+        assert snapshot_risk_history(db, today) == result # Aynı gün tekrar: idempotent
+        assert result["stores"] == 5 and result["products"] == 6
+
+        report = {row["store_id"]: row["status"] for row in get_risk_report(db, db.query(Store).all())}
+        todays = {row.store_id: row.status for row in db.query(StoreRiskSnapshot).filter_by(snapshot_date=today)}
+        assert todays == report and todays[3] == "HIGH_RISK"
+
+        product = db.query(ProductRiskSnapshot).filter_by(snapshot_date=today, product_id=1).one()
+        items = db.query(Inventory).filter(Inventory.product_id == 1).all()
+        assert product.store_count == len(items)
+        assert product.total_stock == sum(i.quantity for i in items)
+        assert product.out_of_stock_stores == sum(1 for i in items if i.quantity <= 0)
+        db.close()
+        engine.dispose()
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            statements = []
+            event.listen(async_engine.sync_engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args: statements.append(statement))
+            async with AsyncSession(async_engine) as adb:
+                start, end = risk_service.resolve_range(yesterday, today)
+                series = await risk_service.store_risk_series(adb, start, end, [3])
+                assert [(p.snapshot_date, p.status) for p in series][-1] == (today, "HIGH_RISK")
+                assert len(series) == 2
+
+                counts = await risk_service.store_status_counts(adb, start, end)
+                assert [c["snapshot_date"] for c in counts] == [yesterday, today]
+                assert sum(counts[1]["counts"].values()) == 5
+                assert counts[1]["counts"]["HIGH_RISK"] >= 1
+
+                products = await risk_service.product_risk_series(adb, [1, 2], start, end)
+                assert len(products) == 4
+            assert not any("inventories" in sql for sql in statements)
+            await async_engine.dispose()
+
+        asyncio.run(run())
+
+
+def test_daily_job_runs_once_per_day():
+    """Aynı gün ikinci çalıştırma atlanır; başarısız görev retry süresinden sonra devralınır."""
+    engine, db = build_db(2, 2)
+    session_factory = sessionmaker(bind=engine)
+    calls = []
+
+    def job(session):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("geçici hata")
+        return "ok"
+
+    scheduler.register_daily_job("test_job", 0, job)
+    today = datetime.date.today()
+    assert scheduler.run_job("test_job", today, session_factory) == scheduler.SUCCESS
+    assert scheduler.run_job("test_job", today, session_factory) == scheduler.SKIPPED
+
+    tomorrow = today + datetime.timedelta(days=1)
+    assert scheduler.run_job("test_job", tomorrow, session_factory) == scheduler.FAILED
+    retry_delay = settings.SCHEDULER_RETRY_DELAY
+    settings.SCHEDULER_RETRY_DELAY = 0
+    try:
+        assert scheduler.run_job("test_job", tomorrow, session_factory) == scheduler.SUCCESS
+    finally:
+        settings.SCHEDULER_RETRY_DELAY = retry_delay
+
+    runs = db.query(ScheduledJobRun).filter_by(job_name="test_job").order_by(ScheduledJobRun.run_date).all()
+    assert [(r.run_date, r.status) for r in runs] == [(today, "Success"), (tomorrow, "Success")]
+    assert len(calls) == 3
+    db.close()
+
+
+def test_failed_job_is_retried_after_delay_same_day():
+    """Başarısızlıktan sonra erken yoklama günü kapatmaz; retry süresi dolunca görev tekrar çalışır."""
+    engine, db = build_db(2, 2)
+    session_factory = sessionmaker(bind=engine)
+    calls = []
+
+    def job(session):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("geçici hata")
+        return "ok"
+
+    scheduler.register_daily_job("test_retry_job", 0, job)
+    today = datetime.date.today()
+    assert scheduler.run_job("test_retry_job", today, session_factory) == scheduler.FAILED
+
+    # Bir sonraki yoklama (SCHEDULER_POLL_SECONDS sonra) retry süresinden önce gelir
+    status = scheduler.run_job("test_retry_job", today, session_factory)
+    assert status == scheduler.RETRY_PENDING and status not in scheduler.DONE_FOR_TODAY
+    assert len(calls) == 1
+
+    # Retry süresi geçmiş gibi: bitiş zamanını geriye al
+    run = db.query(ScheduledJobRun).filter_by(job_name="test_retry_job").one()
+    run.finished_at -= datetime.timedelta(seconds=settings.SCHEDULER_RETRY_DELAY + 1)
+    db.commit()
+    assert scheduler.run_job("test_retry_job", today, session_factory) == scheduler.SUCCESS
+    assert scheduler.run_job("test_retry_job", today, session_factory) == scheduler.SKIPPED
+    assert len(calls) == 2
+    db.close()
+
+
+if __name__ == "__main__":
+    test_snapshots_and_time_series()
+    test_daily_job_runs_once_per_day()
+    test_failed_job_is_retried_after_delay_same_day()
+    print("✅ Risk geçmişi testleri geçti")
@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+import os
+import tempfile
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+import sales_rollup
+from models import Product, Sale, SalesDaily
+from routers.pos import create_pos_sale_direct
+from routers.sales import read_sales_rollup
+from schemas import PosSaleCreate
+from tests.helpers import build_db, count_queries
+
+DAY = datetime.date(2026, 3, 4) # Çarşamba
+
+
+def _rollup(db):
+    return {(r.store_id, r.product_id, r.date): (r.quantity, r.revenue, r.transaction_count)
+            for r in db.query(SalesDaily) if r.transaction_count}
+
+
+def _recount(db):
+    """Beklenen özet: sales tablosu üzerinde doğrudan GROUP BY."""
+    rows = db.execute(
+        select(Sale.store_id, Sale.product_id, Sale.date,
+               func.sum(Sale.quantity), func.sum(Sale.total_price), func.count())
+        .group_by(Sale.store_id, Sale.product_id, Sale.date)
+    ).all()
+    return {(s, p, d): (q, r, n) for s, p, d, q, r, n in rows}
+
+
+def test_orm_writes_update_rollup_incrementally():
+    engine, db = build_db(2, 3)
+    for day in range(3):
+        for store_id in (1, 2):
+            db.add(Sale(store_id=store_id, product_id=1, date=DAY + datetime.timedelta(days=day),
+                        quantity=2, total_price=40.0))
+    db.add(Sale(store_id=1, product_id=1, date=DAY, quantity=3, total_price=60.0)) # Aynı gün ikinci satır
+    _, queries = count_queries(engine, db.commit)
+    assert queries <= 7 + 1 # Satış INSERT'leri + özet için tek UPSERT (executemany)
+    assert _rollup(db)[(1, 1, DAY)] == (5, 100.0, 2)
+    assert _rollup(db) == _recount(db)
+
+    # Güncelleme (anahtar değişimi dahil), silme ve SQL ifadesi ataması
+    sale = db.query(Sale).filter_by(store_id=2, date=DAY).one()
+    sale.quantity = 7
+    sale.date = DAY + datetime.timedelta(days=10)
+    db.delete(db.query(Sale).filter_by(store_id=1, quantity=3).one())
+    db.query(Sale).filter_by(store_id=1, date=DAY).one().total_price = Sale.total_price * 2
+    db.commit()
+    assert _rollup(db) == _recount(db)
+    assert _rollup(db)[(1, 1, DAY)] == (2, 80.0, 1)
+    assert (2, 1, DAY) not in _rollup(db)
+
+    # Ham / toplu ekleme: add_sales ile bildirilir
+    rows = [{"store_id": 2, "product_id": 3, "date": DAY, "quantity": 1, "total_price": 20.0}] * 4
+    db.connection().execute(insert(Sale.__table__), rows)
+    sales_rollup.add_sales(db.connection(), rows)
+    db.commit()
+    assert _rollup(db) == _recount(db)
+
+    # Backfill: aralık silinip yeniden kurulur
+    db.execute(SalesDaily.__table__.delete())
+    assert sales_rollup.rebuild_sales_daily(db.connection(), DAY, DAY + datetime.timedelta(days=1)) == 4
+    assert sales_rollup.rebuild_sales_daily(db.connection()) == 7 # Tüm aralık
+    db.commit()
+    assert _rollup(db) == _recount(db)
+    db.close()
+
+
+def test_rollup_granularity_endpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rollup.db")
+        engine, db = build_db(2, 2, url=f"sqlite:///{path}")
+        for day in range(40): # 2026-03-04 .. 2026-04-12
+            db.add(Sale(store_id=1 + day % 2, product_id=1, date=DAY + datetime.timedelta(days=day),
+                        quantity=1, total_price=10.0))
+        db.commit()
+        db.close()
+        engine.dispose()
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            async with AsyncSession(async_engine) as adb:
+                end = DAY + datetime.timedelta(days=39)
+                months = await read_sales_rollup("month", DAY, end, None, 1, adb)
+                assert [(str(r["period"]), r["quantity"]) for r in months] == [("2026-03-01", 28), ("2026-04-01", 12)]
+
+                weeks = await read_sales_rollup("week", DAY, end, 1, 1, adb)
+                assert str(weeks[0]["period"]) == "2026-03-02" # Pazartesi
+                assert sum(r["quantity"] for r in weeks) == 20 and all(r["store_id"] == 1 for r in weeks)
+
+                days = await read_sales_rollup("day", DAY, DAY + datetime.timedelta(days=2), None, None, adb)
+                assert [r["transaction_count"] for r in days] == [1, 1, 1]
+            await async_engine.dispose()
+
+        asyncio.run(run())
+
+
+def _enforce_foreign_keys(dbapi_connection, _record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def test_pos_direct_sale_without_field_store():
+    """Saha mağazası (9999) kurulmamışsa satış yine işlenir; Sale/sales_daily satırı yazılmaz."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pos.db")
+        engine, db = build_db(2, 2, url=f"sqlite:///{path}")
+        db.query(Product).filter_by(id=1).one().sku = "SKU-FIELD"
+        db.commit()
+        db.close()
+        engine.dispose()
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            # PostgreSQL gibi yabancı anahtarları zorla: yetim store_id flush'ı düşürürdü
+            event.listen(async_engine.sync_engine, "connect", _enforce_foreign_keys)
+            sale = PosSaleCreate(pos_device_id="POS-FIELD", receipt_no="R-FIELD-1", total_amount=40.0,
+                                 items=[{"product_sku": "SKU-FIELD", "quantity": 2, "unit_price": 20.0}],
+                                 payments=[{"payment_method": "CASH", "amount": 40.0}])
+            async with AsyncSession(async_engine) as adb:
+                result = await create_pos_sale_direct(sale, db=adb)
+                assert result["receipt_no"] == "R-FIELD-1"
+                assert (await adb.execute(select(func.count()).select_from(Sale))).scalar() == 0
+                assert (await adb.execute(select(func.count()).select_from(SalesDaily))).scalar() == 0
+            await async_engine.dispose()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_orm_writes_update_rollup_incrementally()
+    test_rollup_granularity_endpoint()
+    test_pos_direct_sale_without_field_store()
+    print("✅ Satış özeti testleri geçti")
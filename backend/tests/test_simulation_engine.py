@@ -0,0 +1,83 @@
+import numpy as np
+from sqlalchemy import func, select
+
+import risk_engine
+import simulation_engine
+from core.exceptions import ResourceNotFoundException
+from models import Inventory, Sale, SalesDaily
+from sandbox_engine import SandboxRegistry
+from tests.helpers import build_db, count_queries
+
+
+def _quantities(db):
+    return dict(db.execute(select(Inventory.id, Inventory.quantity).order_by(Inventory.id)).all())
+
+
+def test_db_simulations_are_set_based():
+    """Senaryolar kalem başına değil, sabit sayıda toplu ifadeyle yazmalı; özetler tutarlı kalmalı."""
+    counts = []
+    for n_stores, n_products in ((4, 5), (12, 30)):
+        engine, db = build_db(n_stores, n_products)
+        risk_engine.refresh_risk_summary(db)
+        before = sum(_quantities(db).values())
+
+        message, queries = count_queries(engine, lambda: simulation_engine.simulate_sales_boom(db, seed=3))
+        counts.append(queries)
+        sold = db.query(func.sum(Sale.quantity)).scalar() or 0
+        assert sold > 0 and str(sold) in message
+        assert sum(_quantities(db).values()) == before - sold
+        assert db.query(func.sum(SalesDaily.quantity)).scalar() == sold
+        assert risk_engine.refresh_risk_summary(db) # Etkilenen mağazalar dirty işaretlendi
+
+        stock = _quantities(db)
+        message = simulation_engine.simulate_supply_shock(db)
+        lost = sum(q // 2 for q in stock.values() if q > 0) # int(q * 0.5)
+        assert str(lost) in message
+        assert _quantities(db) == {i: q - q // 2 if q > 0 else q for i, q in stock.items()}
+        assert len(risk_engine.refresh_risk_summary(db)) == n_stores
+        db.close()
+    assert counts[0] == counts[1] # Sorgu sayısı envanter boyutundan bağımsız
+
+
+def test_sandbox_does_not_touch_database():
+    engine, db = build_db(5, 8)
+    registry = SandboxRegistry()
+    stock = _quantities(db)
+
+    boom = registry.create(db)
+    shock, queries = count_queries(engine, lambda: registry.create(db))
+    assert queries == 0 and shock.base is boom.base # Taban snapshot paylaşılır
+
+    _, queries = count_queries(engine, lambda: boom.apply("sales-boom", seed=3))
+    shock.apply("supply-shock")
+    shock.apply("recession", seed=1)
+    assert queries == 0 and _quantities(db) == stock
+    assert boom.base.snapshot.quantity.tolist() == list(stock.values()) # Taban değişmedi
+
+    state = boom.state()
+    assert state["projected"]["units_sold"] > 0
+    assert state["projected"]["total_stock"] == state["baseline"]["total_stock"] - state["projected"]["units_sold"]
+    assert len(state["risk_map"]) == 5 and {"status", "baseline_status", "color"} <= set(state["risk_map"][0])
+    assert shock.state()["projected"]["total_stock"] != state["projected"]["total_stock"]
+
+    # Aynı tohumla sandbox projeksiyonu, canlı simülasyonun yazdığı stokla aynı
+    simulation_engine.simulate_sales_boom(db, seed=3)
+    assert np.array_equal(boom.quantity, np.array(list(_quantities(db).values())))
+
+    boom.reset()
+    assert boom.quantity is boom.base.snapshot.quantity and boom.state()["scenarios"] == []
+
+    registry.delete(boom.id)
+    try:
+        registry.get(boom.id)
+        assert False, "Silinen sandbox bulunmamalı"
+    except ResourceNotFoundException:
+        pass
+    assert [s["sandbox_id"] for s in registry.list()] == [shock.id]
+    db.close()
+
+
+if __name__ == "__main__":
+    test_db_simulations_are_set_based()
+    test_sandbox_does_not_touch_database()
+    print("✅ Simülasyon ve sandbox testleri geçti")
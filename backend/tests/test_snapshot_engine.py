@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+import simulation_engine
+import snapshot_engine
+from models import Inventory, Store, StoreType
+from tests.helpers import build_db
+
+
+def _state(db):
+    return (db.query(func.sum(Inventory.quantity)).scalar(), db.query(Store).count(),
+            db.query(func.max(Store.id)).scalar())
+
+
+def test_restore_returns_to_golden_copy():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db = build_db(4, 5, url=f"sqlite:///{os.path.join(tmp, 'live.db')}")
+        assert snapshot_engine.supports_snapshots(engine)
+        assert snapshot_engine.restore_golden_snapshot(engine) is None # Altın kopya yok -> çağıran seed eder
+
+        golden = _state(db)
+        snapshot_engine.save_golden_snapshot(engine)
+        assert os.path.exists(os.path.join(tmp, "live.db.golden"))
+
+        simulation_engine.simulate_supply_shock(db)
+        db.add(Store(name="Yeni", store_type=StoreType.STORE, lat=41.0, lon=29.0))
+        db.commit()
+        assert _state(db) != golden
+
+        other = sessionmaker(bind=engine)() # Havuzda açık kalan başka bir bağlantı
+        other.query(Store).count()
+        other.commit()
+        db.close()
+
+        result = snapshot_engine.restore_golden_snapshot(engine)
+        assert result["snapshot"].endswith("live.db.golden")
+        assert _state(other) == golden
+
+        # AUTOINCREMENT sayacı da geri döner: yeni satır eski id'yi yeniden kullanır
+        store = Store(name="Tekrar", store_type=StoreType.STORE, lat=41.0, lon=29.0)
+        other.add(store)
+        other.commit()
+        assert store.id == golden[2] + 1
+        other.close()
+        engine.dispose()
+
+    memory_engine, memory_db = build_db(2, 2)
+    assert not snapshot_engine.supports_snapshots(memory_engine)
+    memory_db.close()
+
+
+if __name__ == "__main__":
+    test_restore_returns_to_golden_copy()
+    print("✅ Snapshot testleri geçti")
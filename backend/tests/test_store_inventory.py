@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import os
+import tempfile
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from models import Forecast, Inventory
+from services.inventory_service import list_store_inventory
+from tests.helpers import build_db
+
+
+def _expected(sync_db, store_id):
+    """Eski mantık: her satır için ayrı tahmin toplamı (bugün..30 gün)."""
+    today = datetime.date.today()
+    rows = {}
+    for item in sync_db.query(Inventory).filter(Inventory.store_id == store_id):
+        predicted = sum(
+            f.predicted_quantity for f in sync_db.query(Forecast).filter(
+                Forecast.store_id == store_id, Forecast.product_id == item.product_id,
+                Forecast.date >= today, Forecast.date <= today + datetime.timedelta(days=30))
+        )
+        status = "OUT_OF_STOCK_RISK" if item.quantity < predicted else "OVERSTOCK" if item.quantity > predicted * 2 else "OPTIMAL"
+        rows[item.product_id] = (item.quantity, predicted, status)
+    return rows
+
+
+async def _all_pages(db, store_id, **kwargs):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = await list_store_inventory(db, store_id, cursor=cursor, **kwargs)
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_keyset_pages_match_full_listing():
+    """Sayfalar birleşince tam liste çıkmalı; filtre/sıralama sunucuda doğru uygulanmalı."""
+    async def run(path, expected, store_id):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        counter = {"n": 0}
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: counter.__setitem__("n", counter["n"] + 1))
+        async with AsyncSession(engine) as db:
+            rows, pages = await _all_pages(db, store_id, limit=7)
+            assert pages == 5 # 30 ürün / 7
+            assert [r["product_id"] for r in rows] == sorted(expected)
+            assert {r["product_id"]: (r["quantity"], r["predicted_sales"], r["status"]) for r in rows} == expected
+
+            counter["n"] = 0
+            await list_store_inventory(db, store_id, limit=7)
+            print(f"product_id sırası, ilk sayfa: {counter['n']} sorgu")
+            assert counter["n"] == 2 # sayfa + sadece o sayfanın tahminleri
+
+            for status in ("OUT_OF_STOCK_RISK", "OVERSTOCK", "OPTIMAL"):
+                rows, _ = await _all_pages(db, store_id, status=status, limit=4)
+                assert sorted(r["product_id"] for r in rows) == sorted(p for p, v in expected.items() if v[2] == status)
+
+            rows, _ = await _all_pages(db, store_id, sort="predicted_sales", descending=True, limit=4)
+            keys = [(r["predicted_sales"], r["product_id"]) for r in rows]
+            assert keys == sorted(keys, reverse=True) and len(keys) == len(expected)
+
+            rows, _ = await _all_pages(db, store_id, sort="product_name", limit=6)
+            assert len({r["product_id"] for r in rows}) == len(expected)
+        await engine.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inventory.db")
+        sync_engine, sync_db = build_db(3, 30, url=f"sqlite:///{path}")
+        store_id = 3
+        expected = _expected(sync_db, store_id)
+        sync_db.close()
+        sync_engine.dispose()
+        asyncio.run(run(path, expected, store_id))
+
+
+def test_invalid_arguments_rejected():
+    async def run():
+        async with AsyncSession(create_async_engine("sqlite+aiosqlite://")) as db:
+            for kwargs in ({"status": "BAD"}, {"sort": "price"}, {"cursor": "not-a-cursor"}):
+                try:
+                    await list_store_inventory(db, 1, **kwargs)
+                except ValueError:
+                    continue
+                raise AssertionError(f"ValueError bekleniyordu: {kwargs}")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_keyset_pages_match_full_listing()
+    test_invalid_arguments_rejected()
+    print("✅ Mağaza stok listesi testleri geçti")
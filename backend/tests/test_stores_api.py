@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from starlette.requests import Request
+
+from models import Inventory, Store
+from routers.stores import read_stores
+from tests.helpers import build_db
+
+
+def _request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/stores", "headers": headers})
+
+
+def _expected(sync_db):
+    """Eski endpoint mantığı: envanteri Python'da topla, quantity < 10 çeşitleri say."""
+    expected = {}
+    for store in sync_db.query(Store).all():
+        items = sync_db.query(Inventory).filter(Inventory.store_id == store.id).all()
+        low = sum(1 for i in items if i.quantity < 10)
+        expected[store.id] = {
+            "stock": sum(i.quantity for i in items),
+            "safety_stock": sum(i.safety_stock for i in items),
+            "risk_status": "CRITICAL" if low > 20 else "WARNING" if low > 5 else "SAFE",
+        }
+    return expected
+
+
+def test_read_stores_single_query_and_etag():
+    """Liste envanter yüklemeden özet tablosundan gelir; ETag eşleşirse 304 döner."""
+    async def run(path, sync_db):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            response = await read_stores(_request(), db)
+        stores = json.loads(response.body)
+        got = {s["id"]: {k: s[k] for k in ("stock", "safety_stock", "risk_status")} for s in stores}
+        assert got == _expected(sync_db)
+        etag = response.headers["etag"]
+
+        # Özet güncel: envanter tablosu okunmaz
+        statements.clear()
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            response = await read_stores(_request(etag), db)
+        print(f"Güncel özetle liste: {len(statements)} sorgu, durum {response.status_code}")
+        assert response.status_code == 304 and not response.body
+        assert not any("FROM inventories" in sql for sql in statements)
+
+        # Stok değişince ETag da değişir
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            item = (await db.execute(select(Inventory).order_by(Inventory.id).limit(1))).scalar_one()
+            item.quantity += 1
+            await db.commit()
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            response = await read_stores(_request(etag), db)
+        assert response.status_code == 200 and response.headers["etag"] != etag
+        await engine.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stores.db")
+        sync_engine, sync_db = build_db(6, 30, url=f"sqlite:///{path}")
+        asyncio.run(run(path, sync_db))
+        sync_db.close()
+        sync_engine.dispose()
+
+
+if __name__ == "__main__":
+    test_read_stores_single_query_and_etag()
+    print("✅ Mağaza listesi testi geçti")
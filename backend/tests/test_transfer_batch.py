@@ -0,0 +1,192 @@
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+
+import change_tracker
+from database import Base
+from models import Store, StoreType, Product, Inventory, Transfer, TransferStatus
+from schemas import TransferRequest
+from services.inventory_service import execute_transfer_batch
+
+
+async def _setup(path: str, n_stores: int = 4, n_products: int = 3):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        for i in range(n_stores):
+            db.add(Store(id=i + 1, name=f"Store {i + 1}", store_type=StoreType.STORE, lat=41.0, lon=29.0))
+        for i in range(n_products):
+            db.add(Product(id=i + 1, name=f"Product {i + 1}", category="Test", cost=10, price=20))
+        await db.flush()
+        # Mağaza 4'te ürün yok (hedefte kayıt açılmalı)
+        for store_id in range(1, n_stores):
+            for product_id in range(1, n_products + 1):
+                db.add(Inventory(store_id=store_id, product_id=product_id, quantity=100, safety_stock=10))
+        await db.commit()
+    return engine
+
+
+async def _quantities(engine):
+    async with AsyncSession(engine) as db:
+        rows = (await db.execute(select(Inventory.store_id, Inventory.product_id, Inventory.quantity))).all()
+    return {(s, p): q for s, p, q in rows}
+
+
+def test_batch_applies_valid_items_and_reports_failures():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _setup(os.path.join(tmp, "batch.db"))
+            transfers = [
+                TransferRequest(source_store_id=1, target_store_id=2, product_id=1, amount=60),
+                TransferRequest(source_store_id=1, target_store_id=3, product_id=1, amount=60),  # Toplam 120 > 100
+                TransferRequest(source_store_id=2, target_store_id=4, product_id=2, amount=30),  # Hedefte kayıt yok
+                TransferRequest(source_store_id=4, target_store_id=1, product_id=3, amount=5),   # Kaynakta ürün yok
+                TransferRequest(source_store_id=1, target_store_id=99, product_id=1, amount=1),  # Mağaza yok
+                TransferRequest(source_store_id=3, target_store_id=3, product_id=1, amount=1),   # Aynı mağaza
+            ]
+
+            seq = change_tracker.current_sequence()
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                results = await execute_transfer_batch(db, transfers)
+
+            print([(r["index"], r["success"], r["detail"]) for r in results])
+            assert [r["success"] for r in results] == [True, False, True, False, False, False]
+            assert "yetersiz stok" in results[1]["detail"]
+
+            qty = await _quantities(engine)
+            assert qty[(1, 1)] == 40 and qty[(2, 1)] == 160
+            assert qty[(2, 2)] == 70 and qty[(4, 2)] == 30
+
+            async with AsyncSession(engine) as db:
+                assert (await db.execute(select(func.count(Transfer.id)))).scalar() == 2
+            assert results[0]["transfer_record_id"] is not None
+
+            # Değişiklik takibi anahtarlarla bildirilmeli (artımlı motor tam yenileme yapmasın)
+            _, changes = change_tracker.changes_since(seq)
+            assert changes[change_tracker.INVENTORY] == {(1, 1), (2, 1), (2, 2), (4, 2)}
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_all_or_nothing_and_constant_query_count():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _setup(os.path.join(tmp, "batch.db"), n_stores=8, n_products=20)
+            counter = {"n": 0}
+            event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: counter.__setitem__("n", counter["n"] + 1))
+
+            counts = []
+            for n in (2, 40):
+                transfers = [TransferRequest(source_store_id=1 + i % 3, target_store_id=4 + i % 4,
+                                             product_id=1 + i % 20, amount=1) for i in range(n)]
+                counter["n"] = 0
+                async with AsyncSession(engine, expire_on_commit=False) as db:
+                    results = await execute_transfer_batch(db, transfers)
+                assert all(r["success"] for r in results)
+                counts.append(counter["n"])
+            print(f"sorgu sayıları: {counts}")
+            assert counts[0] == counts[1]
+
+            before = await _quantities(engine)
+            transfers = [
+                TransferRequest(source_store_id=1, target_store_id=2, product_id=1, amount=1),
+                TransferRequest(source_store_id=1, target_store_id=2, product_id=1, amount=10_000),
+            ]
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                results = await execute_transfer_batch(db, transfers, all_or_nothing=True)
+            assert not any(r["success"] for r in results)
+            assert await _quantities(engine) == before
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_concurrent_stock_drop_rolls_back_batch():
+    """Stok okunduktan sonra azalırsa UPDATE eksiye düşürmemeli; tüm batch geri alınmalı."""
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _setup(os.path.join(tmp, "batch.db"))
+            state = {"dropped": False}
+
+            def drop_stock(conn, cursor, statement, *args):
+                # Okuma ile UPDATE arasına giren başka bir yazımı taklit eder
+                if statement.lstrip().startswith("UPDATE inventories") and not state["dropped"]:
+                    state["dropped"] = True
+                    conn.exec_driver_sql("UPDATE inventories SET quantity = 10 WHERE store_id = 1 AND product_id = 1")
+
+            event.listen(engine.sync_engine, "before_cursor_execute", drop_stock)
+            transfers = [
+                TransferRequest(source_store_id=1, target_store_id=2, product_id=1, amount=60),
+                TransferRequest(source_store_id=2, target_store_id=3, product_id=2, amount=30),
+            ]
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                results = await execute_transfer_batch(db, transfers)
+            event.remove(engine.sync_engine, "before_cursor_execute", drop_stock)
+
+            assert state["dropped"]
+            assert not any(r["success"] for r in results)
+            assert "geri alındı" in results[0]["detail"]
+            qty = await _quantities(engine)
+            assert qty[(1, 1)] == 100 and qty[(2, 1)] == 100 and qty[(2, 2)] == 100 # Eşzamanlı yazım da geri alındı
+            async with AsyncSession(engine) as db:
+                assert (await db.execute(select(func.count(Transfer.id)))).scalar() == 0
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_concurrent_stock_drop_keeps_stored_records_approved():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _setup(os.path.join(tmp, "batch.db"))
+            async with AsyncSession(engine) as db:
+                db.add_all([
+                    Transfer(id=1, source_store_id=1, target_store_id=2, product_id=1, amount=60,
+                             status=TransferStatus.PENDING),
+                    Transfer(id=2, source_store_id=2, target_store_id=3, product_id=2, amount=30,
+                             status=TransferStatus.PENDING),
+                ])
+                await db.commit()
+
+            state = {"dropped": False}
+
+            def drop_stock(conn, cursor, statement, *args):
+                if statement.lstrip().startswith("UPDATE inventories") and not state["dropped"]:
+                    state["dropped"] = True
+                    conn.exec_driver_sql("UPDATE inventories SET quantity = 10 WHERE store_id = 1 AND product_id = 1")
+
+            event.listen(engine.sync_engine, "before_cursor_execute", drop_stock)
+            transfers = [
+                TransferRequest(source_store_id=1, target_store_id=2, product_id=1, amount=60),
+                TransferRequest(source_store_id=2, target_store_id=3, product_id=2, amount=30),
+            ]
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                results = await execute_transfer_batch(db, transfers, record_ids=[1, 2])
+            event.remove(engine.sync_engine, "before_cursor_execute", drop_stock)
+
+            assert state["dropped"]
+            assert not any(r["success"] for r in results)
+            assert [r["transfer_record_id"] for r in results] == [1, 2]
+            async with AsyncSession(engine) as db:
+                rows = (await db.execute(select(Transfer.status, Transfer.decided_at).order_by(Transfer.id))).all()
+            # Stok geri alındı ama onay kaybolmadı: öneriler Approved olarak tekrar denenebilir
+            assert [status for status, _ in rows] == [TransferStatus.APPROVED, TransferStatus.APPROVED]
+            assert all(decided_at is not None for _, decided_at in rows)
+            qty = await _quantities(engine)
+            assert qty[(1, 1)] == 100 and qty[(2, 2)] == 100
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_batch_applies_valid_items_and_reports_failures()
+    test_all_or_nothing_and_constant_query_count()
+    test_concurrent_stock_drop_rolls_back_batch()
+    test_concurrent_stock_drop_keeps_stored_records_approved()
@@ -0,0 +1,142 @@
+import datetime
+
+from benchmarks.bench_transfer_matching import build_network, legacy_build, legacy_match
+from models import Inventory, Forecast, RoutePenalty
+from tests.helpers import build_db, count_queries
+from transfer_engine import (
+    generate_transfer_recommendations, load_stores_with_inventory, load_demand_map, load_penalty_map,
+    compute_transfer_recommendations, IncrementalTransferEngine
+)
+
+
+def test_query_count_is_constant():
+    """Motorun sorgu sayısı mağaza/ürün sayısından bağımsız olmalı (N+1 yok)."""
+    counts = []
+    for n_stores, n_products in [(4, 3), (12, 20)]:
+        engine, db = build_db(n_stores, n_products)
+        db.expire_all()
+
+        def run():
+            stores = load_stores_with_inventory(db)
+            return generate_transfer_recommendations(db, stores)
+
+        recs, n_queries = count_queries(engine, run)
+        print(f"{n_stores} mağaza x {n_products} ürün -> {n_queries} sorgu, {len(recs)} öneri")
+        counts.append(n_queries)
+        db.close()
+
+    assert counts[0] == counts[1]
+
+
+def test_optimal_mode_respects_constraints():
+    """mode=optimal: tır kapasitesi, tam sayı miktar ve alıcı ihtiyacı aşılmamalı."""
+    engine, db = build_db(10, 8, seed=7)
+    stores = load_stores_with_inventory(db)
+
+    greedy = generate_transfer_recommendations(db, stores, max_truck_capacity=20)
+    optimal = generate_transfer_recommendations(db, stores, max_truck_capacity=20, mode="optimal")
+    print(f"greedy: {len(greedy)} öneri, optimal: {len(optimal)} öneri")
+
+    assert optimal, "Optimal mod öneri üretmeli"
+    received = {}
+    for rec in optimal:
+        assert 0 < rec["amount"] <= 20
+        assert float(rec["amount"]).is_integer()
+        key = (rec["target"]["id"], rec["product_id"])
+        received[key] = received.get(key, 0) + rec["amount"]
+
+    # Greedy ile aynı ihtiyaç tanımı: (talep + güvenlik stoğu) - stok
+    today = datetime.date.today()
+    for (store_id, product_id), amount in received.items():
+        inv = db.query(Inventory).filter_by(store_id=store_id, product_id=product_id).one()
+        demand = sum(f.predicted_quantity for f in db.query(Forecast).filter_by(store_id=store_id, product_id=product_id)
+                     if today <= f.date <= today + datetime.timedelta(days=7))
+        assert amount <= (demand + inv.safety_stock) - inv.quantity
+
+    # Aynı alıcıya tek tırdan fazla gidebildiği için optimal toplam en az greedy kadar taşır
+    assert sum(r["amount"] for r in optimal) >= sum(r["amount"] for r in greedy)
+    db.close()
+
+
+def test_incremental_matches_full_recompute():
+    """Artımlı motor her değişiklikten sonra tam hesaplamayla aynı listeyi üretmeli."""
+    engine, db = build_db(10, 12, seed=3)
+    incremental = IncrementalTransferEngine()
+
+    def full():
+        db.expire_all()
+        return generate_transfer_recommendations(db, load_stores_with_inventory(db))
+
+    assert incremental.recommendations(db) == full()
+    assert incremental.last_refresh["type"] == "full"
+
+    # 1. Tek envanter kaydı (transfer / POS satışı gibi)
+    item = db.query(Inventory).filter_by(store_id=5, product_id=3).one()
+    item.quantity = 0
+    db.commit()
+    assert incremental.recommendations(db) == full()
+    assert incremental.last_refresh == {"type": "incremental", "products": 1}
+
+    # 2. Tahmin değişimi
+    forecast = db.query(Forecast).filter_by(store_id=7, product_id=4).first()
+    forecast.predicted_quantity += 500
+    db.commit()
+    assert incremental.recommendations(db) == full()
+    assert incremental.last_refresh == {"type": "incremental", "products": 1}
+
+    # 3. Rollback edilen değişiklik yayınlanmamalı
+    item.quantity = 999
+    db.flush()
+    db.rollback()
+    incremental.recommendations(db)
+    assert incremental.last_refresh["type"] == "none"
+
+    # 4. Rota cezası tüm ürünleri etkiler
+    recs = incremental.recommendations(db)
+    db.add(RoutePenalty(source_store_id=recs[0]["source"]["id"], target_store_id=recs[0]["target"]["id"], penalty_score=50))
+    db.commit()
+    assert incremental.recommendations(db) == full()
+
+    # 5. Toplu UPDATE anahtar taşımaz -> tam yenileme
+    db.query(Inventory).filter(Inventory.store_id == 1).update({Inventory.quantity: Inventory.quantity // 2})
+    db.commit()
+    assert incremental.recommendations(db) == full()
+    assert incremental.last_refresh["type"] == "full"
+    db.close()
+
+
+def test_parallel_matches_sequential():
+    """Süreç havuzunda parçalı eşleştirme, sıralı çalıştırmayla aynı listeyi (transfer_id dahil) üretmeli."""
+    engine, db = build_db(10, 15, seed=11)
+    stores = load_stores_with_inventory(db)
+    today = datetime.date.today()
+    demand_map = load_demand_map(db, [s.id for s in stores], today, today + datetime.timedelta(days=7))
+    penalty_map = load_penalty_map(db)
+
+    for mode in ("greedy", "optimal"):
+        sequential = compute_transfer_recommendations(stores, demand_map, penalty_map, mode=mode, time_budget=60, workers=1)
+        parallel = compute_transfer_recommendations(stores, demand_map, penalty_map, mode=mode, time_budget=60, workers=3)
+        print(f"{mode}: {len(sequential)} öneri")
+        assert parallel == sequential
+    db.close()
+
+
+def test_indexed_matcher_matches_legacy_loop():
+    """Ürün indeksli havuzlar, her alıcı için tüm vericileri tarayan eski döngüyle aynı eşleşmeleri vermeli."""
+    for seed in range(12):
+        stores, demand_map, penalty_map = build_network(40, 60, density=0.4, seed=seed)
+        receivers, givers = legacy_build(stores, demand_map)
+        expected = legacy_match(stores, receivers, givers, penalty_map)
+
+        recs = compute_transfer_recommendations(stores, demand_map, penalty_map, workers=1)
+        actual = [(r["source"]["id"], r["target"]["id"], r["product_id"], r["amount"]) for r in recs]
+        assert len(expected) > 50
+        assert actual == expected, f"seed={seed}"
+
+
+if __name__ == "__main__":
+    test_query_count_is_constant()
+    test_optimal_mode_respects_constraints()
+    test_incremental_matches_full_recompute()
+    test_parallel_matches_sequential()
+    test_indexed_matcher_matches_legacy_loop()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+
+from models import Inventory, Transfer, TransferBatch, TransferStatus, RoutePenalty
+from routers.transfers import reject_transfer
+from schemas import RejectionRequest
+from services import transfer_service
+from tests.helpers import build_db
+
+
+def test_run_is_persisted_and_lifecycle_is_tracked():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "runs.db")
+        engine, db = build_db(8, 6, seed=5, url=f"sqlite:///{path}")
+
+        # 1. Çalıştırma saklanır, ikinci çalıştırma ilkini Superseded yapar
+        first = transfer_service.create_recommendation_run(db)
+        second = transfer_service.create_recommendation_run(db)
+        assert first.total_transfers > 2
+        assert db.query(Transfer).filter_by(batch_id=second.id).count() == second.total_transfers
+        assert db.get(TransferBatch, first.id).status == "Superseded"
+        db.close()
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            async with AsyncSession(async_engine, expire_on_commit=False) as adb:
+                latest = await transfer_service.get_batch(adb)
+                assert latest.id == second.id
+
+                pending = await transfer_service.list_batch_transfers(adb, latest.id, TransferStatus.PENDING)
+                assert [t["rank"] for t in pending] == sorted(t["rank"] for t in pending)
+                assert pending[0]["transfer_id"] == f"RUN-{pending[0]['record_id']}"
+
+                # 2. Onay + stok taşıma (Completed)
+                top = pending[0]
+                source_before = (await adb.execute(select(Inventory.quantity).filter_by(
+                    store_id=top["source"]["id"], product_id=top["product_id"]))).scalar()
+                results = await transfer_service.approve_transfers(adb, [top["record_id"], top["record_id"], 999999])
+                assert [r["success"] for r in results] == [True, False, False]
+
+            async with AsyncSession(async_engine, expire_on_commit=False) as adb:
+                row = await adb.get(Transfer, top["record_id"])
+                assert row.status == TransferStatus.COMPLETED and row.completed_at is not None
+                source_after = (await adb.execute(select(Inventory.quantity).filter_by(
+                    store_id=top["source"]["id"], product_id=top["product_id"]))).scalar()
+                assert source_after == source_before - top["amount"]
+
+                # 3. Red: satır Rejected, rota cezası artar; tekrar onaylanamaz
+                other = await adb.get(Transfer, pending[1]["record_id"])
+                penalty = await transfer_service.reject_transfer_record(adb, other, "COST")
+                assert penalty.penalty_score >= 1
+                results = await transfer_service.approve_transfers(adb, [other.id])
+                assert not results[0]["success"]
+
+                # 4. Canlı önizleme kimliği (TRF-<n>) aynı numaralı kayıtlı satırı reddetmez
+                third = pending[2]
+                request = RejectionRequest(transfer_id=f"TRF-{third['record_id']}", source_store_id=third["source"]["id"],
+                                           target_store_id=third["target"]["id"], product_id=third["product_id"], reason="COST")
+                await reject_transfer(request, adb)
+                assert (await adb.execute(select(Transfer.status).filter_by(id=third["record_id"]))).scalar() == TransferStatus.PENDING
+                await reject_transfer(request.model_copy(update={"transfer_id": third["transfer_id"]}), adb)
+
+            async with AsyncSession(async_engine) as adb:
+                assert (await adb.get(Transfer, pending[1]["record_id"])).status == TransferStatus.REJECTED
+                assert (await adb.get(Transfer, pending[2]["record_id"])).status == TransferStatus.REJECTED
+                assert (await adb.execute(select(RoutePenalty))).scalars().first() is not None
+            await async_engine.dispose()
+
+        asyncio.run(run())
+        engine.dispose()
+
+
+def test_fractional_amounts_are_rounded_once(monkeypatch):
+    engine, db = build_db(4, 2, seed=3)
+    recs = [
+        {"source": {"id": 1}, "target": {"id": 2}, "product_id": 1, "amount": amount,
+         "algorithm": "test", "xai_explanation": {"score": 1.0}}
+        for amount in (2.6, 0.4, 3.5)
+    ]
+    monkeypatch.setattr(transfer_service, "generate_transfer_recommendations", lambda *args, **kwargs: recs)
+
+    batch = transfer_service.create_recommendation_run(db)
+    amounts = [t.amount for t in db.query(Transfer).filter_by(batch_id=batch.id).order_by(Transfer.rank)]
+    # 0.4 -> 0 saklanmaz; toplam satırlarla aynı yuvarlamadan gelir
+    assert amounts == [3, 4]
+    assert batch.total_transfers == 2 and batch.total_units == sum(amounts)
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    test_run_is_persisted_and_lifecycle_is_tracked()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from analysis_engine import expand_what_if_grid, simulate_what_if, simulate_what_if_batch
+from models import Inventory
+from tests.helpers import build_db, count_queries
+
+
+def test_batch_matches_single_what_if():
+    """Toplu sonuç, senaryo başına simulate_what_if ile aynı olmalı; sorgu sayısı sabit kalmalı."""
+    engine, db = build_db(4, 3)
+    db.query(Inventory).filter_by(store_id=4, product_id=3).delete() # Eksik envanter senaryosu
+    db.commit()
+
+    scenarios = expand_what_if_grid([1, 2, 4], [1, 3, 4], [1, 3], [5, 50, 400])
+    assert len(scenarios) == (3 * 3 - 2) * 2 * 3 # Kaynak = hedef kombinasyonları atlanır
+    assert not np.any(scenarios[:, 0] == scenarios[:, 1])
+
+    result, queries = count_queries(engine, lambda: simulate_what_if_batch(db, scenarios))
+    assert queries == 2 # Envanter + fiyat; senaryo sayısından bağımsız
+    columns = result["results"]
+    assert result["scenarios"] == len(scenarios)
+    assert result["summary"]["not_found"] > 0
+    assert sum(result["summary"][k] for k in ("approved", "rejected", "not_found")) == len(scenarios)
+
+    for i, (source, target, product_id, amount) in enumerate(scenarios.tolist()):
+        single = simulate_what_if(db, source, target, product_id, amount)
+        if "error" in single:
+            assert columns["recommendation"][i] == "ENVANTER_YOK"
+            assert columns["source_stock_after"][i] is None
+            continue
+        assert columns["recommendation"][i] == single["recommendation"]
+        assert columns["source_stock_after"][i] == single["source_store_impact"]["stock_after"]
+        assert columns["source_risk"][i] == single["source_store_impact"]["risk_assessment"]
+        assert columns["target_stock_after"][i] == single["target_store_impact"]["stock_after"]
+        assert columns["potential_revenue_increase"][i] == single["target_store_impact"]["potential_revenue_increase"]
+
+    empty = simulate_what_if_batch(db, np.empty((0, 4), dtype=np.int64))
+    assert empty["scenarios"] == 0 and empty["results"]["recommendation"] == []
+    db.close()
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_what_if()
+    print("✅ Toplu what-if testleri geçti")
@@ -1,222 +1,889 @@
-from models import Store, StoreType, Forecast
-from risk_engine import analyze_store_risk
-from typing import List, Dict
-import math
-from sqlalchemy.orm import Session
+from models import Store, StoreType, Forecast, Inventory, RoutePenalty, Product
+from core.config import settings
+from core.logger import logger
+from geo_engine import get_distance_matrix, DistanceMatrix
+from typing import List, Dict, Tuple, Optional
+from collections import defaultdict, namedtuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from datetime import date, timedelta
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import change_tracker
 
-def calculate_distance(lat1, lon1, lat2, lon2):
+try:
+    # Global optimizasyon (mode=optimal) için LP çözücü (HiGHS)
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+except ImportError:
+    linprog = None
+
+# SQLite'ın bind parametre limitine (999) takılmamak için IN listesi parça boyutu
+DEMAND_QUERY_CHUNK_SIZE = 500
+
+# Hiyerarşi Kuralı: Önce HUB, sonra CENTER, en son STORE
+SEARCH_ORDER = [StoreType.HUB, StoreType.CENTER, StoreType.STORE]
+
+ALGORITHM_NAME = "Robin Hood AI v2.2 (Bulk Optimized)"
+OPTIMAL_ALGORITHM_NAME = "Robin Hood AI v3.0 (Min-Cost Flow)"
+
+TRANSFER_MODES = ("greedy", "optimal")
+
+# --- Optimal Mod Ağırlıkları ---
+# Hiyerarşi kuralını akış modelinde korumak için kaynak türüne göre birim bonus:
+# Herhangi bir HUB birimi her zaman CENTER biriminden, CENTER da STORE biriminden değerlidir.
+TIER_BONUS = {StoreType.HUB: 2000.0, StoreType.CENTER: 1000.0, StoreType.STORE: 0.0}
+ABC_A_BONUS = 100.0 # Açgözlü moddaki "A grubu önce" kuralının karşılığı
+OPTIMAL_CANDIDATES_PER_RECEIVER = 25 # Alıcı başına en iyi K kaynak (kenar sayısını sınırlar)
+
+# Paralel modda worker başına parça sayısı (dengesiz ürünlerde yük dağılımı için)
+SHARDS_PER_WORKER = 4
+
+def load_stores_with_inventory(db: Session) -> List[Store]:
     """
-    Haversine Formülü: Küresel yüzey üzerindeki iki nokta arasındaki en kısa mesafeyi hesaplar.
-    
-    Matematiksel Formül:
-    a = sin²(Δlat/2) + cos(lat1) * cos(lat2) * sin²(Δlon/2)
-    c = 2 * atan2(√a, √(1-a))
-    d = R * c
-    
-    R: Dünya Yarıçapı (Ortalama 6371 km)
+    Mağazaları envanter ve ürün bilgileriyle birlikte tek geçişte (Eager Load) çeker.
+
+    selectinload, mağaza sayısından bağımsız olarak sabit sayıda sorgu üretir
+    (Store + Inventory + Product). Böylece motor içinde `store.inventory` ve
+    `item.product` erişimleri veritabanına tekrar gitmez.
     """
-    R = 6371 # Dünya yarıçapı (km)
-    dLat = math.radians(lat2 - lat1)
-    dLon = math.radians(lon2 - lon1)
-    a = math.sin(dLat/2) * math.sin(dLat/2) + \
-        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
-        math.sin(dLon/2) * math.sin(dLon/2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
+    return db.query(Store).options(
+        selectinload(Store.inventory).selectinload(Inventory.product)
+    ).all()
 
-def generate_transfer_recommendations(db: Session, stores: List[Store], max_truck_capacity: int = 50) -> List[Dict]:
+def load_demand_map(db: Session, store_ids: List[int], start: date, end: date) -> Dict[Tuple[int, int], float]:
     """
-    Robin Hood Algoritması (Proaktif Stok Dengeleme):
-    Zenginden (Stok Fazlası Olan) alıp, fakire (Stok İhtiyacı Olan) verme prensibi.
-    
-    Adımlar:
-    1. Talep Tahmini Analizi (Gelecek 7 gün ne satacak?)
-    2. Eksik (Shortage) ve Fazla (Excess) tespiti.
-    3. Maliyet Fonksiyonu (Cost Function) ile en uygun transfer eşlemesi.
+    Talep Ön Yükleme (Demand Preload):
+    Verilen tarih aralığındaki tahminleri (store_id, product_id) bazında
+    GROUP BY ile toplayıp RAM'e alır.
+
+    Eski yöntem: Her (mağaza, ürün) çifti için ayrı Forecast sorgusu (N x M sorgu).
+    Yeni yöntem: Mağaza listesi parçaları başına tek gruplanmış sorgu.
+    """
+    demand_map = {}
+    for i in range(0, len(store_ids), DEMAND_QUERY_CHUNK_SIZE):
+        chunk = store_ids[i:i + DEMAND_QUERY_CHUNK_SIZE]
+        rows = db.query(
+            Forecast.store_id,
+            Forecast.product_id,
+            func.sum(Forecast.predicted_quantity)
+        ).filter(
+            Forecast.store_id.in_(chunk),
+            Forecast.date >= start,
+            Forecast.date <= end
+        ).group_by(Forecast.store_id, Forecast.product_id).all()
+
+        for store_id, product_id, total in rows:
+            demand_map[(store_id, product_id)] = total or 0
+
+    return demand_map
+
+def _keys_by_product(keys) -> Tuple[List[int], List[int]]:
+    return sorted({product_id for _, product_id in keys}), sorted({store_id for store_id, _ in keys})
+
+def load_inventory_rows(db: Session, keys) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """
+    Sadece verilen (store_id, product_id) kayıtlarının stok bilgisini okur (artımlı mod).
+    Ürün listesi parçalar halinde sorgulanır; istenmeyen çiftler RAM'de elenir.
+    """
+    product_ids, store_ids = _keys_by_product(keys)
+    rows = {}
+    for i in range(0, len(product_ids), DEMAND_QUERY_CHUNK_SIZE):
+        chunk = product_ids[i:i + DEMAND_QUERY_CHUNK_SIZE]
+        result = db.query(
+            Inventory.store_id, Inventory.product_id, Inventory.quantity, Inventory.safety_stock
+        ).filter(Inventory.product_id.in_(chunk), Inventory.store_id.in_(store_ids)).all()
+        for store_id, product_id, quantity, safety_stock in result:
+            if (store_id, product_id) in keys:
+                rows[(store_id, product_id)] = (quantity, safety_stock)
+    return rows
+
+def load_demand_for_keys(db: Session, keys, start: date, end: date) -> Dict[Tuple[int, int], float]:
+    """load_demand_map'in artımlı karşılığı: sadece verilen çiftlerin talebini toplar."""
+    product_ids, store_ids = _keys_by_product(keys)
+    demand = {}
+    for i in range(0, len(product_ids), DEMAND_QUERY_CHUNK_SIZE):
+        chunk = product_ids[i:i + DEMAND_QUERY_CHUNK_SIZE]
+        rows = db.query(
+            Forecast.store_id,
+            Forecast.product_id,
+            func.sum(Forecast.predicted_quantity)
+        ).filter(
+            Forecast.product_id.in_(chunk),
+            Forecast.store_id.in_(store_ids),
+            Forecast.date >= start,
+            Forecast.date <= end
+        ).group_by(Forecast.store_id, Forecast.product_id).all()
+        for store_id, product_id, total in rows:
+            if (store_id, product_id) in keys:
+                demand[(store_id, product_id)] = total or 0
+    return demand
+
+def load_penalty_map(db: Session) -> Dict[Tuple[int, int], float]:
+    """
+    [OPTIMIZASYON] Ceza Puanlarını Toplu Çek (Memory Cache)
+    N+1 Problemini çözer: Döngü içinde her defasında DB'ye gitmek yerine
+    tek seferde tüm ceza tablosunu çekip RAM'e alıyoruz.
+    """
+    rows = db.query(RoutePenalty.source_store_id, RoutePenalty.target_store_id, RoutePenalty.penalty_score).all()
+    return {(source_id, target_id): score for source_id, target_id, score in rows}
+
+class GiverPool:
+    """
+    Verici Havuzu: Tek bir (store_type, product_id) için fazla stoğu olan mağazalar.
+
+    Eşleştirme sırasında sadece ilgili ürünü stoklayan vericiler taranır.
+    `excess` dizisi tüketildikçe yerinde (in-place) güncellenir; tükenen
+    kayıtlar havuzun yarısını geçince havuz sıkıştırılır (compact).
+    """
+    __slots__ = ("store_type", "product_id", "store_ids", "store_idx", "excess", "active")
+
+    def __init__(self, store_type: StoreType, product_id: int):
+        self.store_type = store_type
+        self.product_id = product_id
+        self.store_ids = []
+        self.store_idx = []
+        self.excess = []
+        self.active = 0
+
+    def add(self, store_id: int, store_idx: int, excess: float):
+        self.store_ids.append(store_id)
+        self.store_idx.append(store_idx)
+        self.excess.append(excess)
+
+    def finalize(self):
+        """Python listelerini vektörize skor hesabı için NumPy dizilerine çevirir."""
+        self.store_ids = np.asarray(self.store_ids, dtype=np.int64)
+        self.store_idx = np.asarray(self.store_idx, dtype=np.int64)
+        self.excess = np.asarray(self.excess, dtype=float)
+        self.active = int(np.count_nonzero(self.excess > 0))
+
+    def consume(self, position: int, amount: float):
+        """Vericinin fazlasını sanal olarak düşür (aynı turda başkasına vermesin)."""
+        self.excess[position] -= amount
+        if self.excess[position] <= 0:
+            self.active -= 1
+            if self.active * 2 < len(self.excess):
+                self.compact()
+
+    def compact(self):
+        keep = self.excess > 0
+        self.store_ids = self.store_ids[keep]
+        self.store_idx = self.store_idx[keep]
+        self.excess = self.excess[keep]
+
+def classify_item(store_id: int, store_idx: int, store_type: StoreType, product_id: int, quantity: int,
+                  safety_stock: int, total_predicted_demand: float, abc_category: str,
+                  receivers: List[Dict], pools: Dict[Tuple[StoreType, int], "GiverPool"]):
+    """
+    Tek bir (mağaza, ürün) kaydını alıcı / verici olarak sınıflandırır.
+    Tam hesaplama (build_pools) ve artımlı motor aynı kuralı kullanır.
+    """
+    # Alıcı mı? (Receiver Detection)
+    # Formül: Mevcut Stok < (Tahminlenen Talep + Güvenlik Stoğu)
+    if quantity < (total_predicted_demand + safety_stock):
+        shortage = (total_predicted_demand + safety_stock) - quantity
+
+        # Aciliyet Skoru (Urgency Metric):
+        # Stok 0 ise aciliyet maksimumdur (1.0).
+        # Değilse, talebin kaçta kaçını karşıladığına göre lineer artar.
+        urgency_score = 1.0 if quantity == 0 else (total_predicted_demand / quantity if quantity > 0 else 1.0)
+
+        receivers.append({
+            "store_id": store_id,
+            "store_idx": store_idx,
+            "product_id": product_id,
+            "shortage": shortage,
+            "priority": min(urgency_score, 1.0),
+            "current_stock": quantity,
+            "safety_stock": safety_stock,
+            "predicted_demand": total_predicted_demand,
+            "abc_category": abc_category
+        })
+
+    # Verici mi? (Gelecek hafta talebinden ve güvenlik stoğundan fazlası varsa)
+    elif quantity > (total_predicted_demand + safety_stock):
+        excess = quantity - (total_predicted_demand + safety_stock)
+
+        # Mağazalar için daha sıkı kural (Sadece %50 fazlasını verebilir)
+        if store_type == StoreType.STORE:
+            excess = int(excess * 0.5)
+
+        if excess > 0:
+            key = (store_type, product_id)
+            pool = pools.get(key)
+            if pool is None:
+                pool = pools[key] = GiverPool(store_type, product_id)
+            pool.add(store_id, store_idx, excess)
+
+def build_pools(stores: List[Store], demand_map: Dict[Tuple[int, int], float], distance_matrix: DistanceMatrix):
+    """
+    1. Havuzları Doldur (Tahmin Odaklı Analiz)
+
+    Dönüş:
+    - receivers: İhtiyacı olan (store, product) kayıtları (ORM nesnesi içermez)
+    - pools: (store_type, product_id) -> GiverPool
+    - products: product_id -> Product (rapor/XAI için)
     """
-    
-    recommendations = []
-    transfer_id_counter = 100
-    today = date.today()
-    next_week = today + timedelta(days=7)
-    
-    # Envanteri analiz et
-    # İhtiyacı olanlar (Receivers) ve Fazlası olanlar (Givers)
     receivers = []
-    givers = {StoreType.HUB: [], StoreType.CENTER: [], StoreType.STORE: []}
-    
-    # 1. Havuzları Doldur (Tahmin Odaklı Analiz)
+    pools: Dict[Tuple[StoreType, int], GiverPool] = {}
+    products = {}
+
     for store in stores:
+        store_idx = distance_matrix.index[store.id]
         for item in store.inventory:
-            # GELECEK TALEBİ ÇEK (Önümüzdeki 7 gün)
-            future_demand = db.query(Forecast).filter(
-                Forecast.store_id == store.id,
-                Forecast.product_id == item.product_id,
-                Forecast.date >= today,
-                Forecast.date <= next_week
-            ).with_entities(Forecast.predicted_quantity).all()
-            
-            total_predicted_demand = sum([f[0] for f in future_demand])
-            
-            # Alıcı mı? (Receiver Detection)
-            # Formül: Mevcut Stok < (Tahminlenen Talep + Güvenlik Stoğu)
-            if item.quantity < (total_predicted_demand + item.safety_stock):
-                shortage = (total_predicted_demand + item.safety_stock) - item.quantity
-                
-                # Aciliyet Skoru (Urgency Metric):
-                # Stok 0 ise aciliyet maksimumdur (1.0).
-                # Değilse, talebin kaçta kaçını karşıladığına göre lineer artar.
-                urgency_score = 1.0 if item.quantity == 0 else (total_predicted_demand / item.quantity if item.quantity > 0 else 1.0)
-                
-                receivers.append({
-                    "store": store,
-                    "product": item.product,
-                    "shortage": shortage,
-                    "priority": min(urgency_score, 1.0),
-                    "current_stock": item.quantity,
-                    "safety_stock": item.safety_stock,
-                    "predicted_demand": total_predicted_demand,
-                    "abc_category": item.product.abc_category
-                })
-            
-            # Verici mi? (Gelecek hafta talebinden ve güvenlik stoğundan fazlası varsa)
-            elif item.quantity > (total_predicted_demand + item.safety_stock):
-                excess = item.quantity - (total_predicted_demand + item.safety_stock)
-                
-                # Mağazalar için daha sıkı kural (Sadece %50 fazlasını verebilir)
-                if store.store_type == StoreType.STORE:
-                    excess = int(excess * 0.5)
-
-                if excess > 0:
-                    givers[store.store_type].append({
-                        "store": store,
-                        "product_id": item.product_id,
-                        "excess": excess,
-                        "current_stock": item.quantity
-                    })
-
-    # 2. Önceliğe Göre Sırala (ABC Kategorisi A olanlar ve Urgency Score yüksek olanlar önce)
-    receivers.sort(key=lambda x: (x["abc_category"] == 'A', x["priority"]), reverse=True)
-    
-    # 3. Eşleştirme Algoritması
-    
-    # [OPTIMIZASYON] Ceza Puanlarını Toplu Çek (Memory Cache)
-    # N+1 Problemini çözer: Döngü içinde her defasında DB'ye gitmek yerine
-    # tek seferde tüm ceza tablosunu çekip RAM'e alıyoruz.
-    from models import RoutePenalty
-    all_penalties = db.query(RoutePenalty).all()
-    penalty_map = {}
-    for p in all_penalties:
-        penalty_map[(p.source_store_id, p.target_store_id)] = p.penalty_score
+            products[item.product_id] = item.product
+
+            # GELECEK TALEBİ OKU (Önümüzdeki 7 gün) - RAM'den
+            total_predicted_demand = demand_map.get((store.id, item.product_id), 0)
+            classify_item(store.id, store_idx, store.store_type, item.product_id, item.quantity, item.safety_stock,
+                          total_predicted_demand, item.product.abc_category, receivers, pools)
+
+    for pool in pools.values():
+        pool.finalize()
+
+    return receivers, pools, products
+
+def receiver_sort_key(receiver: Dict):
+    """
+    2. Önceliğe Göre Sıralama Anahtarı
+    ABC Kategorisi A olanlar ve Urgency Score yüksek olanlar önce.
+    Eşitlikte (store_id, product_id) sırası kullanılır (deterministik).
+    """
+    return (receiver["abc_category"] != 'A', -receiver["priority"], receiver["store_id"], receiver["product_id"])
+
+def rank_receivers(receivers: List[Dict]) -> List[Dict]:
+    """Alıcıları önceliğe göre sıralar ve global sıra numarasını (rank) yazar."""
+    receivers.sort(key=receiver_sort_key)
+    for rank, receiver in enumerate(receivers):
+        receiver["rank"] = rank
+    return receivers
+
+def group_by_product(receivers: List[Dict]) -> Dict[int, List[Dict]]:
+    """Sıralı alıcıları ürün bazında gruplar (grup içi sıra korunur)."""
+    grouped = defaultdict(list)
+    for receiver in receivers:
+        grouped[receiver["product_id"]].append(receiver)
+    return grouped
+
+class PenaltyIndex:
+    """
+    Rota Ceza Puanları: Hedef mağaza başına, mesafe matrisi indeksine göre
+    yoğun (dense) ceza satırı. Sadece cezası olan hedefler için satır tutulur.
+    """
+    def __init__(self, penalty_map: Dict[Tuple[int, int], float], distance_matrix: DistanceMatrix):
+        n = len(distance_matrix.store_ids)
+        self.zeros = np.zeros(n)
+        self.rows: Dict[int, np.ndarray] = {}
+        for (source_id, target_id), score in penalty_map.items():
+            if source_id not in distance_matrix.index or target_id not in distance_matrix.index:
+                continue
+            row = self.rows.get(target_id)
+            if row is None:
+                row = self.rows[target_id] = np.zeros(n)
+            row[distance_matrix.index[source_id]] = score
+
+    def row(self, target_store_id: int) -> np.ndarray:
+        return self.rows.get(target_store_id, self.zeros)
+
+def match_product_greedy(receivers: List[Dict], pools: Dict[Tuple[StoreType, int], GiverPool],
+                         distances: np.ndarray, penalties: PenaltyIndex, max_truck_capacity: int) -> List[Dict]:
+    """
+    3. Eşleştirme Algoritması (Tek Ürün, Açgözlü)
+
+    Ürünler birbirini etkilemez (fazla stok ürün bazında takip edilir), bu yüzden
+    her ürün kendi alıcı listesi ve verici havuzlarıyla bağımsız eşleştirilir.
+    Bir alıcı için maliyet: O(ilgili ürünü stoklayan verici sayısı), vektörize.
+    """
+    matches = []
+    if not receivers:
+        return matches
+    product_id = receivers[0]["product_id"]
+    product_pools = [(source_type, pools.get((source_type, product_id))) for source_type in SEARCH_ORDER]
 
     for req in receivers:
-        needed_product_id = req["product"].id
-        amount_needed = req["shortage"]
-        
+        distance_row = distances[req["store_idx"]]
+        penalty_row = penalties.row(req["store_id"])
+
         # SIRA 1: HUB Kontrolü
         # SIRA 2: CENTER Kontrolü
         # SIRA 3: STORE Kontrolü
-        
-        search_order = [StoreType.HUB, StoreType.CENTER, StoreType.STORE]
-        best_source = None
-        min_dist = float('inf')
-        best_score = -float('inf')
-        
-        for source_type in search_order:
-            potential_givers = [g for g in givers[source_type] if g["product_id"] == needed_product_id and g["excess"] > 0]
-            
-            if not potential_givers:
+        for source_type, pool in product_pools:
+            if pool is None or pool.active == 0:
                 continue # Bu türde kaynak yok, bir sonrakine bak
-                
-            # Bu türdeki en uygun (en optimize) kaynağı bul
-            for giver in potential_givers:
-                dist = calculate_distance(req["store"].lat, req["store"].lon, giver["store"].lat, giver["store"].lon)
-                
-                # --- ROBIN HOOD SKORU (Optimizasyon Fonksiyonu) ---
-                # Amaç: Lojistik maliyeti en aza indirirken, stok riskini en çok azaltan hamleyi bulmak.
-                # Skor Fonksiyonu: F(x) = (Aciliyet * w1) - (Mesafe * w2) - (Ceza * w3)
-                
-                logistics_cost = dist * 2.5 # km başına 2.5 TL birim maliyet
-                
-                # Merkez/Hub ise mesafeyi biraz daha tolere et (Daha büyük araçları var)
-                dist_penalty = dist if source_type == StoreType.STORE else dist * 0.7 
-                
-                # Ceza Puanını RAM'den Oku (Hızlı)
-                penalty_score = penalty_map.get((giver["store"].id, req["store"].id), 0.0)
-                
-                # Skor Hesaplama (Ceza puanı skoru düşürür)
-                score = (req["priority"] * 100) - (dist_penalty * 0.5) - (penalty_score * 5.0)
-                
-                if score > best_score:
-                    best_score = score
-                    min_dist = dist
-                    best_source = giver
-            
-            if best_source:
-                # Kaynak bulundu! Döngüyü kır (Hiyerarşi kuralı: Hub varsa Store'a bakma)
-                break 
-        
-        if best_source:
+
+            # Mesafe matristen indeksle okunur (her çağrıda trigonometri yok)
+            dist = distance_row[pool.store_idx]
+
+            # --- ROBIN HOOD SKORU (Optimizasyon Fonksiyonu) ---
+            # Amaç: Lojistik maliyeti en aza indirirken, stok riskini en çok azaltan hamleyi bulmak.
+            # Skor Fonksiyonu: F(x) = (Aciliyet * w1) - (Mesafe * w2) - (Ceza * w3)
+
+            # Merkez/Hub ise mesafeyi biraz daha tolere et (Daha büyük araçları var)
+            dist_penalty = dist if source_type == StoreType.STORE else dist * 0.7
+
+            # Ceza Puanını RAM'den Oku (Hızlı)
+            penalty_score = penalty_row[pool.store_idx]
+
+            # Skor Hesaplama (Ceza puanı skoru düşürür)
+            scores = (req["priority"] * 100) - (dist_penalty * 0.5) - (penalty_score * 5.0)
+
+            # Tükenmiş vericiler ve hesaplanamayan (koordinatsız) mesafeler elenir
+            scores = np.where((pool.excess > 0) & ~np.isnan(scores), scores, -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] == -np.inf:
+                continue
+
             # Transfer miktarını belirle (Aracın kapasitesini aşamaz)
-            transfer_amount = min(amount_needed, best_source["excess"], max_truck_capacity)
-            
-            # Kaynağın stoğunu sanal olarak düşür (aynı döngüde başkasına vermesin)
-            best_source["excess"] -= transfer_amount
-            
-            source_store = best_source["store"]
-            target_store = req["store"]
-            product_name = req["product"].name
-            
-            # --- XAI (Açıklanabilir Yapay Zeka - Explainable AI) ---
-            # "Black Box" (Kara Kutu) model olmamak için, sistemin neden bu kararı verdiği
-            # son kullanıcıya doğal dilde raporlanır.
-            explanations = []
-            
-            # Neden Hedef Seçildi?
-            stockout_risk_reduction = min(100, round((transfer_amount / req["predicted_demand"]) * 100)) if req["predicted_demand"] > 0 else 100
-            
-            explanations.append(f"Risk Analizi: Stok tükenme riski %{stockout_risk_reduction} oranında azaltıldı.")
-            explanations.append(f"Talep Tahmini: Önümüzdeki 7 gün için {req['predicted_demand']} adet ihtiyaç var.")
-            
-            # Neden Kaynak Seçildi?
-            if source_store.store_type == StoreType.HUB:
-                explanations.append(f"Lojistik Stratejisi: En verimli kaynak (HUB) kullanıldı.")
-            else:
-                 explanations.append(f"Lojistik Stratejisi: En yakın ve stoğu bol mağaza ({source_store.name}) seçildi.")
-
-            # ABC Önceliği
-            if req['abc_category'] == 'A':
-                explanations.append(f"Finansal Etki: A Grubu (Yüksek Ciro) ürün önceliklendirildi.")
-            
-            # Maliyet/Lojistik
-            estimated_cost = min_dist * 4.5 # km başına 4.5 TL (Örnek)
-            explanations.append(f"Lojistik Maliyet: ₺{estimated_cost:,.0f} (Mesafe: {min_dist:.1f} km).")
-            
-            rec = {
-                "transfer_id": f"TRF-{transfer_id_counter}",
-                "source": {
-                    "id": source_store.id,
-                    "name": source_store.name,
-                    "type": source_store.store_type.value
-                },
-                "target": {
-                    "id": target_store.id,
-                    "name": target_store.name,
-                    "type": target_store.store_type.value
-                },
-                "product_id": req["product"].id,
-                "product": product_name, 
+            transfer_amount = min(req["shortage"], pool.excess[best].item(), max_truck_capacity)
+            matches.append({
+                "receiver": req,
+                "source_store_id": int(pool.store_ids[best]),
                 "amount": transfer_amount,
-                "xai_explanation": { # Frontend'de kart olarak gösterilecek
-                    "summary": f"Stok Riski %{stockout_risk_reduction} Azaltıldı | Maliyet: ₺{estimated_cost:,.0f}",
-                    "reasons": explanations,
-                    "score": round(max(0, best_score)), # Skor negatif olmasın
-                    "type": "PROACTIVE" # Frontend için tip belirteci
-                },
-                "algorithm": "Robin Hood AI v2.2 (Bulk Optimized)"
-            }
-            recommendations.append(rec)
-            transfer_id_counter += 1
-
-    return recommendations
+                "score": float(scores[best]),
+                "distance": float(dist[best])
+            })
+            pool.consume(best, transfer_amount)
+
+            # Kaynak bulundu! Döngüyü kır (Hiyerarşi kuralı: Hub varsa Store'a bakma)
+            break
+
+    return matches
+
+def match_product_optimal(receivers: List[Dict], pools: Dict[Tuple[StoreType, int], GiverPool],
+                          distances: np.ndarray, penalties: PenaltyIndex, max_truck_capacity: int,
+                          time_limit: float) -> Optional[List[Dict]]:
+    """
+    3b. Global Eşleştirme (Tek Ürün, Min-Cost Flow)
+
+    Ürünün dengelenmesi bir ulaştırma (min-cost flow) problemi olarak çözülür:
+        max  Σ f(g,r) * [Skor(g,r) + Hiyerarşi Bonusu(g) + ABC Bonusu(r)]
+        s.t. Σ_r f(g,r) <= Fazla(g),  Σ_g f(g,r) <= İhtiyaç(r),  0 <= f(g,r) <= Tır Kapasitesi
+    Skor terimleri açgözlü modla aynıdır (aciliyet, dist_penalty, RoutePenalty).
+    Kısıt matrisi tam tek-modüler olduğu için LP çözümü tam sayıdır.
+
+    Çözülemezse (süre aşımı vb.) None döner; çağıran açgözlü moda düşer.
+    """
+    product_id = receivers[0]["product_id"]
+
+    # Vericiler (Tüm türler tek dizide)
+    giver_parts = []
+    for source_type in SEARCH_ORDER:
+        pool = pools.get((source_type, product_id))
+        if pool is None or pool.active == 0:
+            continue
+        positions = np.flatnonzero(pool.excess > 0)
+        giver_parts.append((source_type, pool, positions))
+    if not giver_parts:
+        return []
+
+    g_store_ids = np.concatenate([pool.store_ids[pos] for _, pool, pos in giver_parts])
+    g_idx = np.concatenate([pool.store_idx[pos] for _, pool, pos in giver_parts])
+    g_excess = np.floor(np.concatenate([pool.excess[pos] for _, pool, pos in giver_parts]))
+    g_is_store = np.concatenate([np.full(len(pos), source_type == StoreType.STORE) for source_type, _, pos in giver_parts])
+    g_bonus = np.concatenate([np.full(len(pos), TIER_BONUS[source_type]) for source_type, _, pos in giver_parts])
+
+    # Alıcılar
+    r_ids = [req["store_id"] for req in receivers]
+    r_idx = np.array([req["store_idx"] for req in receivers], dtype=np.int64)
+    r_shortage = np.floor(np.array([req["shortage"] for req in receivers], dtype=float))
+    r_priority = np.array([req["priority"] for req in receivers], dtype=float)
+    r_bonus = np.array([ABC_A_BONUS if req["abc_category"] == 'A' else 0.0 for req in receivers])
+
+    # --- Skor Matrisi (Verici x Alıcı), vektörize ---
+    dist = distances[np.ix_(g_idx, r_idx)]
+    dist_penalty = np.where(g_is_store[:, None], dist, dist * 0.7)
+    penalty_score = np.stack([penalties.row(rid)[g_idx] for rid in r_ids], axis=1)
+    scores = (r_priority[None, :] * 100) - (dist_penalty * 0.5) - (penalty_score * 5.0)
+    values = scores + g_bonus[:, None] + r_bonus[None, :]
+
+    valid = ~np.isnan(values) & (g_excess > 0)[:, None] & (r_shortage > 0)[None, :]
+
+    # Büyük havuzlarda her alıcı için sadece en değerli K kaynağı aday yap
+    if len(g_idx) > OPTIMAL_CANDIDATES_PER_RECEIVER:
+        masked = np.where(valid, values, -np.inf)
+        top = np.argpartition(-masked, OPTIMAL_CANDIDATES_PER_RECEIVER - 1, axis=0)[:OPTIMAL_CANDIDATES_PER_RECEIVER]
+        keep = np.zeros_like(valid)
+        keep[top, np.arange(len(r_idx))[None, :]] = True
+        valid &= keep
+
+    gi, ri = np.nonzero(valid)
+    if len(gi) == 0:
+        return []
+
+    n_givers, n_edges = len(g_idx), len(gi)
+    edges = np.arange(n_edges)
+    constraints = coo_matrix(
+        (np.ones(2 * n_edges), (np.concatenate([gi, n_givers + ri]), np.concatenate([edges, edges]))),
+        shape=(n_givers + len(r_idx), n_edges)
+    ).tocsr()
+
+    result = linprog(
+        -values[gi, ri], # linprog minimize eder
+        A_ub=constraints,
+        b_ub=np.concatenate([g_excess, r_shortage]),
+        bounds=(0, max_truck_capacity),
+        method="highs",
+        options={"time_limit": max(time_limit, 0.01)}
+    )
+    if result.status != 0:
+        return None
+
+    flows = np.rint(result.x)
+    used = np.flatnonzero(flows > 0)
+    # Aynı alıcıya birden fazla kaynak gidebilir: önce en değerli kaynak
+    used = used[np.lexsort((-values[gi[used], ri[used]], ri[used]))]
+
+    # Giver offsetleri: birleşik dizideki indeks -> (havuz, havuz içi pozisyon)
+    owners = [(pool, pos) for _, pool, positions in giver_parts for pos in positions]
+
+    matches = []
+    for edge in used:
+        g, r = gi[edge], ri[edge]
+        amount = float(flows[edge])
+        pool, position = owners[g]
+        pool.excess[position] -= amount
+        matches.append({
+            "receiver": receivers[r],
+            "source_store_id": int(g_store_ids[g]),
+            "amount": amount,
+            "score": float(scores[g, r]),
+            "distance": float(dist[g, r]),
+            "algorithm": OPTIMAL_ALGORITHM_NAME
+        })
+    for _, pool, _ in giver_parts:
+        pool.active = int(np.count_nonzero(pool.excess > 0))
+
+    return matches
+
+def build_recommendation(match: Dict, transfer_no: int, stores_by_id: Dict[int, Store], products: Dict) -> Dict:
+    """Eşleşmeyi XAI açıklamalı öneri sözlüğüne dönüştürür."""
+    req = match["receiver"]
+    transfer_amount = match["amount"]
+    min_dist = match["distance"]
+    source_store = stores_by_id[match["source_store_id"]]
+    target_store = stores_by_id[req["store_id"]]
+    product_name = products[req["product_id"]].name
+
+    # --- XAI (Açıklanabilir Yapay Zeka - Explainable AI) ---
+    # "Black Box" (Kara Kutu) model olmamak için, sistemin neden bu kararı verdiği
+    # son kullanıcıya doğal dilde raporlanır.
+    explanations = []
+
+    # Neden Hedef Seçildi?
+    stockout_risk_reduction = min(100, round((transfer_amount / req["predicted_demand"]) * 100)) if req["predicted_demand"] > 0 else 100
+
+    explanations.append(f"Risk Analizi: Stok tükenme riski %{stockout_risk_reduction} oranında azaltıldı.")
+    explanations.append(f"Talep Tahmini: Önümüzdeki 7 gün için {req['predicted_demand']} adet ihtiyaç var.")
+
+    # Neden Kaynak Seçildi?
+    if source_store.store_type == StoreType.HUB:
+        explanations.append(f"Lojistik Stratejisi: En verimli kaynak (HUB) kullanıldı.")
+    else:
+         explanations.append(f"Lojistik Stratejisi: En yakın ve stoğu bol mağaza ({source_store.name}) seçildi.")
+
+    # ABC Önceliği
+    if req['abc_category'] == 'A':
+        explanations.append(f"Finansal Etki: A Grubu (Yüksek Ciro) ürün önceliklendirildi.")
+
+    # Maliyet/Lojistik
+    estimated_cost = min_dist * 4.5 # km başına 4.5 TL (Örnek)
+    explanations.append(f"Lojistik Maliyet: ₺{estimated_cost:,.0f} (Mesafe: {min_dist:.1f} km).")
+
+    return {
+        "transfer_id": f"TRF-{transfer_no}",
+        "source": {
+            "id": source_store.id,
+            "name": source_store.name,
+            "type": source_store.store_type.value
+        },
+        "target": {
+            "id": target_store.id,
+            "name": target_store.name,
+            "type": target_store.store_type.value
+        },
+        "product_id": req["product_id"],
+        "product": product_name,
+        "amount": transfer_amount,
+        "xai_explanation": { # Frontend'de kart olarak gösterilecek
+            "summary": f"Stok Riski %{stockout_risk_reduction} Azaltıldı | Maliyet: ₺{estimated_cost:,.0f}",
+            "reasons": explanations,
+            "score": round(max(0, match["score"])), # Skor negatif olmasın
+            "type": "PROACTIVE" # Frontend için tip belirteci
+        },
+        "algorithm": match.get("algorithm", ALGORITHM_NAME)
+    }
+
+def assemble_recommendations(matches: List[Dict], stores_by_id: Dict[int, Store], products: Dict) -> List[Dict]:
+    """
+    Ürün bazlı eşleşmeleri global alıcı sırasına göre birleştirir.
+    transfer_id numaraları bu sıraya göre (TRF-100'den itibaren) verilir.
+    """
+    matches.sort(key=lambda m: m["receiver"]["rank"]) # Stabil: alıcı içi sıra korunur
+    return [
+        build_recommendation(match, 100 + i, stores_by_id, products)
+        for i, match in enumerate(matches)
+    ]
+
+def match_products(product_groups: List[List[Dict]], pools: Dict[Tuple[StoreType, int], GiverPool],
+                   distances: np.ndarray, penalties: PenaltyIndex, max_truck_capacity: int,
+                   use_optimal: bool, deadline: float) -> Tuple[List[Dict], int]:
+    """
+    Ürün gruplarını sırayla eşleştirir. Optimal modda süre bütçesi (deadline,
+    time.time() cinsinden) dolan veya çözülemeyen ürünler greedy ile çözülür.
+    deadline işçi süreçlere de gider; perf_counter'ın başlangıç noktası süreçler
+    arasında tanımsız olduğundan duvar saati kullanılır.
+
+    Dönüş: (eşleşmeler, greedy'ye düşen ürün sayısı)
+    """
+    matches = []
+    fallbacks = 0
+    for product_receivers in product_groups:
+        product_matches = None
+        if use_optimal:
+            remaining = deadline - time.time()
+            if remaining > 0:
+                product_matches = match_product_optimal(product_receivers, pools, distances, penalties, max_truck_capacity, remaining)
+            if product_matches is None:
+                fallbacks += 1
+        if product_matches is None:
+            product_matches = match_product_greedy(product_receivers, pools, distances, penalties, max_truck_capacity)
+        matches.extend(product_matches)
+    return matches, fallbacks
+
+# --- Paralel (Bölümlenmiş) Eşleştirme ---
+# Her worker sürecine mesafe matrisi ve ceza indeksi başlangıçta BİR kez verilir
+# (fork'ta kopyasız paylaşılır, spawn'da worker başına bir kez kopyalanır).
+# Görevler sadece kendi ürünlerinin alıcı ve havuzlarını taşır.
+_worker_state = {}
+
+def _init_match_worker(distances: np.ndarray, penalties: PenaltyIndex):
+    distances.setflags(write=False)
+    _worker_state["distances"] = distances
+    _worker_state["penalties"] = penalties
+
+def _match_shard(shard: List[Tuple[List[Dict], Dict]], max_truck_capacity: int, use_optimal: bool, deadline: float):
+    """Worker: Bir parça ürünü eşleştirir, sonucu alıcı sırası (rank) ile sade tuple olarak döner."""
+    pools = {}
+    for _, product_pools in shard:
+        pools.update(product_pools)
+    matches, fallbacks = match_products([receivers for receivers, _ in shard], pools, _worker_state["distances"],
+                                        _worker_state["penalties"], max_truck_capacity, use_optimal, deadline)
+    return [
+        (m["receiver"]["rank"], m["source_store_id"], m["amount"], m["score"], m["distance"], m.get("algorithm"))
+        for m in matches
+    ], fallbacks
+
+def partition_products(product_groups: List[List[Dict]], n_shards: int) -> List[List[List[Dict]]]:
+    """
+    Ürünleri alıcı sayısına göre dengeli parçalara böler (en büyük ürün önce,
+    en hafif parçaya). Eşitlikte product_id kullanıldığı için bölümleme deterministiktir.
+    """
+    shards = [[] for _ in range(n_shards)]
+    loads = [0] * n_shards
+    for group in sorted(product_groups, key=lambda g: (-len(g), g[0]["product_id"])):
+        target = loads.index(min(loads))
+        shards[target].append(group)
+        loads[target] += len(group)
+    return [shard for shard in shards if shard]
+
+def match_products_parallel(product_groups: List[List[Dict]], receivers: List[Dict],
+                            pools: Dict[Tuple[StoreType, int], GiverPool], distances: np.ndarray,
+                            penalties: PenaltyIndex, max_truck_capacity: int, use_optimal: bool,
+                            deadline: float, workers: int) -> Tuple[List[Dict], int]:
+    """
+    Ürün bazlı parçaları bir süreç havuzunda (ProcessPoolExecutor) eşleştirir.
+    Sonuçlar alıcı sırasına (rank) göre birleştirildiği için çıktı ve transfer_id
+    numaraları sıralı çalıştırmayla birebir aynıdır.
+    """
+    shards = []
+    for shard in partition_products(product_groups, workers * SHARDS_PER_WORKER):
+        shards.append([
+            (group, {key: pools[key] for key in ((t, group[0]["product_id"]) for t in SEARCH_ORDER) if key in pools})
+            for group in shard
+        ])
+
+    matches = []
+    fallbacks = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_match_worker,
+                             initargs=(distances, penalties)) as executor:
+        futures = [executor.submit(_match_shard, shard, max_truck_capacity, use_optimal, deadline) for shard in shards]
+        for future in futures:
+            shard_matches, shard_fallbacks = future.result()
+            fallbacks += shard_fallbacks
+            for rank, source_store_id, amount, score, distance, algorithm in shard_matches:
+                match = {"receiver": receivers[rank], "source_store_id": source_store_id,
+                         "amount": amount, "score": score, "distance": distance}
+                if algorithm is not None:
+                    match["algorithm"] = algorithm
+                matches.append(match)
+    return matches, fallbacks
+
+def compute_transfer_recommendations(stores: List[Store], demand_map: Dict[Tuple[int, int], float],
+                                     penalty_map: Dict[Tuple[int, int], float], max_truck_capacity: int = 50,
+                                     mode: str = "greedy", time_budget: Optional[float] = None,
+                                     workers: Optional[int] = None) -> List[Dict]:
+    """
+    Robin Hood çekirdeği (DB bağımsız): Ön yüklenmiş talep ve ceza verisiyle çalışır.
+    Benchmark ve testler doğrudan bu fonksiyonu çağırabilir.
+
+    mode:
+    - "greedy" : Alıcılar öncelik sırasıyla tek tek en iyi kaynağa eşlenir.
+    - "optimal": Her ürün min-cost flow olarak global çözülür. Süre bütçesi
+                 (time_budget) aşılırsa veya çözücü yoksa kalan ürünler greedy çalışır.
+
+    workers: 1'den büyükse ürünler parçalara bölünüp süreç havuzunda eşleştirilir
+             (varsayılan: settings.TRANSFER_MATCH_WORKERS).
+    """
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Geçersiz transfer modu: {mode}")
+    # [OPTIMIZASYON] Mağazalar arası mesafe matrisi (süreç içinde önbelleklenir)
+    distance_matrix = get_distance_matrix(stores)
+    stores_by_id = {store.id: store for store in stores}
+
+    receivers, pools, products = build_pools(stores, demand_map, distance_matrix)
+    rank_receivers(receivers)
+    penalties = PenaltyIndex(penalty_map, distance_matrix)
+
+    use_optimal = mode == "optimal"
+    if use_optimal and linprog is None:
+        logger.warning("scipy bulunamadı, optimal mod yerine greedy kullanılıyor.")
+        use_optimal = False
+    deadline = time.time() + (time_budget if time_budget is not None else settings.TRANSFER_OPTIMAL_TIME_BUDGET)
+
+    product_groups = list(group_by_product(receivers).values())
+    workers = settings.TRANSFER_MATCH_WORKERS if workers is None else workers
+    matches = None
+    if workers > 1 and len(product_groups) > 1:
+        try:
+            matches, fallbacks = match_products_parallel(product_groups, receivers, pools, distance_matrix.matrix, penalties,
+                                                         max_truck_capacity, use_optimal, deadline, workers)
+        except (OSError, BrokenProcessPool) as e:
+            # Süreç açılamayan ortamlar (kısıtlı konteyner vb.): sıralı çalış
+            logger.warning(f"Paralel transfer eşleştirme başlatılamadı, sıralı çalışılıyor: {e}")
+    if matches is None:
+        matches, fallbacks = match_products(product_groups, pools, distance_matrix.matrix, penalties,
+                                            max_truck_capacity, use_optimal, deadline)
+
+    if fallbacks:
+        logger.warning(f"Optimal transfer: {fallbacks} ürün süre bütçesi/çözücü nedeniyle greedy ile çözüldü.")
+
+    return assemble_recommendations(matches, stores_by_id, products)
+
+def generate_transfer_recommendations(db: Session, stores: List[Store], max_truck_capacity: int = 50,
+                                      mode: str = "greedy", workers: Optional[int] = None) -> List[Dict]:
+    """
+    Robin Hood Algoritması (Proaktif Stok Dengeleme):
+    Zenginden (Stok Fazlası Olan) alıp, fakire (Stok İhtiyacı Olan) verme prensibi.
+
+    Adımlar:
+    1. Talep Tahmini Analizi (Gelecek 7 gün ne satacak?)
+    2. Eksik (Shortage) ve Fazla (Excess) tespiti.
+    3. Maliyet Fonksiyonu (Cost Function) ile en uygun transfer eşlemesi
+       (greedy: öncelik sırasıyla, optimal: ürün bazında min-cost flow).
+       Ürünler bağımsız olduğu için eşleştirme süreç havuzunda paralel çalışabilir.
+    """
+    today = date.today()
+    next_week = today + timedelta(days=7)
+
+    # [OPTIMIZASYON] Gelecek 7 günün talebini tek seferde RAM'e al
+    # (Mağaza x Ürün kadar sorgu yerine sabit sayıda gruplanmış sorgu)
+    demand_map = load_demand_map(db, [s.id for s in stores], today, next_week)
+    penalty_map = load_penalty_map(db)
+
+    return compute_transfer_recommendations(stores, demand_map, penalty_map, max_truck_capacity, mode=mode, workers=workers)
+
+# ==========================================
+# ♻️ ARTIMLI MOD (Incremental Engine)
+# ==========================================
+# Alıcı/verici durumunun kaynağı (stok + 7 günlük talep) RAM'de tutulur.
+# change_tracker'dan gelen (store_id, product_id) değişiklikleri sadece ilgili
+# kayıtları günceller ve sadece dokunulan ürünler yeniden eşleştirilir.
+
+StoreInfo = namedtuple("StoreInfo", "id name store_type lat lon")
+ProductInfo = namedtuple("ProductInfo", "id name abc_category")
+
+class IncrementalTransferEngine:
+    """
+    Artımlı Robin Hood motoru.
+
+    Ürünler birbirinden bağımsız eşleştiği için (bkz. match_product_greedy)
+    bir envanter/tahmin değişikliği sadece o ürünün sonucunu etkiler.
+    Kararlı durumda bir çağrının maliyeti O(değişen kayıt + etkilenen ürün)
+    olur; tam yeniden hesaplama sadece şu durumlarda yapılır:
+    - İlk çağrı, gün değişimi (7 günlük pencere kayar)
+    - Mağaza/ürün tablosu değişimi veya anahtarsız (toplu) değişiklik
+    - Durum TRANSFER_INCREMENTAL_MAX_AGE saniyeden eskiyse (diğer worker'ların
+      değişikliklerini kaçırmamak için güvenlik ağı)
+    """
+    def __init__(self, max_truck_capacity: int = 50, mode: str = "greedy"):
+        if mode not in TRANSFER_MODES:
+            raise ValueError(f"Geçersiz transfer modu: {mode}")
+        self.max_truck_capacity = max_truck_capacity
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.sequence = -1
+        self.built_on: Optional[date] = None
+        self.built_at = 0.0
+        self.stores_by_id: Dict[int, StoreInfo] = {}
+        self.products: Dict[int, ProductInfo] = {}
+        self.stock: Dict[int, Dict[int, Tuple[int, int]]] = defaultdict(dict) # product_id -> store_id -> (stok, güvenlik)
+        self.demand_map: Dict[Tuple[int, int], float] = {}
+        self.penalty_map: Dict[Tuple[int, int], float] = {}
+        self.distance_matrix: Optional[DistanceMatrix] = None
+        self.penalties: Optional[PenaltyIndex] = None
+        self.results: Dict[int, List[Tuple[tuple, Dict]]] = {} # product_id -> [(sıra anahtarı, öneri)]
+        self.last_refresh = {"type": None, "products": 0}
+
+    def recommendations(self, db: Session) -> List[Dict]:
+        """Durumu son değişikliklere göre günceller ve tam öneri listesini döner."""
+        with self._lock:
+            latest, changes = change_tracker.changes_since(self.sequence)
+            if self._needs_rebuild(changes):
+                self._rebuild(db, latest)
+            elif changes:
+                self._apply(db, changes, latest)
+            else:
+                self.last_refresh = {"type": "none", "products": 0}
+            return self._assemble()
+
+    def _needs_rebuild(self, changes) -> bool:
+        if changes is None or self.built_on != date.today():
+            return True
+        if time.monotonic() - self.built_at > settings.TRANSFER_INCREMENTAL_MAX_AGE:
+            return True
+        if change_tracker.STORE in changes or change_tracker.PRODUCT in changes:
+            return True
+        return any(changes.get(kind, ()) is None for kind in (change_tracker.INVENTORY, change_tracker.FORECAST))
+
+    def _rebuild(self, db: Session, sequence: int):
+        """Tüm durumu DB'den yükler (sabit sayıda sorgu) ve bütün ürünleri eşleştirir."""
+        today = date.today()
+        stores = load_stores_with_inventory(db)
+        self.stores_by_id = {s.id: StoreInfo(s.id, s.name, s.store_type, s.lat, s.lon) for s in stores}
+        self.products = {}
+        self.stock = defaultdict(dict)
+        for store in stores:
+            for item in store.inventory:
+                product = item.product
+                self.products[item.product_id] = ProductInfo(product.id, product.name, product.abc_category)
+                self.stock[item.product_id][store.id] = (item.quantity, item.safety_stock)
+
+        self.demand_map = load_demand_map(db, list(self.stores_by_id), today, today + timedelta(days=7))
+        self.penalty_map = load_penalty_map(db)
+        self.distance_matrix = get_distance_matrix(list(self.stores_by_id.values()))
+        self.penalties = PenaltyIndex(self.penalty_map, self.distance_matrix)
+
+        self.results = {}
+        self._match(list(self.stock))
+        self.sequence = sequence
+        self.built_on = today
+        self.built_at = time.monotonic()
+        self.last_refresh = {"type": "full", "products": len(self.stock)}
+
+    def _apply(self, db: Session, changes: Dict, sequence: int):
+        """Sadece değişen (mağaza, ürün) kayıtlarını yeniden okur ve etkilenen ürünleri eşleştirir."""
+        dirty_products = set()
+
+        if change_tracker.ROUTE_PENALTY in changes:
+            # Ceza her ürünün skorunu etkiler
+            self.penalty_map = load_penalty_map(db)
+            self.penalties = PenaltyIndex(self.penalty_map, self.distance_matrix)
+            dirty_products.update(self.stock)
+
+        inventory_keys = changes.get(change_tracker.INVENTORY) or set()
+        if inventory_keys:
+            rows = load_inventory_rows(db, inventory_keys)
+            for store_id, product_id in inventory_keys:
+                if store_id not in self.stores_by_id:
+                    continue
+                row = rows.get((store_id, product_id))
+                if row is None:
+                    self.stock[product_id].pop(store_id, None)
+                else:
+                    self.stock[product_id][store_id] = row
+            self._load_missing_products(db, {product_id for _, product_id in inventory_keys})
+            dirty_products.update(product_id for _, product_id in inventory_keys)
+
+        forecast_keys = changes.get(change_tracker.FORECAST) or set()
+        if forecast_keys:
+            today = date.today()
+            demand = load_demand_for_keys(db, forecast_keys, today, today + timedelta(days=7))
+            for key in forecast_keys:
+                if key in demand:
+                    self.demand_map[key] = demand[key]
+                else:
+                    self.demand_map.pop(key, None)
+            dirty_products.update(product_id for _, product_id in forecast_keys)
+
+        self._match(dirty_products)
+        self.sequence = sequence
+        self.last_refresh = {"type": "incremental", "products": len(dirty_products)}
+
+    def _load_missing_products(self, db: Session, product_ids):
+        missing = [pid for pid in product_ids if pid not in self.products]
+        if not missing:
+            return
+        for product in db.query(Product.id, Product.name, Product.abc_category).filter(Product.id.in_(missing)):
+            self.products[product.id] = ProductInfo(product.id, product.name, product.abc_category)
+
+    def _match(self, product_ids):
+        """Verilen ürünlerin alıcı/verici havuzlarını RAM'deki durumdan kurar ve eşleştirir."""
+        use_optimal = self.mode == "optimal" and linprog is not None
+        deadline = time.perf_counter() + settings.TRANSFER_OPTIMAL_TIME_BUDGET
+        index = self.distance_matrix.index
+
+        for product_id in product_ids:
+            entries = self.stock.get(product_id)
+            product = self.products.get(product_id)
+            if not entries or product is None:
+                self.results.pop(product_id, None)
+                continue
+
+            receivers, pools = [], {}
+            for store_id, (quantity, safety_stock) in entries.items():
+                store = self.stores_by_id[store_id]
+                classify_item(store_id, index[store_id], store.store_type, product_id, quantity, safety_stock,
+                              self.demand_map.get((store_id, product_id), 0), product.abc_category, receivers, pools)
+            if not receivers:
+                self.results.pop(product_id, None)
+                continue
+            for pool in pools.values():
+                pool.finalize()
+            receivers.sort(key=receiver_sort_key)
+
+            matches = None
+            if use_optimal and deadline > time.perf_counter():
+                matches = match_product_optimal(receivers, pools, self.distance_matrix.matrix, self.penalties,
+                                                self.max_truck_capacity, deadline - time.perf_counter())
+            if matches is None:
+                matches = match_product_greedy(receivers, pools, self.distance_matrix.matrix, self.penalties,
+                                               self.max_truck_capacity)
+
+            # transfer_id global sıraya göre verileceği için montajda eklenir
+            self.results[product_id] = [
+                (receiver_sort_key(m["receiver"]), build_recommendation(m, 0, self.stores_by_id, self.products))
+                for m in matches
+            ]
+
+    def _assemble(self) -> List[Dict]:
+        ordered = sorted(
+            (entry for product_results in self.results.values() for entry in product_results),
+            key=lambda entry: entry[0] # Stabil: alıcı içi sıra korunur
+        )
+        return [dict(rec, transfer_id=f"TRF-{100 + i}") for i, (_, rec) in enumerate(ordered)]
+
+_incremental_engines: Dict[Tuple[str, int], IncrementalTransferEngine] = {}
+_incremental_lock = threading.Lock()
+
+def get_incremental_engine(mode: str = "greedy", max_truck_capacity: int = 50) -> IncrementalTransferEngine:
+    """Süreç içinde (mod, tır kapasitesi) başına tek artımlı motor örneği döner."""
+    key = (mode, max_truck_capacity)
+    with _incremental_lock:
+        engine = _incremental_engines.get(key)
+        if engine is None:
+            engine = _incremental_engines[key] = IncrementalTransferEngine(max_truck_capacity, mode)
+        return engine
@@ -0,0 +1,36 @@
+import axiosClient from './axios';
+
+// ==========================================
+// 🧵 ARKA PLAN İŞLERİ
+// ==========================================
+// Simülasyon, reset ve analiz endpoint'leri sonucu beklemeden iş kaydı döner (202).
+// waitForJob işi bitene kadar yoklar ve işin sonucunu (eski yanıt gövdesi) döner.
+
+const FINISHED = ['Success', 'Failed', 'Cancelled'];
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const waitForJob = async (job, { interval = 1000, onProgress } = {}) => {
+    let current = job;
+    while (!FINISHED.includes(current.status)) {
+        await sleep(interval);
+        const { data } = await axiosClient.get(`/api/jobs/${current.id}`);
+        current = data;
+        if (onProgress) onProgress(current);
+    }
+    if (current.status !== 'Success') {
+        throw new Error(current.error || `İş ${current.status === 'Cancelled' ? 'iptal edildi' : 'başarısız oldu'}`);
+    }
+    return current.result;
+};
+
+// İşi başlatan POST isteğini gönderir ve sonucunu bekler
+export const runJob = async (url, payload, options) => {
+    const { data } = await axiosClient.post(url, payload);
+    return waitForJob(data, options);
+};
+
+export const cancelJob = async (jobId) => {
+    const { data } = await axiosClient.post(`/api/jobs/${jobId}/cancel`);
+    return data;
+};
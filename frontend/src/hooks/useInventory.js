@@ -1,13 +1,26 @@
 import { useQuery } from '@tanstack/react-query';
 import axiosClient from '../api/axios';
 
+const PAGE_SIZE = 1000; // Backend'in izin verdiği en büyük sayfa
+
+// Stok listesi sayfalıdır: X-Next-Cursor başlığı bitene kadar sonraki sayfalar da çekilir
+const fetchInventory = async (storeId) => {
+    const rows = [];
+    let cursor;
+    do {
+        const response = await axiosClient.get(`/api/stores/${storeId}/inventory`, {
+            params: { limit: PAGE_SIZE, cursor },
+        });
+        rows.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return rows;
+};
+
 export const useInventory = (storeId) => {
     return useQuery({
         queryKey: ['inventory', storeId],
-        queryFn: async () => {
-            const { data } = await axiosClient.get(`/api/stores/${storeId}/inventory`);
-            return data;
-        },
+        queryFn: () => fetchInventory(storeId),
         enabled: !!storeId, // Sadece storeId varsa çalış
         staleTime: 1000 * 60 * 5, // 5 dakika boyunca cache'den oku
         keepPreviousData: true, // ID değişirken eski veriyi göster (UX)
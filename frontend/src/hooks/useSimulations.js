@@ -1,5 +1,6 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import axiosClient from '../api/axios';
+import { runJob } from '../api/jobs';
 
 // Fetch Simulation Stats
 const fetchStats = async () => {
@@ -7,10 +8,9 @@ const fetchStats = async () => {
     return data;
 };
 
-// Reset Simulation
+// Reset Simulation (arka plan işi; iş bitince sonucu döner)
 const resetSimulation = async () => {
-    const { data } = await axiosClient.post('/api/simulate/reset');
-    return data;
+    return runJob('/api/simulate/reset');
 };
 
 // Run Scenario (Boom, Recession, Supply Shock)
@@ -22,8 +22,7 @@ const runScenario = async (scenarioType) => {
         case 'shock': endpoint = 'supply-shock'; break;
         default: throw new Error('Invalid scenario type');
     }
-    const { data } = await axiosClient.post(`/api/simulate/${endpoint}`);
-    return data;
+    return runJob(`/api/simulate/${endpoint}`);
 };
 
 // Run What-If Analysis
@@ -4,6 +4,7 @@ import { ArrowPathIcon, CheckBadgeIcon, ChartBarIcon, ExclamationTriangleIcon, R
 import ColdStartModule from '../components/ColdStartModule';
 import NewProductModal from '../components/NewProductModal';
 import axiosClient from '../api/axios';
+import { runJob } from '../api/jobs';
 import { useTheme } from '../context/ThemeContext';
 
 const InfoTooltip = ({ text }) => (
@@ -67,7 +68,7 @@ const Analytics = () => {
     const handleGenerateForecasts = async () => {
         setIsGenerating(true);
         try {
-            await axiosClient.post('/api/forecast/generate');
+            await runJob('/api/forecast/generate', undefined, { interval: 2000 });
             await fetchAccuracyData();
         } catch (error) {
             console.error("Tahmin üretim hatası:", error);